@@ -6,41 +6,73 @@ Definisce gli endpoint per l'invio e la gestione dei log.
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Body
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import asyncio
 import uuid
 import json
 
 from core.models import LogEntry, LogLevel, LogProject
 from core.log_manager import LogManager
+from core.log_writer import get_log_writer, LogQueueFullError, LogWriterStoppedError
+from core.config import get_settings
 from core.auth import get_api_key
 
 router = APIRouter()
 log_manager = LogManager()
 
+
+async def _enqueue_logs(log_entries: List[LogEntry], durable: Optional[bool]) -> List[str]:
+    """
+    Accoda i log nella pipeline di scrittura e, se richiesto, attende il commit.
+    
+    Coda piena -> 429 con Retry-After; pipeline ferma -> 503.
+    """
+    try:
+        future = get_log_writer().submit(log_entries)
+    except LogQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    except LogWriterStoppedError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    
+    if durable is None:
+        durable = get_settings().ingest_wait_durable
+    if durable:
+        return await asyncio.wrap_future(future)
+    return [entry.id for entry in log_entries]
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_log(
     log_entry: LogEntry = Body(...),
+    durable: Optional[bool] = None,
     api_key: str = Depends(get_api_key)
 ):
     """
     Crea una nuova voce di log.
     
+    Il log viene accodato nella pipeline di scrittura; con `durable=true` la risposta
+    arriva solo dopo il commit su disco.
     Richiede un API key valido per l'autenticazione.
     """
-    log_id = log_manager.add_log(log_entry)
-    return {"id": log_id, "message": "Log registrato con successo"}
+    log_ids = await _enqueue_logs([log_entry], durable)
+    return {"id": log_ids[0], "message": "Log registrato con successo"}
 
 @router.post("/batch", status_code=status.HTTP_201_CREATED)
 async def create_logs_batch(
     log_entries: List[LogEntry] = Body(...),
+    durable: Optional[bool] = None,
     api_key: str = Depends(get_api_key)
 ):
     """
     Crea multiple voci di log in un'unica richiesta.
     
     Utile per l'invio di log in batch in caso di connessione intermittente.
+    I log del batch vengono scritti nella stessa transazione.
     Richiede un API key valido per l'autenticazione.
     """
-    log_ids = log_manager.add_logs_batch(log_entries)
+    log_ids = await _enqueue_logs(log_entries, durable)
     return {"ids": log_ids, "count": len(log_ids), "message": "Logs registrati con successo"}
 
 @router.get("/", response_model=List[Dict[str, Any]])
@@ -239,35 +271,11 @@ async def cleanup_unarchived(
 
     Richiede un'API key valida.
     """
-    conn = log_manager._get_connection()
-    cursor = conn.cursor()
-
-    # Verifica se la tabella compressed_logs esiste
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='compressed_logs'")
-    if not cursor.fetchone():
-        # Se non esiste, allora non ci sono log archiviati: cancella tutto
-        try:
-            cursor.execute("DELETE FROM logs")
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
-            return {"deleted_count": deleted_count, "message": f"Eliminati {deleted_count} log (nessun archivio trovato)"}
-        except Exception as e:
-            conn.rollback()
-            conn.close()
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
-
-    # Se la tabella esiste, elimina i log il cui id non è presente in compressed_logs
     try:
-        cursor.execute("DELETE FROM logs WHERE id NOT IN (SELECT log_id FROM compressed_logs)")
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
-        return {"deleted_count": deleted_count, "message": f"Eliminati {deleted_count} log non archiviati"}
+        deleted_count = log_manager.delete_unarchived_logs()
     except Exception as e:
-        conn.rollback()
-        conn.close()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    return {"deleted_count": deleted_count, "message": f"Eliminati {deleted_count} log non archiviati"}
 
 
 @router.delete("/cleanup/all", status_code=status.HTTP_200_OK)
@@ -299,18 +307,18 @@ async def cleanup_all(
             # Se la tabella non esiste, ignora
             pass
 
-        # 2) elimina tutti i logs
-        cursor.execute("DELETE FROM logs")
-        deleted_logs = cursor.rowcount
-
         conn.commit()
+
+        # 2) elimina tutti i logs (DROP delle partizioni) e gli archivi colonnari
+        deleted_logs = log_manager.delete_all_logs()
+        removed_columnar = log_manager.delete_all_archives()
     except Exception as e:
         conn.rollback()
         conn.close()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
     # Rimuovi i file di archivio dal filesystem (fuori dalla transazione DB)
-    removed_archives = 0
+    removed_archives = removed_columnar
     for path in archives:
         try:
             import os
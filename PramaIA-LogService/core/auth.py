@@ -7,14 +7,24 @@ from fastapi.security.api_key import APIKeyHeader
 from typing import Dict, Optional, Any, List
 import os
 import json
+import time
+import hashlib
 import logging
+import threading
 from datetime import datetime, timedelta
 
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key", auto_error=False)
 API_KEYS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "api_keys.json")
+API_KEY_USAGE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "api_key_usage.json")
 
 logger = logging.getLogger(__name__)
 
+# Indice in memoria delle API key: hash della chiave -> {"id", "info", "expiry"}
+_key_index: Dict[str, Dict[str, Any]] = {}
+# (mtime_ns, dimensione) del file da cui è stato costruito l'indice; None = da ricaricare
+_key_index_signature = None
+_key_index_lock = threading.Lock()
+
 # Carica le API key dal file di configurazione
 def load_api_keys() -> Dict[str, Dict]:
     """Carica le API key dal file di configurazione."""
@@ -66,34 +76,108 @@ def load_api_keys() -> Dict[str, Dict]:
         logger.error(f"Errore durante il caricamento del file delle API keys: {str(e)}")
         return {}
 
-def get_api_key_info(api_key: str) -> Optional[Dict]:
-    """Verifica e restituisce le informazioni sull'API key."""
-    api_keys = load_api_keys()
+def _hash_api_key(api_key: str) -> str:
+    """Restituisce l'hash SHA-256 di una API key, usato come chiave dell'indice."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+def _api_keys_signature() -> Optional[tuple]:
+    """Restituisce (mtime_ns, dimensione) del file delle API key, None se non esiste."""
+    try:
+        stat = os.stat(API_KEYS_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _build_key_index(api_keys: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Costruisce l'indice delle API key con la data di scadenza già convertita.
     
-    # Primo tentativo: cerca direttamente la chiave
+    Args:
+        api_keys: Contenuto del file delle API key
+        
+    Returns:
+        Dizionario hash della chiave -> {"id", "info", "expiry"}
+    """
+    index = {}
     for key_id, key_info in api_keys.items():
         if isinstance(key_info, dict):
-            if key_info.get("key") == api_key:
-                # Verifica se la chiave è scaduta
-                if key_info.get("expiry"):
-                    try:
-                        expiry_date = datetime.fromisoformat(key_info["expiry"])
-                        if datetime.now() > expiry_date:
-                            logger.debug(f"API key scaduta: {mask_api_key(api_key)}")
-                            return None
-                    except ValueError as e:
-                        logger.warning(f"Formato data di scadenza non valido: {key_info['expiry']}, errore: {str(e)}")
-                
-                return key_info
-        elif isinstance(key_info, str) and key_info == api_key:  # Formato legacy
+            info = key_info
+        elif isinstance(key_info, str):  # Formato legacy
             # Converti al nuovo formato
-            new_key_info = {
+            info = {
                 "name": key_id,
                 "key": key_info,
                 "projects": [key_id],
                 "expiry": None
             }
-            return new_key_info
+        else:
+            continue
+        
+        if not info.get("key"):
+            continue
+        
+        expiry = None
+        if info.get("expiry"):
+            try:
+                expiry = datetime.fromisoformat(info["expiry"])
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Formato data di scadenza non valido: {info['expiry']}, errore: {str(e)}")
+        
+        # A parità di chiave vale la prima voce del file
+        index.setdefault(_hash_api_key(str(info["key"])), {"id": key_id, "info": info, "expiry": expiry})
+    return index
+
+def _get_key_index() -> Dict[str, Dict[str, Any]]:
+    """
+    Restituisce l'indice delle API key, ricaricando il file solo se è cambiato.
+    """
+    global _key_index, _key_index_signature
+    
+    signature = _api_keys_signature()
+    with _key_index_lock:
+        if signature is not None and signature == _key_index_signature:
+            return _key_index
+        
+        api_keys = load_api_keys()
+        if signature is None:
+            # Il file è stato appena creato con le chiavi di default
+            signature = _api_keys_signature()
+        
+        _key_index = _build_key_index(api_keys)
+        _key_index_signature = signature
+        logger.debug(f"Indice delle API key ricaricato: {len(_key_index)} chiavi")
+        return _key_index
+
+def invalidate_api_key_cache():
+    """
+    Forza il ricaricamento dell'indice delle API key alla prossima richiesta.
+    
+    Va chiamata dopo ogni modifica di `API_KEYS_FILE` (creazione, rigenerazione o
+    eliminazione di una chiave); le modifiche esterne vengono rilevate dalla data di modifica.
+    """
+    global _key_index_signature
+    with _key_index_lock:
+        _key_index_signature = None
+
+def _lookup_api_key(api_key: str) -> Optional[Dict[str, Any]]:
+    """Cerca una API key valida e non scaduta nell'indice."""
+    entry = _get_key_index().get(_hash_api_key(api_key))
+    if entry is None:
+        return None
+    
+    # Verifica se la chiave è scaduta
+    if entry["expiry"] and datetime.now() > entry["expiry"]:
+        logger.debug(f"API key scaduta: {mask_api_key(api_key)}")
+        return None
+    
+    return entry
+
+def get_api_key_info(api_key: str) -> Optional[Dict]:
+    """Verifica e restituisce le informazioni sull'API key."""
+    # Primo tentativo: cerca la chiave nell'indice
+    entry = _lookup_api_key(api_key)
+    if entry:
+        return entry["info"]
     
     # Secondo tentativo: controlla se è una chiave nel formato di sviluppo (pramaialog_pdk_dev_key_12345)
     if api_key.startswith("pramaialog_") and "_dev_key_" in api_key:
@@ -125,6 +209,11 @@ async def get_api_key(api_key: str = Security(API_KEY_HEADER)) -> str:
             detail="API Key mancante"
         )
     
+    entry = _lookup_api_key(api_key)
+    if entry:
+        get_api_key_usage_tracker().record(entry["id"])
+        return api_key
+    
     key_info = get_api_key_info(api_key)
     if not key_info:
         logger.warning(f"Tentativo di accesso con API key non valida: {mask_api_key(api_key)}")
@@ -176,12 +265,143 @@ def create_api_key(name: str, projects: List[str], expiry_days: Optional[int] =
     try:
         with open(API_KEYS_FILE, "w") as f:
             json.dump(api_keys, f, indent=4)
+        invalidate_api_key_cache()
         logger.info(f"Creata nuova API key con nome: {name}, ID: {key_id}")
     except Exception as e:
         logger.error(f"Errore durante il salvataggio della nuova API key: {str(e)}")
     
     return key_info
 
+class ApiKeyUsageTracker:
+    """
+    Contatori delle richieste per API key.
+    
+    I contatori vengono incrementati in memoria a ogni richiesta autenticata e sommati
+    in `API_KEY_USAGE_FILE` da un thread ogni `flush_interval_seconds` secondi e all'arresto.
+    """
+    
+    def __init__(self, path: str = API_KEY_USAGE_FILE, flush_interval_seconds: int = 60):
+        """
+        Inizializza i contatori.
+        
+        Args:
+            path: File JSON con i totali per ID della chiave
+            flush_interval_seconds: Intervallo tra due salvataggi su file
+        """
+        self.path = path
+        self.flush_interval = max(1, flush_interval_seconds)
+        
+        self._lock = threading.Lock()
+        # ID della chiave -> [richieste non ancora salvate, ultimo utilizzo (epoch)]
+        self._pending: Dict[str, list] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def record(self, key_id: str):
+        """Conta una richiesta autenticata con la chiave `key_id`."""
+        now = time.time()
+        with self._lock:
+            counter = self._pending.get(key_id)
+            if counter is None:
+                self._pending[key_id] = [1, now]
+            else:
+                counter[0] += 1
+                counter[1] = now
+    
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Legge i totali salvati su file."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Errore durante il caricamento dei contatori delle API key: {str(e)}")
+            return {}
+    
+    def _merge(self, usage: Dict[str, Dict[str, Any]], pending: Dict[str, list]) -> Dict[str, Dict[str, Any]]:
+        """Somma i contatori in memoria ai totali."""
+        for key_id, (count, last_used) in pending.items():
+            entry = usage.setdefault(key_id, {"requests": 0, "last_used": None})
+            entry["requests"] = entry.get("requests", 0) + count
+            entry["last_used"] = datetime.fromtimestamp(last_used).isoformat()
+        return usage
+    
+    def flush(self):
+        """Somma i contatori in memoria ai totali su file e li azzera."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        
+        try:
+            usage = self._merge(self._read(), pending)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(usage, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Errore durante il salvataggio dei contatori delle API key: {str(e)}")
+            # Rimetti i contatori in memoria per il prossimo salvataggio
+            with self._lock:
+                for key_id, (count, last_used) in pending.items():
+                    counter = self._pending.setdefault(key_id, [0, last_used])
+                    counter[0] += count
+                    counter[1] = max(counter[1], last_used)
+    
+    def get_usage(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Restituisce i totali per ID della chiave, compresi i contatori non ancora salvati.
+        
+        Returns:
+            Dizionario ID della chiave -> {"requests", "last_used"}
+        """
+        with self._lock:
+            pending = {key_id: list(counter) for key_id, counter in self._pending.items()}
+        return self._merge(self._read(), pending)
+    
+    def start(self):
+        """Avvia il thread di salvataggio periodico."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="api-key-usage", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Ferma il thread e salva i contatori rimasti in memoria."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+    
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+# Singleton dei contatori di utilizzo
+_usage_tracker = None
+_usage_tracker_lock = threading.Lock()
+
+def get_api_key_usage_tracker() -> ApiKeyUsageTracker:
+    """
+    Ottiene l'istanza singleton dei contatori di utilizzo delle API key.
+    
+    Returns:
+        ApiKeyUsageTracker
+    """
+    global _usage_tracker
+    with _usage_tracker_lock:
+        if _usage_tracker is None:
+            from core.config import get_settings
+            
+            _usage_tracker = ApiKeyUsageTracker(
+                flush_interval_seconds=get_settings().api_key_usage_flush_seconds
+            )
+    return _usage_tracker
+
 def mask_api_key(api_key: str) -> str:
     """Maschera una API key per la visualizzazione nei log."""
     if not api_key:
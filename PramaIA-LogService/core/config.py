@@ -39,6 +39,7 @@ class LogServiceSettings(BaseSettings):
     
     # Configurazione di sicurezza
     enable_api_key_auth: bool = True
+    api_key_usage_flush_seconds: int = 60  # Intervallo di salvataggio dei contatori di utilizzo delle API key
     enable_cors: bool = True
     cors_origins: List[str] = [
         "http://localhost:3000",
@@ -52,6 +53,12 @@ class LogServiceSettings(BaseSettings):
     max_logs_per_request: int = 1000
     retention_days: int = 90  # Durata massima dei log in giorni
     
+    # Pipeline di ingestione (commit di gruppo)
+    ingest_queue_size: int = 10000  # Log in attesa oltre i quali si risponde 429
+    ingest_batch_size: int = 500  # Log massimi per transazione
+    ingest_flush_interval_ms: int = 50  # Attesa massima prima del commit di un gruppo
+    ingest_wait_durable: bool = False  # Se True le route rispondono solo dopo il commit
+    
     # Configurazione della compressione
     enable_log_compression: bool = True  # Attiva/disattiva la compressione dei log
     compress_logs_older_than_days: int = 1  # Comprimi i log più vecchi di X giorni
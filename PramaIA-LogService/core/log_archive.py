@@ -0,0 +1,193 @@
+"""
+Formato colonnare compresso per gli archivi dei log.
+
+Un archivio contiene i log di una partizione giornaliera sigillata, ordinati per
+timestamp e divisi in blocchi di `ARCHIVE_BLOCK_ROWS` righe. In ogni blocco ogni
+colonna è un array JSON compresso separatamente (zstd se disponibile, altrimenti
+zlib), così una ricerca decomprime solo le colonne che le servono.
+
+Struttura del file:
+
+    MAGIC | blocco 0 | blocco 1 | ... | footer JSON | lunghezza footer (8 byte) | MAGIC
+
+Il footer descrive i blocchi: righe, timestamp minimo/massimo, livelli, progetti
+e posizione di ogni colonna. La stessa descrizione viene copiata nel database dei
+log (tabella `log_archive_blocks`) per scegliere i blocchi senza aprire i file.
+"""
+
+import os
+import json
+import struct
+import zlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("PramaIA-LogService.LogArchive")
+
+MAGIC = b"PLCA1\n"
+ARCHIVE_EXTENSION = ".plca"
+
+# Righe per blocco: abbastanza per una buona compressione, poche da decomprimere per blocco
+ARCHIVE_BLOCK_ROWS = 4096
+
+# Codec usato per i nuovi archivi
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return zlib.compress(data, 9)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archivio compresso con zstd: installa il pacchetto 'zstandard'")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def write_archive(path: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+                  block_rows: int = ARCHIVE_BLOCK_ROWS, codec: str = DEFAULT_CODEC) -> Dict[str, Any]:
+    """
+    Scrive un archivio colonnare.
+
+    Args:
+        path: Percorso del file da creare
+        columns: Nomi delle colonne (devono includere timestamp, level e project)
+        rows: Righe ordinate per timestamp, con i valori nell'ordine di `columns`
+        block_rows: Righe per blocco
+        codec: "zstd" o "zlib"
+
+    Returns:
+        Footer dell'archivio (descrizione dei blocchi)
+    """
+    columns = list(columns)
+    ts_index = columns.index("timestamp")
+    level_index = columns.index("level")
+    project_index = columns.index("project")
+
+    footer = {"version": 1, "codec": codec, "columns": columns, "row_count": 0, "blocks": []}
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+
+        def flush(block: List[Sequence[Any]]):
+            meta = {
+                "row_count": len(block),
+                "min_timestamp": block[0][ts_index],
+                "max_timestamp": block[-1][ts_index],
+                "levels": sorted({row[level_index] for row in block}),
+                "projects": sorted({row[project_index] for row in block}),
+                "columns": {}
+            }
+            for i, column in enumerate(columns):
+                data = _compress(
+                    json.dumps([row[i] for row in block], separators=(",", ":")).encode("utf-8"),
+                    codec
+                )
+                meta["columns"][column] = [f.tell(), len(data)]
+                f.write(data)
+            footer["blocks"].append(meta)
+            footer["row_count"] += len(block)
+
+        block: List[Sequence[Any]] = []
+        for row in rows:
+            block.append(tuple(row))
+            if len(block) >= block_rows:
+                flush(block)
+                block = []
+        if block:
+            flush(block)
+
+        footer_bytes = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+        f.write(footer_bytes)
+        f.write(struct.pack("<Q", len(footer_bytes)))
+        f.write(MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    return footer
+
+
+def read_footer(path: str) -> Dict[str, Any]:
+    """
+    Legge la descrizione dei blocchi di un archivio.
+    """
+    with open(path, "rb") as f:
+        f.seek(-(8 + len(MAGIC)), os.SEEK_END)
+        trailer = f.read(8 + len(MAGIC))
+        if trailer[8:] != MAGIC:
+            raise ValueError(f"File di archivio non valido: {path}")
+        (length,) = struct.unpack("<Q", trailer[:8])
+        f.seek(-(8 + len(MAGIC) + length), os.SEEK_END)
+        return json.loads(f.read(length).decode("utf-8"))
+
+
+def read_columns(path: str, codec: str, block_columns: Dict[str, List[int]],
+                 columns: Iterable[str]) -> Dict[str, List[Any]]:
+    """
+    Decomprime alcune colonne di un blocco.
+
+    Args:
+        path: Percorso dell'archivio
+        codec: Codec dell'archivio
+        block_columns: Posizioni delle colonne del blocco ({colonna: [offset, lunghezza]})
+        columns: Colonne da leggere
+
+    Returns:
+        Dizionario colonna -> lista di valori
+    """
+    result = {}
+    with open(path, "rb") as f:
+        for column in columns:
+            offset, length = block_columns[column]
+            f.seek(offset)
+            result[column] = json.loads(_decompress(f.read(length), codec).decode("utf-8"))
+    return result
+
+
+def scan_block(path: str, codec: str, block_columns: Dict[str, List[int]],
+               filter_columns: Sequence[str], predicate,
+               columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Restituisce le righe di un blocco che soddisfano un predicato.
+
+    Le colonne in `filter_columns` vengono decompresse per prime; le altre solo se
+    almeno una riga del blocco passa il filtro.
+
+    Args:
+        path: Percorso dell'archivio
+        codec: Codec dell'archivio
+        block_columns: Posizioni delle colonne del blocco
+        filter_columns: Colonne lette dal predicato
+        predicate: Funzione (dict colonna -> valore) -> bool
+        columns: Colonne da restituire (default: tutte)
+
+    Returns:
+        Righe come dizionari
+    """
+    columns = list(columns or block_columns.keys())
+    filter_columns = list(filter_columns) or ["timestamp"]
+    filter_values = read_columns(path, codec, block_columns, filter_columns)
+    row_count = len(next(iter(filter_values.values()))) if filter_values else 0
+
+    matches = []
+    for i in range(row_count):
+        if predicate({column: values[i] for column, values in filter_values.items()}):
+            matches.append(i)
+    if not matches:
+        return []
+
+    remaining = [column for column in columns if column not in filter_values]
+    values = dict(filter_values)
+    values.update(read_columns(path, codec, block_columns, remaining))
+    return [{column: values[column][i] for column in columns} for i in matches]
@@ -3,6 +3,7 @@ Sistema di gestione dei log.
 """
 
 import os
+import re
 import json
 import sqlite3
 from typing import List, Dict, Any, Optional, Union
@@ -11,11 +12,106 @@ import uuid
 import logging
 
 from core.models import LogEntry, LogLevel, LogProject, LogStats
+from core import log_archive
 
 # Configura il logger interno
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("LogManager")
 
+# Chiavi dei dettagli/contesto estratte in colonne indicizzate della tabella logs
+ENTITY_KEYS = ("document_id", "file_name", "file_hash")
+
+# Righe elaborate per transazione durante il backfill delle colonne estratte
+ENTITY_BACKFILL_BATCH = 5000
+
+# Colonne di una partizione dei log, nell'ordine delle righe prodotte da serialize_log
+LOG_COLUMNS = (
+    "id", "timestamp", "project", "level", "module", "message", "details", "context",
+    "document_id", "file_name", "file_hash"
+)
+
+# Schema di una partizione giornaliera ({name} è il nome della tabella)
+PARTITION_DDL = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    project TEXT NOT NULL,
+    level TEXT NOT NULL,
+    module TEXT NOT NULL,
+    message TEXT NOT NULL,
+    details TEXT,
+    context TEXT,
+    document_id TEXT,
+    file_name TEXT,
+    file_hash TEXT
+)
+'''
+
+# Indici di ogni partizione: (suffisso, colonne)
+PARTITION_INDEXES = (
+    ("timestamp", "timestamp"),
+    ("project", "project"),
+    ("level", "level"),
+    ("module", "module"),
+    ("document_id", "document_id, timestamp"),
+    ("file_name", "file_name, timestamp"),
+    ("file_hash", "file_hash, timestamp"),
+)
+
+# Giorno usato per i timestamp che non iniziano con una data ISO
+INVALID_PARTITION_DAY = "0000-00-00"
+
+# Rollup dei conteggi per (progetto, livello, modulo): (tabella, lunghezza del prefisso del timestamp)
+ROLLUP_TABLES = (
+    ("log_rollup_minute", 16),  # YYYY-MM-DDTHH:MM
+    ("log_rollup_hour", 13),    # YYYY-MM-DDTHH
+)
+
+# Schema di una tabella di rollup ({name} è il nome della tabella)
+ROLLUP_DDL = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    bucket TEXT NOT NULL,
+    project TEXT NOT NULL,
+    level TEXT NOT NULL,
+    module TEXT NOT NULL,
+    log_count INTEGER NOT NULL,
+    min_timestamp TEXT NOT NULL,
+    max_timestamp TEXT NOT NULL,
+    PRIMARY KEY (bucket, project, level, module)
+)
+'''
+
+# Carattere massimo: `prefisso + PREFIX_END` è il limite superiore delle stringhe con quel prefisso
+PREFIX_END = "\U0010ffff"
+
+
+def extract_entity_refs(details: Optional[Dict[str, Any]], context: Optional[Dict[str, Any]]) -> tuple:
+    """
+    Estrae document_id, file_name e file_hash dai dettagli o dal contesto di un log.
+
+    I dettagli hanno la precedenza sul contesto. Se manca file_name viene usato il nome
+    del file in file_path.
+
+    Args:
+        details: Dettagli del log
+        context: Contesto del log
+
+    Returns:
+        Tupla (document_id, file_name, file_hash); i valori assenti sono None
+    """
+    refs = {}
+    for source in (details, context):
+        if not isinstance(source, dict):
+            continue
+        for key in ENTITY_KEYS:
+            value = source.get(key)
+            if key not in refs and value not in (None, ""):
+                refs[key] = str(value)
+        if "file_name" not in refs and source.get("file_path"):
+            refs["file_name"] = os.path.basename(str(source["file_path"]).replace("\\", "/"))
+    return tuple(refs.get(key) for key in ENTITY_KEYS)
+
+
 class LogManager:
     """
     Gestisce la memorizzazione e il recupero dei log.
@@ -46,55 +142,471 @@ class LogManager:
         Returns:
             Connessione a SQLite
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=30)
         conn.row_factory = sqlite3.Row
         return conn
     
     def _initialize_database(self):
         """
         Inizializza il database creando le tabelle necessarie se non esistono.
+        
+        I log sono memorizzati in partizioni giornaliere (`logs_pYYYYMMDD`) elencate in
+        `log_partitions`; `logs` è una vista UNION ALL sulle partizioni per le sole letture.
+        I conteggi per minuto e per ora sono mantenuti nelle tabelle di rollup (`ROLLUP_TABLES`).
         """
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Crea la tabella dei log
+        # Il journal WAL è persistente nel file: lettori e thread di scrittura non si bloccano
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        # Tabella chiave/valore per lo stato delle migrazioni
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''')
+        
+        # Catalogo delle partizioni giornaliere
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_partitions (
+            name TEXT PRIMARY KEY,
+            day TEXT NOT NULL UNIQUE,
+            created_at TEXT NOT NULL
+        )
+        ''')
+
+        # Archivi colonnari delle partizioni sigillate e indice dei loro blocchi
         cursor.execute('''
-        CREATE TABLE IF NOT EXISTS logs (
-            id TEXT PRIMARY KEY,
-            timestamp TEXT NOT NULL,
-            project TEXT NOT NULL,
-            level TEXT NOT NULL,
-            module TEXT NOT NULL,
-            message TEXT NOT NULL,
-            details TEXT,
-            context TEXT
+        CREATE TABLE IF NOT EXISTS log_archives (
+            path TEXT PRIMARY KEY,
+            day TEXT NOT NULL,
+            codec TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            min_timestamp TEXT,
+            max_timestamp TEXT,
+            size_bytes INTEGER NOT NULL,
+            created_at TEXT NOT NULL
         )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_log_archives_day ON log_archives (day)')
+        for name, _ in ROLLUP_TABLES:
+            cursor.execute(ROLLUP_DDL.format(name=name))
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_archive_blocks (
+            path TEXT NOT NULL,
+            block INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            min_timestamp TEXT NOT NULL,
+            max_timestamp TEXT NOT NULL,
+            levels TEXT NOT NULL,
+            projects TEXT NOT NULL,
+            columns TEXT NOT NULL,
+            PRIMARY KEY (path, block)
+        )
+        ''')
+        conn.commit()
+        
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = 'logs'")
+        row = cursor.fetchone()
+        if row and row["type"] == "table":
+            # Database precedente alle partizioni: completa le migrazioni della tabella unica
+            self._migrate_entity_columns(conn)
+            cursor.execute("ALTER TABLE logs RENAME TO logs_unpartitioned")
+            conn.commit()
         
-        # Crea indici per migliorare le performance delle query
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON logs (timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project ON logs (project)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_level ON logs (level)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_module ON logs (module)')
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'logs_unpartitioned'")
+        if cursor.fetchone():
+            self._migrate_to_partitions(conn)
         
+        cursor.execute("SELECT name FROM log_partitions")
+        self._partitions = {row["name"] for row in cursor.fetchall()}
+        
+        # Allinea la vista al catalogo (anche dopo un arresto a metà di una creazione)
+        self._rebuild_logs_view(conn)
+        conn.commit()
+        
+        # Database precedente ai rollup: calcolali una volta dai log esistenti.
+        # L'INSERT prende il lock di scrittura, così una sola istanza esegue il calcolo.
+        cursor.execute(
+            "INSERT OR IGNORE INTO log_meta (key, value) VALUES ('rollups_built', ?)",
+            (datetime.now().isoformat(),)
+        )
+        if cursor.rowcount:
+            self._build_rollups(conn)
         conn.commit()
         conn.close()
         
-        logger.info(f"Database inizializzato: {self.db_path}")
+        logger.info(f"Database inizializzato: {self.db_path} ({len(self._partitions)} partizioni)")
     
-    def add_log(self, log_entry: LogEntry) -> str:
+    def _migrate_entity_columns(self, conn):
         """
-        Aggiunge una voce di log al database.
+        Aggiunge document_id, file_name e file_hash alla tabella logs non partizionata
+        e ne esegue il backfill.
+        """
+        cursor = conn.cursor()
+        columns = {row["name"] for row in cursor.execute("PRAGMA table_info(logs)").fetchall()}
+        missing = [key for key in ENTITY_KEYS if key not in columns]
+        for key in missing:
+            cursor.execute(f"ALTER TABLE logs ADD COLUMN {key} TEXT")
+        if missing:
+            cursor.execute(
+                "INSERT OR REPLACE INTO log_meta (key, value) VALUES ('entity_backfill_rowid', '0')"
+            )
+        conn.commit()
+        
+        self._backfill_entity_refs(conn)
+    
+    def _backfill_entity_refs(self, conn):
+        """
+        Popola document_id, file_name e file_hash per i log scritti prima dell'estrazione.
+
+        Procede per blocchi di rowid e salva l'avanzamento in log_meta dopo ogni blocco,
+        così un riavvio riprende da dove si era fermato.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM log_meta WHERE key = 'entity_backfill_rowid'")
+        row = cursor.fetchone()
+        if not row:
+            return
+
+        last_rowid = int(row["value"])
+        updated = 0
+        while True:
+            cursor.execute(
+                "SELECT rowid, details, context FROM logs WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, ENTITY_BACKFILL_BATCH)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for log_row in rows:
+                parsed = []
+                for raw in (log_row["details"], log_row["context"]):
+                    try:
+                        parsed.append(json.loads(raw) if raw else None)
+                    except Exception:
+                        parsed.append(None)
+                refs = extract_entity_refs(*parsed)
+                if any(refs):
+                    updates.append(refs + (log_row["rowid"],))
+
+            last_rowid = rows[-1]["rowid"]
+            cursor.executemany(
+                "UPDATE logs SET document_id = ?, file_name = ?, file_hash = ? WHERE rowid = ?",
+                updates
+            )
+            cursor.execute(
+                "UPDATE log_meta SET value = ? WHERE key = 'entity_backfill_rowid'",
+                (str(last_rowid),)
+            )
+            conn.commit()
+            updated += len(updates)
+
+        cursor.execute("DELETE FROM log_meta WHERE key = 'entity_backfill_rowid'")
+        conn.commit()
+        logger.info(f"Backfill completato: estratti riferimenti a documenti/file per {updated} log")
+    
+    @staticmethod
+    def _partition_day(timestamp: str) -> str:
+        """
+        Restituisce il giorno (YYYY-MM-DD) della partizione che contiene il timestamp.
+        """
+        day = (timestamp or "")[:10]
+        return day if re.fullmatch(r"\d{4}-\d{2}-\d{2}", day) else INVALID_PARTITION_DAY
+    
+    @staticmethod
+    def _partition_name(day: str) -> str:
+        """
+        Restituisce il nome della tabella della partizione di un giorno.
+        """
+        return "logs_p" + day.replace("-", "")
+    
+    def _ensure_partition(self, conn, day: str) -> str:
+        """
+        Crea (se manca) la partizione del giorno con i suoi indici e la registra nel catalogo.
+        
+        Returns:
+            Nome della tabella della partizione
+        """
+        name = self._partition_name(day)
+        if name in self._partitions:
+            return name
+        
+        cursor = conn.cursor()
+        cursor.execute(PARTITION_DDL.format(name=name))
+        for suffix, columns in PARTITION_INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{suffix} ON {name} ({columns})")
+        cursor.execute(
+            "INSERT OR IGNORE INTO log_partitions (name, day, created_at) VALUES (?, ?, ?)",
+            (name, day, datetime.now().isoformat())
+        )
+        if cursor.rowcount:
+            self._rebuild_logs_view(conn)
+        self._partitions.add(name)
+        return name
+    
+    def _rebuild_logs_view(self, conn):
+        """
+        Ricrea la vista `logs` come UNION ALL di tutte le partizioni del catalogo.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM log_partitions ORDER BY day")
+        names = [row["name"] for row in cursor.fetchall()]
+        columns = ", ".join(LOG_COLUMNS)
+        if names:
+            body = " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in names)
+        else:
+            body = "SELECT " + ", ".join(f"NULL AS {column}" for column in LOG_COLUMNS) + " WHERE 0"
+        cursor.execute("DROP VIEW IF EXISTS logs")
+        cursor.execute(f"CREATE VIEW logs AS {body}")
+    
+    def _list_partitions(
+        self,
+        conn,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Elenca, in ordine cronologico, le partizioni che intersecano l'intervallo di tempo.
+        """
+        query = "SELECT name FROM log_partitions WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND day >= ?"
+            params.append(self._partition_day(start_date.isoformat()))
+        if end_date:
+            query += " AND day <= ?"
+            params.append(self._partition_day(end_date.isoformat()))
+        query += " ORDER BY day"
+        
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return [row["name"] for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _union_query(partitions: List[str], select: str, where: str, params: list) -> tuple:
+        """
+        Compone `SELECT ... FROM p WHERE ...` su ogni partizione unendo i risultati con UNION ALL.
+        
+        Returns:
+            Tupla (sql, parametri)
+        """
+        sql = " UNION ALL ".join(f"SELECT {select} FROM {name} WHERE {where}" for name in partitions)
+        return sql, list(params) * len(partitions)
+    
+    def _drop_partitions(self, conn, partitions: List[str], update_rollups: bool = True) -> int:
+        """
+        Elimina partizioni intere (DROP TABLE) e aggiorna catalogo e vista.
         
         Args:
-            log_entry: LogEntry da aggiungere
-            
+            conn: Connessione al database
+            partitions: Nomi delle partizioni
+            update_rollups: Se False i log restano nei rollup (partizione spostata in un archivio)
+        
         Returns:
-            ID del log aggiunto
+            Numero di log contenuti nelle partizioni eliminate
         """
-        conn = self._get_connection()
+        if not partitions:
+            return 0
+        
         cursor = conn.cursor()
+        dropped = 0
+        for name in partitions:
+            groups = {}
+            try:
+                if update_rollups:
+                    groups = self._minute_groups(conn, name)
+                    dropped += sum(group[0] for group in groups.values())
+                else:
+                    cursor.execute(f"SELECT COUNT(*) AS count FROM {name}")
+                    dropped += cursor.fetchone()["count"]
+            except sqlite3.OperationalError:
+                # Tabella già eliminata da un'altra istanza: resta solo la voce di catalogo
+                pass
+            self._apply_rollups(conn, groups, -1)
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+            cursor.execute("DELETE FROM log_partitions WHERE name = ?", (name,))
+            self._partitions.discard(name)
+        self._rebuild_logs_view(conn)
+        return dropped
+    
+    def _migrate_to_partitions(self, conn):
+        """
+        Sposta i log della vecchia tabella unica nelle partizioni giornaliere.
+        
+        Copia un giorno per transazione con INSERT OR IGNORE, così una migrazione
+        interrotta riprende senza duplicati; al termine elimina la tabella.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM log_partitions")
+        self._partitions = {row["name"] for row in cursor.fetchall()}
+        
+        cursor.execute("SELECT DISTINCT substr(timestamp, 1, 10) AS day FROM logs_unpartitioned")
+        days = sorted({self._partition_day(row["day"]) for row in cursor.fetchall()})
+        columns = ", ".join(LOG_COLUMNS)
+        for day in days:
+            name = self._ensure_partition(conn, day)
+            if day == INVALID_PARTITION_DAY:
+                cursor.execute(
+                    f"INSERT OR IGNORE INTO {name} ({columns}) SELECT {columns} FROM logs_unpartitioned "
+                    "WHERE timestamp NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+                )
+            else:
+                next_day = (datetime.fromisoformat(day) + timedelta(days=1)).strftime("%Y-%m-%d")
+                cursor.execute(
+                    f"INSERT OR IGNORE INTO {name} ({columns}) SELECT {columns} FROM logs_unpartitioned "
+                    "WHERE timestamp >= ? AND timestamp < ?",
+                    (day, next_day)
+                )
+            conn.commit()
+        
+        cursor.execute("DROP TABLE logs_unpartitioned")
+        self._rebuild_logs_view(conn)
+        conn.commit()
+        logger.info(f"Migrazione completata: log distribuiti in {len(days)} partizioni giornaliere")
+    
+    @staticmethod
+    def _merge_group(groups: Dict[tuple, list], key: tuple, count: int, first: str, last: str):
+        """
+        Somma un conteggio al gruppo `key` allargandone l'intervallo [first, last].
+        """
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [count, first, last]
+        else:
+            group[0] += count
+            group[1] = min(group[1], first)
+            group[2] = max(group[2], last)
+    
+    @classmethod
+    def _group_by_minute(cls, rows) -> Dict[tuple, list]:
+        """
+        Aggrega righe (timestamp, project, level, module) per minuto.
+        
+        Returns:
+            {(minuto, project, level, module): [conteggio, timestamp minimo, timestamp massimo]}
+        """
+        groups: Dict[tuple, list] = {}
+        for timestamp, project, level, module in rows:
+            cls._merge_group(groups, (timestamp[:16], project, level, module), 1, timestamp, timestamp)
+        return groups
+    
+    @staticmethod
+    def _minute_groups(conn, partition: str, where: str = "1=1", params: list = ()) -> Dict[tuple, list]:
+        """
+        Aggrega per minuto (come `_group_by_minute`) le righe di una partizione che soddisfano `where`.
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT substr(timestamp, 1, 16) AS minute, project, level, module, COUNT(*) AS count, "
+            f"MIN(timestamp) AS first, MAX(timestamp) AS last FROM {partition} WHERE {where} "
+            "GROUP BY minute, project, level, module",
+            list(params)
+        )
+        return {
+            (row["minute"], row["project"], row["level"], row["module"]): [row["count"], row["first"], row["last"]]
+            for row in cursor.fetchall()
+        }
+    
+    def _apply_rollups(self, conn, groups: Dict[tuple, list], sign: int = 1):
+        """
+        Aggiorna le tabelle di rollup con gruppi per minuto; il commit è a carico del chiamante.
+        
+        Args:
+            conn: Connessione al database
+            groups: Gruppi prodotti da `_group_by_minute` o `_minute_groups`
+            sign: 1 per log inseriti, -1 per log eliminati
+        """
+        if not groups:
+            return
         
+        for name, length in ROLLUP_TABLES:
+            buckets: Dict[tuple, list] = {}
+            for (minute, project, level, module), (count, first, last) in groups.items():
+                self._merge_group(buckets, (minute[:length], project, level, module), count, first, last)
+            
+            if sign > 0:
+                conn.executemany(
+                    f"INSERT INTO {name} (bucket, project, level, module, log_count, min_timestamp, max_timestamp) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (bucket, project, level, module) DO UPDATE SET "
+                    "log_count = log_count + excluded.log_count, "
+                    "min_timestamp = MIN(min_timestamp, excluded.min_timestamp), "
+                    "max_timestamp = MAX(max_timestamp, excluded.max_timestamp)",
+                    [key + tuple(value) for key, value in buckets.items()]
+                )
+            else:
+                # Dopo una sottrazione min/max restano un limite del bucket, non più il valore esatto
+                conn.executemany(
+                    f"UPDATE {name} SET log_count = log_count - ? "
+                    "WHERE bucket = ? AND project = ? AND level = ? AND module = ?",
+                    [(value[0],) + key for key, value in buckets.items()]
+                )
+                conn.executemany(
+                    f"DELETE FROM {name} WHERE bucket = ? AND project = ? AND level = ? AND module = ? "
+                    "AND log_count <= 0",
+                    list(buckets.keys())
+                )
+    
+    def _archive_groups(self, conn, path: str) -> Dict[tuple, list]:
+        """
+        Aggrega per minuto le righe di un archivio colonnare, decomprimendo solo le colonne necessarie.
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT b.columns, a.codec FROM log_archive_blocks b JOIN log_archives a ON a.path = b.path "
+            "WHERE b.path = ? ORDER BY b.block",
+            (path,)
+        )
+        columns = ("timestamp", "project", "level", "module")
+        groups: Dict[tuple, list] = {}
+        for block in cursor.fetchall():
+            values = log_archive.read_columns(path, block["codec"], json.loads(block["columns"]), columns)
+            block_groups = self._group_by_minute(zip(*(values[column] for column in columns)))
+            for key, (count, first, last) in block_groups.items():
+                self._merge_group(groups, key, count, first, last)
+        return groups
+    
+    def _build_rollups(self, conn):
+        """
+        Ricalcola da zero le tabelle di rollup da partizioni e archivi; il commit è a carico del chiamante.
+        """
+        for name, _ in ROLLUP_TABLES:
+            conn.execute(f"DELETE FROM {name}")
+        
+        total = 0
+        for name in self._list_partitions(conn):
+            groups = self._minute_groups(conn, name)
+            self._apply_rollups(conn, groups)
+            total += sum(group[0] for group in groups.values())
+        
+        cursor = conn.cursor()
+        cursor.execute("SELECT path FROM log_archives")
+        for row in cursor.fetchall():
+            try:
+                groups = self._archive_groups(conn, row["path"])
+            except Exception as e:
+                logger.error(f"Errore durante la lettura dell'archivio {row['path']}: {str(e)}")
+                continue
+            self._apply_rollups(conn, groups)
+            total += sum(group[0] for group in groups.values())
+        
+        logger.info(f"Rollup dei conteggi calcolati per {total} log")
+    
+    def serialize_log(self, log_entry: LogEntry) -> tuple:
+        """
+        Converte una voce di log nella riga da inserire nella tabella logs.
+        
+        Args:
+            log_entry: LogEntry da convertire
+            
+        Returns:
+            Tupla (id, timestamp, project, level, module, message, details, context,
+            document_id, file_name, file_hash)
+        """
         # Converti le strutture dati in JSON con gestione degli errori
         try:
             details_json = json.dumps(log_entry.details) if log_entry.details else None
@@ -109,11 +621,7 @@ class LogManager:
             logger.error(f"Errore durante la serializzazione JSON del contesto per il log {log_entry.id}: {str(e)}")
             context_json = json.dumps({"error": "Impossibile serializzare il contesto originale", "message": str(e)})
         
-        # Inserisci il log
-        cursor.execute('''
-        INSERT INTO logs (id, timestamp, project, level, module, message, details, context)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        return (
             log_entry.id,
             log_entry.timestamp.isoformat(),
             log_entry.project,
@@ -122,10 +630,71 @@ class LogManager:
             log_entry.message,
             details_json,
             context_json
-        ))
+        ) + extract_entity_refs(log_entry.details, log_entry.context)
+    
+    def insert_log_rows(self, rows: List[tuple]) -> int:
+        """
+        Inserisce righe già serializzate con `serialize_log` in un'unica transazione.
         
-        conn.commit()
-        conn.close()
+        Args:
+            rows: Righe da inserire
+            
+        Returns:
+            Numero di righe inserite
+        """
+        if not rows:
+            return 0
+        
+        # Raggruppa le righe per partizione giornaliera
+        by_day: Dict[str, List[tuple]] = {}
+        for row in rows:
+            by_day.setdefault(self._partition_day(row[1]), []).append(row)
+        
+        columns = ", ".join(LOG_COLUMNS)
+        placeholders = ", ".join("?" for _ in LOG_COLUMNS)
+        conn = self._get_connection()
+        try:
+            for attempt in range(2):
+                try:
+                    for day, day_rows in by_day.items():
+                        name = self._ensure_partition(conn, day)
+                        conn.executemany(
+                            f"INSERT INTO {name} ({columns}) VALUES ({placeholders})",
+                            day_rows
+                        )
+                    self._apply_rollups(conn, self._group_by_minute(row[1:5] for row in rows))
+                    conn.commit()
+                    break
+                except sqlite3.OperationalError as e:
+                    conn.rollback()
+                    # Partizione eliminata da un'altra istanza: ricarica il catalogo e riprova
+                    if attempt or "no such table" not in str(e):
+                        raise
+                    self._partitions = set(
+                        row["name"] for row in conn.execute("SELECT name FROM log_partitions")
+                    )
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return len(rows)
+    
+    def add_log(self, log_entry: LogEntry) -> str:
+        """
+        Aggiunge una voce di log al database.
+        
+        Scrive in modo sincrono; le route di ingestione passano invece dalla
+        pipeline di commit di gruppo in `core.log_writer`.
+        
+        Args:
+            log_entry: LogEntry da aggiungere
+            
+        Returns:
+            ID del log aggiunto
+        """
+        self.insert_log_rows([self.serialize_log(log_entry)])
         
         logger.debug(f"Log aggiunto: {log_entry.id} - {log_entry.message}")
         return log_entry.id
@@ -140,54 +709,16 @@ class LogManager:
         Returns:
             Lista di ID dei log aggiunti
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        log_ids = []
+        rows = [self.serialize_log(log_entry) for log_entry in log_entries]
         
         try:
-            for log_entry in log_entries:
-                # Converti le strutture dati in JSON con gestione degli errori
-                try:
-                    details_json = json.dumps(log_entry.details) if log_entry.details else None
-                except Exception as e:
-                    logger.error(f"Errore durante la serializzazione JSON dei dettagli per il log {log_entry.id}: {str(e)}")
-                    # Salva una versione semplificata che può essere serializzata
-                    details_json = json.dumps({"error": "Impossibile serializzare i dettagli originali", "message": str(e)})
-                    
-                try:    
-                    context_json = json.dumps(log_entry.context) if log_entry.context else None
-                except Exception as e:
-                    logger.error(f"Errore durante la serializzazione JSON del contesto per il log {log_entry.id}: {str(e)}")
-                    context_json = json.dumps({"error": "Impossibile serializzare il contesto originale", "message": str(e)})
-                
-                # Inserisci il log
-                cursor.execute('''
-                INSERT INTO logs (id, timestamp, project, level, module, message, details, context)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    log_entry.id,
-                    log_entry.timestamp.isoformat(),
-                    log_entry.project,
-                    log_entry.level,
-                    log_entry.module,
-                    log_entry.message,
-                    details_json,
-                    context_json
-                ))
-                
-                log_ids.append(log_entry.id)
-            
-            conn.commit()
-            logger.info(f"Batch di {len(log_ids)} log aggiunto con successo")
+            self.insert_log_rows(rows)
+            logger.info(f"Batch di {len(rows)} log aggiunto con successo")
         except Exception as e:
-            conn.rollback()
             logger.error(f"Errore durante l'aggiunta del batch di log: {str(e)}")
             raise
-        finally:
-            conn.close()
         
-        return log_ids
+        return [row[0] for row in rows]
     
     def get_logs(
         self,
@@ -225,8 +756,8 @@ class LogManager:
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Costruisci la query
-        query = "SELECT * FROM logs WHERE 1=1"
+        # Costruisci la condizione applicata a ogni partizione
+        query = "1=1"
         params = []
         
         # Standardizza il valore di project a stringa
@@ -252,30 +783,16 @@ class LogManager:
             query += " AND module = ?"
             params.append(module)
             
-        # Filtri per documento e file - Migliorata per cercare in più campi
+        # Filtri per documento e file sulle colonne estratte all'ingestione (indicizzate)
         if document_id:
-            # Cerca nei dettagli o contesto JSON contenenti document_id
-            query += " AND (details LIKE ? OR context LIKE ?)"
-            doc_search = f"%{document_id}%"
-            params.append(doc_search)
-            params.append(doc_search)
+            query += " AND document_id = ?"
+            params.append(document_id)
             
         if file_name:
-            # Cerca nei dettagli o contesto JSON contenenti file_name
-            # Cerca sia nei campi file_name che file_path o semplicemente come parte di qualsiasi stringa
-            query += " AND (details LIKE ? OR details LIKE ? OR details LIKE ? OR context LIKE ? OR context LIKE ? OR context LIKE ?)"
-            
-            # Ricerca per nome file in vari formati
-            file_search1 = f"%\"file_name\":%{file_name}%"  # Nome file in campo file_name
-            file_search2 = f"%\"file_path\":%{file_name}%"  # Nome file come parte del percorso
-            file_search3 = f"%{file_name}%"                 # Nome file in qualsiasi punto
-            
-            params.append(file_search1)
-            params.append(file_search2)
-            params.append(file_search3)
-            params.append(file_search1)
-            params.append(file_search2)
-            params.append(file_search3)
+            # Prefisso del nome file (o del nome in file_path) come range sull'indice
+            query += " AND file_name >= ? AND file_name < ?"
+            params.append(file_name)
+            params.append(file_name + "\U0010ffff")
         
         if start_date:
             query += " AND timestamp >= ?"
@@ -296,16 +813,55 @@ class LogManager:
         if sort_order.lower() not in valid_sort_orders:
             sort_order = "desc"
         
-        # Applica l'ordinamento
-        query += f" ORDER BY {sort_by} {sort_order.upper()}"
-        
-        # Limita i risultati
-        query += " LIMIT ? OFFSET ?"
-        params.append(limit)
-        params.append(offset)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        # Solo le partizioni e gli archivi che intersecano l'intervallo richiesto
+        partitions = self._list_partitions(conn, start_date, end_date)
+        archive_days = self._archive_days(conn, start_date, end_date)
+        archive_filters = {
+            "project": project_str,
+            "level": level_str,
+            "module": module,
+            "document_id": document_id,
+            "file_name": file_name,
+            "start": start_date.isoformat() if start_date else None,
+            "end": end_date.isoformat() if end_date else None
+        }
+        descending = sort_order.lower() == "desc"
+        wanted = offset + limit
+        
+        rows = []
+        if sort_by == "timestamp":
+            # Partizioni e archivi coprono giorni disgiunti: si leggono giorno per giorno
+            # nell'ordine richiesto e ci si ferma appena raccolte offset + limit righe
+            live = {name[len("logs_p"):]: name for name in partitions}
+            days = sorted(set(live) | {day.replace("-", "") for day in archive_days}, reverse=descending)
+            for day in days:
+                day_rows = []
+                if day in live:
+                    cursor.execute(
+                        f"SELECT * FROM {live[day]} WHERE {query} ORDER BY timestamp {sort_order.upper()} LIMIT ?",
+                        params + [wanted - len(rows)]
+                    )
+                    day_rows.extend(dict(row) for row in cursor.fetchall())
+                archive_day = f"{day[:4]}-{day[4:6]}-{day[6:]}"
+                if archive_day in archive_days:
+                    day_rows.extend(self._search_archives(conn, archive_day, archive_filters))
+                    day_rows.sort(key=lambda row: row["timestamp"], reverse=descending)
+                rows.extend(day_rows[:wanted - len(rows)])
+                if len(rows) >= wanted:
+                    break
+            rows = rows[offset:wanted]
+        else:
+            if partitions:
+                union_sql, union_params = self._union_query(partitions, "*", query, params)
+                cursor.execute(
+                    f"SELECT * FROM ({union_sql}) ORDER BY {sort_by} {sort_order.upper()} LIMIT ?",
+                    union_params + [wanted]
+                )
+                rows = [dict(row) for row in cursor.fetchall()]
+            for day in archive_days:
+                rows.extend(self._search_archives(conn, day, archive_filters))
+            rows.sort(key=lambda row: row[sort_by], reverse=descending)
+            rows = rows[offset:wanted]
         
         # Converti i risultati in dizionari
         results = []
@@ -344,6 +900,103 @@ class LogManager:
         conn.close()
         return results
     
+    def _rollup_range(
+        self,
+        conn,
+        filters: Dict[str, Any],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[tuple, list]:
+        """
+        Conta i log per (progetto, livello, modulo) in un intervallo usando i rollup.
+        
+        Le ore interamente nell'intervallo vengono lette da log_rollup_hour, i minuti interi
+        delle ore di bordo da log_rollup_minute; partizioni e archivi vengono letti solo
+        per i due minuti di bordo, così il costo non dipende dal volume dei log.
+        
+        Args:
+            conn: Connessione al database
+            filters: Filtri di uguaglianza su project, level e module
+            start_date: Inizio dell'intervallo (incluso)
+            end_date: Fine dell'intervallo (inclusa)
+            
+        Returns:
+            {(project, level, module): [conteggio, timestamp minimo, timestamp massimo]}
+        """
+        start = start_date.isoformat() if start_date else None
+        end = end_date.isoformat() if end_date else None
+        
+        filter_sql = ""
+        filter_params = []
+        for column in ("project", "level", "module"):
+            if filters.get(column):
+                filter_sql += f" AND {column} = ?"
+                filter_params.append(filters[column])
+        
+        # Bucket dei rollup: (tabella, condizione, parametri)
+        hour_where = "1=1"
+        hour_params = []
+        if start:
+            hour_where += " AND bucket > ?"
+            hour_params.append(start[:13])
+        if end:
+            hour_where += " AND bucket < ?"
+            hour_params.append(end[:13])
+        buckets = [("log_rollup_hour", hour_where, hour_params)]
+        if start and end and start[:13] == end[:13]:
+            buckets.append(("log_rollup_minute", "bucket > ? AND bucket < ?", [start[:16], end[:16]]))
+        else:
+            if start:
+                buckets.append(("log_rollup_minute", "bucket > ? AND bucket < ?", [start[:16], start[:13] + PREFIX_END]))
+            if end:
+                buckets.append(("log_rollup_minute", "bucket >= ? AND bucket < ?", [end[:13], end[:16]]))
+        
+        # Minuti di bordo letti dai log: intervalli [da, a] inclusi
+        edges = []
+        if start and end and start[:16] == end[:16]:
+            edges.append((start, end))
+        else:
+            if start:
+                edges.append((start, start[:16] + PREFIX_END))
+            if end:
+                edges.append((end[:16], end))
+        
+        groups: Dict[tuple, list] = {}
+        cursor = conn.cursor()
+        for table, where, params in buckets:
+            cursor.execute(
+                "SELECT project, level, module, SUM(log_count) AS count, MIN(min_timestamp) AS first, "
+                f"MAX(max_timestamp) AS last FROM {table} WHERE {where}{filter_sql} "
+                "GROUP BY project, level, module",
+                params + filter_params
+            )
+            for row in cursor.fetchall():
+                self._merge_group(
+                    groups, (row["project"], row["level"], row["module"]), row["count"], row["first"], row["last"]
+                )
+        
+        for low, high in edges:
+            day = self._partition_day(low)
+            cursor.execute("SELECT name FROM log_partitions WHERE day = ?", (day,))
+            partition = cursor.fetchone()
+            if partition:
+                cursor.execute(
+                    "SELECT project, level, module, COUNT(*) AS count, MIN(timestamp) AS first, "
+                    f"MAX(timestamp) AS last FROM {partition['name']} "
+                    f"WHERE timestamp >= ? AND timestamp <= ?{filter_sql} GROUP BY project, level, module",
+                    [low, high] + filter_params
+                )
+                for row in cursor.fetchall():
+                    self._merge_group(
+                        groups, (row["project"], row["level"], row["module"]), row["count"], row["first"], row["last"]
+                    )
+            for row in self._search_archives(conn, day, dict(filters, start=low, end=high)):
+                self._merge_group(
+                    groups, (row["project"], row["level"], row["module"]), 1, row["timestamp"], row["timestamp"]
+                )
+        
+        return groups
+    
     def get_stats(
         self,
         project: Optional[LogProject] = None,
@@ -353,6 +1006,9 @@ class LogManager:
         """
         Ottiene statistiche sui log.
         
+        Le statistiche vengono calcolate dai rollup per minuto/ora (vedi `_rollup_range`)
+        e comprendono anche i log archiviati.
+        
         Args:
             project: Filtra per progetto
             start_date: Data di inizio per il filtro temporale
@@ -364,59 +1020,34 @@ class LogManager:
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Query base per il conteggio totale
-        query = "SELECT COUNT(*) as total FROM logs WHERE 1=1"
-        params = []
+        groups = self._rollup_range(conn, {"project": project}, start_date, end_date)
         
-        # Aggiungi filtri
-        if project:
-            query += " AND project = ?"
-            params.append(project)
-        
-        if start_date:
-            query += " AND timestamp >= ?"
-            params.append(start_date.isoformat())
-        
-        if end_date:
-            query += " AND timestamp <= ?"
-            params.append(end_date.isoformat())
-        
-        # Esegui query per il conteggio totale
-        cursor.execute(query, params)
-        total_logs = cursor.fetchone()["total"]
-        
-        # Query per conteggio per livello
-        level_query = query.replace("COUNT(*) as total", "level, COUNT(*) as count") + " GROUP BY level"
-        cursor.execute(level_query, params)
-        level_rows = cursor.fetchall()
+        total_logs = 0
+        level_counts: Dict[str, int] = {}
+        project_counts: Dict[str, int] = {}
+        module_counts: Dict[str, int] = {}
+        for (project_name, level_name, module_name), (count, _, _) in groups.items():
+            total_logs += count
+            level_counts[level_name] = level_counts.get(level_name, 0) + count
+            project_counts[project_name] = project_counts.get(project_name, 0) + count
+            module_counts[module_name] = module_counts.get(module_name, 0) + count
         
         logs_by_level = {}
         for level in LogLevel:
             logs_by_level[level] = 0
             
-        for row in level_rows:
-            logs_by_level[row["level"]] = row["count"]
-        
-        # Query per conteggio per progetto
-        project_query = query.replace("COUNT(*) as total", "project, COUNT(*) as count") + " GROUP BY project"
-        cursor.execute(project_query, params)
-        project_rows = cursor.fetchall()
+        for level_name, count in level_counts.items():
+            logs_by_level[level_name] = count
         
         logs_by_project = {}
         for project_enum in LogProject:
             logs_by_project[project_enum] = 0
             
-        for row in project_rows:
-            logs_by_project[row["project"]] = row["count"]
-        
-        # Query per conteggio per modulo (top 10)
-        module_query = query.replace("COUNT(*) as total", "module, COUNT(*) as count") + " GROUP BY module ORDER BY count DESC LIMIT 10"
-        cursor.execute(module_query, params)
-        module_rows = cursor.fetchall()
+        for project_name, count in project_counts.items():
+            logs_by_project[project_name] = count
         
-        logs_by_module = {}
-        for row in module_rows:
-            logs_by_module[row["module"]] = row["count"]
+        # Moduli con più log (top 10)
+        logs_by_module = dict(sorted(module_counts.items(), key=lambda item: item[1], reverse=True)[:10])
         
         # Determina il periodo di tempo
         time_period = {}
@@ -427,10 +1058,17 @@ class LogManager:
             time_period["end"] = end_date
         
         if not start_date or not end_date:
-            # Se non specificato, prendi il periodo effettivo dai dati
-            min_max_query = "SELECT MIN(timestamp) as min_time, MAX(timestamp) as max_time FROM logs"
-            cursor.execute(min_max_query)
-            time_row = cursor.fetchone()
+            # Se non specificato, prendi il periodo effettivo dai dati (primo e ultimo minuto dei rollup)
+            cursor.execute(
+                "SELECT MIN(min_timestamp) AS min_time FROM log_rollup_minute "
+                "WHERE bucket = (SELECT MIN(bucket) FROM log_rollup_minute)"
+            )
+            min_time = cursor.fetchone()["min_time"]
+            cursor.execute(
+                "SELECT MAX(max_timestamp) AS max_time FROM log_rollup_minute "
+                "WHERE bucket = (SELECT MAX(bucket) FROM log_rollup_minute)"
+            )
+            time_row = {"min_time": min_time, "max_time": cursor.fetchone()["max_time"]}
             
             if not start_date and time_row["min_time"]:
                 try:
@@ -459,6 +1097,34 @@ class LogManager:
         
         return stats
     
+    def get_client_activity(self, start_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Riepiloga l'attività dei client (coppie progetto/modulo) dai rollup.
+        
+        Args:
+            start_date: Considera solo i log da questa data
+            
+        Returns:
+            Lista di dizionari (project, module, logs_sent, last_log_time) ordinata
+            dall'attività più recente
+        """
+        conn = self._get_connection()
+        try:
+            groups = self._rollup_range(conn, {}, start_date)
+        finally:
+            conn.close()
+        
+        clients: Dict[tuple, list] = {}
+        for (project, _, module), (count, first, last) in groups.items():
+            self._merge_group(clients, (project, module), count, first, last)
+        
+        activity = [
+            {"project": project, "module": module, "logs_sent": count, "last_log_time": last}
+            for (project, module), (count, _, last) in clients.items()
+        ]
+        activity.sort(key=lambda client: client["last_log_time"], reverse=True)
+        return activity
+    
     def cleanup_logs(
         self,
         days_to_keep: int = 30,
@@ -480,10 +1146,12 @@ class LogManager:
         cursor = conn.cursor()
         
         # Calcola la data limite
-        cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).isoformat()
+        cutoff = datetime.now() - timedelta(days=days_to_keep)
+        cutoff_date = cutoff.isoformat()
+        cutoff_day = self._partition_day(cutoff_date)
         
-        # Costruisci la query
-        query = "DELETE FROM logs WHERE timestamp < ?"
+        # Costruisci la condizione
+        query = "timestamp < ?"
         params = [cutoff_date]
         
         if project:
@@ -494,14 +1162,27 @@ class LogManager:
             query += " AND level = ?"
             params.append(level)
         
-        # Esegui la query
-        cursor.execute(query, params)
-        deleted_count = cursor.rowcount
+        deleted_count = 0
+        sealed = []
+        for name in self._list_partitions(conn, end_date=cutoff):
+            if name == self._partition_name(cutoff_day) or project or level:
+                # Partizione a cavallo del limite o filtro parziale: DELETE limitato alla partizione
+                self._apply_rollups(conn, self._minute_groups(conn, name, query, params), -1)
+                cursor.execute(f"DELETE FROM {name} WHERE {query}", params)
+                deleted_count += cursor.rowcount
+            else:
+                sealed.append(name)
+        
+        # Partizioni interamente scadute: DROP TABLE invece di DELETE riga per riga
+        deleted_count += self._drop_partitions(conn, sealed)
         
         conn.commit()
         conn.close()
         
-        logger.info(f"Eliminati {deleted_count} log più vecchi di {days_to_keep} giorni")
+        logger.info(
+            f"Eliminati {deleted_count} log più vecchi di {days_to_keep} giorni "
+            f"({len(sealed)} partizioni eliminate)"
+        )
         return deleted_count
     
     def reset_logs(
@@ -522,17 +1203,25 @@ class LogManager:
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Costruisci la query
-        query = "DELETE FROM logs WHERE timestamp >= ?"
+        # Costruisci la condizione
+        query = "timestamp >= ?"
         params = [cutoff_date.isoformat()]
         
         if project:
             query += " AND project = ?"
             params.append(project)
         
-        # Esegui la query
-        cursor.execute(query, params)
-        deleted_count = cursor.rowcount
+        cutoff_partition = self._partition_name(self._partition_day(cutoff_date.isoformat()))
+        deleted_count = 0
+        whole = []
+        for name in self._list_partitions(conn, start_date=cutoff_date):
+            if name == cutoff_partition or project:
+                self._apply_rollups(conn, self._minute_groups(conn, name, query, params), -1)
+                cursor.execute(f"DELETE FROM {name} WHERE {query}", params)
+                deleted_count += cursor.rowcount
+            else:
+                whole.append(name)
+        deleted_count += self._drop_partitions(conn, whole)
         
         conn.commit()
         conn.close()
@@ -559,40 +1248,17 @@ class LogManager:
             end_date: Data di fine per il filtro temporale
             
         Returns:
-            Numero di log che soddisfano i criteri di filtro
+            Numero di log che soddisfano i criteri di filtro (calcolato dai rollup)
         """
         conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Costruisci la query
-        query = "SELECT COUNT(*) as count FROM logs WHERE 1=1"
-        params = []
-        
-        if project:
-            query += " AND project = ?"
-            params.append(project)
-        
-        if level:
-            query += " AND level = ?"
-            params.append(level)
-        
-        if module:
-            query += " AND module = ?"
-            params.append(module)
-        
-        if start_date:
-            query += " AND timestamp >= ?"
-            params.append(start_date.isoformat())
-        
-        if end_date:
-            query += " AND timestamp <= ?"
-            params.append(end_date.isoformat())
-        
-        cursor.execute(query, params)
-        row = cursor.fetchone()
+        try:
+            groups = self._rollup_range(
+                conn, {"project": project, "level": level, "module": module}, start_date, end_date
+            )
+        finally:
+            conn.close()
         
-        conn.close()
-        return row["count"]
+        return sum(group[0] for group in groups.values())
     
     def get_db_size(self) -> str:
         """
@@ -619,9 +1285,23 @@ class LogManager:
             logger.error(f"Errore durante il calcolo della dimensione del database: {str(e)}")
             return "N/A"
 
+    def _archives_dir(self) -> str:
+        """
+        Restituisce (creandola) la directory degli archivi dei log, accanto al database
+        (logs/archives con il percorso predefinito).
+        """
+        archives_dir = os.path.join(os.path.dirname(os.path.abspath(self.db_path)), "archives")
+        os.makedirs(archives_dir, exist_ok=True)
+        return archives_dir
+    
     def compress_old_logs(self, days_threshold: int = 1) -> int:
         """
-        Comprime i log più vecchi di una certa soglia di giorni.
+        Archivia le partizioni giornaliere interamente più vecchie di una soglia di giorni.
+        
+        Ogni partizione sigillata viene scritta in un archivio colonnare compresso
+        (`core.log_archive`), il cui indice dei blocchi viene registrato in
+        log_archives/log_archive_blocks; poi la partizione viene eliminata con DROP TABLE.
+        Gli archivi restano interrogabili da `get_logs`.
         
         Args:
             days_threshold: Soglia in giorni
@@ -629,116 +1309,286 @@ class LogManager:
         Returns:
             Numero di log compressi
         """
-        import zipfile
-        import json
-        import tempfile
-        from datetime import datetime, timedelta
-        
         conn = None
         try:
-            # Calcola la data soglia
-            threshold_date = (datetime.now() - timedelta(days=days_threshold)).isoformat()
+            # Calcola la data soglia: si archiviano solo i giorni conclusi prima della soglia
+            threshold = datetime.now() - timedelta(days=days_threshold)
+            threshold_partition = self._partition_name(self._partition_day(threshold.isoformat()))
             
-            # Ottieni i log da comprimere
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            # Crea la tabella per i log compressi se non esiste
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS compressed_logs (
-                log_id TEXT PRIMARY KEY,
-                timestamp TEXT NOT NULL,
-                archive_path TEXT NOT NULL,
-                compressed_at TEXT NOT NULL
-            )
-            ''')
-            conn.commit()
-
-            query = "SELECT * FROM logs WHERE timestamp < ? AND NOT EXISTS (SELECT 1 FROM compressed_logs WHERE compressed_logs.log_id = logs.id)"
-            cursor.execute(query, (threshold_date,))
-            logs_to_compress = cursor.fetchall()
-            
-            if not logs_to_compress:
+            sealed = [
+                name for name in self._list_partitions(conn, end_date=threshold)
+                if name != threshold_partition
+            ]
+            if not sealed:
                 conn.close()
                 return 0
+            
+            archives_dir = self._archives_dir()
+            columns = ", ".join(LOG_COLUMNS)
+            raw_size = " + ".join(f"IFNULL(LENGTH({column}), 0)" for column in LOG_COLUMNS)
+            compressed_count = 0
+            raw_bytes = 0
+            archived_bytes = 0
+            for name in sealed:
+                cursor.execute("SELECT day FROM log_partitions WHERE name = ?", (name,))
+                day = cursor.fetchone()["day"]
                 
-            # Crea directory archives se non esiste
-            base_dir = os.path.dirname(os.path.dirname(__file__))
-            archives_dir = os.path.join(base_dir, "logs", "archives")
-            os.makedirs(archives_dir, exist_ok=True)
-            
-            # Nome archivio basato sulla data
-            today = datetime.now().strftime("%Y-%m-%d")
-            archive_path = os.path.join(archives_dir, f"logs_before_{today}.zip")
-        
-            
-            # Crea un file temporaneo per memorizzare i log in formato JSON
-            with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json') as temp_file:
-                logs_json = []
-                for log in logs_to_compress:
-                    log_dict = dict(log)
-                    # Converti JSON in dizionari per i campi details e context
-                    if log_dict["details"]:
-                        log_dict["details"] = json.loads(log_dict["details"])
-                    if log_dict["context"]:
-                        log_dict["context"] = json.loads(log_dict["context"])
-                    logs_json.append(log_dict)
+                # Un giorno già archiviato può ricevere log in ritardo: nuovo file con suffisso
+                archive_path = os.path.join(archives_dir, f"{name}{log_archive.ARCHIVE_EXTENSION}")
+                suffix = 1
+                while os.path.exists(archive_path):
+                    suffix += 1
+                    archive_path = os.path.join(archives_dir, f"{name}-{suffix}{log_archive.ARCHIVE_EXTENSION}")
+                
+                # Dimensione dei dati non compressi, per il rapporto di compressione nel log
+                cursor.execute(f"SELECT SUM({raw_size}) AS size FROM {name}")
+                raw_bytes += cursor.fetchone()["size"] or 0
+                
+                rows = conn.execute(f"SELECT {columns} FROM {name} ORDER BY timestamp")
+                footer = log_archive.write_archive(archive_path, LOG_COLUMNS, rows)
+                size_bytes = os.path.getsize(archive_path)
                 
-                # Scrivi i log nel file temporaneo
-                json.dump(logs_json, temp_file, indent=2)
-                temp_file_path = temp_file.name
-            
-            # Comprimi il file in un archivio ZIP
-            with zipfile.ZipFile(archive_path, 'a', zipfile.ZIP_DEFLATED) as zip_file:
-                zip_file.write(temp_file_path, f"logs_{len(logs_to_compress)}_{today}.json")
-            
-            # Elimina il file temporaneo
-            os.unlink(temp_file_path)
-            
-            # Registra i log come compressi
-            compressed_at = datetime.now().isoformat()
-            for log in logs_to_compress:
                 try:
+                    blocks = footer["blocks"]
                     cursor.execute(
-                        "INSERT INTO compressed_logs (log_id, timestamp, archive_path, compressed_at) VALUES (?, ?, ?, ?)",
-                        (log["id"], log["timestamp"], archive_path, compressed_at)
+                        "INSERT INTO log_archives (path, day, codec, row_count, min_timestamp, max_timestamp, "
+                        "size_bytes, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            archive_path, day, footer["codec"], footer["row_count"],
+                            blocks[0]["min_timestamp"] if blocks else None,
+                            blocks[-1]["max_timestamp"] if blocks else None,
+                            size_bytes, datetime.now().isoformat()
+                        )
                     )
-                except sqlite3.IntegrityError:
-                    # Ignora se il log è già stato compresso
-                    pass
-
-            # Elimina i log originali dalla tabella `logs` dopo che sono stati registrati in `compressed_logs`.
-            try:
-                log_ids = [log["id"] for log in logs_to_compress]
-                # Usa una query parametrizzata con il numero corretto di placeholder
-                placeholders = ",".join(["?" for _ in log_ids])
-                delete_query = f"DELETE FROM logs WHERE id IN ({placeholders})"
-                cursor.execute(delete_query, tuple(log_ids))
-            except Exception as e:
-                # Se la cancellazione fallisce, rollback e logga
-                conn.rollback()
-                logger.error(f"Errore durante l'eliminazione dei log originali dopo compressione: {str(e)}")
-                try:
-                    conn.close()
-                except:
-                    pass
-                return 0
-
-            conn.commit()
+                    cursor.executemany(
+                        "INSERT INTO log_archive_blocks (path, block, row_count, min_timestamp, max_timestamp, "
+                        "levels, projects, columns) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                archive_path, i, block["row_count"], block["min_timestamp"],
+                                block["max_timestamp"], json.dumps(block["levels"]),
+                                json.dumps(block["projects"]), json.dumps(block["columns"])
+                            )
+                            for i, block in enumerate(blocks)
+                        ]
+                    )
+                    
+                    # Elimina la partizione intera: i suoi log restano nei rollup, ora sono nell'archivio
+                    self._drop_partitions(conn, [name], update_rollups=False)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    os.remove(archive_path)
+                    raise
+                
+                compressed_count += footer["row_count"]
+                archived_bytes += size_bytes
+            
             conn.close()
-
-            logger.info(f"Compressi {len(logs_to_compress)} log nell'archivio {archive_path} e rimossi dalla tabella logs")
-            return len(logs_to_compress)
+            
+            ratio = f", {raw_bytes / archived_bytes:.1f}x" if archived_bytes else ""
+            logger.info(
+                f"Archiviati {compressed_count} log di {len(sealed)} partizioni "
+                f"({archived_bytes} byte{ratio})"
+            )
+            return compressed_count
             
         except Exception as e:
             logger.error(f"Errore durante la compressione dei log: {str(e)}")
             # Assicurati che la connessione venga chiusa in caso di errore
             if conn:
                 try:
+                    conn.rollback()
                     conn.close()
                 except:
                     pass  # Ignora errori durante la chiusura della connessione
             return 0
+    
+    def _archive_days(
+        self,
+        conn,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Elenca, in ordine cronologico, i giorni archiviati che intersecano l'intervallo.
+        """
+        query = "SELECT DISTINCT day FROM log_archives WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND day >= ?"
+            params.append(self._partition_day(start_date.isoformat()))
+        if end_date:
+            query += " AND day <= ?"
+            params.append(self._partition_day(end_date.isoformat()))
+        query += " ORDER BY day"
+        
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return [row["day"] for row in cursor.fetchall()]
+    
+    def _search_archives(self, conn, day: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Cerca negli archivi di un giorno le righe che soddisfano i filtri di get_logs.
+        
+        I blocchi vengono scelti dall'indice (intervallo di timestamp, livelli, progetti);
+        di ogni blocco si decomprimono prima le sole colonne filtrate.
+        """
+        query = (
+            "SELECT b.path, b.columns, b.levels, b.projects, a.codec FROM log_archive_blocks b "
+            "JOIN log_archives a ON a.path = b.path WHERE a.day = ?"
+        )
+        params = [day]
+        if filters.get("start"):
+            query += " AND b.max_timestamp >= ?"
+            params.append(filters["start"])
+        if filters.get("end"):
+            query += " AND b.min_timestamp <= ?"
+            params.append(filters["end"])
+        query += " ORDER BY b.path, b.block"
+        
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        blocks = cursor.fetchall()
+        
+        filter_columns = ["timestamp"] + [
+            column for column in ("project", "level", "module", "document_id", "file_name")
+            if filters.get(column)
+        ]
+        file_prefix = filters.get("file_name")
+        
+        def predicate(row: Dict[str, Any]) -> bool:
+            timestamp = row["timestamp"]
+            if filters.get("start") and timestamp < filters["start"]:
+                return False
+            if filters.get("end") and timestamp > filters["end"]:
+                return False
+            for column in ("project", "level", "module", "document_id"):
+                if filters.get(column) and row[column] != filters[column]:
+                    return False
+            if file_prefix and not (row["file_name"] or "").startswith(file_prefix):
+                return False
+            return True
+        
+        results = []
+        for block in blocks:
+            if filters.get("level") and filters["level"] not in json.loads(block["levels"]):
+                continue
+            if filters.get("project") and filters["project"] not in json.loads(block["projects"]):
+                continue
+            try:
+                results.extend(log_archive.scan_block(
+                    block["path"], block["codec"], json.loads(block["columns"]),
+                    filter_columns, predicate, LOG_COLUMNS
+                ))
+            except Exception as e:
+                logger.error(f"Errore durante la lettura dell'archivio {block['path']}: {str(e)}")
+        return results
+    
+    
+    def _delete_archives(self, conn, paths: List[str]) -> int:
+        """
+        Elimina archivi colonnari (file e righe di indice); il commit è a carico del chiamante.
+        
+        Returns:
+            Numero di file di archivio rimossi
+        """
+        cursor = conn.cursor()
+        removed = 0
+        for path in paths:
+            # I log dell'archivio escono dai rollup
+            try:
+                groups = self._archive_groups(conn, path) if os.path.exists(path) else {}
+            except Exception as e:
+                logger.error(f"Errore durante la lettura dell'archivio {path}: {str(e)}")
+                groups = {}
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+            except Exception as e:
+                logger.error(f"Errore durante l'eliminazione dell'archivio {path}: {str(e)}")
+                continue
+            self._apply_rollups(conn, groups, -1)
+            cursor.execute("DELETE FROM log_archive_blocks WHERE path = ?", (path,))
+            cursor.execute("DELETE FROM log_archives WHERE path = ?", (path,))
+        return removed
+    
+    def delete_all_archives(self) -> int:
+        """
+        Elimina tutti gli archivi colonnari.
+        
+        Returns:
+            Numero di file di archivio rimossi
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT path FROM log_archives")
+            removed = self._delete_archives(conn, [row["path"] for row in cursor.fetchall()])
+            conn.commit()
+            return removed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def delete_unarchived_logs(self) -> int:
+        """
+        Elimina i log non presenti in compressed_logs e rimuove le partizioni rimaste vuote.
+        
+        Returns:
+            Numero di log eliminati
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='compressed_logs'")
+            has_archive = cursor.fetchone() is not None
+            
+            deleted_count = 0
+            empty = []
+            for name in self._list_partitions(conn):
+                if has_archive:
+                    unarchived = "id NOT IN (SELECT log_id FROM compressed_logs)"
+                    self._apply_rollups(conn, self._minute_groups(conn, name, unarchived), -1)
+                    cursor.execute(f"DELETE FROM {name} WHERE {unarchived}")
+                    deleted_count += cursor.rowcount
+                    cursor.execute(f"SELECT 1 FROM {name} LIMIT 1")
+                    if cursor.fetchone() is None:
+                        empty.append(name)
+                else:
+                    empty.append(name)
+            deleted_count += self._drop_partitions(conn, empty)
+            conn.commit()
+            return deleted_count
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def delete_all_logs(self) -> int:
+        """
+        Elimina tutti i log rimuovendo tutte le partizioni.
+        
+        Returns:
+            Numero di log eliminati
+        """
+        conn = self._get_connection()
+        try:
+            deleted_count = self._drop_partitions(conn, self._list_partitions(conn))
+            conn.commit()
+            return deleted_count
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
             
     def cleanup_compressed_logs(self, days_to_keep: int = 365) -> int:
         """
@@ -761,23 +1611,24 @@ class LogManager:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            # Verifica se la tabella esiste
+            # Archivi colonnari: file e indice dei blocchi
+            cursor.execute("SELECT path FROM log_archives WHERE created_at < ?", (cutoff_date,))
+            deleted_count = self._delete_archives(conn, [row["path"] for row in cursor.fetchall()])
+            conn.commit()
+            
+            # Verifica se la tabella degli archivi ZIP precedenti esiste
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='compressed_logs'")
             if not cursor.fetchone():
                 conn.close()
-                return 0
+                logger.info(f"Eliminati {deleted_count} archivi di log compressi")
+                return deleted_count
                 
             # Ottieni gli archivi da eliminare
             query = "SELECT DISTINCT archive_path FROM compressed_logs WHERE compressed_at < ?"
             cursor.execute(query, (cutoff_date,))
             archives_to_delete = [row["archive_path"] for row in cursor.fetchall()]
             
-            if not archives_to_delete:
-                conn.close()
-                return 0
-            
             # Elimina gli archivi
-            deleted_count = 0
             for archive_path in archives_to_delete:
                 try:
                     if os.path.exists(archive_path):
@@ -0,0 +1,254 @@
+"""
+Pipeline di scrittura dei log con commit di gruppo.
+
+Le route di ingestione accodano i log in una coda limitata in memoria; un unico
+thread di scrittura li preleva e li inserisce con `executemany` in una sola
+transazione ogni `flush_interval_ms` millisecondi o ogni `batch_size` record.
+Il numero di commit (e di fsync) non dipende più dal numero di richieste.
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, List, Optional, Tuple
+
+from core.models import LogEntry
+
+logger = logging.getLogger("PramaIA-LogService.LogWriter")
+
+
+class LogQueueFullError(Exception):
+    """La coda di ingestione è piena: il client deve riprovare più tardi."""
+
+
+class LogWriterStoppedError(Exception):
+    """Il thread di scrittura è fermo e non accetta nuovi log."""
+
+
+class LogWriter:
+    """
+    Coda limitata di log con un singolo thread di scrittura.
+    """
+
+    def __init__(self, log_manager, queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval_ms: int = 50):
+        """
+        Inizializza la pipeline di scrittura.
+
+        Args:
+            log_manager: LogManager che esegue gli inserimenti
+            queue_size: Numero massimo di log in attesa di scrittura
+            batch_size: Numero massimo di log per transazione
+            flush_interval_ms: Attesa massima prima del commit di un gruppo
+        """
+        self.log_manager = log_manager
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0, flush_interval_ms) / 1000.0
+
+        self._condition = threading.Condition()
+        self._queue: Deque[Tuple[List[tuple], Future]] = deque()
+        self._queued = 0
+        self._in_flight = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Contatori esposti da get_stats
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.commits = 0
+
+    def start(self):
+        """
+        Avvia il thread di scrittura (se non è già in esecuzione).
+        """
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+        logger.info(
+            f"Pipeline di scrittura avviata (coda {self.queue_size}, gruppo {self.batch_size}, "
+            f"intervallo {int(self.flush_interval * 1000)} ms)"
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Ferma il thread di scrittura dopo aver scritto i log ancora in coda.
+        """
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        logger.info("Pipeline di scrittura fermata")
+
+    def submit(self, log_entries: List[LogEntry]) -> Future:
+        """
+        Accoda uno o più log per la scrittura.
+
+        Args:
+            log_entries: Log da scrivere (nella stessa transazione)
+
+        Returns:
+            Future completato con la lista degli ID quando i log sono su disco
+
+        Raises:
+            LogQueueFullError: Se la coda non ha spazio per i log
+            LogWriterStoppedError: Se la pipeline è ferma
+        """
+        rows = [self.log_manager.serialize_log(entry) for entry in log_entries]
+        future: Future = Future()
+        if not rows:
+            future.set_result([])
+            return future
+
+        with self._condition:
+            if not self._running:
+                raise LogWriterStoppedError("La pipeline di scrittura dei log non è attiva")
+            pending = self._queued + self._in_flight
+            if pending + len(rows) > self.queue_size:
+                self.rejected += len(rows)
+                raise LogQueueFullError(
+                    f"Coda di ingestione piena ({pending}/{self.queue_size} log in attesa)"
+                )
+            self._queue.append((rows, future))
+            self._queued += len(rows)
+            self.enqueued += len(rows)
+            self._condition.notify_all()
+        return future
+
+    def get_stats(self) -> dict:
+        """
+        Restituisce lo stato della coda e i contatori di scrittura.
+        """
+        with self._condition:
+            return {
+                "running": self._running,
+                "pending": self._queued + self._in_flight,
+                "queue_size": self.queue_size,
+                "batch_size": self.batch_size,
+                "flush_interval_ms": int(self.flush_interval * 1000),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "commits": self.commits
+            }
+
+    def _next_group(self) -> List[Tuple[List[tuple], Future]]:
+        """
+        Attende il primo log in coda, poi raccoglie il gruppo fino a batch_size record
+        o alla scadenza dell'intervallo.
+        """
+        with self._condition:
+            while self._running and not self._queue:
+                self._condition.wait()
+            if not self._queue:
+                return []
+
+            deadline = time.monotonic() + self.flush_interval
+            while self._running and self._queued < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            group = []
+            count = 0
+            while self._queue and (not group or count + len(self._queue[0][0]) <= self.batch_size):
+                rows, future = self._queue.popleft()
+                group.append((rows, future))
+                count += len(rows)
+            self._queued -= count
+            self._in_flight = count
+            return group
+
+    def _run(self):
+        """
+        Ciclo del thread di scrittura.
+        """
+        while True:
+            group = self._next_group()
+            if not group:
+                return
+            self._write_group(group)
+            with self._condition:
+                self._in_flight = 0
+
+    def _write_group(self, group: List[Tuple[List[tuple], Future]]):
+        """
+        Scrive un gruppo di richieste in una transazione; se fallisce, riprova richiesta
+        per richiesta per isolare quella non valida (es. ID duplicato).
+        """
+        try:
+            self.log_manager.insert_log_rows([row for rows, _ in group for row in rows])
+        except Exception as e:
+            if len(group) == 1:
+                self._complete(group, e)
+                return
+            logger.warning(f"Commit di gruppo fallito ({e}), scrittura richiesta per richiesta")
+        else:
+            self._complete(group, None)
+            return
+
+        for item in group:
+            try:
+                self.log_manager.insert_log_rows(item[0])
+            except Exception as e:
+                self._complete([item], e)
+            else:
+                self._complete([item], None)
+
+    def _complete(self, group: List[Tuple[List[tuple], Future]], error: Optional[Exception]):
+        count = sum(len(rows) for rows, _ in group)
+        with self._condition:
+            if error is None:
+                self.written += count
+                self.commits += 1
+            else:
+                self.failed += count
+        if error is not None:
+            logger.error(f"Errore durante la scrittura di {count} log: {error}")
+        for rows, future in group:
+            if error is None:
+                future.set_result([row[0] for row in rows])
+            else:
+                future.set_exception(error)
+
+
+# Singleton della pipeline di scrittura
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """
+    Ottiene l'istanza singleton della pipeline di scrittura, avviandola alla creazione.
+
+    Returns:
+        LogWriter
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            from core.config import get_settings
+            from core.log_manager import LogManager
+
+            settings = get_settings()
+            # Stesso database delle letture, della manutenzione e della retention
+            _writer = LogWriter(
+                LogManager(),
+                queue_size=settings.ingest_queue_size,
+                batch_size=settings.ingest_batch_size,
+                flush_interval_ms=settings.ingest_flush_interval_ms
+            )
+            _writer.start()
+    return _writer
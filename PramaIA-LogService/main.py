@@ -15,6 +15,8 @@ from api.log_router import router as log_router
 from api.document_lifecycle_router import router as lifecycle_router
 from core.config import get_settings, configure_service_logging
 from core.maintenance import get_maintenance_scheduler
+from core.log_writer import get_log_writer
+from core.auth import get_api_key_usage_tracker
 from core.middleware import setup_middleware
 from core.system_events import register_lifecycle_event
 from web.settings_router import settings_router
@@ -66,6 +68,30 @@ app.include_router(search_router, prefix="/dashboard", tags=["search"])
 app.include_router(web_lifecycle_router, prefix="/dashboard", tags=["lifecycle"])
 
 
+@app.on_event("startup")
+async def start_log_writer():
+    """Avvia la pipeline di scrittura dei log."""
+    get_log_writer().start()
+
+
+@app.on_event("startup")
+async def start_api_key_usage_tracker():
+    """Avvia il salvataggio periodico dei contatori di utilizzo delle API key."""
+    get_api_key_usage_tracker().start()
+
+
+@app.on_event("shutdown")
+async def stop_log_writer():
+    """Scrive i log ancora in coda e ferma la pipeline."""
+    get_log_writer().stop()
+
+
+@app.on_event("shutdown")
+async def stop_api_key_usage_tracker():
+    """Salva i contatori di utilizzo delle API key ancora in memoria."""
+    get_api_key_usage_tracker().stop()
+
+
 @app.get("/dashboard")
 async def dashboard_root():
     """Compatibilità: reindirizza /dashboard -> /dashboard/ (pagina di ricerca)."""
@@ -102,7 +128,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Endpoint per il controllo dello stato del servizio."""
-    return {"status": "ok", "version": app.version}
+    return {"status": "ok", "version": app.version, "ingest": get_log_writer().get_stats()}
 
 @app.post("/maintenance")
 async def trigger_maintenance():
@@ -0,0 +1,22 @@
+"""
+Configurazione comune dei test: rende importabili i package del servizio
+(core, api, web) anche quando pytest viene lanciato da un'altra directory.
+"""
+
+import os
+import sys
+
+import pytest
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_ROOT not in sys.path:
+    sys.path.insert(0, SERVICE_ROOT)
+
+
+@pytest.fixture
+def log_manager(tmp_path):
+    """LogManager su un database temporaneo (archivi nella stessa directory)."""
+    from core.log_manager import LogManager
+
+    (tmp_path / "logs").mkdir()
+    return LogManager(str(tmp_path / "logs" / "log_database.db"))
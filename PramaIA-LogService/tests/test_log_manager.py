@@ -0,0 +1,118 @@
+"""
+Test dell'archiviazione dei log: partizioni giornaliere, archivi compressi e rollup.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from core.log_manager import LogManager
+from core.models import LogEntry, LogLevel, LogProject
+
+
+def make_logs(day: datetime, count: int, level: LogLevel = LogLevel.INFO):
+    return [
+        LogEntry(
+            timestamp=day.replace(hour=10, minute=i % 60, second=0, microsecond=0),
+            project=LogProject.SERVER,
+            level=level,
+            module="test_module",
+            message=f"messaggio {i}",
+            details={"document_id": f"doc-{i}"}
+        )
+        for i in range(count)
+    ]
+
+
+def all_log_ids(log_manager):
+    return {log["id"] for log in log_manager.get_logs(limit=10000)}
+
+
+def test_count_unchanged_after_compress(log_manager):
+    now = datetime.now()
+    log_manager.add_logs_batch(make_logs(now - timedelta(days=3), 40))
+    log_manager.add_logs_batch(make_logs(now - timedelta(days=2), 25, LogLevel.ERROR))
+    log_manager.add_logs_batch(make_logs(now, 10))
+    ids_before = all_log_ids(log_manager)
+    stats_before = log_manager.get_stats()
+    assert log_manager.get_logs_count() == len(ids_before) == 75
+
+    assert log_manager.compress_old_logs(days_threshold=1) == 65
+
+    # I log archiviati restano contati e interrogabili
+    assert log_manager.get_logs_count() == 75
+    assert all_log_ids(log_manager) == ids_before
+    assert log_manager.get_logs_count(level=LogLevel.ERROR) == 25
+    stats_after = log_manager.get_stats()
+    assert stats_after.total_logs == stats_before.total_logs == 75
+    assert stats_after.logs_by_level == stats_before.logs_by_level
+    archives = os.listdir(os.path.join(os.path.dirname(log_manager.db_path), "archives"))
+    assert len(archives) == 2
+
+    # I rollup ricostruiti all'avvio comprendono gli archivi
+    reopened = LogManager(log_manager.db_path)
+    assert reopened.get_logs_count() == 75
+
+
+def test_late_arrivals_are_archived_separately(log_manager):
+    archived_day = datetime.now() - timedelta(days=3)
+    log_manager.add_logs_batch(make_logs(archived_day, 30))
+    assert log_manager.compress_old_logs(days_threshold=1) == 30
+
+    # Log in ritardo per un giorno già archiviato: nuova partizione, poi un secondo archivio
+    late = make_logs(archived_day, 5, LogLevel.WARNING)
+    log_manager.add_logs_batch(late)
+    assert log_manager.get_logs_count() == 35
+    assert log_manager.compress_old_logs(days_threshold=1) == 5
+
+    assert log_manager.get_logs_count() == 35
+    assert log_manager.get_logs_count(level=LogLevel.WARNING) == 5
+    assert {entry.id for entry in late} <= all_log_ids(log_manager)
+    day_logs = log_manager.get_logs(
+        start_date=archived_day.replace(hour=0, minute=0), end_date=archived_day.replace(hour=23, minute=59),
+        limit=1000
+    )
+    assert len(day_logs) == 35
+    archives = sorted(os.listdir(os.path.join(os.path.dirname(log_manager.db_path), "archives")))
+    assert len(archives) == 2
+
+    reopened = LogManager(log_manager.db_path)
+    assert reopened.get_logs_count() == 35
+    assert reopened.get_stats().total_logs == 35
+
+
+def test_rollup_counts_match_stored_logs(log_manager):
+    now = datetime.now()
+    start = (now - timedelta(days=2)).replace(hour=9, minute=0, second=0, microsecond=0)
+    # Log distribuiti su più ore e giorni, con livelli diversi
+    entries = [
+        LogEntry(
+            timestamp=start + timedelta(minutes=37 * i),
+            project=LogProject.SERVER if i % 3 else LogProject.PDK,
+            level=(LogLevel.INFO, LogLevel.WARNING, LogLevel.ERROR)[i % 3],
+            module=f"module_{i % 4}",
+            message=f"messaggio {i}"
+        )
+        for i in range(120)
+    ]
+    log_manager.add_logs_batch(entries)
+
+    # Intervalli non allineati all'ora: minuti di bordo e ore intere dai rollup
+    ranges = [
+        (None, None),
+        (start + timedelta(minutes=50), start + timedelta(hours=20, minutes=13)),
+        (start + timedelta(hours=30, minutes=1), None),
+        (None, start + timedelta(hours=5, minutes=59, seconds=30))
+    ]
+    for start_date, end_date in ranges:
+        expected = [
+            entry for entry in entries
+            if (start_date is None or entry.timestamp >= start_date)
+            and (end_date is None or entry.timestamp <= end_date)
+        ]
+        stats = log_manager.get_stats(start_date=start_date, end_date=end_date)
+        assert stats.total_logs == len(expected)
+        assert log_manager.get_logs_count(start_date=start_date, end_date=end_date) == len(expected)
+        assert log_manager.get_logs_count(
+            level=LogLevel.ERROR, start_date=start_date, end_date=end_date
+        ) == sum(1 for entry in expected if entry.level == LogLevel.ERROR)
+        assert stats.logs_by_project[LogProject.PDK] == sum(1 for entry in expected if entry.project == LogProject.PDK)
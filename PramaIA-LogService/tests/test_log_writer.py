@@ -0,0 +1,99 @@
+"""
+Test della pipeline di scrittura con commit di gruppo (core.log_writer).
+
+Le route di ingestione rispondono 429 a LogQueueFullError e 503 a LogWriterStoppedError.
+"""
+
+import threading
+
+import pytest
+
+from core.log_writer import LogQueueFullError, LogWriter, LogWriterStoppedError
+from core.models import LogEntry, LogLevel, LogProject
+
+
+class SlowLogManager:
+    """LogManager che blocca gli inserimenti finché il test non li rilascia."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.commits = []
+
+    def serialize_log(self, entry):
+        return (entry.id, entry.message)
+
+    def insert_log_rows(self, rows):
+        self.started.set()
+        assert self.release.wait(5)
+        self.commits.append([row[0] for row in rows])
+        return len(rows)
+
+
+def make_entries(count):
+    return [
+        LogEntry(project=LogProject.SERVER, level=LogLevel.INFO, module="test", message=f"log {i}")
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def log_manager():
+    manager = SlowLogManager()
+    yield manager
+    manager.release.set()
+
+
+@pytest.fixture
+def writer(log_manager):
+    writer = LogWriter(log_manager, queue_size=5, batch_size=10, flush_interval_ms=0)
+    writer.start()
+    yield writer
+    log_manager.release.set()
+    writer.stop()
+
+
+def test_full_queue_rejects_logs(writer, log_manager):
+    # Il primo gruppo è in scrittura e occupa la coda finché il commit non termina
+    first = writer.submit(make_entries(3))
+    assert log_manager.started.wait(5)
+    second = writer.submit(make_entries(2))
+
+    with pytest.raises(LogQueueFullError):
+        writer.submit(make_entries(1))
+    stats = writer.get_stats()
+    assert stats["pending"] == 5
+    assert stats["rejected"] == 1
+
+    log_manager.release.set()
+    assert len(first.result(timeout=5)) == 3
+    assert len(second.result(timeout=5)) == 2
+
+    # Svuotata la coda i log sono di nuovo accettati
+    assert len(writer.submit(make_entries(5)).result(timeout=5)) == 5
+    assert writer.get_stats()["written"] == 10
+
+
+def test_oversized_request_is_rejected(writer):
+    with pytest.raises(LogQueueFullError):
+        writer.submit(make_entries(6))
+    assert writer.get_stats()["rejected"] == 6
+
+
+def test_stopped_writer_rejects_logs(writer, log_manager):
+    log_manager.release.set()
+    writer.stop()
+
+    with pytest.raises(LogWriterStoppedError):
+        writer.submit(make_entries(1))
+
+
+def test_stop_flushes_queued_logs(log_manager):
+    writer = LogWriter(log_manager, queue_size=100, batch_size=100, flush_interval_ms=1000)
+    writer.start()
+    future = writer.submit(make_entries(4))
+    log_manager.release.set()
+    writer.stop()
+
+    assert len(future.result(timeout=5)) == 4
+    assert sum(len(commit) for commit in log_manager.commits) == 4
@@ -158,20 +158,14 @@ async def logservice_page(
     uptime = dt.datetime.now() - log_manager.start_time if hasattr(log_manager, 'start_time') else "N/A"
     uptime_str = str(uptime).split('.')[0] if isinstance(uptime, dt.timedelta) else uptime
     
-    # Recupera le statistiche sui client dal database
-    conn = log_manager._get_connection()
-    cursor = conn.cursor()
+    # Recupera le statistiche sui client dai rollup dei conteggi
+    client_activity = log_manager.get_client_activity()
     
     # Ottieni il numero di connessioni attive e totali (stimato dai log recenti)
-    cursor.execute("""
-        SELECT COUNT(DISTINCT project || ':' || module) as active_connections
-        FROM logs
-        WHERE timestamp >= ?
-    """, ((dt.datetime.now() - dt.timedelta(hours=1)).isoformat(),))
-    active_connections = cursor.fetchone()["active_connections"]
-    
-    cursor.execute("SELECT COUNT(DISTINCT project || ':' || module) as total_connections FROM logs")
-    total_connections = cursor.fetchone()["total_connections"]
+    active_connections = len(log_manager.get_client_activity(
+        start_date=dt.datetime.now() - dt.timedelta(hours=1)
+    ))
+    total_connections = len(client_activity)
     
     # Dati di stato del servizio
     service_status = {
@@ -186,19 +180,8 @@ async def logservice_page(
         "total_logs": log_manager.get_logs_count()
     }
     
-    # Ottieni dati reali sui client attivi dal database
-    cursor.execute("""
-        SELECT 
-            project,
-            module,
-            MAX(timestamp) as last_log_time,
-            COUNT(*) as logs_sent
-        FROM logs
-        GROUP BY project, module
-        ORDER BY last_log_time DESC
-        LIMIT 10
-    """)
-    client_data = cursor.fetchall()
+    # Client attivi: le coppie progetto/modulo con l'attività più recente
+    client_data = client_activity[:10]
     
     # Crea la lista dei client attivi con dati reali
     active_clients = []
@@ -216,8 +199,6 @@ async def logservice_page(
             "status": status
         })
     
-    # Non chiudere ancora la connessione, verrà usata più avanti
-    
     # Ottieni le chiavi API reali dal file di configurazione
     import os
     import json
@@ -230,18 +211,10 @@ async def logservice_page(
             with open(api_keys_path, "r") as f:
                 api_keys_data = json.load(f)
                 
-            # Ottieni i timestamp dell'ultimo utilizzo di ciascuna chiave
-            last_used_query = """
-                SELECT project, MAX(timestamp) as last_used 
-                FROM logs 
-                GROUP BY project
-            """
-            cursor.execute(last_used_query)
-            # Ottieni e archivia i risultati prima di chiudere la connessione
-            last_used_data = {row["project"]: row["last_used"] for row in cursor.fetchall()}
-            
-            # Ora che abbiamo finito con il database, possiamo chiudere la connessione
-            conn.close()
+            # Ottieni i timestamp dell'ultimo utilizzo di ciascuna chiave (attività più recente per progetto)
+            last_used_data = {}
+            for client in client_activity:
+                last_used_data.setdefault(client["project"], client["last_log_time"])
             
             # Formatta le chiavi API per la visualizzazione
             for key_name, key_info in api_keys_data.items():
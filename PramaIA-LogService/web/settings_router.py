@@ -11,7 +11,7 @@ from pydantic import BaseModel
 from datetime import datetime
 import logging
 
-from core.auth import get_api_key, create_api_key
+from core.auth import get_api_key, create_api_key, invalidate_api_key_cache, get_api_key_usage_tracker
 from core.config import get_settings, update_settings
 from core.models import LogProject
 
@@ -43,9 +43,11 @@ async def list_api_keys(
     from core.auth import load_api_keys
     
     api_keys_data = load_api_keys()
+    usage = get_api_key_usage_tracker().get_usage()
     
     result = []
     for key_id, key_info in api_keys_data.items():
+        key_usage = usage.get(key_id, {})
         if isinstance(key_info, dict):
             result.append({
                 "id": key_id,
@@ -53,7 +55,9 @@ async def list_api_keys(
                 "key_masked": mask_api_key(key_info.get("key", "")),
                 "projects": key_info.get("projects", []),
                 "expiry": key_info.get("expiry"),
-                "created_at": key_info.get("created", datetime.now().isoformat())
+                "created_at": key_info.get("created", datetime.now().isoformat()),
+                "requests": key_usage.get("requests", 0),
+                "last_used": key_usage.get("last_used")
             })
         else:
             # Formato legacy
@@ -63,7 +67,9 @@ async def list_api_keys(
                 "key_masked": mask_api_key(key_info),
                 "projects": [key_id],
                 "expiry": None,
-                "created_at": "N/A"
+                "created_at": "N/A",
+                "requests": key_usage.get("requests", 0),
+                "last_used": key_usage.get("last_used")
             })
     
     return result
@@ -200,6 +206,7 @@ async def delete_api_key(
         try:
             with open(api_keys_path, "w", encoding="utf-8") as f:
                 json.dump(api_keys, f, indent=4)
+            invalidate_api_key_cache()
             logger.info(f"Chiave {matched_key_id} eliminata con successo")
         except Exception as e:
             logger.error(f"Errore durante il salvataggio del file JSON: {str(e)}")
@@ -296,6 +303,7 @@ async def regenerate_api_key(
     # Salva le modifiche
     with open(api_keys_path, "w", encoding="utf-8") as f:
         json.dump(api_keys, f, indent=4)
+    invalidate_api_key_cache()
     
     # Preparazione della risposta
     name = key_info["name"] if isinstance(key_info, dict) else key_id
@@ -314,18 +314,97 @@ class VectorstoreAdapter(DataSourceAdapter):
             "mime_type": ["mime_type", "content_type", "type"]
         })
     
+    def build_server_filter(self, criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Traduce i criteri estratti in un filtro tipizzato del VectorstoreService.
+        
+        Il filtro è un sovrainsieme dei criteri (filter_data viene comunque applicato
+        ai risultati): i criteri non esprimibili lato server (autore per sottostringa,
+        estensioni) restano solo lato client.
+        """
+        conditions = []
+        
+        date_range = criteria.get("date_range")
+        if isinstance(date_range, dict) and date_range.get("start") and date_range.get("end"):
+            conditions.append({"field": "created_at", "op": "range",
+                               "gte": date_range["start"], "lte": date_range["end"]})
+        
+        specific_date = criteria.get("specific_date")
+        if specific_date:
+            day = datetime.fromisoformat(specific_date).date()
+            conditions.append({"field": "created_at", "op": "range",
+                               "gte": day.isoformat(), "lt": (day + timedelta(days=1)).isoformat()})
+        
+        year = criteria.get("year")
+        if isinstance(year, int):
+            conditions.append({"field": "created_at", "op": "range",
+                               "gte": f"{year:04d}-01-01", "lt": f"{year + 1:04d}-01-01"})
+        
+        size_bounds = {}
+        if isinstance(criteria.get("min_size"), (int, float)):
+            size_bounds["gte"] = criteria["min_size"]
+        if isinstance(criteria.get("max_size"), (int, float)):
+            size_bounds["lte"] = criteria["max_size"]
+        if size_bounds:
+            # Qualsiasi campo dimensione mappato: il client sceglie poi il primo presente
+            conditions.append({"or": [
+                {"field": f"metadata.{field}", "op": "range", **size_bounds}
+                for field in self.field_mapping.get("file_size", ["file_size"])
+            ]})
+        
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"and": conditions}
+    
+    async def _fetch_filtered(self, session: aiohttp.ClientSession, server_filter: Dict[str, Any],
+                              limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Recupera solo i documenti che soddisfano il filtro (POST /documents/filter).
+        Restituisce None se il servizio non supporta l'endpoint.
+        """
+        filter_url = f"{self.base_url}/documents/filter"
+        documents = []
+        cursor = None
+        
+        while True:
+            body = {"filter": server_filter, "limit": limit}
+            if cursor:
+                body["cursor"] = cursor
+            
+            async with session.post(filter_url, json=body) as response:
+                if response.status in (404, 405):
+                    return None
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"VectorstoreService error {response.status}: {error_text}")
+                
+                data = await response.json()
+                documents.extend(data.get("documents", []))
+                cursor = data.get("next_cursor")
+                if not cursor:
+                    return documents
+    
     async def fetch_data(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Recupera documenti dal VectorstoreService."""
         documents_url = f"{self.base_url}/documents/"
         timeout = aiohttp.ClientTimeout(total=self.timeout)
         
         async with aiohttp.ClientSession(timeout=timeout) as session:
+            # Filtra lato server quando i criteri lo consentono
+            server_filter = self.build_server_filter(params.get("criteria") or {})
+            if server_filter:
+                filtered = await self._fetch_filtered(session, server_filter, params.get("batch_size", 100))
+                if filtered is not None:
+                    return filtered
+            
             all_documents = []
             offset = 0
+            cursor = None
             limit = params.get("batch_size", 100)
             
             while True:
-                request_params = {"limit": limit, "offset": offset}
+                # Paginazione keyset tramite next_cursor; offset solo per servizi meno recenti
+                request_params = {"limit": limit, "cursor": cursor} if cursor else {"limit": limit, "offset": offset}
                 
                 async with session.get(documents_url, params=request_params) as response:
                     if response.status == 200:
@@ -337,6 +416,12 @@ class VectorstoreAdapter(DataSourceAdapter):
                         
                         all_documents.extend(documents)
                         
+                        if "next_cursor" in data:
+                            cursor = data["next_cursor"]
+                            if not cursor:
+                                break
+                            continue
+                        
                         if len(documents) < limit:
                             break
                         
@@ -613,7 +698,8 @@ class GenericMetadataSearchProcessor:
             # Parametri per fetch dati
             fetch_params = {
                 "batch_size": inputs.get("batch_size", 100),
-                "max_total": inputs.get("max_total", 1000)
+                "max_total": inputs.get("max_total", 1000),
+                "criteria": metadata_criteria
             }
             
             # Recupera dati
@@ -74,7 +74,7 @@ async def create_vectorstore_document(document: Dict[str, Any] = Body(...)):
 async def get_vectorstore_statistics():
     """
     Gateway endpoint for frontend compatibility.
-    Maps to /stats/processing
+    Maps to /stats/processing (served from the incrementally maintained counters)
     """
     logger.info("Richiesta ricevuta all'endpoint /vectorstore/statistics")
     stats_data = await stats.get_processing_stats()
@@ -102,13 +102,18 @@ async def get_document_db_status():
 
 # Endpoint per elencare i documenti
 @router.get("/documents/list")
-async def list_documents(limit: int = 100, offset: int = 0):
+async def list_documents(limit: int = 100, offset: int = 0, fields: Optional[str] = None):
     """
     Restituisce la lista dei documenti nel database.
+    
+    Args:
+        fields: Campi da restituire separati da virgola (es. "id,filename,collection").
+            Se "metadata" non è incluso la tabella dei metadati non viene letta.
     """
     try:
         # Ottieni documenti
-        documents = doc_db.get_documents(limit=limit, offset=offset)
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        documents = doc_db.get_documents(limit=limit, offset=offset, fields=field_list)
         total = doc_db.get_document_count()
         
         return {
@@ -188,9 +193,8 @@ async def reset_database():
         db_path = doc_db.db_file
         logger.info(f"Resettando database: {db_path}")
         
-        # Chiudi eventuali connessioni
-        if hasattr(doc_db, '_connection') and doc_db._connection:
-            doc_db._connection.close()
+        # Chiudi le connessioni del pool
+        doc_db.close_connections()
             
         # Rimuovi il file del database
         if os.path.exists(db_path):
@@ -232,9 +236,8 @@ async def reset_database_by_type(type: str):
             db_path = doc_db.db_file
             logger.info(f"Resettando database SQL: {db_path}")
             
-            # Chiudi eventuali connessioni
-            if hasattr(doc_db, '_connection') and doc_db._connection:
-                doc_db._connection.close()
+            # Chiudi le connessioni del pool
+            doc_db.close_connections()
                 
             # Rimuovi il file del database
             if os.path.exists(db_path):
@@ -300,6 +303,9 @@ async def reset_document_db():
         db_path = doc_db.db_file
         logger.info(f"Resettando database documenti: {db_path}")
         
+        # Chiudi le connessioni del pool
+        doc_db.close_connections()
+        
         # Rimuovi il file del database
         if os.path.exists(db_path):
             os.remove(db_path)
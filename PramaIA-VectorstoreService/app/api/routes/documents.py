@@ -5,12 +5,18 @@
 Documents module for Vectorstore Service.
 """
 
-from fastapi import APIRouter, HTTPException, Body, status
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Body, Request, status
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime
+import json
 import uuid
+import asyncio
 
+from app.core.config import get_settings
+from app.core.embedding_manager import embedding_manager
 from app.utils.document_manager import DocumentManager
+from app.utils.metadata_filter import MetadataFilterError, compile_metadata_filter
+from app.utils.thread_pools import PoolSaturatedError, run_read, run_write, run_embedding
 
 # Create router
 router = APIRouter()
@@ -41,7 +47,7 @@ async def recalculate_stats():
     """
     # Usa sync_databases invece di recalculate_stats
     manager = get_metadata_manager()
-    result = manager.sync_databases()
+    result = await run_read(manager.sync_databases)
     if not result.get('success', False):
         raise HTTPException(
             status_code=500,
@@ -50,94 +56,38 @@ async def recalculate_stats():
     return {"message": "Statistiche ricalcolate correttamente", "details": result}
 
 @router.get("/")
-async def get_documents(limit: int = 50, offset: int = 0):
+async def get_documents(limit: int = 50, offset: int = 0, cursor: Optional[str] = None,
+                        collection: Optional[str] = None, fields: Optional[str] = None):
     """
-    Get all documents with pagination.
+    Get documents with keyset pagination.
+    
+    Pages are read with a (created_at, id) keyset: pass the returned `next_cursor`
+    to fetch the following page. `offset` is still accepted for older clients.
     
     Args:
         limit: Number of documents to return (default: 50)
-        offset: Number of documents to skip (default: 0)
+        offset: Number of documents to skip, ignored when `cursor` is given (default: 0)
+        cursor: Opaque cursor returned by the previous page (optional)
+        collection: Filter by collection (optional)
+        fields: Comma-separated list of fields to return (optional)
     
     Returns:
         Dict: Documents information with pagination.
     """
-    print(f"[DEBUG] Chiamata endpoint /documents/ con limit={limit}, offset={offset}")
+    print(f"[DEBUG] Chiamata endpoint /documents/ con limit={limit}, offset={offset}, cursor={cursor}")
+    
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
     
     try:
-        print(f"[DEBUG] Tentativo lista documenti da SQLite...")
-        # Prima prova a ottenere documenti da SQLite
         manager = get_metadata_manager()
-        all_doc_ids = manager.list_all_documents()
-        print(f"[DEBUG] SQLite ha restituito {len(all_doc_ids)} IDs: {all_doc_ids[:5]}")
-        
-        # Se SQLite è vuoto, leggi direttamente da ChromaDB
-        if not all_doc_ids:
-            print(f"[DEBUG] SQLite vuoto, tentativo lettura ChromaDB...")
-            try:
-                collection = manager.vector_db.get_collection()
-                if collection:
-                    print(f"[DEBUG] Collezione ChromaDB trovata")
-                    chroma_data = collection.get()
-                    all_doc_ids = chroma_data.get('ids', []) if chroma_data else []
-                    print(f"[DEBUG] ChromaDB ha restituito {len(all_doc_ids)} IDs")
-                else:
-                    print(f"[DEBUG] Nessuna collezione ChromaDB trovata")
-            except Exception as e:
-                print(f"[DEBUG] Errore lettura ChromaDB: {e}")
-                all_doc_ids = []
-        
-        print(f"[DEBUG] Applicazione paginazione: offset={offset}, limit={limit}")
-        # Apply pagination
-        paginated_ids = all_doc_ids[offset:offset + limit]
-        print(f"[DEBUG] IDs paginati: {paginated_ids}")
-        
-        print(f"[DEBUG] Recupero dettagli documenti...")
-        # Get detailed document information for paginated results
-        documents = []
-        for i, doc_id in enumerate(paginated_ids):
-            print(f"[DEBUG] Elaborazione documento {i+1}/{len(paginated_ids)}: {doc_id}")
-            try:
-                # Prima prova SQLite
-                doc = manager.get_document(doc_id)
-                print(f"[DEBUG] SQLite per {doc_id}: {'trovato' if doc else 'non trovato'}")
-                
-                # Se non trovato in SQLite, prova ChromaDB
-                if not doc:
-                    print(f"[DEBUG] Tentativo ChromaDB per {doc_id}")
-                    try:
-                        collection = manager.vector_db.get_collection()
-                        if collection:
-                            chroma_data = collection.get(ids=[doc_id])
-                            if chroma_data and chroma_data.get('documents'):
-                                doc = {
-                                    'id': doc_id,
-                                    'content': chroma_data['documents'][0] if chroma_data['documents'] else '',
-                                    'metadata': chroma_data['metadatas'][0] if chroma_data.get('metadatas') and chroma_data['metadatas'] else {}
-                                }
-                                print(f"[DEBUG] ChromaDB per {doc_id}: documento ricostruito")
-                    except Exception as e:
-                        print(f"[DEBUG] Errore lettura documento {doc_id} da ChromaDB: {e}")
-                
-                if doc:
-                    documents.append(doc)
-                    print(f"[DEBUG] Documento {doc_id} aggiunto alla lista")
-                    
-            except Exception as e:
-                print(f"[DEBUG] Errore elaborazione documento {doc_id}: {e}")
-                continue
-        
-        print(f"[DEBUG] Preparazione risposta finale...")
-        result = {
-            "message": "Documents endpoint operational",
-            "documents": documents,
-            "total": len(all_doc_ids),
-            "limit": limit,
-            "offset": offset,
-            "returned": len(documents)
-        }
-        print(f"[DEBUG] Risposta pronta: {len(documents)} documenti restituiti")
-        return result
-        
+        page = await run_read(
+            manager.get_documents_page,
+            limit=limit, cursor=cursor, collection=collection, offset=offset, fields=field_list
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         print(f"[ERROR] Errore generale endpoint documents: {e}")
         import traceback
@@ -148,9 +98,22 @@ async def get_documents(limit: int = 50, offset: int = 0):
             "total": 0,
             "limit": limit,
             "offset": offset,
+            "next_cursor": None,
             "returned": 0,
             "error": str(e)
         }
+    
+    documents = page["documents"]
+    print(f"[DEBUG] Risposta pronta: {len(documents)} documenti restituiti")
+    return {
+        "message": "Documents endpoint operational",
+        "documents": documents,
+        "total": page["total"],
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": page["next_cursor"],
+        "returned": len(documents)
+    }
 
 @router.get("/list")
 async def list_documents():
@@ -160,7 +123,7 @@ async def list_documents():
     Returns:
         Dict: List of document IDs.
     """
-    document_ids = get_metadata_manager().list_all_documents()
+    document_ids = await run_read(get_metadata_manager().list_all_documents)
     return {
         "documents": document_ids,
         "total": len(document_ids)
@@ -186,13 +149,16 @@ async def count_documents_today():
         """
         
         # Esegui la query usando il metodo del manager
-        conn = manager.metadata_db._get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(count_query)
-        result = cursor.fetchone()
-        count = result[0] if result else 0
-        cursor.close()
-        conn.close()
+        def count_today():
+            conn = manager.metadata_db._get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(count_query)
+            result = cursor.fetchone()
+            cursor.close()
+            conn.close()
+            return result[0] if result else 0
+        
+        count = await run_read(count_today)
         
         print(f"[DEBUG] Documenti creati oggi: {count}")
         
@@ -202,12 +168,14 @@ async def count_documents_today():
             "message": f"Found {count} documents created today"
         }
         
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         print(f"[ERROR] Errore conteggio documenti oggi: {e}")
         # Fallback: usa il metodo esistente per contare tutti i documenti
         try:
             manager = get_metadata_manager()
-            all_docs = manager.list_all_documents()
+            all_docs = await run_read(manager.list_all_documents)
             return {
                 "count": len(all_docs),
                 "date": datetime.now().strftime("%Y-%m-%d"),
@@ -221,6 +189,104 @@ async def count_documents_today():
                 "error": str(e)
             }
 
+@router.post("/filter")
+async def filter_documents(body: Dict[str, Any] = Body(...)):
+    """
+    Get documents matching a typed metadata filter, with keyset pagination.
+    
+    Body fields: `filter` (see app.utils.metadata_filter: eq/ne/gt/gte/lt/lte/range/in/prefix
+    combined with and/or), `limit`, `cursor`, `collection` and `fields`.
+    
+    Returns:
+        Dict: Matching documents and the cursor of the next page.
+    """
+    metadata_filter = body.get("filter")
+    fields = body.get("fields")
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    
+    try:
+        try:
+            limit = int(body.get("limit", 50))
+        except (TypeError, ValueError):
+            raise ValueError(f"limit non valido: {body.get('limit')!r}")
+        compile_metadata_filter(metadata_filter)
+        page = await run_read(
+            get_metadata_manager().get_documents_page,
+            limit=limit,
+            cursor=body.get("cursor"),
+            collection=body.get("collection"),
+            fields=fields,
+            metadata_filter=metadata_filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {
+        "documents": page["documents"],
+        "limit": limit,
+        "next_cursor": page["next_cursor"],
+        "returned": len(page["documents"])
+    }
+
+@router.get("/search")
+async def search_documents_text(q: str, collection: Optional[str] = None, limit: int = 20,
+                                offset: int = 0, fields: Optional[str] = None):
+    """
+    Full-text search over document filename, content and selected metadata.
+    
+    Results are ranked with BM25 and include a highlighted snippet.
+    
+    Args:
+        q: Search text (words are ANDed, a trailing '*' matches by prefix)
+        collection: Filter by collection (optional)
+        limit: Number of results to return (default: 20)
+        offset: Number of results to skip (default: 0)
+        fields: Comma-separated list of fields to return (optional)
+    
+    Returns:
+        Dict: Ranked results with pagination.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Il parametro q non può essere vuoto")
+    
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    manager = get_metadata_manager()
+    search = await run_read(
+        manager.full_text_search, q, collection=collection, limit=limit, offset=offset, fields=field_list
+    )
+    
+    if "error" in search:
+        raise HTTPException(status_code=500, detail=f"Errore ricerca full-text: {search['error']}")
+    
+    return {
+        "query": q,
+        "results": search["results"],
+        "total": search["total"],
+        "limit": limit,
+        "offset": offset,
+        "returned": len(search["results"])
+    }
+
+def _prepare_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Completa un documento in ingresso con ID e timestamp di creazione se mancanti."""
+    # Genera un ID per il documento se non è presente
+    if "id" not in document:
+        document["id"] = f"doc{uuid.uuid4().hex[:8]}"
+    
+    # Aggiungi timestamp di creazione se non presente
+    if "metadata" not in document:
+        document["metadata"] = {}
+    
+    if "created_at" not in document["metadata"]:
+        document["metadata"]["created_at"] = datetime.now().isoformat()
+    
+    # La collezione indicata nel documento decide dove finiscono metadati e vettore
+    if document.get("collection") and "collection" not in document["metadata"]:
+        document["metadata"]["collection"] = document["collection"]
+    
+    return document
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_document(document: Dict[str, Any] = Body(...)):
     """
@@ -233,16 +299,7 @@ async def create_document(document: Dict[str, Any] = Body(...)):
         Dict: Created document.
     """
     try:
-        # Genera un ID per il documento se non è presente
-        if "id" not in document:
-            document["id"] = f"doc{uuid.uuid4().hex[:8]}"
-        
-        # Aggiungi timestamp di creazione se non presente
-        if "metadata" not in document:
-            document["metadata"] = {}
-        
-        if "created_at" not in document["metadata"]:
-            document["metadata"]["created_at"] = datetime.now().isoformat()
+        _prepare_document(document)
         
         print(f"Aggiunta documento con ID: {document['id']}")
         print(f"Collezione: {document.get('collection', 'default')}")
@@ -253,7 +310,7 @@ async def create_document(document: Dict[str, Any] = Body(...)):
         content = document.get('content', '')
         metadata = document.get('metadata', {})
         
-        success = get_metadata_manager().add_document(doc_id, content, metadata)
+        success = await run_write(get_metadata_manager().add_document, doc_id, content, metadata)
         
         if not success:
             raise HTTPException(
@@ -262,13 +319,15 @@ async def create_document(document: Dict[str, Any] = Body(...)):
             )
         
         # Verifica se il documento è stato effettivamente salvato
-        saved_doc = get_metadata_manager().get_document(document["id"])
+        saved_doc = await run_read(get_metadata_manager().get_document, document["id"])
         if not saved_doc:
             print(f"AVVISO: Documento {document['id']} non trovato dopo il salvataggio")
         else:
             print(f"Documento {document['id']} salvato con successo. Contenuto: {len(saved_doc.get('content', '')) if 'content' in saved_doc else 'Nessun contenuto'}")
         
         return document
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         print(f"Errore nell'aggiunta del documento: {str(e)}")
         raise HTTPException(
@@ -276,6 +335,112 @@ async def create_document(document: Dict[str, Any] = Body(...)):
             detail=f"Errore durante il salvataggio del documento: {str(e)}"
         )
 
+async def _iter_ndjson(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Legge il corpo della richiesta come NDJSON in streaming, una riga alla volta.
+    
+    Yields:
+        Tuple (numero di riga, documento decodificato o eccezione di parsing)
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+    
+    if buffer.strip():
+        line_number += 1
+        try:
+            yield line_number, json.loads(buffer)
+        except ValueError as e:
+            yield line_number, e
+
+@router.post("/batch")
+async def create_documents_batch(request: Request):
+    """
+    Create many documents in a single request.
+    
+    Accepts either a JSON body (`{"documents": [...]}` or a plain list) or an
+    NDJSON stream (`Content-Type: application/x-ndjson`, one document per line).
+    A JSON body is written with a single SQLite transaction; NDJSON input is
+    consumed incrementally and flushed every `batch_size` documents, so large
+    uploads are never held in memory all at once.
+    
+    Returns:
+        Dict: Per-item status and totals.
+    """
+    manager = get_metadata_manager()
+    batch_size = max(1, get_settings().batch_size)
+    results: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    
+    async def flush():
+        if pending:
+            batch = list(pending)
+            pending.clear()
+            results.extend(await run_write(manager.add_documents, batch, batch_size=batch_size))
+    
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        async for line_number, item in _iter_ndjson(request):
+            if isinstance(item, Exception) or not isinstance(item, dict):
+                results.append({
+                    "id": None,
+                    "line": line_number,
+                    "status": "error",
+                    "error": f"Riga NDJSON non valida: {item}"
+                })
+                continue
+            pending.append(_prepare_document(item))
+            if len(pending) >= batch_size:
+                await flush()
+    else:
+        try:
+            payload = await request.json()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Corpo JSON non valido: {str(e)}"
+            )
+        
+        documents = payload.get("documents") if isinstance(payload, dict) else payload
+        if not isinstance(documents, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Il corpo deve contenere una lista 'documents'"
+            )
+        
+        for index, item in enumerate(documents):
+            if not isinstance(item, dict):
+                results.append({
+                    "id": None,
+                    "index": index,
+                    "status": "error",
+                    "error": "Il documento deve essere un oggetto JSON"
+                })
+                continue
+            pending.append(_prepare_document(item))
+    
+    # Il corpo JSON è già in memoria: un'unica transazione SQLite per tutto il batch
+    await flush()
+    
+    created = sum(1 for item in results if item.get("status") == "created")
+    print(f"[DEBUG] Batch documenti: {created}/{len(results)} creati")
+    return {
+        "total": len(results),
+        "created": created,
+        "failed": len(results) - created,
+        "vectorized": sum(1 for item in results if item.get("vectorized")),
+        "results": results
+    }
+
 @router.get("/{document_id}")
 async def get_document(document_id: str):
     """
@@ -287,73 +452,14 @@ async def get_document(document_id: str):
     Returns:
         Dict: Document information.
     """
-    document = get_metadata_manager().get_document(document_id)
+    document = await run_read(get_metadata_manager().get_document, document_id)
     
     # Log debug info
     print(f"Richiesto documento con ID: {document_id}")
     print(f"Documento trovato: {document is not None}")
     
     if not document:
-        # Verifica se esistono documenti nel database (per diagnostica)
-        try:
-            all_doc_ids = get_metadata_manager().list_all_documents()
-            first_5_ids = all_doc_ids[:5]
-            print(f"Documento {document_id} non trovato. Primi 5 documenti disponibili: {first_5_ids}")
-            
-            # Verifica se il documento esiste in ChromaDB
-            from app.core.vectordb_manager import VectorDBManager
-            chroma = VectorDBManager()
-            collection = chroma.get_collection("test_documents")
-            
-            if collection:
-                try:
-                    chroma_docs = collection.get(ids=[document_id])
-                    if chroma_docs and chroma_docs.get("ids"):
-                        print(f"Documento {document_id} trovato in ChromaDB ma non nel database")
-                        
-                        # Recupera il contenuto da ChromaDB
-                        content = ""
-                        if "documents" in chroma_docs and chroma_docs["documents"] and len(chroma_docs["documents"]) > 0:
-                            if len(chroma_docs["documents"][0]) > 0:
-                                content = chroma_docs["documents"][0][0]
-                            
-                        # Recupera i metadati
-                        metadata_dict = {}
-                        if "metadatas" in chroma_docs and chroma_docs["metadatas"] and len(chroma_docs["metadatas"]) > 0:
-                            if len(chroma_docs["metadatas"][0]) > 0:
-                                metadata_dict = chroma_docs["metadatas"][0][0]
-                                if not isinstance(metadata_dict, dict):
-                                    metadata_dict = {}
-                        
-                        # Crea un documento sintetico
-                        print(f"Creazione documento sintetico da ChromaDB")
-                        filename = f"document_{document_id}"
-                        collection = "test_documents"
-                        
-                        if isinstance(metadata_dict, dict):
-                            if "filename" in metadata_dict:
-                                filename = metadata_dict["filename"]
-                            if "collection" in metadata_dict:
-                                collection = metadata_dict["collection"]
-                        
-                        document = {
-                            "id": document_id,
-                            "filename": filename,
-                            "collection": collection,
-                            "content": content,
-                            "metadata": metadata_dict
-                        }
-                        
-                        # Salva il documento nel database per future richieste
-                        get_metadata_manager().add_document(document_id, content, metadata_dict)
-                        print(f"Documento {document_id} recuperato da ChromaDB e salvato nel database")
-                        
-                        return document
-                except Exception as e:
-                    print(f"Errore nel recupero da ChromaDB: {str(e)}")
-        except Exception as list_err:
-            print(f"Errore nell'elencare i documenti disponibili: {str(list_err)}")
-        
+        # DocumentManager.get_document cerca già il vettore in tutte le collezioni ChromaDB
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Documento con ID {document_id} non trovato"
@@ -378,7 +484,7 @@ async def delete_document(document_id: str):
     Returns:
         Dict: Deletion confirmation.
     """
-    success = get_metadata_manager().delete_document(document_id)
+    success = await run_write(get_metadata_manager().delete_document, document_id)
     
     if not success:
         raise HTTPException(
@@ -388,6 +494,30 @@ async def delete_document(document_id: str):
     
     return {"message": f"Documento con ID {document_id} eliminato con successo"}
 
+async def _encode_query_embeddings(manager: DocumentManager, query_text: str,
+                                   collections: List[str]) -> Dict[str, List[float]]:
+    """
+    Calcola nel pool degli embedding l'embedding della query per ogni modello delle
+    collezioni interrogate.
+    
+    Returns:
+        Dict nome del modello -> embedding; i modelli non calcolati vengono omessi
+        e la ricerca li calcolerà da sé (riportando l'eventuale errore).
+    """
+    models = await run_read(manager.search_embedding_models, collections)
+    
+    async def encode(model_name: str):
+        try:
+            return await run_embedding(embedding_manager.encode_query, query_text, model_name=model_name)
+        except PoolSaturatedError:
+            raise
+        except Exception as e:
+            print(f"[DEBUG] Embedding query non precalcolato per il modello '{model_name}': {e}")
+            return None
+    
+    vectors = await asyncio.gather(*(encode(model_name) for model_name in models))
+    return {model_name: vector for model_name, vector in zip(models, vectors) if vector is not None}
+
 @router.post("/{collection_name}/query")
 async def query_collection(
     collection_name: str,
@@ -396,9 +526,21 @@ async def query_collection(
     """
     Execute a semantic search query on a specific collection.
     
+    With `"hybrid": true` the vector search and the full-text (BM25) search run
+    in parallel and are fused into a single ranking. Optional hybrid parameters:
+    `fusion` ("rrf" or "weighted"), `rrf_k`, `vector_weight`, `lexical_weight`
+    and `candidates` (results taken from each leg).
+    
+    `filter` takes a typed metadata filter (see POST /documents/filter) that is
+    applied before the vector search.
+    
+    Only documents of `collection_name` are searched. `collections` (a list) searches
+    several collections in parallel and merges them into a single top-k; the default
+    collection name ("prama_documents" or "default") searches all collections.
+    
     Args:
         collection_name: Name of the collection to search
-        query_data: Query parameters including query_text, top_k, metadata_filter
+        query_data: Query parameters including query_text, top_k, metadata_filter, hybrid
         
     Returns:
         Dict: Search results with matches
@@ -407,6 +549,9 @@ async def query_collection(
         query_text = query_data.get("query_text", "")
         top_k = query_data.get("top_k", 5)
         metadata_filter = query_data.get("metadata_filter", {})
+        hybrid = bool(query_data.get("hybrid", False))
+        typed_filter = query_data.get("filter")
+        collections = query_data.get("collections") or [collection_name]
         
         if not query_text:
             raise HTTPException(
@@ -414,11 +559,55 @@ async def query_collection(
                 detail="query_text is required"
             )
         
-        print(f"[DEBUG] Query collection '{collection_name}': '{query_text}' (top_k={top_k})")
+        if not isinstance(collections, list) or not all(isinstance(name, str) and name for name in collections):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="collections must be a list of collection names"
+            )
+        
+        if typed_filter is not None:
+            try:
+                compile_metadata_filter(typed_filter)
+            except MetadataFilterError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        print(f"[DEBUG] Query collection '{collection_name}': '{query_text}' (top_k={top_k}, hybrid={hybrid})")
         
         # Usa il DocumentManager per eseguire la ricerca
         manager = get_metadata_manager()
-        results = manager.search_documents(query_text, limit=top_k, where=metadata_filter)
+        
+        # Gli embedding della query (uno per modello delle collezioni interrogate) sono
+        # calcolati nel pool dedicato: nel pool delle letture resta solo I/O
+        query_embeddings = await _encode_query_embeddings(manager, query_text, collections)
+        hybrid_info = None
+        if hybrid:
+            try:
+                hybrid_info = await run_read(
+                    manager.hybrid_search,
+                    query_text,
+                    limit=top_k,
+                    where=metadata_filter,
+                    fusion=query_data.get("fusion", "rrf"),
+                    rrf_k=int(query_data.get("rrf_k", 60)),
+                    vector_weight=float(query_data.get("vector_weight", 1.0)),
+                    lexical_weight=float(query_data.get("lexical_weight", 1.0)),
+                    candidates=query_data.get("candidates"),
+                    metadata_filter=typed_filter,
+                    collections=collections,
+                    query_embeddings=query_embeddings
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            results = hybrid_info["results"]
+        else:
+            try:
+                results = await run_read(
+                    manager.search_documents,
+                    query_text, limit=top_k, where=metadata_filter, metadata_filter=typed_filter,
+                    collections=collections, query_embeddings=query_embeddings
+                )
+            except MetadataFilterError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
         # Formatta i risultati nel formato atteso dal client
         matches = []
@@ -427,18 +616,34 @@ async def query_collection(
                 "id": result.get("id", ""),
                 "document": result.get("content", ""),
                 "metadata": result.get("metadata", {}),
-                "similarity_score": result.get("similarity_score", 0.0)  # Chiave corretta
+                "similarity_score": result.get("similarity_score", 0.0),  # Chiave corretta
+                "collection": result.get("collection") or result.get("metadata", {}).get("collection")
             }
+            if hybrid:
+                match["hybrid_score"] = result.get("hybrid_score", 0.0)
+                match["lexical_score"] = result.get("lexical_score")
+                match["ranks"] = result.get("ranks", {})
+                if result.get("snippet"):
+                    match["snippet"] = result["snippet"]
             matches.append(match)
         
         print(f"[DEBUG] Query '{collection_name}' returned {len(matches)} matches")
-        return {
+        response = {
             "matches": matches,
             "total": len(matches),
             "collection": collection_name,
+            "collections": collections,
             "query": query_text
         }
+        if hybrid_info is not None:
+            response["search_mode"] = "hybrid"
+            response["fusion"] = hybrid_info["fusion"]
+            response["legs"] = hybrid_info["legs"]
+            response["timings_ms"] = hybrid_info["timings_ms"]
+        return response
         
+    except (HTTPException, PoolSaturatedError):
+        raise
     except Exception as e:
         print(f"[ERROR] Query collection '{collection_name}' failed: {e}")
         import traceback
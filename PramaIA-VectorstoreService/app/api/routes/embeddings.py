@@ -4,6 +4,8 @@ Embeddings module for Vectorstore Service.
 
 from fastapi import APIRouter
 
+from app.core.embedding_manager import embedding_manager
+
 # Create router
 router = APIRouter()
 
@@ -13,9 +15,12 @@ async def get_embeddings():
     Get embeddings information.
     
     Returns:
-        Dict: Embeddings information.
+        Dict: Embeddings information, with per-model load and encode timings.
     """
+    stats = embedding_manager.get_stats()
     return {
         "message": "Embeddings endpoint operational",
-        "models": []
+        "models": list(stats["models"].keys()),
+        "default_model": stats["default_model"],
+        "stats": stats
     }
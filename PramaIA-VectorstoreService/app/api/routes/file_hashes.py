@@ -2,12 +2,15 @@
 Router per la gestione degli hash dei file nel VectorstoreService.
 """
 from fastapi import APIRouter, Depends, HTTPException, Body, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
+import json
 import hashlib
 from pydantic import BaseModel, Field
 
 from app.utils.file_hash_manager import FileHashManager
 from app.dependencies.auth import get_api_key
+from app.utils.thread_pools import run_read, run_write
 
 # Istanzia il gestore degli hash
 file_hash_manager = FileHashManager()
@@ -31,6 +34,29 @@ class DuplicateCheckResponse(BaseModel):
     document_id: Optional[str] = Field(None, description="ID del documento duplicato, se presente")
     is_path_duplicate: bool = Field(False, description="Indica se è un duplicato esatto del percorso")
     
+class DuplicateCheckItem(BaseModel):
+    """Singolo file nel controllo duplicati a lotti."""
+    file_hash: str = Field(..., description="Hash MD5 del file")
+    client_id: str = Field("system", description="ID del client")
+    original_path: str = Field("", description="Percorso originale del file")
+
+class BatchDuplicateCheckRequest(BaseModel):
+    """Modello per la richiesta di controllo duplicati a lotti."""
+    items: List[DuplicateCheckItem] = Field(..., max_length=10000, description="File da controllare (massimo 10000)")
+
+class BatchDuplicateCheckResult(DuplicateCheckResponse):
+    """Esito del controllo per un singolo file del lotto."""
+    file_hash: str
+    client_id: str = "system"
+    original_path: str = ""
+
+class BatchDuplicateCheckResponse(BaseModel):
+    """Modello per la risposta al controllo duplicati a lotti."""
+    results: List[BatchDuplicateCheckResult] = Field(..., description="Esiti nello stesso ordine della richiesta")
+    total: int = Field(..., description="Numero di file controllati")
+    duplicates: int = Field(..., description="Numero di duplicati di contenuto o di percorso")
+    path_duplicates: int = Field(..., description="Numero di duplicati esatti del percorso")
+    
 class SaveHashRequest(BaseModel):
     """Modello per la richiesta di salvataggio hash."""
     file_hash: str = Field(..., description="Hash MD5 del file")
@@ -58,7 +84,8 @@ async def check_duplicate(
     """
     Controlla se un file è un duplicato basandosi sull'hash.
     """
-    is_duplicate, document_id, is_path_duplicate = file_hash_manager.check_duplicate(
+    is_duplicate, document_id, is_path_duplicate = await run_read(
+        file_hash_manager.check_duplicate,
         file_hash=request.file_hash,
         client_id=request.client_id,
         original_path=request.original_path
@@ -70,6 +97,26 @@ async def check_duplicate(
         is_path_duplicate=is_path_duplicate
     )
     
+@router.post("/check-duplicates", response_model=BatchDuplicateCheckResponse)
+async def check_duplicates(
+    request: BatchDuplicateCheckRequest,
+    api_key: str = Depends(get_api_key)
+) -> BatchDuplicateCheckResponse:
+    """
+    Check a batch of files for duplicates with a single set-based lookup.
+    """
+    results = await run_read(
+        file_hash_manager.check_duplicates,
+        [(item.file_hash, item.client_id, item.original_path) for item in request.items]
+    )
+    
+    return BatchDuplicateCheckResponse(
+        results=[BatchDuplicateCheckResult(**result) for result in results],
+        total=len(results),
+        duplicates=sum(1 for result in results if result["is_duplicate"]),
+        path_duplicates=sum(1 for result in results if result["is_path_duplicate"])
+    )
+    
 @router.post("/save", status_code=201)
 async def save_hash(
     request: SaveHashRequest,
@@ -78,7 +125,8 @@ async def save_hash(
     """
     Salva l'hash di un file nel database.
     """
-    success = file_hash_manager.save_file_hash(
+    success = await run_write(
+        file_hash_manager.save_file_hash,
         file_hash=request.file_hash,
         filename=request.filename,
         document_id=request.document_id,
@@ -98,15 +146,26 @@ async def list_hashes(
     api_key: str = Depends(get_api_key)
 ) -> List[HashRecord]:
     """
-    Ottiene tutti gli hash dal database.
+    Ottiene una pagina di hash dal database.
     """
-    all_hashes = file_hash_manager.get_all_hashes()
-    
-    # Applica paginazione
-    paginated_hashes = all_hashes[offset:offset + limit]
+    # La paginazione avviene in SQL, senza caricare l'intera tabella
+    paginated_hashes = await run_read(file_hash_manager.get_hashes_page, limit=limit, offset=offset)
     
     # Converti ogni dizionario in un oggetto HashRecord
     return [HashRecord(**h) for h in paginated_hashes]
+
+@router.get("/export")
+async def export_hashes(
+    api_key: str = Depends(get_api_key)
+) -> StreamingResponse:
+    """
+    Stream all hashes as NDJSON (one record per line), newest first.
+    """
+    def generate():
+        for record in file_hash_manager.iter_hashes():
+            yield json.dumps(record, default=str) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
     
 @router.delete("/{file_hash}")
 async def delete_hash(
@@ -116,7 +175,7 @@ async def delete_hash(
     """
     Elimina un hash dal database.
     """
-    success = file_hash_manager.delete_hash(file_hash)
+    success = await run_write(file_hash_manager.delete_hash, file_hash)
     
     if not success:
         raise HTTPException(status_code=404, detail=f"Hash {file_hash} non trovato")
@@ -4,6 +4,8 @@ Health check module for Vectorstore Service.
 
 from fastapi import APIRouter, Depends
 from app.services.health import get_service_health
+from app.utils.file_watcher import get_active_file_watcher
+from app.utils.thread_pools import get_all_pool_stats
 
 # Create router
 router = APIRouter()
@@ -29,3 +31,33 @@ async def get_dependencies_health():
         Dict: Detailed health information.
     """
     return await get_service_health()
+
+@router.get("/file-watcher")
+async def get_file_watcher_health():
+    """
+    Get file watcher backend and scan metrics.
+    
+    Returns:
+        Dict: Active backend, scan durations and detected change counts.
+    """
+    watcher = get_active_file_watcher()
+    if watcher is None:
+        return {"status": "disabled"}
+    stats = watcher.get_stats()
+    return {"status": "running" if stats["running"] else "stopped", **stats}
+
+@router.get("/pools")
+async def get_pools_health():
+    """
+    Get saturation metrics of the request thread pools (read, write, embedding).
+    
+    Returns:
+        Dict: Per-pool occupancy, rejections and wait/run times.
+    """
+    pools = get_all_pool_stats()
+    saturated = [name for name, stats in pools.items() if stats["in_flight"] >= stats["capacity"]]
+    return {
+        "status": "saturated" if saturated else "ok",
+        "saturated": saturated,
+        "pools": pools
+    }
@@ -2,20 +2,90 @@
 Reconciliation module for Vectorstore Service.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from app.services.reconciliation import (
+    reconciliation_service,
+    ReconciliationError,
+    RECONCILIATION_PAGE_SIZE,
+    RECONCILIATION_REPAIR_BATCH_SIZE
+)
 
 # Create router
 router = APIRouter()
 
+
+class ReconciliationJobRequest(BaseModel):
+    """Parametri di un job di riconciliazione."""
+    dry_run: bool = Field(False, description="Rileva le incongruenze senza correggerle")
+    page_size: int = Field(RECONCILIATION_PAGE_SIZE, ge=1, le=100000, description="ID letti per pagina da ciascun archivio")
+    repair_batch_size: int = Field(RECONCILIATION_REPAIR_BATCH_SIZE, ge=1, le=10000, description="Correzioni per lotto")
+    delete_orphan_vectors: bool = Field(True, description="Elimina da ChromaDB i vettori senza documento")
+    reindex_missing_vectors: bool = Field(True, description="Reindicizza i documenti vettorizzabili senza vettore")
+
+
 @router.get("/")
 async def get_reconciliation():
     """
     Get reconciliation status.
     
     Returns:
-        Dict: Reconciliation information.
+        Dict: Running job (with progress and ETA) or the last finished job.
+    """
+    return reconciliation_service.get_status()
+
+
+@router.post("/jobs", status_code=202)
+async def start_reconciliation_job(request: ReconciliationJobRequest = ReconciliationJobRequest()):
+    """
+    Start a reconciliation job between SQLite and ChromaDB in the background.
+    
+    Returns:
+        Dict: The job, to be polled on GET /reconciliation/jobs/{job_id}.
+    """
+    try:
+        return reconciliation_service.start_job(**request.model_dump())
+    except ReconciliationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/jobs")
+async def list_reconciliation_jobs(limit: int = 20):
+    """
+    List the most recent reconciliation jobs.
+    """
+    return {"jobs": reconciliation_service.list_jobs(limit=max(1, min(limit, 100)))}
+
+
+@router.get("/jobs/{job_id}")
+async def get_reconciliation_job(job_id: str):
+    """
+    Get a reconciliation job with its progress, rate and ETA.
+    """
+    job = reconciliation_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} non trovato")
+    return job
+
+
+@router.post("/jobs/{job_id}/resume", status_code=202)
+async def resume_reconciliation_job(job_id: str):
+    """
+    Resume an interrupted, cancelled or failed job from its last checkpoint.
+    """
+    try:
+        return reconciliation_service.resume_job(job_id)
+    except ReconciliationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_reconciliation_job(job_id: str):
+    """
+    Cancel the running job; it stops after the current batch and can be resumed.
     """
-    return {
-        "message": "Reconciliation endpoint operational",
-        "status": "idle"
-    }
+    try:
+        return reconciliation_service.cancel_job(job_id)
+    except ReconciliationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
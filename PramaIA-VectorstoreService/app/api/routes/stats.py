@@ -5,6 +5,10 @@ Statistics module for Vectorstore Service.
 from fastapi import APIRouter
 from datetime import datetime, timedelta
 from app.utils.document_manager import DocumentManager
+from app.core.embedding_manager import embedding_manager
+from app.utils.sqlite_pool import get_all_pool_stats
+from app.services.stats_service import stats_service
+from app.utils.thread_pools import run_read, run_write
 
 # Create router
 router = APIRouter()
@@ -20,7 +24,7 @@ async def get_stats():
     Returns:
         Dict: Basic statistics.
     """
-    stats = vectorstore_manager.get_statistics()
+    stats = await run_read(vectorstore_manager.get_statistics)
     
     return {
         "message": "Stats endpoint operational",
@@ -33,9 +37,52 @@ async def get_stats():
         # Aggiungo i campi specifici per SQLite e ChromaDB
         "sqlite_documents": stats.get("sqlite_documents", 0),
         "chroma_documents": stats.get("chroma_documents", 0),
-        "chroma_collections": stats.get("chroma_collections", 0)
+        "chroma_collections": stats.get("chroma_collections", 0),
+        # Dettaglio dei contatori incrementali
+        "total_documents": stats.get("documents_total", 0),
+        "collection_count": len(stats.get("by_collection", {})),
+        "by_collection": [
+            {"name": name, "document_count": count}
+            for name, count in sorted(stats.get("by_collection", {}).items())
+        ],
+        "by_content_type": stats.get("by_content_type", {}),
+        "stats_reconciliation": stats_service.last_reconciliation,
+        "query_embedding_cache": embedding_manager.query_cache.get_stats()
     }
 
+@router.get("/query-cache")
+async def get_query_cache_stats():
+    """
+    Get query embedding cache statistics.
+    
+    Returns:
+        Dict: Hit/miss/eviction counters of the query embedding cache.
+    """
+    return embedding_manager.query_cache.get_stats()
+
+@router.get("/embedding-store")
+async def get_embedding_store_stats():
+    """
+    Get document embedding store statistics.
+    
+    Returns:
+        Dict: Size and hit rate of the content-addressed embedding store.
+    """
+    store = embedding_manager.document_store
+    if store is None:
+        return {"enabled": False}
+    return {"enabled": True, **await run_read(store.get_stats)}
+
+@router.get("/sqlite-pool")
+async def get_sqlite_pool_stats():
+    """
+    Get SQLite connection pool statistics.
+    
+    Returns:
+        Dict: Per-database pool usage, including connection wait times.
+    """
+    return {"pools": get_all_pool_stats()}
+
 @router.get("/processing")
 async def get_processing_stats():
     """
@@ -44,12 +91,51 @@ async def get_processing_stats():
     Returns:
         Dict: Document processing statistics.
     """
-    stats = vectorstore_manager.get_statistics()
-    documents = vectorstore_manager.list_all_documents()
+    stats = await run_read(vectorstore_manager.get_statistics)
     
     return {
         "documents_in_queue": stats.get("documents_in_queue", 0),
         "documents_in_coda": stats.get("processing_queue", 0),
         "documents_processed_today": stats.get("documents_today", 0),
-        "total_documents": len(documents)
+        "total_documents": stats.get("documents_total", 0)
+    }
+
+@router.get("/reconciliation")
+async def get_stats_reconciliation():
+    """
+    Get the outcome of the last statistics reconciliation.
+    
+    Returns:
+        Dict: Status, time and drift corrected by the last run.
+    """
+    return {
+        "interval_seconds": stats_service.interval,
+        **stats_service.last_reconciliation
+    }
+
+@router.post("/reconcile")
+async def reconcile_stats():
+    """
+    Recompute the statistics counters from the data and fix any drift.
+    
+    Returns:
+        Dict: Outcome of the reconciliation.
+    """
+    return await run_write(stats_service.reconcile)
+
+@router.get("/{collection_name}")
+async def get_collection_stats(collection_name: str):
+    """
+    Get statistics for a single collection.
+    
+    Args:
+        collection_name: Name of the collection.
+    
+    Returns:
+        Dict: Document count of the collection.
+    """
+    stats = await run_read(vectorstore_manager.get_statistics)
+    return {
+        "name": collection_name,
+        "document_count": stats.get("by_collection", {}).get(collection_name, 0)
     }
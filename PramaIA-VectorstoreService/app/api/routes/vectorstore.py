@@ -3,7 +3,18 @@ Vectorstore Statistics module.
 """
 
 from fastapi import APIRouter, Query, Path, HTTPException, status
+from pydantic import BaseModel, Field
+from app.core.vectordb_manager import vector_db_manager
 from app.utils.sqlite_metadata_manager import SQLiteMetadataManager
+from app.utils.thread_pools import run_read, run_write
+from app.services.index_benchmark import BENCHMARK_K, BENCHMARK_SAMPLE_SIZE
+from app.services.index_maintenance import (
+    index_maintenance_service,
+    IndexMaintenanceError,
+    REBUILD_MIN_RECALL,
+    REBUILD_MAX_RECALL_DROP,
+    REBUILD_PAGE_SIZE
+)
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -17,6 +28,53 @@ logger = logging.getLogger(__name__)
 # Initialize MetadataStoreManager
 metadata_manager = SQLiteMetadataManager()
 
+
+class CollectionSettings(BaseModel):
+    """Impostazioni di una collezione ChromaDB (le omesse assumono i valori predefiniti)."""
+    space: Optional[str] = Field(None, description="Metrica HNSW: l2, cosine o ip")
+    m: Optional[int] = Field(None, ge=2, le=128, description="Connessioni per nodo del grafo HNSW")
+    construction_ef: Optional[int] = Field(None, ge=1, description="Ampiezza della ricerca in costruzione")
+    search_ef: Optional[int] = Field(None, ge=1, description="Ampiezza della ricerca in interrogazione")
+    num_threads: Optional[int] = Field(None, ge=1, description="Thread usati da HNSW per inserimenti e ricerche")
+    quantization: Optional[str] = Field(None, description="Vettori quantizzati con re-ranking esatto: none, int8 o binary")
+    rerank_candidates: Optional[int] = Field(None, ge=1, description="Candidati quantizzati riordinati con i vettori float32")
+    embedding_model: Optional[str] = Field(None, description="Modello di embedding della collezione")
+
+
+class CreateCollectionRequest(BaseModel):
+    """Richiesta di creazione di una collezione."""
+    name: str = Field(..., description="Nome della collezione (3-63 caratteri alfanumerici, '.', '_' o '-')")
+    settings: CollectionSettings = CollectionSettings()
+
+
+class BenchmarkRequest(BaseModel):
+    """Parametri del benchmark di un indice."""
+    sample_size: int = Field(BENCHMARK_SAMPLE_SIZE, ge=1, le=10000, description="Numero di query del campione")
+    k: int = Field(BENCHMARK_K, ge=1, le=1000, description="Numero di vicini confrontati (recall@k)")
+
+
+class RebuildRequest(BenchmarkRequest):
+    """Parametri della ricostruzione dell'indice di una collezione."""
+    settings: CollectionSettings = CollectionSettings()
+    benchmark: bool = Field(True, description="Misura recall e latenza del vecchio e del nuovo indice")
+    min_recall: float = Field(REBUILD_MIN_RECALL, ge=0, le=1, description="Recall@k minimo per completare lo scambio")
+    max_recall_drop: Optional[float] = Field(REBUILD_MAX_RECALL_DROP, ge=0, le=1,
+                                             description="Calo massimo di recall@k rispetto al vecchio indice")
+    retain_previous: bool = Field(False, description="Conserva la vecchia collezione dopo lo scambio")
+    page_size: int = Field(REBUILD_PAGE_SIZE, ge=1, le=10000, description="Vettori copiati per pagina")
+
+
+async def _start_index_job(start, *args, **kwargs):
+    """Avvia un job sugli indici traducendo gli errori del servizio in risposte HTTP."""
+    try:
+        return await run_read(start, *args, **kwargs)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IndexMaintenanceError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
 @router.get("/")
 async def get_vectorstore_stats():
     """
@@ -25,8 +83,8 @@ async def get_vectorstore_stats():
     Returns:
         Dict: Vectorstore statistics.
     """
-    documents = metadata_manager.get_documents()
-    collections = metadata_manager.get_collections()
+    documents = await run_read(metadata_manager.get_documents)
+    collections = await run_read(metadata_manager.get_collections)
     
     # Calcola le statistiche del vectorstore
     return {
@@ -47,7 +105,7 @@ async def get_vectorstore_documents(collection: Optional[str] = Query(None, desc
     Returns:
         Dict: List of documents.
     """
-    documents = metadata_manager.get_documents()
+    documents = await run_read(metadata_manager.get_documents)
     
     if collection:
         # Filtra i documenti per collezione
@@ -66,10 +124,10 @@ async def get_vectorstore_collections():
     Returns:
         Dict: List of collections.
     """
-    collections = metadata_manager.get_collections()
+    collections = await run_read(metadata_manager.get_collections)
     
     # Conta i documenti per collezione
-    documents = metadata_manager.get_documents()
+    documents = await run_read(metadata_manager.get_documents)
     collection_counts = {}
     
     for doc in documents:
@@ -90,6 +148,127 @@ async def get_vectorstore_collections():
         "total": len(result)
     }
 
+@router.post("/collections", status_code=status.HTTP_201_CREATED)
+async def create_vectorstore_collection(request: CreateCollectionRequest):
+    """
+    Create a collection with its own HNSW index settings and embedding model.
+    
+    Documents whose `collection` matches the name are indexed in it.
+    
+    Returns:
+        Dict: Name and effective settings of the collection.
+    """
+    existing = await run_read(vector_db_manager.list_collections)
+    if request.name in existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"La collezione '{request.name}' esiste già"
+        )
+    try:
+        await run_write(
+            vector_db_manager.create_collection, request.name, request.settings.model_dump(exclude_none=True)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {
+        "name": request.name,
+        "settings": vector_db_manager.get_collection_settings(request.name)
+    }
+
+@router.get("/collections/{collection_name}/settings")
+async def get_vectorstore_collection_settings(collection_name: str = Path(..., description="Nome della collezione")):
+    """
+    Get the index settings and embedding model of a collection.
+    
+    Returns:
+        Dict: Name and settings of the collection.
+    """
+    settings = await run_read(vector_db_manager.get_collection_settings, collection_name)
+    if settings is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Collezione {collection_name} non trovata"
+        )
+    return {"name": collection_name, "settings": settings}
+
+@router.put("/collections/{collection_name}/settings", status_code=status.HTTP_202_ACCEPTED)
+async def update_vectorstore_collection_settings(settings: CollectionSettings,
+                                                 collection_name: str = Path(..., description="Nome della collezione")):
+    """
+    Change the HNSW settings of a collection.
+    
+    HNSW parameters are fixed when the index is built, so this starts a background
+    rebuild with the new settings (see POST /collections/{name}/rebuild).
+    
+    Returns:
+        Dict: The rebuild job, to be polled on GET /index-jobs/{job_id}.
+    """
+    return await _start_index_job(
+        index_maintenance_service.start_rebuild, collection_name, settings.model_dump(exclude_none=True)
+    )
+
+@router.post("/collections/{collection_name}/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_vectorstore_collection(request: RebuildRequest = RebuildRequest(),
+                                         collection_name: str = Path(..., description="Nome della collezione")):
+    """
+    Rebuild (or compact) the index of a collection in the background.
+    
+    Vectors are copied into a fresh collection with the requested settings, optionally
+    benchmarked against the current index, and swapped in atomically. Writes keep
+    going during the copy and are replayed before the swap.
+    
+    Setting `quantization` to "int8" or "binary" converts the collection to a quantized
+    index with exact re-ranking; with `benchmark` the job reports recall and memory of
+    both indexes and `max_recall_drop` rejects the swap when recall falls too far.
+    
+    Returns:
+        Dict: The rebuild job, to be polled on GET /index-jobs/{job_id}.
+    """
+    params = request.model_dump()
+    params["settings"] = request.settings.model_dump(exclude_none=True)
+    return await _start_index_job(index_maintenance_service.start_rebuild, collection_name, **params)
+
+@router.post("/collections/{collection_name}/benchmark", status_code=status.HTTP_202_ACCEPTED)
+async def benchmark_vectorstore_collection(request: BenchmarkRequest = BenchmarkRequest(),
+                                           collection_name: str = Path(..., description="Nome della collezione")):
+    """
+    Measure recall@k and query latency of a collection's index in the background.
+    
+    Returns:
+        Dict: The benchmark job, to be polled on GET /index-jobs/{job_id}.
+    """
+    return await _start_index_job(index_maintenance_service.start_benchmark, collection_name,
+                                  **request.model_dump())
+
+@router.get("/index-jobs")
+async def list_index_jobs(limit: int = Query(20, ge=1, le=100),
+                          collection: Optional[str] = Query(None, description="Filtra per collezione")):
+    """
+    List the most recent index rebuild and benchmark jobs.
+    """
+    return {"jobs": index_maintenance_service.list_jobs(limit=limit, collection=collection)}
+
+@router.get("/index-jobs/{job_id}")
+async def get_index_job(job_id: str):
+    """
+    Get an index job with its progress and, when finished, its benchmark report.
+    """
+    job = index_maintenance_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} non trovato")
+    return job
+
+@router.post("/index-jobs/{job_id}/cancel")
+async def cancel_index_job(job_id: str):
+    """
+    Cancel a running index job; a partial rebuild is discarded.
+    """
+    try:
+        return index_maintenance_service.cancel_job(job_id)
+    except IndexMaintenanceError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
 # REDIRECT per compatibilità: /collections/ -> /vectorstore/collections  
 @router.get("/", include_in_schema=False, deprecated=True)
 async def collections_redirect():
@@ -113,7 +292,7 @@ async def get_vectorstore_document(document_id: str = Path(..., description="ID
     Returns:
         Dict: Document information.
     """
-    document = metadata_manager.get_document(document_id)
+    document = await run_read(metadata_manager.get_document, document_id)
     
     if not document:
         raise HTTPException(
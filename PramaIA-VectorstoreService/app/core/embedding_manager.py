@@ -0,0 +1,339 @@
+"""
+Embedding Manager - Gestione centralizzata dei modelli di embedding.
+
+Questo modulo mantiene i modelli SentenceTransformer caricati una sola volta per
+processo e raggruppa le richieste di encoding concorrenti (micro-batching) in un'unica
+chiamata a `encode`, esponendo i tempi di caricamento e di encoding per modello.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional, Dict, List, Any
+
+from app.utils.query_embedding_cache import QueryEmbeddingCache
+from app.utils.embedding_store import EmbeddingStore, content_hash
+
+# Configurazione logger
+logger = logging.getLogger(__name__)
+
+# Modello di embedding predefinito (lo stesso usato da ChromaDB per l'indicizzazione)
+DEFAULT_EMBEDDING_MODEL = os.getenv("VECTORSTORE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Finestra di raccolta delle richieste concorrenti (0 disabilita il micro-batching)
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("VECTORSTORE_EMBEDDING_BATCH_WINDOW_MS", "2"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("VECTORSTORE_EMBEDDING_MAX_BATCH_SIZE", "32"))
+
+# Cache degli embedding delle query (0 disabilita la cache)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("VECTORSTORE_QUERY_CACHE_SIZE", "1024"))
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("VECTORSTORE_QUERY_CACHE_TTL_SECONDS", "600"))
+
+# Archivio persistente degli embedding dei documenti (vuoto = accanto al database dei documenti)
+EMBEDDING_STORE_ENABLED = os.getenv("VECTORSTORE_EMBEDDING_STORE_ENABLED", "true").lower() == "true"
+EMBEDDING_STORE_PATH = os.getenv("VECTORSTORE_EMBEDDING_STORE_PATH", "")
+
+
+class _ModelStats:
+    """Contatori di caricamento e di encoding per un singolo modello."""
+
+    def __init__(self):
+        self.load_time_ms: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.encode_calls = 0
+        self.encoded_texts = 0
+        self.encode_time_ms_total = 0.0
+        self.last_encode_ms: Optional[float] = None
+        self.max_batch_size = 0
+        self._lock = threading.Lock()
+
+    def record_encode(self, batch_size: int, elapsed_ms: float) -> None:
+        with self._lock:
+            self.encode_calls += 1
+            self.encoded_texts += batch_size
+            self.encode_time_ms_total += elapsed_ms
+            self.last_encode_ms = elapsed_ms
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.encode_calls
+            return {
+                "loaded": self.loaded_at is not None,
+                "load_time_ms": round(self.load_time_ms, 2) if self.load_time_ms is not None else None,
+                "loaded_at": self.loaded_at,
+                "encode_calls": calls,
+                "encoded_texts": self.encoded_texts,
+                "encode_time_ms_total": round(self.encode_time_ms_total, 2),
+                "avg_encode_ms": round(self.encode_time_ms_total / calls, 2) if calls else 0.0,
+                "avg_batch_size": round(self.encoded_texts / calls, 2) if calls else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "last_encode_ms": round(self.last_encode_ms, 2) if self.last_encode_ms is not None else None
+            }
+
+
+class EmbeddingManager:
+    """
+    Gestore dei modelli di embedding.
+    Singleton per garantire che ogni modello venga caricato una sola volta per processo.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EmbeddingManager, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, _ModelStats] = {}
+        self._queues: Dict[str, "queue.Queue"] = {}
+        self._workers: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self.default_model = DEFAULT_EMBEDDING_MODEL
+        self.batch_window = max(0.0, EMBEDDING_BATCH_WINDOW_MS) / 1000.0
+        self.max_batch_size = max(1, EMBEDDING_MAX_BATCH_SIZE)
+        self.query_cache = QueryEmbeddingCache(
+            max_size=QUERY_EMBEDDING_CACHE_SIZE,
+            ttl_seconds=QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        )
+        self._document_store: Optional[EmbeddingStore] = None
+        self._initialized = True
+
+    @property
+    def document_store(self) -> Optional[EmbeddingStore]:
+        """Archivio degli embedding dei documenti, aperto al primo uso (None se disabilitato)."""
+        if not EMBEDDING_STORE_ENABLED:
+            return None
+        if self._document_store is None:
+            with self._lock:
+                if self._document_store is None:
+                    path = EMBEDDING_STORE_PATH
+                    if not path:
+                        from app.core.config import get_settings
+                        path = os.path.join(os.path.dirname(get_settings().SQLITE_DB_PATH), "embedding_store.db")
+                    self._document_store = EmbeddingStore(path)
+        return self._document_store
+
+    def _get_model_lock(self, model_name: str) -> threading.Lock:
+        with self._lock:
+            if model_name not in self._model_locks:
+                self._model_locks[model_name] = threading.Lock()
+                self._stats[model_name] = _ModelStats()
+            return self._model_locks[model_name]
+
+    def get_model(self, model_name: Optional[str] = None):
+        """
+        Restituisce il modello richiesto, caricandolo alla prima richiesta.
+
+        Args:
+            model_name: Nome del modello. Se None, usa il modello predefinito.
+
+        Raises:
+            ImportError: Se sentence-transformers non è installato.
+        """
+        name = model_name or self.default_model
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._get_model_lock(name):
+            # Un altro thread potrebbe aver caricato il modello nel frattempo
+            model = self._models.get(name)
+            if model is not None:
+                return model
+
+            from sentence_transformers import SentenceTransformer
+
+            start = time.perf_counter()
+            model = SentenceTransformer(name)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            stats = self._stats[name]
+            stats.load_time_ms = elapsed_ms
+            stats.loaded_at = time.time()
+            self._models[name] = model
+            logger.info(f"Modello di embedding '{name}' caricato in {elapsed_ms:.0f} ms")
+            return model
+
+    def warmup(self, model_names: Optional[List[str]] = None) -> None:
+        """
+        Precarica i modelli indicati (o quello predefinito) per evitare il costo
+        di caricamento sulla prima query.
+        """
+        for name in model_names or [self.default_model]:
+            try:
+                self.get_model(name)
+            except ImportError:
+                logger.warning("sentence-transformers non disponibile, warmup embedding saltato")
+                return
+            except Exception as e:
+                logger.error(f"Errore nel caricamento del modello di embedding '{name}': {e}")
+
+    def encode(self, texts: List[str], model_name: Optional[str] = None) -> List[List[float]]:
+        """
+        Calcola gli embedding normalizzati di una lista di testi in un'unica chiamata.
+
+        Args:
+            texts: Testi da codificare
+            model_name: Nome del modello (opzionale)
+
+        Returns:
+            Lista di vettori (uno per testo).
+        """
+        if not texts:
+            return []
+
+        name = model_name or self.default_model
+        model = self.get_model(name)
+
+        start = time.perf_counter()
+        vectors = model.encode(texts, normalize_embeddings=True)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._stats[name].record_encode(len(texts), elapsed_ms)
+
+        return [vector.tolist() for vector in vectors]
+
+    def encode_documents(self, texts: List[str], model_name: Optional[str] = None) -> List[List[float]]:
+        """
+        Calcola gli embedding dei chunk di documento riusando quelli già archiviati.
+
+        I testi sono cercati nell'archivio per (modello, sha256 del contenuto): solo i
+        mancanti passano dal modello, una volta sola anche se ripetuti nel lotto, e
+        vengono poi salvati nell'archivio.
+
+        Args:
+            texts: Testi da codificare
+            model_name: Nome del modello (opzionale)
+
+        Returns:
+            Lista di vettori (uno per testo).
+        """
+        store = self.document_store
+        if store is None:
+            return self.encode(texts, model_name)
+        if not texts:
+            return []
+
+        name = model_name or self.default_model
+        hashes = [content_hash(text) for text in texts]
+        try:
+            found = store.get_many(name, hashes)
+        except Exception as e:
+            logger.warning(f"Archivio embedding non disponibile, calcolo completo: {e}")
+            return self.encode(texts, name)
+
+        missing = {h: text for h, text in zip(hashes, texts) if h not in found}
+        if missing:
+            computed = dict(zip(missing, self.encode(list(missing.values()), name)))
+            try:
+                store.put_many(name, computed)
+            except Exception as e:
+                logger.warning(f"Errore salvataggio di {len(computed)} embedding nell'archivio: {e}")
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    def encode_query(self, text: str, model_name: Optional[str] = None) -> List[float]:
+        """
+        Calcola l'embedding di una singola query.
+
+        Le query già viste vengono servite dalla cache LRU/TTL; le chiamate concorrenti
+        per lo stesso modello vengono raccolte per al massimo `batch_window` secondi e
+        codificate insieme con un'unica chiamata a `encode`.
+
+        Args:
+            text: Testo della query
+            model_name: Nome del modello (opzionale)
+
+        Returns:
+            Vettore di embedding della query.
+        """
+        name = model_name or self.default_model
+        cached = self.query_cache.get(name, text)
+        if cached is not None:
+            return cached
+
+        if self.batch_window <= 0:
+            vector = self.encode([text], name)[0]
+        else:
+            # Carica il modello nel thread chiamante, così gli errori di import emergono subito
+            self.get_model(name)
+
+            future: Future = Future()
+            self._get_queue(name).put((text, future))
+            vector = future.result()
+
+        self.query_cache.put(name, text, vector)
+        return vector
+
+    def _get_queue(self, model_name: str) -> "queue.Queue":
+        with self._lock:
+            request_queue = self._queues.get(model_name)
+            if request_queue is None:
+                request_queue = queue.Queue()
+                worker = threading.Thread(
+                    target=self._batch_worker,
+                    args=(model_name, request_queue),
+                    name=f"embedding-batcher-{model_name}",
+                    daemon=True
+                )
+                self._queues[model_name] = request_queue
+                self._workers[model_name] = worker
+                worker.start()
+            return request_queue
+
+    def _batch_worker(self, model_name: str, request_queue: "queue.Queue") -> None:
+        """Thread che raccoglie le richieste concorrenti e le codifica in batch."""
+        while True:
+            batch = [request_queue.get()]
+            deadline = time.monotonic() + self.batch_window
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(request_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self.encode([text for text, _ in batch], model_name)
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                logger.error(f"Errore encoding batch per il modello '{model_name}': {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce le statistiche di caricamento ed encoding per ogni modello.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            queue_depths = {name: q.qsize() for name, q in self._queues.items()}
+
+        return {
+            "default_model": self.default_model,
+            "batch_window_ms": self.batch_window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "query_cache": self.query_cache.get_stats(),
+            "document_store": self._document_store.get_stats() if self._document_store else None,
+            "models": {
+                name: {**model_stats.to_dict(), "pending_requests": queue_depths.get(name, 0)}
+                for name, model_stats in stats.items()
+            }
+        }
+
+
+# Esporta un'istanza singleton
+embedding_manager = EmbeddingManager()
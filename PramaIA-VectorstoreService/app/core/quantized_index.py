@@ -0,0 +1,331 @@
+"""
+Quantized Index - Indice vettoriale quantizzato con re-ranking esatto.
+
+Per le collezioni grandi l'indice HNSW di ChromaDB (vettori float32 più il grafo)
+non sta più in memoria. Una collezione con `quantization` impostato a "int8" o
+"binary" conserva invece:
+
+- in memoria i soli codici quantizzati (int8: 1 byte per dimensione più scala e
+  norma; binary: 1 bit per dimensione), usati per una prima ricerca esaustiva;
+- su disco, in un file float32 mappato in memoria, i vettori originali, letti solo
+  per ricalcolare la distanza esatta dei migliori `rerank_candidates` candidati.
+
+La mappatura riga -> ID è in un piccolo database SQLite accanto ai file; le
+eliminazioni lasciano righe morte, recuperate ricostruendo la collezione.
+"""
+
+import os
+import shutil
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configurazione logger
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Righe valutate per blocco nella prima ricerca (limita la memoria temporanea)
+SCAN_BLOCK_ROWS = 65536
+
+# Numero di bit a 1 per ogni valore di byte (distanza di Hamming)
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint16)
+
+
+def pairwise_distances(space: str, queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Distanze (query x vettori) come le calcola hnswlib per la metrica indicata."""
+    if space == "cosine":
+        q = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        v = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return 1.0 - q @ v.T
+    if space == "ip":
+        return 1.0 - queries @ vectors.T
+    # l2: distanza euclidea al quadrato
+    return ((queries ** 2).sum(axis=1)[:, None] - 2.0 * queries @ vectors.T
+            + (vectors ** 2).sum(axis=1)[None, :])
+
+
+class QuantizedIndex:
+    """
+    Indice quantizzato di una collezione, persistito in una directory dedicata.
+    """
+
+    def __init__(self, directory: str, mode: str, space: str):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Quantizzazione non supportata: {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self.space = space
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._codes_path = os.path.join(directory, "codes.bin")
+        self._factors_path = os.path.join(directory, "factors.f32")
+        self._db = sqlite3.connect(os.path.join(directory, "rows.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        row = self._db.execute("SELECT value FROM info WHERE key = 'dimension'").fetchone()
+        self.dimension: Optional[int] = int(row[0]) if row else None
+        self._load()
+
+    # --- Persistenza -------------------------------------------------------
+
+    def _code_width(self) -> int:
+        return self.dimension if self.mode == "int8" else (self.dimension + 7) // 8
+
+    def _load(self) -> None:
+        """Carica codici e mappatura; scarta le righe scritte a metà da un arresto improvviso."""
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self._codes = np.empty((0, 0), dtype=np.int8 if self.mode == "int8" else np.uint8)
+        self._factors = np.empty((0, 2), dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._mmap: Optional[np.memmap] = None
+        if self.dimension is None:
+            return
+
+        width = self._code_width()
+        sizes = [
+            os.path.getsize(path) // unit if os.path.exists(path) else 0
+            for path, unit in ((self._vectors_path, self.dimension * 4), (self._codes_path, width),
+                               (self._factors_path, 8))
+        ]
+        size = min(sizes)
+        for path, unit in ((self._vectors_path, self.dimension * 4), (self._codes_path, width),
+                           (self._factors_path, 8)):
+            if os.path.exists(path) and os.path.getsize(path) != size * unit:
+                with open(path, "r+b") as f:
+                    f.truncate(size * unit)
+        self._db.execute("DELETE FROM rows WHERE row >= ?", (size,))
+        self._db.commit()
+
+        dtype = np.int8 if self.mode == "int8" else np.uint8
+        codes = np.fromfile(self._codes_path, dtype=dtype, count=size * width) if size else np.empty(0, dtype)
+        self._codes = self._grow(codes.reshape(size, width), size)
+        factors = np.fromfile(self._factors_path, dtype=np.float32, count=size * 2) if size else np.empty(0, np.float32)
+        self._factors = self._grow(factors.reshape(size, 2), size)
+        self._alive = np.zeros(len(self._codes), dtype=bool)
+        self._ids = [None] * size
+        for row, document_id in self._db.execute("SELECT row, id FROM rows"):
+            self._ids[row] = document_id
+            self._rows[document_id] = row
+            self._alive[row] = True
+        self._size = size
+
+    @staticmethod
+    def _grow(array: np.ndarray, needed: int) -> np.ndarray:
+        """Restituisce l'array con capacità per almeno `needed` righe (crescita geometrica)."""
+        if needed <= len(array) and len(array):
+            return array
+        capacity = max(1024, needed, int(len(array) * 1.5))
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:min(len(array), needed)] = array[:needed]
+        return grown
+
+    def _vectors(self) -> np.ndarray:
+        """Vettori float32 mappati in memoria (riaperti quando il file è cresciuto)."""
+        if self._mmap is None or len(self._mmap) < self._size:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                   shape=(self._size, self.dimension)) if self._size else None
+        return self._mmap
+
+    def close(self) -> None:
+        with self._lock:
+            self._mmap = None
+            self._db.close()
+
+    def destroy(self) -> None:
+        """Chiude l'indice ed elimina i suoi file."""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    # --- Quantizzazione ----------------------------------------------------
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Restituisce codici e fattori per riga: (scala, norma^2 del vettore ricostruito)
+        per int8, (0, norma^2 originale) per binary.
+        """
+        if self.mode == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            decoded = codes.astype(np.float32) * scales[:, None]
+            return codes, np.stack([scales, (decoded ** 2).sum(axis=1)], axis=1).astype(np.float32)
+        codes = np.packbits(vectors > 0, axis=1)
+        return codes, np.stack([np.zeros(len(vectors)), (vectors ** 2).sum(axis=1)], axis=1).astype(np.float32)
+
+    def _approximate(self, query: np.ndarray, rows: slice) -> np.ndarray:
+        """Distanza approssimata (più bassa = più vicino) della query dalle righe indicate."""
+        codes = self._codes[rows]
+        factors = self._factors[rows]
+        if self.mode == "binary":
+            query_bits = np.packbits(query > 0)
+            return _POPCOUNT[codes ^ query_bits].sum(axis=1).astype(np.float32)
+        dots = (codes.astype(np.float32) @ query) * factors[:, 0]
+        if self.space == "l2":
+            return factors[:, 1] - 2.0 * dots
+        if self.space == "cosine":
+            return -dots / np.sqrt(np.maximum(factors[:, 1], 1e-12))
+        return -dots
+
+    # --- Scritture ---------------------------------------------------------
+
+    def upsert(self, ids: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """Aggiunge o sostituisce i vettori degli ID indicati."""
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Un embedding per ogni ID è richiesto")
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                self._db.execute("INSERT OR REPLACE INTO info VALUES ('dimension', ?)", (str(self.dimension),))
+                self._db.commit()
+                self._load()
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(f"Dimensione degli embedding {vectors.shape[1]} diversa da quella "
+                                 f"della collezione ({self.dimension})")
+
+            # Un ID ripetuto nel lotto tiene l'ultimo vettore
+            latest = {document_id: i for i, document_id in enumerate(ids)}
+            ids = list(latest)
+            vectors = vectors[list(latest.values())]
+            codes, factors = self._quantize(vectors)
+
+            # I file prima della mappatura: dopo un arresto improvviso le righe senza ID vengono scartate
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._codes_path, "ab") as f:
+                f.write(codes.tobytes())
+            with open(self._factors_path, "ab") as f:
+                f.write(factors.tobytes())
+
+            start = self._size
+            end = start + len(ids)
+            self._codes = self._grow(self._codes, end)
+            self._factors = self._grow(self._factors, end)
+            self._alive = self._grow(self._alive, end)
+            self._codes[start:end] = codes
+            self._factors[start:end] = factors
+
+            replaced = [self._rows[document_id] for document_id in ids if document_id in self._rows]
+            self._db.executemany("DELETE FROM rows WHERE id = ?", [(document_id,) for document_id in ids])
+            self._db.executemany("INSERT INTO rows (row, id) VALUES (?, ?)",
+                                 [(start + i, document_id) for i, document_id in enumerate(ids)])
+            self._db.commit()
+
+            for row in replaced:
+                self._alive[row] = False
+                self._ids[row] = None
+            self._ids.extend(ids)
+            for i, document_id in enumerate(ids):
+                self._rows[document_id] = start + i
+            self._alive[start:end] = True
+            self._size = end
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """Elimina i vettori degli ID indicati. Restituisce quanti erano presenti."""
+        with self._lock:
+            rows = [self._rows.pop(document_id) for document_id in ids if document_id in self._rows]
+            if rows:
+                self._db.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+                self._db.commit()
+                for row in rows:
+                    self._alive[row] = False
+                    self._ids[row] = None
+            return len(rows)
+
+    # --- Letture -----------------------------------------------------------
+
+    def get(self, ids: Sequence[str]) -> Dict[str, List[float]]:
+        """Vettori float32 originali degli ID presenti."""
+        with self._lock:
+            present = [(document_id, self._rows[document_id]) for document_id in ids if document_id in self._rows]
+            if not present:
+                return {}
+            vectors = self._vectors()[[row for _, row in present]]
+        return {document_id: vector.tolist() for (document_id, _), vector in zip(present, vectors)}
+
+    def search(self, query: Sequence[float], k: int, candidates: int,
+               allowed_ids: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Cerca i k vettori più vicini: prima ricerca sui codici quantizzati, poi
+        distanza esatta sui migliori `candidates` letti dal file float32.
+
+        Args:
+            query: Vettore della query
+            k: Numero di risultati
+            candidates: Candidati della prima ricerca da riordinare
+            allowed_ids: Limita la ricerca a questi ID (filtri sui metadati)
+
+        Returns:
+            Lista di (ID, distanza) in ordine di distanza crescente.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        with self._lock:
+            if not self._size or k <= 0:
+                return []
+            if q.shape[0] != self.dimension:
+                raise ValueError(f"Dimensione della query {q.shape[0]} diversa da quella "
+                                 f"della collezione ({self.dimension})")
+            candidates = max(candidates, k)
+
+            if allowed_ids is not None:
+                rows = np.array(sorted(self._rows[i] for i in set(allowed_ids) if i in self._rows), dtype=np.int64)
+                if not len(rows):
+                    return []
+                scores = np.concatenate([
+                    self._approximate(q, rows[start:start + SCAN_BLOCK_ROWS])
+                    for start in range(0, len(rows), SCAN_BLOCK_ROWS)
+                ])
+            else:
+                rows = np.arange(self._size)
+                scores = np.concatenate([
+                    self._approximate(q, slice(start, min(start + SCAN_BLOCK_ROWS, self._size)))
+                    for start in range(0, self._size, SCAN_BLOCK_ROWS)
+                ])
+                scores[~self._alive[:self._size]] = np.inf
+
+            alive_count = int(np.isfinite(scores).sum())
+            if not alive_count:
+                return []
+            top = min(candidates, alive_count)
+            best = np.argpartition(scores, top - 1)[:top] if top < len(scores) else np.arange(len(scores))
+            best = best[np.isfinite(scores[best])]
+            candidate_rows = np.sort(rows[best])
+
+            exact = pairwise_distances(self.space, q[None, :], np.asarray(self._vectors()[candidate_rows]))[0]
+            order = np.argsort(exact, kind="stable")[:k]
+            return [(self._ids[candidate_rows[i]], float(exact[i])) for i in order]
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Occupazione dell'indice: byte residenti in memoria (codici, fattori, maschera)
+        e byte del file float32 mappato (letto solo per il re-ranking).
+        """
+        with self._lock:
+            size = self._size
+            width = self._code_width() if self.dimension else 0
+            return {
+                "quantization": self.mode,
+                "dimension": self.dimension,
+                "vectors": len(self._rows),
+                "rows": size,
+                "dead_rows": size - len(self._rows),
+                "resident_bytes": size * (width + 8 + 1),
+                "mapped_bytes": size * (self.dimension or 0) * 4
+            }
@@ -3,13 +3,31 @@ VectorDB Manager - Gestione del database vettoriale ChromaDB.
 
 Questo modulo fornisce funzionalità per accedere a ChromaDB in modalità persistente locale
 senza utilizzare una connessione HTTP.
+
+Ogni collezione logica dei documenti ha la propria collezione ChromaDB (e quindi il
+proprio indice HNSW). Gli handle aperti sono tenuti in un registro per nome, insieme
+alle impostazioni della collezione (spazio HNSW, M, ef, modello di embedding), che
+ChromaDB conserva nei metadati della collezione.
+
+Le collezioni con `quantization` "int8" o "binary" tengono i vettori in un indice
+quantizzato (vedi app.core.quantized_index): ChromaDB conserva solo documenti e
+metadati, con un embedding segnaposto di una dimensione. Le scritture e le ricerche
+passano quindi da store_vectors, delete_vectors, fetch_vectors e query_vectors.
 """
 
 import os
+import re
+import uuid
+import hashlib
 import logging
+import shutil
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 import chromadb
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator, Set
+
+from app.core.quantized_index import QuantizedIndex, QUANTIZATION_MODES
 
 # Configurazione logger
 logger = logging.getLogger(__name__)
@@ -17,6 +35,144 @@ logger = logging.getLogger(__name__)
 # Directory di persistenza di ChromaDB
 CHROMA_PERSIST_DIR = os.path.join(os.getcwd(), "data", "chroma_db")
 CHROMA_COLLECTION_NAME = "prama_documents"
+# Indici quantizzati, una sottodirectory per ID di collezione ChromaDB
+QUANTIZED_INDEX_DIR = os.path.join(CHROMA_PERSIST_DIR, "quantized")
+
+# Impostazioni predefinite delle nuove collezioni (valori predefiniti di ChromaDB)
+DEFAULT_HNSW_SPACE = os.getenv("VECTORSTORE_HNSW_SPACE", "l2")
+DEFAULT_HNSW_M = int(os.getenv("VECTORSTORE_HNSW_M", "16"))
+DEFAULT_HNSW_CONSTRUCTION_EF = int(os.getenv("VECTORSTORE_HNSW_CONSTRUCTION_EF", "100"))
+DEFAULT_HNSW_SEARCH_EF = int(os.getenv("VECTORSTORE_HNSW_SEARCH_EF", "10"))
+DEFAULT_HNSW_NUM_THREADS = int(os.getenv("VECTORSTORE_HNSW_NUM_THREADS") or os.cpu_count() or 4)
+DEFAULT_QUANTIZATION = os.getenv("VECTORSTORE_QUANTIZATION", "none")
+DEFAULT_RERANK_CANDIDATES = int(os.getenv("VECTORSTORE_QUANTIZED_RERANK_CANDIDATES", "100"))
+
+HNSW_SPACES = ("l2", "cosine", "ip")
+
+# Chiavi dei metadati di collezione ChromaDB per ciascuna impostazione
+COLLECTION_SETTING_KEYS = {
+    "space": "hnsw:space",
+    "m": "hnsw:M",
+    "construction_ef": "hnsw:construction_ef",
+    "search_ef": "hnsw:search_ef",
+    "num_threads": "hnsw:num_threads",
+    "embedding_model": "embedding_model",
+    "quantization": "quantization",
+    "rerank_candidates": "rerank_candidates"
+}
+
+# Nomi di collezione ammessi da ChromaDB: 3-63 caratteri, inizio e fine alfanumerici
+_COLLECTION_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{1,61}[A-Za-z0-9]$")
+
+# Nomi logici che indicano la collezione predefinita
+_DEFAULT_COLLECTION_ALIASES = ("", "default", CHROMA_COLLECTION_NAME)
+
+# Collezioni temporanee della ricostruzione degli indici (escluse da ricerche e statistiche)
+_INTERNAL_COLLECTION_RE = re.compile(r"__(rebuild|retired)_[0-9a-f]{8}$")
+
+
+def is_valid_collection_name(name: str) -> bool:
+    """Verifica che il nome sia accettato da ChromaDB come nome di collezione."""
+    return bool(_COLLECTION_NAME_RE.match(name)) and ".." not in name
+
+
+def is_internal_collection(name: str) -> bool:
+    """Indica se la collezione è una copia temporanea creata dalla ricostruzione dell'indice."""
+    return bool(_INTERNAL_COLLECTION_RE.search(name))
+
+
+def internal_collection_name(name: str, kind: str) -> str:
+    """Nome di una collezione temporanea ('rebuild' o 'retired') derivata da `name`."""
+    return f"{name[:45]}__{kind}_{uuid.uuid4().hex[:8]}"
+
+
+def is_default_collection(name: Optional[str]) -> bool:
+    """Indica se il nome logico designa la collezione predefinita."""
+    return name is None or name in _DEFAULT_COLLECTION_ALIASES
+
+
+def resolve_collection_name(name: Optional[str]) -> str:
+    """
+    Restituisce la collezione ChromaDB che ospita i vettori della collezione logica `name`.
+
+    I documenti senza collezione e quelli con un nome non valido per ChromaDB
+    restano nella collezione predefinita (con la collezione nei metadati).
+    """
+    if is_default_collection(name) or not is_valid_collection_name(name):
+        return CHROMA_COLLECTION_NAME
+    return name
+
+
+def default_collection_settings() -> Dict[str, Any]:
+    """Impostazioni delle nuove collezioni, dalle variabili d'ambiente."""
+    from app.core.embedding_manager import DEFAULT_EMBEDDING_MODEL
+    return {
+        "space": DEFAULT_HNSW_SPACE,
+        "m": DEFAULT_HNSW_M,
+        "construction_ef": DEFAULT_HNSW_CONSTRUCTION_EF,
+        "search_ef": DEFAULT_HNSW_SEARCH_EF,
+        "num_threads": DEFAULT_HNSW_NUM_THREADS,
+        "embedding_model": DEFAULT_EMBEDDING_MODEL,
+        "quantization": DEFAULT_QUANTIZATION,
+        "rerank_candidates": DEFAULT_RERANK_CANDIDATES
+    }
+
+
+def _settings_from_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Legge le impostazioni dai metadati della collezione; le chiavi assenti (collezioni
+    create prima del registro) valgono come i valori predefiniti di ChromaDB.
+    """
+    from app.core.embedding_manager import DEFAULT_EMBEDDING_MODEL
+    metadata = metadata or {}
+    return {
+        "space": metadata.get("hnsw:space", "l2"),
+        "m": metadata.get("hnsw:M", 16),
+        "construction_ef": metadata.get("hnsw:construction_ef", 100),
+        "search_ef": metadata.get("hnsw:search_ef", 10),
+        "num_threads": metadata.get("hnsw:num_threads", os.cpu_count() or 4),
+        "embedding_model": metadata.get("embedding_model", DEFAULT_EMBEDDING_MODEL),
+        "quantization": metadata.get("quantization", "none"),
+        "rerank_candidates": metadata.get("rerank_candidates", DEFAULT_RERANK_CANDIDATES)
+    }
+
+
+def _validate_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+    unknown = set(settings) - set(COLLECTION_SETTING_KEYS)
+    if unknown:
+        raise ValueError(f"Impostazioni di collezione non supportate: {sorted(unknown)}")
+    if "space" in settings and settings["space"] not in HNSW_SPACES:
+        raise ValueError(f"Spazio HNSW non supportato: {settings['space']!r} (ammessi: {', '.join(HNSW_SPACES)})")
+    if "quantization" in settings and settings["quantization"] not in QUANTIZATION_MODES:
+        raise ValueError(f"Quantizzazione non supportata: {settings['quantization']!r} "
+                         f"(ammesse: {', '.join(QUANTIZATION_MODES)})")
+    for key in ("m", "construction_ef", "search_ef", "num_threads", "rerank_candidates"):
+        if key in settings and (not isinstance(settings[key], int) or settings[key] < 1):
+            raise ValueError(f"'{key}' deve essere un intero positivo")
+    if "embedding_model" in settings and not isinstance(settings["embedding_model"], str):
+        raise ValueError("'embedding_model' deve essere una stringa")
+    return settings
+
+
+def _placeholder_embedding(document_id: str) -> List[float]:
+    """
+    Embedding di una dimensione registrato in ChromaDB per le collezioni quantizzate:
+    valori distinti per ID, così il grafo HNSW (minimo) non degenera su punti identici.
+    """
+    return [int(hashlib.sha1(document_id.encode("utf-8")).hexdigest()[:8], 16) / 2 ** 32]
+
+
+class _WriteGate:
+    """Stato delle scritture su una collezione: scrittori attivi, sospensione e ID modificati."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.writers = 0
+        self.paused = False
+        self.dirty: Optional[Set[str]] = None
+        # ID delle scritture in corso (contatore per ID)
+        self.in_flight: Dict[str, int] = {}
+
 
 class VectorDBManager:
     """
@@ -37,6 +193,19 @@ class VectorDBManager:
             
         self._client = None
         self._collection = None
+        # Registro degli handle aperti: nome -> (collezione, impostazioni)
+        self._handles: Dict[str, Any] = {}
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        # Nomi delle collezioni ChromaDB (interne incluse): letti dal client al primo uso e
+        # poi aggiornati da apertura, eliminazione e sostituzione; None finché non sono letti
+        self._collection_names: Optional[Set[str]] = None
+        self._handles_lock = threading.RLock()
+        # Barriere di scrittura per collezione, usate dalla ricostruzione degli indici
+        self._gates: Dict[str, "_WriteGate"] = {}
+        # Indici quantizzati aperti, per ID di collezione ChromaDB
+        self._quantized: Dict[str, QuantizedIndex] = {}
+        self.handle_hits = 0
+        self.handle_opens = 0
         self._initialized = True
         
         # Assicurati che la directory di persistenza esista
@@ -71,7 +240,8 @@ class VectorDBManager:
             )
             
             # Assicurati che la collezione esista
-            self._collection = self._client.get_or_create_collection(name=CHROMA_COLLECTION_NAME)
+            self._reset_registry()
+            self._collection = self._open_collection(CHROMA_COLLECTION_NAME)
             
             logger.info(f"ChromaDB inizializzato con successo. Collezione: {CHROMA_COLLECTION_NAME}")
             return True
@@ -82,7 +252,8 @@ class VectorDBManager:
             try:
                 logger.warning("Tentativo fallback con client in-memory...")
                 self._client = chromadb.Client()
-                self._collection = self._client.get_or_create_collection(name=CHROMA_COLLECTION_NAME)
+                self._reset_registry()
+                self._collection = self._open_collection(CHROMA_COLLECTION_NAME)
                 logger.warning("Fallback riuscito - usando ChromaDB in modalità in-memory")
                 return True
             except Exception as fallback_error:
@@ -99,12 +270,44 @@ class VectorDBManager:
             self._init_client()
         return self._client
     
-    def get_collection(self, collection_name=None):
+    def _reset_registry(self) -> None:
+        with self._handles_lock:
+            self._handles.clear()
+            self._settings.clear()
+            self._collection_names = None
+    
+    def _open_collection(self, name: str, settings: Optional[Dict[str, Any]] = None, create: bool = True):
         """
-        Restituisce una collezione ChromaDB.
+        Apre la collezione (creandola se manca e `create` è True) e la registra.
+        
+        Le impostazioni sono applicate solo alla creazione: una collezione esistente viene
+        aperta con get_collection, perché get_or_create_collection ne sovrascriverebbe i metadati.
+        """
+        if name in self.list_collections(include_internal=True):
+            collection = self._client.get_collection(name=name)
+        elif not create:
+            return None
+        else:
+            metadata = {
+                COLLECTION_SETTING_KEYS[key]: value
+                for key, value in {**default_collection_settings(), **(settings or {})}.items()
+            }
+            collection = self._client.get_or_create_collection(name=name, metadata=metadata)
+        with self._handles_lock:
+            self._handles[name] = collection
+            self._settings[name] = _settings_from_metadata(collection.metadata)
+            if self._collection_names is not None:
+                self._collection_names.add(name)
+            self.handle_opens += 1
+        return collection
+    
+    def get_collection(self, collection_name=None, create: bool = True):
+        """
+        Restituisce una collezione ChromaDB, dal registro degli handle se già aperta.
         
         Args:
             collection_name: Nome della collezione. Se None, usa la collezione predefinita.
+            create: Se False restituisce None per le collezioni che non esistono
         """
         if not self._client:
             self._init_client()
@@ -112,16 +315,359 @@ class VectorDBManager:
         if not self._client:
             logger.error("Client ChromaDB non disponibile")
             return None
-            
+        
+        name_to_use = CHROMA_COLLECTION_NAME
+        if collection_name is not None:
+            name_to_use = collection_name
+        
+        with self._handles_lock:
+            collection = self._handles.get(name_to_use)
+            if collection is not None:
+                self.handle_hits += 1
+                return collection
+        
         try:
-            name_to_use = CHROMA_COLLECTION_NAME
-            if collection_name is not None:
-                name_to_use = collection_name
-            return self._client.get_or_create_collection(name=name_to_use)
+            return self._open_collection(name_to_use, create=create)
         except Exception as e:
             logger.error(f"Errore nel recupero della collezione '{collection_name}': {str(e)}")
             return None
     
+    def create_collection(self, name: str, settings: Optional[Dict[str, Any]] = None):
+        """
+        Crea una collezione con le impostazioni indicate.
+        
+        Args:
+            name: Nome della collezione
+            settings: Impostazioni (space, m, construction_ef, search_ef, embedding_model);
+                quelle omesse assumono i valori predefiniti
+        
+        Raises:
+            ValueError: Se il nome o le impostazioni non sono validi o la collezione esiste già.
+        """
+        if not is_valid_collection_name(name) or is_internal_collection(name):
+            raise ValueError(f"Nome di collezione non valido: {name!r}")
+        settings = _validate_settings(dict(settings or {}))
+        if not self.get_client():
+            raise ValueError("Client ChromaDB non disponibile")
+        if name in self.list_collections():
+            raise ValueError(f"La collezione '{name}' esiste già")
+        collection = self._open_collection(name, settings)
+        logger.info(f"Collezione '{name}' creata con impostazioni {self._settings[name]}")
+        return collection
+    
+    def get_collection_settings(self, collection_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Restituisce le impostazioni della collezione, o None se non esiste.
+        """
+        name = collection_name or CHROMA_COLLECTION_NAME
+        with self._handles_lock:
+            if name in self._settings:
+                return dict(self._settings[name])
+        if self.get_collection(name, create=False) is None:
+            return None
+        with self._handles_lock:
+            return dict(self._settings[name])
+    
+    def forget_collection(self, collection_name: str) -> None:
+        """Rimuove l'handle dal registro (dopo l'eliminazione o la sostituzione della collezione)."""
+        with self._handles_lock:
+            self._handles.pop(collection_name, None)
+            self._settings.pop(collection_name, None)
+    
+    def create_rebuild_collection(self, collection_name: str, settings: Dict[str, Any]):
+        """
+        Crea la collezione temporanea in cui ricostruire l'indice di `collection_name`.
+        
+        Returns:
+            Tuple (nome della collezione temporanea, collezione)
+        """
+        settings = _validate_settings(dict(settings))
+        if not self.get_client():
+            raise ValueError("Client ChromaDB non disponibile")
+        target_name = internal_collection_name(collection_name, "rebuild")
+        return target_name, self._open_collection(target_name, settings)
+    
+    def drop_collection(self, collection_name: str) -> None:
+        """Elimina la collezione da ChromaDB e dal registro, con l'eventuale indice quantizzato."""
+        collection = self._client.get_collection(name=collection_name)
+        self.forget_collection(collection_name)
+        self._client.delete_collection(name=collection_name)
+        with self._handles_lock:
+            if self._collection_names is not None:
+                self._collection_names.discard(collection_name)
+        self._destroy_quantized_index(collection)
+    
+    # --- Vettori (ChromaDB o indice quantizzato) -----------------------------
+    
+    def get_quantized_index(self, collection_name: str) -> Optional[QuantizedIndex]:
+        """
+        Restituisce l'indice quantizzato della collezione, o None se la collezione
+        non è quantizzata (o non esiste).
+        """
+        settings = self.get_collection_settings(collection_name)
+        if not settings or settings.get("quantization", "none") == "none":
+            return None
+        collection = self.get_collection(collection_name, create=False)
+        if collection is None:
+            return None
+        key = str(collection.id)
+        with self._handles_lock:
+            index = self._quantized.get(key)
+            if index is None:
+                index = QuantizedIndex(os.path.join(QUANTIZED_INDEX_DIR, key),
+                                       settings["quantization"], settings["space"])
+                self._quantized[key] = index
+            return index
+    
+    def _destroy_quantized_index(self, collection: Any) -> None:
+        key = str(collection.id)
+        with self._handles_lock:
+            index = self._quantized.pop(key, None)
+        if index is not None:
+            index.destroy()
+        elif os.path.isdir(os.path.join(QUANTIZED_INDEX_DIR, key)):
+            shutil.rmtree(os.path.join(QUANTIZED_INDEX_DIR, key), ignore_errors=True)
+    
+    def store_vectors(self, collection_name: str, ids: List[str], documents: List[str],
+                      metadatas: List[Any], embeddings: Optional[List[List[float]]] = None,
+                      upsert: bool = False) -> None:
+        """
+        Scrive documenti e vettori nella collezione. Per le collezioni quantizzate i
+        vettori vanno nell'indice quantizzato e ChromaDB riceve gli embedding segnaposto.
+        
+        Raises:
+            ValueError: Se la collezione non esiste o è quantizzata e mancano gli embedding.
+        """
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            raise ValueError(f"Collezione ChromaDB '{collection_name}' non disponibile")
+        index = self.get_quantized_index(collection_name)
+        kwargs = {"ids": ids, "documents": documents, "metadatas": metadatas}
+        if index is not None:
+            if embeddings is None:
+                raise ValueError(f"La collezione quantizzata '{collection_name}' richiede gli embedding")
+            kwargs["embeddings"] = [_placeholder_embedding(document_id) for document_id in ids]
+        elif embeddings is not None:
+            kwargs["embeddings"] = embeddings
+        if upsert:
+            collection.upsert(**kwargs)
+        else:
+            collection.add(**kwargs)
+        if index is not None:
+            index.upsert(ids, embeddings)
+    
+    def delete_vectors(self, collection_name: str, ids: List[str]) -> None:
+        """Elimina documenti e vettori dalla collezione (e dall'eventuale indice quantizzato)."""
+        collection = self.get_collection(collection_name, create=False)
+        if collection is None:
+            return
+        collection.delete(ids=ids)
+        index = self.get_quantized_index(collection_name)
+        if index is not None:
+            index.delete(ids)
+    
+    def fetch_vectors(self, collection_name: str, ids: Optional[List[str]] = None,
+                      include: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Come Collection.get, ma gli embedding delle collezioni quantizzate sono i vettori
+        float32 originali; gli ID senza vettore sono esclusi.
+        """
+        collection = self.get_collection(collection_name, create=False)
+        if collection is None:
+            return {"ids": []}
+        include = list(include or ["documents", "metadatas"])
+        index = self.get_quantized_index(collection_name) if "embeddings" in include else None
+        data = collection.get(ids=ids, include=include, **kwargs)
+        if index is None:
+            return data
+        
+        vectors = index.get(data.get("ids") or [])
+        keep = [i for i, document_id in enumerate(data.get("ids") or []) if document_id in vectors]
+        result = {"ids": [data["ids"][i] for i in keep],
+                  "embeddings": [vectors[data["ids"][i]] for i in keep]}
+        for field in ("documents", "metadatas"):
+            if data.get(field) is not None:
+                result[field] = [data[field][i] for i in keep]
+        return result
+    
+    def query_vectors(self, collection_name: str, query_embedding: List[float], n_results: int,
+                      where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ricerca dei vicini della query nel formato di Collection.query.
+        
+        Le collezioni quantizzate sono cercate sui codici quantizzati, con re-ranking esatto
+        dei migliori `rerank_candidates`; un filtro `where` viene risolto prima su ChromaDB.
+        """
+        collection = self.get_collection(collection_name, create=False)
+        if collection is None:
+            raise ValueError(f"Collezione ChromaDB '{collection_name}' non disponibile")
+        index = self.get_quantized_index(collection_name)
+        if index is None:
+            return collection.query(query_embeddings=[query_embedding], n_results=n_results, where=where)
+        
+        allowed = collection.get(where=where, include=[])["ids"] if where else None
+        settings = self.get_collection_settings(collection_name)
+        hits = index.search(query_embedding, n_results, settings["rerank_candidates"], allowed_ids=allowed)
+        data = collection.get(ids=[document_id for document_id, _ in hits], include=["documents", "metadatas"])
+        by_id = {document_id: i for i, document_id in enumerate(data.get("ids") or [])}
+        found = [(document_id, distance) for document_id, distance in hits if document_id in by_id]
+        return {
+            "ids": [[document_id for document_id, _ in found]],
+            "documents": [[data["documents"][by_id[document_id]] for document_id, _ in found]],
+            "metadatas": [[data["metadatas"][by_id[document_id]] for document_id, _ in found]],
+            "distances": [[distance for _, distance in found]]
+        }
+    
+    def get_index_memory(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Stima della memoria dell'indice della collezione: byte residenti (vettori e
+        grafo HNSW, o codici quantizzati più il grafo segnaposto) e byte mappati da disco.
+        """
+        collection = self.get_collection(collection_name, create=False)
+        if collection is None:
+            return None
+        settings = self.get_collection_settings(collection_name)
+        count = collection.count()
+        # Per elemento hnswlib tiene il vettore, 2*M collegamenti al livello 0 e l'etichetta
+        graph_bytes = count * (2 * settings["m"] * 4 + 4 + 8)
+        index = self.get_quantized_index(collection_name)
+        if index is not None:
+            stats = index.get_stats()
+            return {**stats, "hnsw_bytes": count * 4 + graph_bytes,
+                    "resident_bytes": stats["resident_bytes"] + count * 4 + graph_bytes}
+        
+        sample = collection.get(limit=1, include=["embeddings"]).get("embeddings") or []
+        dimension = len(sample[0]) if sample else 0
+        hnsw_bytes = count * dimension * 4 + graph_bytes
+        return {"quantization": "none", "dimension": dimension, "vectors": count,
+                "hnsw_bytes": hnsw_bytes, "resident_bytes": hnsw_bytes, "mapped_bytes": 0}
+    
+    def _gate(self, collection_name: str) -> "_WriteGate":
+        with self._handles_lock:
+            gate = self._gates.get(collection_name)
+            if gate is None:
+                gate = self._gates[collection_name] = _WriteGate()
+            return gate
+    
+    @contextmanager
+    def writing(self, collection_name: str, ids: Optional[List[str]] = None) -> Iterator[None]:
+        """
+        Delimita una scrittura sulla collezione: attende se le scritture sono sospese per
+        lo scambio dell'indice e, durante una ricostruzione, registra gli ID modificati.
+        """
+        gate = self._gate(collection_name)
+        with gate.condition:
+            while gate.paused:
+                gate.condition.wait()
+            gate.writers += 1
+            ids = list(ids or ())
+            for document_id in ids:
+                gate.in_flight[document_id] = gate.in_flight.get(document_id, 0) + 1
+            if gate.dirty is not None:
+                gate.dirty.update(ids)
+        try:
+            yield
+        finally:
+            with gate.condition:
+                gate.writers -= 1
+                for document_id in ids:
+                    remaining = gate.in_flight[document_id] - 1
+                    if remaining:
+                        gate.in_flight[document_id] = remaining
+                    else:
+                        del gate.in_flight[document_id]
+                gate.condition.notify_all()
+    
+    def track_writes(self, collection_name: str) -> None:
+        """
+        Inizia a registrare gli ID scritti sulla collezione (vedi pause_writes); include
+        quelli delle scritture già in corso, che la copia potrebbe non vedere.
+        """
+        gate = self._gate(collection_name)
+        with gate.condition:
+            gate.dirty = set(gate.in_flight)
+    
+    def untrack_writes(self, collection_name: str) -> None:
+        """Smette di registrare gli ID scritti sulla collezione."""
+        gate = self._gate(collection_name)
+        with gate.condition:
+            gate.dirty = None
+    
+    @contextmanager
+    def pause_writes(self, collection_name: str) -> Iterator[Set[str]]:
+        """
+        Sospende le nuove scritture sulla collezione e attende quelle in corso.
+        
+        Yields:
+            Gli ID scritti da quando è iniziata la registrazione (track_writes).
+        """
+        gate = self._gate(collection_name)
+        with gate.condition:
+            gate.paused = True
+            while gate.writers:
+                gate.condition.wait()
+            dirty = set(gate.dirty or ())
+        try:
+            yield dirty
+        finally:
+            with gate.condition:
+                gate.paused = False
+                gate.dirty = None
+                gate.condition.notify_all()
+    
+    def swap_collection(self, collection_name: str, replacement_name: str,
+                        retain_previous: bool = False) -> Optional[str]:
+        """
+        Sostituisce la collezione con quella ricostruita: la vecchia viene rinominata,
+        la nuova prende il suo nome e il registro punta subito al nuovo handle.
+        Da chiamare con le scritture sospese (pause_writes).
+        
+        Returns:
+            Nome con cui è conservata la vecchia collezione, o None se è stata eliminata.
+        """
+        with self._handles_lock:
+            current = self._client.get_collection(name=collection_name)
+            replacement = self._client.get_collection(name=replacement_name)
+            retired_name = internal_collection_name(collection_name, "retired")
+            current.modify(name=retired_name)
+            try:
+                replacement.modify(name=collection_name)
+            except Exception:
+                # Scambio non riuscito: la collezione attiva riprende il suo nome e il
+                # registro (che punta ancora a lei) resta valido
+                logger.error(f"Sostituzione dell'indice di '{collection_name}' fallita: ripristino della collezione")
+                current.modify(name=collection_name)
+                raise
+            self._handles.pop(replacement_name, None)
+            self._settings.pop(replacement_name, None)
+            self._handles[collection_name] = replacement
+            self._settings[collection_name] = _settings_from_metadata(replacement.metadata)
+            if self._collection_names is not None:
+                self._collection_names.discard(replacement_name)
+                self._collection_names.add(retired_name)
+            if collection_name == CHROMA_COLLECTION_NAME:
+                self._collection = replacement
+        
+        logger.info(f"Indice della collezione '{collection_name}' sostituito (precedente: {retired_name})")
+        if retain_previous:
+            return retired_name
+        self._client.delete_collection(name=retired_name)
+        with self._handles_lock:
+            if self._collection_names is not None:
+                self._collection_names.discard(retired_name)
+        self._destroy_quantized_index(current)
+        return None
+    
+    def get_registry_stats(self) -> Dict[str, Any]:
+        """Restituisce le collezioni aperte nel registro e i contatori di utilizzo."""
+        with self._handles_lock:
+            return {
+                "open_collections": sorted(self._handles),
+                "handle_hits": self.handle_hits,
+                "handle_opens": self.handle_opens,
+                "settings": {name: dict(settings) for name, settings in self._settings.items()}
+            }
+    
     def get_status(self) -> Dict[str, Any]:
         """
         Verifica lo stato della connessione a ChromaDB.
@@ -152,10 +698,39 @@ class VectorDBManager:
             logger.error(f"Errore nella verifica dello stato di ChromaDB: {str(e)}")
             return {"status": "error", "message": f"Errore: {str(e)}"}
     
-    def list_collections(self) -> List[str]:
+    def cached_collections(self, include_internal: bool = False, refresh: bool = False) -> List[str]:
+        """
+        Lista le collezioni dal registro, senza interrogare ChromaDB ad ogni chiamata.
+        
+        L'elenco è letto dal client solo al primo uso o con `refresh` (ad esempio quando
+        una collezione richiesta non compare nel registro).
+        
+        Args:
+            include_internal: Includi le collezioni temporanee della ricostruzione degli indici
+            refresh: Rileggi l'elenco da ChromaDB
+        """
+        with self._handles_lock:
+            names = self._collection_names
+        if names is None or refresh:
+            if not self.get_client():
+                logger.error("Client ChromaDB non disponibile")
+                return []
+            try:
+                names = {collection.name for collection in self._client.list_collections()}
+            except Exception as e:
+                logger.error(f"Errore nel listare le collezioni: {str(e)}")
+                return []
+            with self._handles_lock:
+                self._collection_names = set(names)
+        return sorted(name for name in names if include_internal or not is_internal_collection(name))
+    
+    def list_collections(self, include_internal: bool = False) -> List[str]:
         """
         Lista tutte le collezioni disponibili in ChromaDB.
         
+        Args:
+            include_internal: Includi le collezioni temporanee della ricostruzione degli indici
+        
         Returns:
             Lista di nomi delle collezioni.
         """
@@ -168,7 +743,10 @@ class VectorDBManager:
             
         try:
             collections = self._client.list_collections()
-            return [collection.name for collection in collections]
+            return [
+                collection.name for collection in collections
+                if include_internal or not is_internal_collection(collection.name)
+            ]
         except Exception as e:
             logger.error(f"Errore nel listare le collezioni: {str(e)}")
             return []
@@ -0,0 +1,157 @@
+"""
+Benchmark degli indici: recall@k, latenza e memoria su un campione di query.
+
+Le query sono gli embedding più recenti della cache delle query del modello della
+collezione, completati se necessario con embedding di documenti archiviati. Il
+risultato esatto (ricerca esaustiva) è calcolato scorrendo tutti i vettori della
+collezione a pagine, quindi la memoria usata non dipende dalla sua dimensione.
+Le collezioni sono indicate per nome e lette tramite il VectorDBManager, così le
+collezioni quantizzate sono misurate sul loro indice e sui vettori float32 originali.
+"""
+
+import os
+import time
+import random
+import logging
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from app.core.quantized_index import pairwise_distances
+from app.services.reconciliation import ChromaIdReader, _iter_sorted_ids
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Parametri predefiniti dei benchmark
+BENCHMARK_SAMPLE_SIZE = int(os.getenv("VECTORSTORE_BENCHMARK_SAMPLE_SIZE", "50"))
+BENCHMARK_K = int(os.getenv("VECTORSTORE_BENCHMARK_K", "10"))
+BENCHMARK_PAGE_SIZE = int(os.getenv("VECTORSTORE_BENCHMARK_PAGE_SIZE", "1000"))
+
+
+def _vector_db():
+    from app.core.vectordb_manager import vector_db_manager
+    return vector_db_manager
+
+
+def sample_queries(collection_name: str, model_name: str, sample_size: int) -> np.ndarray:
+    """
+    Sceglie le query del benchmark: prima quelle reali in cache, poi embedding di
+    documenti presi in punti casuali della collezione.
+    """
+    from app.core.embedding_manager import embedding_manager
+
+    queries = embedding_manager.query_cache.sample(model_name, sample_size)
+    missing = sample_size - len(queries)
+    total = _vector_db().get_collection(collection_name, create=False).count()
+    if missing > 0 and total:
+        for offset in sorted(random.sample(range(total), min(missing, total))):
+            result = _vector_db().fetch_vectors(collection_name, limit=1, offset=offset, include=["embeddings"])
+            queries.extend(result.get("embeddings") or [])
+
+    # Le query di un altro modello (dimensione diversa) non sono confrontabili
+    dimension = len(queries[0]) if queries else 0
+    return np.array([q for q in queries if len(q) == dimension], dtype=np.float32).reshape(-1, dimension)
+
+
+def exact_neighbours(collection_name: str, queries: np.ndarray, k: int, space: str,
+                     page_size: int = BENCHMARK_PAGE_SIZE) -> List[List[str]]:
+    """
+    Calcola i k vicini esatti di ogni query con una scansione completa della collezione.
+    """
+    from app.core.vectordb_manager import CHROMA_PERSIST_DIR
+
+    best_ids = np.empty((len(queries), 0), dtype=object)
+    best_distances = np.empty((len(queries), 0), dtype=np.float32)
+    collection = _vector_db().get_collection(collection_name, create=False)
+    reader = ChromaIdReader(CHROMA_PERSIST_DIR, str(collection.id))
+    try:
+        page: List[str] = []
+        for document_id in _iter_sorted_ids(reader.page, None, page_size):
+            page.append(document_id)
+            if len(page) < page_size:
+                continue
+            best_ids, best_distances = _merge_page(collection_name, queries, k, space, page, best_ids, best_distances)
+            page = []
+        if page:
+            best_ids, best_distances = _merge_page(collection_name, queries, k, space, page, best_ids, best_distances)
+    finally:
+        reader.close()
+    return [list(row) for row in best_ids]
+
+
+def _merge_page(collection_name: str, queries: np.ndarray, k: int, space: str, page: List[str],
+                best_ids: np.ndarray, best_distances: np.ndarray):
+    """Unisce i vettori di una pagina ai migliori k correnti di ogni query."""
+    result = _vector_db().fetch_vectors(collection_name, ids=page, include=["embeddings"])
+    if not result.get("ids"):
+        return best_ids, best_distances
+    vectors = np.asarray(result["embeddings"], dtype=np.float32)
+    ids = np.empty(len(result["ids"]), dtype=object)
+    ids[:] = result["ids"]
+
+    candidate_ids = np.concatenate([best_ids, np.broadcast_to(ids, (len(queries), len(ids)))], axis=1)
+    candidate_distances = np.concatenate([best_distances, pairwise_distances(space, queries, vectors)], axis=1)
+    keep = min(k, candidate_distances.shape[1])
+    order = np.argsort(candidate_distances, axis=1, kind="stable")[:, :keep]
+    return (np.take_along_axis(candidate_ids, order, axis=1),
+            np.take_along_axis(candidate_distances, order, axis=1))
+
+
+def measure_index(collection_name: str, queries: np.ndarray, k: int,
+                  exact: List[List[str]]) -> Dict[str, Any]:
+    """
+    Interroga l'indice (HNSW o quantizzato) con ogni query e confronta i risultati con quelli esatti.
+
+    Returns:
+        Dict con recall@k medio e minimo e latenze (media, p50, p95, max) in ms.
+    """
+    latencies: List[float] = []
+    recalls: List[float] = []
+    for query, expected in zip(queries, exact):
+        started = time.perf_counter()
+        result = _vector_db().query_vectors(collection_name, query.tolist(), n_results=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if expected:
+            found = set(result["ids"][0]) if result.get("ids") else set()
+            recalls.append(len(found & set(expected)) / len(expected))
+
+    if not latencies:
+        return {"queries": 0, "k": k, "recall_at_k": None}
+    ordered = sorted(latencies)
+    return {
+        "queries": len(latencies),
+        "k": k,
+        "recall_at_k": round(sum(recalls) / len(recalls), 4) if recalls else None,
+        "recall_at_k_min": round(min(recalls), 4) if recalls else None,
+        "latency_ms_mean": round(sum(latencies) / len(latencies), 3),
+        "latency_ms_p50": round(ordered[len(ordered) // 2], 3),
+        "latency_ms_p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "latency_ms_max": round(ordered[-1], 3)
+    }
+
+
+def benchmark_collection(collection_name: str, settings: Dict[str, Any], sample_size: int = BENCHMARK_SAMPLE_SIZE,
+                         k: int = BENCHMARK_K, queries: Optional[np.ndarray] = None,
+                         exact: Optional[List[List[str]]] = None) -> Dict[str, Any]:
+    """
+    Esegue il benchmark completo di una collezione.
+
+    Args:
+        collection_name: Collezione da misurare
+        settings: Impostazioni della collezione (metrica e modello di embedding)
+        sample_size: Numero di query del campione
+        k: Numero di vicini confrontati
+        queries, exact: Campione e risultati esatti già calcolati (per confrontare
+            due indici con gli stessi vettori)
+    """
+    if queries is None:
+        queries = sample_queries(collection_name, settings["embedding_model"], sample_size)
+    if exact is None:
+        exact = exact_neighbours(collection_name, queries, k, settings["space"])
+    report = measure_index(collection_name, queries, k, exact)
+    report["memory"] = _vector_db().get_index_memory(collection_name)
+    report["vectors"] = report["memory"]["vectors"] if report["memory"] else 0
+    report["settings"] = {key: settings.get(key) for key in ("space", "m", "construction_ef", "search_ef",
+                                                            "num_threads", "quantization", "rerank_candidates")}
+    return report
@@ -0,0 +1,394 @@
+"""
+Index Maintenance Service - Ricostruzione e benchmark degli indici per collezione
+(HNSW di ChromaDB o quantizzati).
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, List, Any
+
+from app.services.index_benchmark import (
+    BENCHMARK_K,
+    BENCHMARK_SAMPLE_SIZE,
+    benchmark_collection,
+    exact_neighbours,
+    sample_queries
+)
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Vettori copiati per pagina durante la ricostruzione
+REBUILD_PAGE_SIZE = int(os.getenv("VECTORSTORE_REBUILD_PAGE_SIZE", "500"))
+# Recall@k minimo del nuovo indice per completare lo scambio (0 = nessun controllo)
+REBUILD_MIN_RECALL = float(os.getenv("VECTORSTORE_REBUILD_MIN_RECALL", "0"))
+# Calo massimo di recall@k rispetto al vecchio indice (vuoto = nessun controllo),
+# ad esempio passando a un indice quantizzato
+_max_recall_drop = os.getenv("VECTORSTORE_REBUILD_MAX_RECALL_DROP", "")
+REBUILD_MAX_RECALL_DROP: Optional[float] = float(_max_recall_drop) if _max_recall_drop else None
+
+# Numero di job conservati in memoria
+MAX_INDEX_JOBS = 50
+
+
+class IndexMaintenanceError(Exception):
+    """Operazione sugli indici non consentita."""
+
+
+class _JobCancelled(Exception):
+    pass
+
+
+class IndexMaintenanceService:
+    """
+    Job in background sugli indici delle collezioni ChromaDB.
+
+    - benchmark: recall@k e latenza dell'indice corrente su un campione di query
+    - rebuild: copia i vettori in una nuova collezione con le impostazioni richieste
+      (parametri HNSW, quantizzazione, o le stesse per compattare l'indice), la misura
+      facoltativamente e la sostituisce a quella corrente. Le scritture continuano
+      durante la copia: gli ID modificati sono registrati e riapplicati con le
+      scritture sospese, subito prima dello scambio.
+
+    Per ogni collezione è in esecuzione al più un job alla volta.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(IndexMaintenanceService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._threads: Dict[str, threading.Thread] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._running_by_collection: Dict[str, str] = {}
+        self._initialized = True
+
+    @property
+    def vector_db(self):
+        from app.core.vectordb_manager import vector_db_manager
+        return vector_db_manager
+
+    # --- API dei job -------------------------------------------------------
+
+    def start_rebuild(self, collection: str, settings: Optional[Dict[str, Any]] = None,
+                      benchmark: bool = True, sample_size: int = BENCHMARK_SAMPLE_SIZE,
+                      k: int = BENCHMARK_K, min_recall: float = REBUILD_MIN_RECALL,
+                      max_recall_drop: Optional[float] = REBUILD_MAX_RECALL_DROP,
+                      retain_previous: bool = False, page_size: int = REBUILD_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Avvia la ricostruzione dell'indice di una collezione in background.
+
+        Args:
+            collection: Nome della collezione
+            settings: Impostazioni da cambiare (le omesse restano quelle correnti)
+            benchmark: Misura recall e latenza del vecchio e del nuovo indice
+            sample_size, k: Dimensione del campione di query e numero di vicini
+            min_recall: Recall@k minimo del nuovo indice; sotto questa soglia lo scambio
+                non avviene e il job termina come "rejected"
+            max_recall_drop: Calo massimo di recall@k rispetto al vecchio indice (None =
+                nessun controllo); oltre questo calo il job termina come "rejected"
+            retain_previous: Conserva la vecchia collezione (con nome interno) dopo lo scambio
+            page_size: Vettori copiati per pagina
+
+        Raises:
+            IndexMaintenanceError: Se un job è già in esecuzione sulla collezione.
+            LookupError: Se la collezione non esiste.
+            ValueError: Se le impostazioni non sono valide.
+        """
+        from app.core.vectordb_manager import _validate_settings
+
+        name, current = self._resolve(collection)
+        changes = dict(settings or {})
+        if changes.get("embedding_model", current["embedding_model"]) != current["embedding_model"]:
+            raise ValueError("Il modello di embedding non può cambiare ricostruendo l'indice: "
+                             "i vettori esistenti sono stati calcolati con il modello corrente")
+        target_settings = _validate_settings({**current, **changes})
+
+        return self._launch("rebuild", name, {
+            "settings": target_settings,
+            "previous_settings": current,
+            "benchmark": benchmark,
+            "sample_size": max(1, sample_size),
+            "k": max(1, k),
+            "min_recall": min_recall,
+            "max_recall_drop": max_recall_drop,
+            "retain_previous": retain_previous,
+            "page_size": max(1, page_size)
+        }, {"copied": 0, "total": 0, "replayed": 0, "phase": "pending"})
+
+    def start_benchmark(self, collection: str, sample_size: int = BENCHMARK_SAMPLE_SIZE,
+                        k: int = BENCHMARK_K) -> Dict[str, Any]:
+        """
+        Avvia il benchmark dell'indice corrente di una collezione in background.
+
+        Raises:
+            IndexMaintenanceError: Se un job è già in esecuzione sulla collezione.
+            LookupError: Se la collezione non esiste.
+        """
+        name, _ = self._resolve(collection)
+        return self._launch("benchmark", name, {"sample_size": max(1, sample_size), "k": max(1, k)},
+                            {"phase": "pending"})
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        Richiede l'annullamento di un job; una ricostruzione si ferma alla pagina
+        corrente ed elimina la collezione parziale.
+
+        Raises:
+            IndexMaintenanceError: Se il job non è in esecuzione.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "running":
+                raise IndexMaintenanceError(f"Il job {job_id} non è in esecuzione")
+            self._cancel_events[job_id].set()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Restituisce lo stato di un job."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list_jobs(self, limit: int = 20, collection: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Restituisce i job più recenti, facoltativamente di una sola collezione."""
+        with self._lock:
+            jobs = [job for job in reversed(self._jobs.values())
+                    if collection is None or job["collection"] == collection]
+            return [self._snapshot(job) for job in jobs[:limit]]
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Annulla i job in esecuzione (allo spegnimento del servizio)."""
+        with self._lock:
+            for event in self._cancel_events.values():
+                event.set()
+            threads = list(self._threads.values())
+        for thread in threads:
+            if thread.is_alive():
+                thread.join(timeout=timeout)
+
+    # --- Esecuzione --------------------------------------------------------
+
+    def _resolve(self, collection: str):
+        from app.core.vectordb_manager import resolve_collection_name
+        name = resolve_collection_name(collection)
+        settings = self.vector_db.get_collection_settings(name)
+        if settings is None:
+            raise LookupError(f"Collezione {collection} non trovata")
+        return name, settings
+
+    def _launch(self, kind: str, collection: str, params: Dict[str, Any],
+                progress: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "collection": collection,
+            "status": "running",
+            "params": params,
+            "progress": progress,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+        with self._lock:
+            running = self._running_by_collection.get(collection)
+            if running:
+                raise IndexMaintenanceError(
+                    f"Job {running} già in esecuzione sulla collezione '{collection}'"
+                )
+            self._running_by_collection[collection] = job["id"]
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > MAX_INDEX_JOBS:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest]["status"] == "running":
+                    break
+                del self._jobs[oldest]
+            self._cancel_events[job["id"]] = threading.Event()
+            thread = threading.Thread(target=self._run_job, args=(job,),
+                                      name=f"index-{kind}-{job['id'][:8]}", daemon=True)
+            self._threads[job["id"]] = thread
+        thread.start()
+        logger.info(f"Job {kind} {job['id']} avviato sulla collezione '{collection}'")
+        return self.get_job(job["id"])
+
+    def _run_job(self, job: Dict[str, Any]) -> None:
+        cancel_event = self._cancel_events[job["id"]]
+        try:
+            if job["kind"] == "rebuild":
+                status, result = self._rebuild(job, cancel_event)
+            else:
+                status, result = self._benchmark(job)
+            error = None
+        except _JobCancelled:
+            status, result, error = "cancelled", None, None
+        except Exception as e:
+            logger.error(f"Errore nel job {job['kind']} {job['id']}: {e}")
+            status, result, error = "failed", None, str(e)
+
+        with self._lock:
+            job["status"] = status
+            job["result"] = result if result is not None else job["result"]
+            job["error"] = error
+            job["finished_at"] = job["updated_at"] = datetime.now().isoformat()
+            self._running_by_collection.pop(job["collection"], None)
+            self._cancel_events.pop(job["id"], None)
+            self._threads.pop(job["id"], None)
+        logger.info(f"Job {job['kind']} {job['id']} terminato: {status}")
+
+    def _set_phase(self, job: Dict[str, Any], phase: str) -> None:
+        with self._lock:
+            job["progress"]["phase"] = phase
+            job["updated_at"] = datetime.now().isoformat()
+
+    def _benchmark(self, job: Dict[str, Any]):
+        params = job["params"]
+        self._set_phase(job, "benchmark")
+        name = job["collection"]
+        settings = self.vector_db.get_collection_settings(name)
+        if settings is None:
+            raise LookupError(f"Collezione {name} non trovata")
+        report = benchmark_collection(name, settings,
+                                      sample_size=params["sample_size"], k=params["k"])
+        return "completed", report
+
+    def _rebuild(self, job: Dict[str, Any], cancel_event: threading.Event):
+        from app.core.vectordb_manager import CHROMA_PERSIST_DIR
+        from app.services.reconciliation import ChromaIdReader, _iter_sorted_ids
+
+        params = job["params"]
+        progress = job["progress"]
+        name = job["collection"]
+        vector_db = self.vector_db
+        started = time.monotonic()
+
+        source = vector_db.get_collection(name, create=False)
+        if source is None:
+            raise LookupError(f"Collezione {name} non trovata")
+        target_name, _ = vector_db.create_rebuild_collection(name, params["settings"])
+        vector_db.track_writes(name)
+        swapped = False
+        try:
+            # 1. Copia a pagine dei vettori (con documenti e metadati) nella nuova collezione
+            self._set_phase(job, "copy")
+            with self._lock:
+                progress["total"] = source.count()
+            reader = ChromaIdReader(CHROMA_PERSIST_DIR, str(source.id))
+            try:
+                page: List[str] = []
+                for document_id in _iter_sorted_ids(reader.page, None, params["page_size"]):
+                    page.append(document_id)
+                    if len(page) >= params["page_size"]:
+                        self._copy_page(job, name, target_name, page, cancel_event)
+                        page = []
+                if page:
+                    self._copy_page(job, name, target_name, page, cancel_event)
+            finally:
+                reader.close()
+
+            # 2. Confronto dei due indici sulle stesse query
+            result: Dict[str, Any] = {"collection": name, "settings": params["settings"],
+                                      "previous_settings": params["previous_settings"]}
+            if params["benchmark"]:
+                self._set_phase(job, "benchmark")
+                previous = params["previous_settings"]
+                queries = sample_queries(name, previous["embedding_model"], params["sample_size"])
+                exact = exact_neighbours(name, queries, params["k"], previous["space"])
+                before = benchmark_collection(name, previous, k=params["k"], queries=queries, exact=exact)
+                after = benchmark_collection(target_name, params["settings"], k=params["k"],
+                                             queries=queries, exact=exact)
+                result["benchmark_before"], result["benchmark_after"] = before, after
+                if before["memory"] and after["memory"] and after["memory"]["resident_bytes"]:
+                    result["memory_reduction"] = round(
+                        before["memory"]["resident_bytes"] / after["memory"]["resident_bytes"], 2
+                    )
+                rejection = self._check_recall(params, before["recall_at_k"], after["recall_at_k"])
+                if rejection:
+                    logger.warning(f"Ricostruzione di '{name}' scartata: {rejection}")
+                    result["rejected_reason"] = rejection
+                    return "rejected", result
+            if cancel_event.is_set():
+                raise _JobCancelled()
+
+            # 3. Scritture avvenute durante la copia, poi scambio atomico
+            self._set_phase(job, "swap")
+            with vector_db.pause_writes(name) as dirty:
+                self._replay(job, name, target_name, sorted(dirty))
+                result["retained_collection"] = vector_db.swap_collection(
+                    name, target_name, retain_previous=params["retain_previous"]
+                )
+                swapped = True
+            result["elapsed_seconds"] = round(time.monotonic() - started, 3)
+            return "completed", result
+        finally:
+            vector_db.untrack_writes(name)
+            if not swapped:
+                try:
+                    vector_db.drop_collection(target_name)
+                except Exception as e:
+                    logger.warning(f"Errore eliminazione della collezione temporanea '{target_name}': {e}")
+
+    @staticmethod
+    def _check_recall(params: Dict[str, Any], before: Optional[float], after: Optional[float]) -> Optional[str]:
+        """Motivo per cui il nuovo indice non soddisfa le soglie di recall, o None."""
+        if after is None:
+            return None
+        k = params["k"]
+        if params["min_recall"] and after < params["min_recall"]:
+            return f"recall@{k} {after} < {params['min_recall']}"
+        if params["max_recall_drop"] is not None and before is not None and before - after > params["max_recall_drop"]:
+            return f"recall@{k} scende da {before} a {after} (tolleranza {params['max_recall_drop']})"
+        return None
+
+    def _copy_page(self, job: Dict[str, Any], source_name: str, target_name: str, page: List[str],
+                   cancel_event: threading.Event) -> None:
+        if cancel_event.is_set():
+            raise _JobCancelled()
+        data = self.vector_db.fetch_vectors(source_name, ids=page, include=["embeddings", "documents", "metadatas"])
+        if data.get("ids"):
+            self.vector_db.store_vectors(target_name, data["ids"], data["documents"], data["metadatas"],
+                                         embeddings=data["embeddings"])
+        with self._lock:
+            job["progress"]["copied"] += len(data.get("ids") or [])
+            job["updated_at"] = datetime.now().isoformat()
+
+    def _replay(self, job: Dict[str, Any], source_name: str, target_name: str, document_ids: List[str]) -> None:
+        """Allinea la nuova collezione agli ID scritti sulla vecchia durante la copia."""
+        page_size = job["params"]["page_size"]
+        for start in range(0, len(document_ids), page_size):
+            chunk = document_ids[start:start + page_size]
+            data = self.vector_db.fetch_vectors(source_name, ids=chunk,
+                                                include=["embeddings", "documents", "metadatas"])
+            present = data.get("ids") or []
+            if present:
+                self.vector_db.store_vectors(target_name, present, data["documents"], data["metadatas"],
+                                             embeddings=data["embeddings"], upsert=True)
+            removed = sorted(set(chunk) - set(present))
+            if removed:
+                self.vector_db.delete_vectors(target_name, removed)
+            with self._lock:
+                job["progress"]["replayed"] += len(chunk)
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia del job (chiamato con il lock acquisito)."""
+        return {**job, "params": dict(job["params"]), "progress": dict(job["progress"])}
+
+
+# Esporta un'istanza singleton
+index_maintenance_service = IndexMaintenanceService()
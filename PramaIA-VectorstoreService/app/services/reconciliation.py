@@ -2,9 +2,17 @@
 Reconciliation Service - Servizio per la riconciliazione tra il file system e il vectorstore.
 """
 
+import os
+import time
+import uuid
+import heapq
+import sqlite3
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, List, Any, Callable, Iterator
+
+from app.services.stats_service import stats_service
 
 # Logger
 logger = logging.getLogger(__name__)
@@ -35,3 +43,505 @@ def get_next_scheduled_run(schedule_time: str) -> Optional[datetime]:
         scheduled_time += timedelta(days=1)
         
     return scheduled_time
+
+
+# Parametri predefiniti dei job di riconciliazione
+RECONCILIATION_PAGE_SIZE = int(os.getenv("VECTORSTORE_RECONCILIATION_PAGE_SIZE", "1000"))
+RECONCILIATION_REPAIR_BATCH_SIZE = int(os.getenv("VECTORSTORE_RECONCILIATION_REPAIR_BATCH_SIZE", "100"))
+
+# Numero di ID di esempio conservati per ogni tipo di incongruenza
+MAX_SAMPLE_IDS = 20
+
+# Stati da cui un job può essere ripreso
+RESUMABLE_STATUSES = ("interrupted", "cancelled", "failed")
+
+
+class ReconciliationError(Exception):
+    """Operazione sui job di riconciliazione non consentita."""
+
+
+class ChromaIdReader:
+    """
+    Legge gli ID di una collezione ChromaDB in ordine crescente, a pagine.
+
+    L'API di ChromaDB 0.4 restituisce gli ID solo nell'ordine di inserimento, quindi
+    gli ID sono letti in sola lettura dal database SQLite interno di ChromaDB
+    (tabella embeddings, indice unico su segment_id, embedding_id).
+    """
+
+    def __init__(self, persist_dir: str, collection_id: str):
+        db_file = os.path.join(persist_dir, "chroma.sqlite3")
+        if not os.path.exists(db_file):
+            raise ReconciliationError(f"Database ChromaDB non trovato: {db_file}")
+        self._conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, check_same_thread=False, timeout=30)
+        row = self._conn.execute(
+            "SELECT id FROM segments WHERE collection = ? AND scope = 'METADATA'", (collection_id,)
+        ).fetchone()
+        if row is None:
+            self._conn.close()
+            raise ReconciliationError(f"Segmento metadati non trovato per la collezione {collection_id}")
+        self._segment_id = row[0]
+
+    def page(self, after: Optional[str], limit: int) -> List[str]:
+        if after is None:
+            rows = self._conn.execute(
+                "SELECT embedding_id FROM embeddings WHERE segment_id = ? ORDER BY embedding_id LIMIT ?",
+                (self._segment_id, limit)
+            ).fetchall()
+        else:
+            rows = self._conn.execute(
+                "SELECT embedding_id FROM embeddings WHERE segment_id = ? AND embedding_id > ? "
+                "ORDER BY embedding_id LIMIT ?",
+                (self._segment_id, after, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _iter_sorted_ids(fetch_page: Callable[[Optional[str], int], List[str]],
+                     after: Optional[str], page_size: int) -> Iterator[str]:
+    """Scorre gli ID in ordine crescente leggendo una pagina alla volta."""
+    while True:
+        page = fetch_page(after, page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1]
+
+
+def _iter_chroma_ids(readers: Dict[str, ChromaIdReader], after: Optional[str],
+                     page_size: int) -> Iterator[Any]:
+    """
+    Scorre gli ID di tutte le collezioni ChromaDB in un unico ordine crescente
+    (merge a k vie), come tuple (id, nome della collezione).
+    """
+    def tagged(name: str, reader: ChromaIdReader) -> Iterator[Any]:
+        for document_id in _iter_sorted_ids(reader.page, after, page_size):
+            yield document_id, name
+
+    return heapq.merge(*(tagged(name, reader) for name, reader in readers.items()))
+
+
+def _new_progress() -> Dict[str, Any]:
+    return {
+        "sqlite_scanned": 0,
+        "chroma_scanned": 0,
+        "matched": 0,
+        "only_in_sqlite": 0,
+        "only_in_sqlite_not_vectorizable": 0,
+        "only_in_chroma": 0,
+        "vectors_added": 0,
+        "vectors_deleted": 0,
+        "repair_errors": 0,
+        "estimated_total": 0,
+        "elapsed_seconds": 0.0,
+        "samples": {"only_in_sqlite": [], "only_in_chroma": []}
+    }
+
+
+class ReconciliationService:
+    """
+    Riconciliazione tra SQLite (metadati, fonte di verità) e ChromaDB (vettori).
+
+    Gli ID dei due archivi sono letti in ordine crescente a pagine e confrontati con
+    un merge join, quindi la memoria usata non dipende dalla dimensione degli archivi.
+    Le incongruenze sono corrette a lotti:
+    - vettori senza documento in SQLite: eliminati da ChromaDB
+    - documenti vettorizzabili senza vettore: reindicizzati in ChromaDB
+    Dopo ogni lotto la posizione raggiunta è salvata su SQLite: un job interrotto,
+    annullato o fallito riprende da lì.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ReconciliationService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._document_manager = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._cancel_event = threading.Event()
+        self._current_job: Optional[Dict[str, Any]] = None
+        self._run_started: Optional[float] = None
+        self._run_processed_start = 0
+        self._initialized = True
+
+    @property
+    def document_manager(self):
+        if self._document_manager is None:
+            from app.utils.document_manager import DocumentManager
+            self._document_manager = DocumentManager()
+            # I job ancora "running" appartengono a un processo terminato
+            for job in self._document_manager.metadata_db.list_reconciliation_jobs(limit=100, status="running"):
+                job["status"] = "interrupted"
+                self._document_manager.metadata_db.save_reconciliation_job(job)
+                logger.warning(f"Job di riconciliazione {job['id']} interrotto, può essere ripreso")
+        return self._document_manager
+
+    @property
+    def metadata_db(self):
+        return self.document_manager.metadata_db
+
+    # --- API dei job -------------------------------------------------------
+
+    def start_job(self, dry_run: bool = False, page_size: int = RECONCILIATION_PAGE_SIZE,
+                  repair_batch_size: int = RECONCILIATION_REPAIR_BATCH_SIZE,
+                  delete_orphan_vectors: bool = True, reindex_missing_vectors: bool = True) -> Dict[str, Any]:
+        """
+        Avvia un nuovo job di riconciliazione in background.
+
+        Args:
+            dry_run: Se True rileva le incongruenze senza correggerle
+            page_size: Numero di ID letti per pagina da ciascun archivio
+            repair_batch_size: Numero di correzioni per lotto
+            delete_orphan_vectors: Elimina da ChromaDB i vettori senza documento
+            reindex_missing_vectors: Reindicizza i documenti vettorizzabili senza vettore
+
+        Raises:
+            ReconciliationError: Se un job è già in esecuzione.
+        """
+        now = datetime.now().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "running",
+            "params": {
+                "dry_run": dry_run,
+                "page_size": max(1, page_size),
+                "repair_batch_size": max(1, repair_batch_size),
+                "delete_orphan_vectors": delete_orphan_vectors,
+                "reindex_missing_vectors": reindex_missing_vectors
+            },
+            "position": None,
+            "progress": _new_progress(),
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+        self._launch(job)
+        return self.get_job(job["id"])
+
+    def resume_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        Riprende un job interrotto, annullato o fallito dall'ultima posizione salvata.
+
+        Raises:
+            ReconciliationError: Se il job non esiste, non è riprendibile o un altro job è in esecuzione.
+        """
+        job = self.metadata_db.get_reconciliation_job(job_id)
+        if job is None:
+            raise ReconciliationError(f"Job {job_id} non trovato")
+        if job["status"] not in RESUMABLE_STATUSES:
+            raise ReconciliationError(f"Il job {job_id} è in stato '{job['status']}' e non può essere ripreso")
+        job["status"] = "running"
+        job["error"] = None
+        self._launch(job)
+        return self.get_job(job_id)
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        Richiede l'annullamento del job in esecuzione; si ferma al lotto corrente.
+
+        Raises:
+            ReconciliationError: Se il job non è in esecuzione.
+        """
+        with self._lock:
+            if not self._current_job or self._current_job["id"] != job_id:
+                raise ReconciliationError(f"Il job {job_id} non è in esecuzione")
+            self._cancel_event.set()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Restituisce lo stato di un job, con avanzamento e tempo stimato se in esecuzione."""
+        with self._lock:
+            if self._current_job and self._current_job["id"] == job_id:
+                return self._with_eta(self._snapshot(self._current_job))
+        job = self.metadata_db.get_reconciliation_job(job_id)
+        return self._with_eta(job) if job else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Restituisce i job più recenti."""
+        jobs = self.metadata_db.list_reconciliation_jobs(limit=limit)
+        with self._lock:
+            current = self._snapshot(self._current_job) if self._current_job else None
+        return [self._with_eta(current if current and job["id"] == current["id"] else job) for job in jobs]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Stato complessivo: job in esecuzione e ultimo job."""
+        with self._lock:
+            current = self._snapshot(self._current_job) if self._current_job else None
+        if current:
+            return {"status": "running", "current_job": self._with_eta(current)}
+        jobs = self.metadata_db.list_reconciliation_jobs(limit=1)
+        return {"status": "idle", "current_job": None, "last_job": self._with_eta(jobs[0]) if jobs else None}
+
+    def diff(self, page_size: int = RECONCILIATION_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Confronta i due archivi in modo sincrono senza correggere nulla né salvare un job.
+
+        Returns:
+            Contatori del confronto (vedi _new_progress).
+        """
+        job = {"id": "diff", "params": {"dry_run": True, "page_size": page_size, "repair_batch_size": 1000,
+                                         "delete_orphan_vectors": False, "reindex_missing_vectors": False},
+               "position": None, "progress": _new_progress()}
+        self._reconcile(job, persist=False, cancel_event=threading.Event())
+        return job["progress"]
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Ferma il job in esecuzione al lotto corrente (allo spegnimento del servizio)."""
+        self._cancel_event.set()
+        thread = self._thread
+        if thread and thread.is_alive():
+            thread.join(timeout=timeout)
+
+    # --- Esecuzione --------------------------------------------------------
+
+    def _launch(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                raise ReconciliationError(f"Job {self._current_job['id']} già in esecuzione")
+            self._cancel_event.clear()
+            self._current_job = job
+            self._run_started = time.monotonic()
+            progress = job["progress"]
+            self._run_processed_start = progress["sqlite_scanned"] + progress["chroma_scanned"]
+            self._thread = threading.Thread(target=self._run_job, args=(job,),
+                                            name=f"reconciliation-{job['id'][:8]}", daemon=True)
+        self.metadata_db.save_reconciliation_job(job)
+        self._thread.start()
+        logger.info(f"Job di riconciliazione {job['id']} avviato (posizione: {job.get('position')})")
+
+    def _run_job(self, job: Dict[str, Any]) -> None:
+        try:
+            completed = self._reconcile(job, persist=True, cancel_event=self._cancel_event)
+            status = "completed" if completed else "cancelled"
+            error = None
+        except Exception as e:
+            logger.error(f"Errore nel job di riconciliazione {job['id']}: {e}")
+            status, error = "failed", str(e)
+
+        with self._lock:
+            job["status"] = status
+            job["error"] = error
+            job["finished_at"] = datetime.now().isoformat()
+            self._current_job = None
+        self.metadata_db.save_reconciliation_job(job)
+        logger.info(f"Job di riconciliazione {job['id']} terminato: {status} ({job['progress']})")
+
+    def _reconcile(self, job: Dict[str, Any], persist: bool, cancel_event: threading.Event) -> bool:
+        """
+        Esegue il merge join a partire da job["position"].
+
+        Returns:
+            True se completato, False se annullato.
+        """
+        params = job["params"]
+        progress = job["progress"]
+        page_size = params["page_size"]
+        batch_size = params["repair_batch_size"]
+        position = job.get("position")
+
+        # Gli ID di tutte le collezioni ChromaDB (una per collezione logica) in un unico ordine
+        from app.core.vectordb_manager import CHROMA_PERSIST_DIR
+        vector_db = self.document_manager.vector_db
+        collections = {}
+        for name in vector_db.list_collections():
+            collection = vector_db.get_collection(name, create=False)
+            if collection is not None:
+                collections[name] = collection
+        if not collections:
+            raise ReconciliationError("Collezione ChromaDB non disponibile")
+        readers: Dict[str, ChromaIdReader] = {}
+        try:
+            for name, collection in collections.items():
+                readers[name] = ChromaIdReader(CHROMA_PERSIST_DIR, str(collection.id))
+        except Exception:
+            for reader in readers.values():
+                reader.close()
+            raise
+
+        if not progress["estimated_total"]:
+            progress["estimated_total"] = self.metadata_db.get_document_count() + sum(
+                collection.count() for collection in collections.values()
+            )
+
+        only_in_sqlite: List[str] = []
+        only_in_chroma: List[Any] = []
+        since_checkpoint = 0
+        last_key: Optional[str] = position
+        last_matched: Optional[str] = None
+        started = time.monotonic()
+
+        def checkpoint() -> None:
+            nonlocal since_checkpoint, started
+            self._repair_missing_vectors(job, only_in_sqlite)
+            self._repair_orphan_vectors(job, collections, only_in_chroma)
+            only_in_sqlite.clear()
+            only_in_chroma.clear()
+            now = time.monotonic()
+            with self._lock:
+                job["position"] = last_key
+                progress["elapsed_seconds"] = round(progress["elapsed_seconds"] + now - started, 3)
+            started = now
+            since_checkpoint = 0
+            if persist:
+                self.metadata_db.save_reconciliation_job(job)
+
+        try:
+            sqlite_iter = _iter_sorted_ids(self.metadata_db.get_document_ids_page, position, page_size)
+            chroma_iter = _iter_chroma_ids(readers, position, page_size)
+            sqlite_id = next(sqlite_iter, None)
+            chroma_id, chroma_collection = next(chroma_iter, (None, None))
+
+            while sqlite_id is not None or chroma_id is not None:
+                if cancel_event.is_set():
+                    checkpoint()
+                    return False
+
+                with self._lock:
+                    if chroma_id is not None and chroma_id == last_matched:
+                        # Stesso documento in un'altra collezione (vettore indicizzato prima
+                        # del routing per collezione): non è un orfano
+                        progress["chroma_scanned"] += 1
+                        advance_sqlite, advance_chroma = False, True
+                    elif chroma_id is None or (sqlite_id is not None and sqlite_id < chroma_id):
+                        progress["sqlite_scanned"] += 1
+                        only_in_sqlite.append(sqlite_id)
+                        last_key = sqlite_id
+                        advance_sqlite, advance_chroma = True, False
+                    elif sqlite_id is None or chroma_id < sqlite_id:
+                        progress["chroma_scanned"] += 1
+                        progress["only_in_chroma"] += 1
+                        self._add_sample(progress, "only_in_chroma", chroma_id)
+                        only_in_chroma.append((chroma_id, chroma_collection))
+                        last_key = chroma_id
+                        advance_sqlite, advance_chroma = False, True
+                    else:
+                        progress["sqlite_scanned"] += 1
+                        progress["chroma_scanned"] += 1
+                        progress["matched"] += 1
+                        last_key = last_matched = sqlite_id
+                        advance_sqlite = advance_chroma = True
+
+                if advance_sqlite:
+                    sqlite_id = next(sqlite_iter, None)
+                if advance_chroma:
+                    chroma_id, chroma_collection = next(chroma_iter, (None, None))
+
+                since_checkpoint += 1
+                if (since_checkpoint >= page_size or len(only_in_sqlite) >= batch_size
+                        or len(only_in_chroma) >= batch_size):
+                    checkpoint()
+
+            checkpoint()
+            return True
+        finally:
+            for reader in readers.values():
+                reader.close()
+
+    @staticmethod
+    def _add_sample(progress: Dict[str, Any], kind: str, document_id: str) -> None:
+        samples = progress["samples"][kind]
+        if len(samples) < MAX_SAMPLE_IDS:
+            samples.append(document_id)
+
+    def _repair_missing_vectors(self, job: Dict[str, Any], document_ids: List[str]) -> None:
+        """Classifica i documenti senza vettore e reindicizza quelli vettorizzabili."""
+        if not document_ids:
+            return
+        params = job["params"]
+        progress = job["progress"]
+        manager = self.document_manager
+
+        documents = manager.metadata_db.get_documents_by_ids(document_ids)
+        vectorizable = [
+            doc for doc in documents
+            if manager._should_vectorize_content(doc.get("content") or "", doc.get("metadata") or {})
+        ]
+        with self._lock:
+            # I documenti non vettorizzabili (binari, vuoti) non hanno un vettore per scelta
+            progress["only_in_sqlite_not_vectorizable"] += len(document_ids) - len(vectorizable)
+            progress["only_in_sqlite"] += len(vectorizable)
+            for doc in vectorizable:
+                self._add_sample(progress, "only_in_sqlite", doc["id"])
+
+        if not vectorizable or params["dry_run"] or not params["reindex_missing_vectors"]:
+            return
+        statuses = manager.vectorize_documents(vectorizable, batch_size=params["repair_batch_size"])
+        with self._lock:
+            progress["vectors_added"] += sum(1 for status in statuses if status["vectorized"])
+            progress["repair_errors"] += sum(1 for status in statuses if "vector_error" in status)
+
+    def _repair_orphan_vectors(self, job: Dict[str, Any], collections: Dict[str, Any],
+                               orphans: List[Any]) -> None:
+        """Elimina da ChromaDB i vettori (id, collezione) il cui documento non esiste in SQLite."""
+        params = job["params"]
+        if not orphans or params["dry_run"] or not params["delete_orphan_vectors"]:
+            return
+        by_collection: Dict[str, List[str]] = {}
+        for document_id, collection_name in orphans:
+            by_collection.setdefault(collection_name, []).append(document_id)
+        for collection_name, document_ids in by_collection.items():
+            try:
+                vector_db = self.document_manager.vector_db
+                with vector_db.writing(collection_name, document_ids):
+                    # Le pagine di SQLite sono lette durante la scansione: un documento inserito
+                    # nel frattempo può risultare orfano, quindi si ricontrolla prima di eliminare
+                    existing = {doc["id"] for doc in self.metadata_db.get_documents_by_ids(document_ids)}
+                    deletable = [document_id for document_id in document_ids if document_id not in existing]
+                    if deletable:
+                        vector_db.delete_vectors(collection_name, deletable)
+                if existing:
+                    logger.debug(f"{len(existing)} vettori di '{collection_name}' non eliminati: documenti presenti in SQLite")
+                if not deletable:
+                    continue
+                stats_service.record_chroma_change(-len(deletable))
+                with self._lock:
+                    job["progress"]["vectors_deleted"] += len(deletable)
+            except Exception as e:
+                logger.warning(f"Errore eliminazione di {len(document_ids)} vettori orfani da '{collection_name}': {e}")
+                with self._lock:
+                    job["progress"]["repair_errors"] += len(document_ids)
+
+    # --- Avanzamento -------------------------------------------------------
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia del job (chiamato con il lock acquisito)."""
+        progress = dict(job["progress"])
+        progress["samples"] = {kind: list(ids) for kind, ids in progress["samples"].items()}
+        return {**job, "params": dict(job["params"]), "progress": progress}
+
+    def _with_eta(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Aggiunge percentuale, velocità e tempo stimato al termine."""
+        progress = job["progress"]
+        processed = progress["sqlite_scanned"] + progress["chroma_scanned"]
+        total = progress.get("estimated_total") or 0
+        progress["percent"] = round(min(100.0, processed * 100.0 / total), 2) if total else None
+        if job.get("status") == "completed":
+            progress["percent"] = 100.0
+
+        rate = None
+        eta = None
+        if job.get("status") == "running" and self._run_started is not None:
+            elapsed = time.monotonic() - self._run_started
+            done_in_run = processed - self._run_processed_start
+            if elapsed > 0 and done_in_run > 0:
+                rate = done_in_run / elapsed
+                eta = max(0.0, (total - processed) / rate) if total else None
+        progress["rate_per_second"] = round(rate, 1) if rate is not None else None
+        progress["eta_seconds"] = round(eta, 1) if eta is not None else None
+        return job
+
+
+# Esporta un'istanza singleton
+reconciliation_service = ReconciliationService()
@@ -0,0 +1,189 @@
+"""
+Stats Service - Statistiche dei documenti mantenute in modo incrementale.
+
+I contatori SQLite (per collezione, per giorno e per content_type) sono aggiornati
+da trigger a ogni scrittura; i conteggi ChromaDB sono tenuti in memoria e aggiornati
+dalle operazioni di aggiunta ed eliminazione. Un job periodico di riconciliazione
+ricalcola tutto dai dati e corregge eventuali derive.
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, date
+from typing import Dict, Any, Optional
+
+from app.core.vectordb_manager import vector_db_manager
+from app.utils.sqlite_metadata_manager import SQLiteMetadataManager
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Intervallo del job di riconciliazione delle statistiche (0 lo disabilita)
+STATS_RECONCILE_INTERVAL_SECONDS = float(os.getenv("VECTORSTORE_STATS_RECONCILE_INTERVAL_SECONDS", "300"))
+
+
+class StatsService:
+    """
+    Servizio delle statistiche dei documenti.
+    Singleton condiviso da tutte le route che espongono statistiche.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StatsService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._metadata_db: Optional[SQLiteMetadataManager] = None
+        self._lock = threading.Lock()
+        self._chroma_documents: Optional[int] = None
+        self._chroma_collections: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.interval = STATS_RECONCILE_INTERVAL_SECONDS
+        self.last_reconciliation: Dict[str, Any] = {"status": "never_run"}
+        self._initialized = True
+
+    @property
+    def metadata_db(self) -> SQLiteMetadataManager:
+        if self._metadata_db is None:
+            # Stessa directory dati di DocumentManager
+            data_dir = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+            self._metadata_db = SQLiteMetadataManager(data_dir=data_dir)
+        return self._metadata_db
+
+    def _refresh_chroma_counts(self) -> None:
+        """Rilegge i conteggi da ChromaDB (usato solo alla prima lettura e dalla riconciliazione)."""
+        chroma_collections = 0
+        chroma_documents = 0
+        try:
+            collection_names = vector_db_manager.list_collections()
+            chroma_collections = len(collection_names)
+            for collection_name in collection_names:
+                collection = vector_db_manager.get_collection(collection_name, create=False)
+                if collection:
+                    chroma_documents += collection.count()
+        except Exception as e:
+            logger.warning(f"Errore statistiche ChromaDB: {e}")
+
+        with self._lock:
+            self._chroma_collections = chroma_collections
+            self._chroma_documents = chroma_documents
+
+    def record_chroma_change(self, delta: int) -> None:
+        """
+        Aggiorna il conteggio dei documenti ChromaDB dopo un'aggiunta (delta > 0)
+        o un'eliminazione (delta < 0) in una qualsiasi collezione.
+        """
+        with self._lock:
+            if self._chroma_documents is not None:
+                self._chroma_documents = max(0, self._chroma_documents + delta)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Restituisce le statistiche correnti leggendo solo i contatori.
+
+        Returns:
+            Dict con i campi storici di DocumentManager.get_statistics più
+            i dettagli per collezione, giorno e content_type.
+        """
+        if self._chroma_documents is None:
+            self._refresh_chroma_counts()
+
+        try:
+            document_stats = self.metadata_db.get_document_stats()
+        except Exception as e:
+            logger.error(f"Errore lettura contatori statistiche: {e}")
+            document_stats = {"total": 0, "by_collection": {}, "by_day": {}, "by_content_type": {}}
+
+        with self._lock:
+            chroma_documents = self._chroma_documents or 0
+            chroma_collections = self._chroma_collections or 0
+
+        total = document_stats["total"]
+        by_day = document_stats["by_day"]
+        by_content_type = dict(document_stats["by_content_type"])
+        untyped = total - sum(by_content_type.values())
+        if untyped > 0:
+            by_content_type["unknown"] = untyped
+
+        return {
+            'sqlite_documents': total,
+            'chroma_collections': chroma_collections,
+            'chroma_documents': chroma_documents,
+            'documents_total': total,
+            'documents_today': by_day.get(date.today().isoformat(), 0),
+            'collections': chroma_collections,
+            'processing_queue': 0,
+            'daily_stats': [{"date": day, "count": count} for day, count in sorted(by_day.items())],
+            'by_collection': document_stats["by_collection"],
+            'by_content_type': by_content_type
+        }
+
+    def reconcile(self) -> Dict[str, Any]:
+        """
+        Ricalcola i contatori dai dati e corregge le derive.
+
+        Returns:
+            Esito della riconciliazione, con le differenze corrette.
+        """
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                previous_chroma = self._chroma_documents
+            drift = self.metadata_db.reconcile_document_stats()
+            self._refresh_chroma_counts()
+            with self._lock:
+                if previous_chroma is not None and previous_chroma != self._chroma_documents:
+                    drift["chroma_documents"] = [previous_chroma, self._chroma_documents]
+
+            result = {
+                "status": "completed",
+                "last_run": datetime.now().isoformat(),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                "drift_corrected": drift
+            }
+            if drift:
+                logger.warning(f"Riconciliazione statistiche: corrette derive {drift}")
+        except Exception as e:
+            logger.error(f"Errore riconciliazione statistiche: {e}")
+            result = {
+                "status": "error",
+                "last_run": datetime.now().isoformat(),
+                "error": str(e)
+            }
+
+        self.last_reconciliation = result
+        return result
+
+    def start(self) -> None:
+        """Avvia il job periodico di riconciliazione."""
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-reconciliation", daemon=True)
+        self._thread.start()
+        logger.info(f"Riconciliazione statistiche avviata (ogni {self.interval:.0f}s)")
+
+    def stop(self) -> None:
+        """Arresta il job periodico di riconciliazione."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.reconcile()
+
+
+# Esporta un'istanza singleton
+stats_service = StatsService()
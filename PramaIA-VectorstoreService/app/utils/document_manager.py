@@ -6,13 +6,66 @@ tra ChromaDB (vector database) e SQLite (metadata database).
 """
 
 import logging
+import math
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any, Union
-from app.core.vectordb_manager import VectorDBManager
+from app.core.vectordb_manager import (
+    VectorDBManager, CHROMA_COLLECTION_NAME, resolve_collection_name, is_default_collection,
+    default_collection_settings
+)
+from app.core.embedding_manager import embedding_manager
 from app.utils.sqlite_metadata_manager import SQLiteMetadataManager
+from app.services.stats_service import stats_service
+from app.utils.rank_fusion import reciprocal_rank_fusion, weighted_score_fusion, DEFAULT_RRF_K
+from app.utils.metadata_filter import MetadataFilterError, to_chroma_where
 
 logger = logging.getLogger(__name__)
 
+# Esecutore condiviso per i due rami (vettoriale e lessicale) della ricerca ibrida
+_hybrid_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
+
+# Numero massimo di documenti preselezionati da un filtro non traducibile per ChromaDB
+FILTER_PREFILTER_MAX_IDS = int(os.getenv("VECTORSTORE_FILTER_PREFILTER_MAX_IDS", "10000"))
+
+# Esecutore per le ricerche su più collezioni, eseguite in parallelo
+COLLECTION_FANOUT_WORKERS = int(os.getenv("VECTORSTORE_COLLECTION_FANOUT_WORKERS", "4"))
+_fanout_executor = ThreadPoolExecutor(max_workers=COLLECTION_FANOUT_WORKERS, thread_name_prefix="collection-fanout")
+
+# Cerca anche i vettori indicizzati nella collezione predefinita prima del routing per collezione
+LEGACY_COLLECTION_FALLBACK = os.getenv("VECTORSTORE_LEGACY_COLLECTION_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+
+def _and_where(*clauses: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Combina in AND le clausole `where` di ChromaDB non vuote."""
+    clauses = [clause for clause in clauses if clause]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _vector_distance(space: str, a: List[float], b: List[float]) -> float:
+    """Distanza tra due vettori con la stessa definizione di hnswlib per lo spazio indicato."""
+    if space == "ip":
+        return 1.0 - sum(x * y for x, y in zip(a, b))
+    if space == "cosine":
+        dot = sum(x * y for x, y in zip(a, b))
+        norms = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return 1.0 - dot / norms if norms else 1.0
+    return sum((x - y) ** 2 for x, y in zip(a, b))
+
+
+def _merge_top_k(results: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Unisce i risultati di più collezioni: ordine per similarità, un solo risultato per ID."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        current = merged.get(result['id'])
+        if current is None or result['similarity_score'] > current['similarity_score']:
+            merged[result['id']] = result
+    return sorted(merged.values(), key=lambda result: result['similarity_score'], reverse=True)[:limit]
+
+
 class DocumentManager:
     """
     Gestore centralizzato per documenti e metadati.
@@ -99,7 +152,9 @@ class DocumentManager:
             document_data = {
                 'id': doc_id,
                 'content': content,
-                **metadata
+                **metadata,
+                # Metadati completi per document_metadata (filtri tipizzati, indice full-text)
+                'metadata': metadata
             }
             
             # 1. Aggiungi sempre a SQLite per metadati e accesso diretto
@@ -112,20 +167,12 @@ class DocumentManager:
             should_vectorize = self._should_vectorize_content(content, metadata)
             
             if should_vectorize:
-                try:
-                    collection = self.vector_db.get_collection()
-                    if collection:
-                        collection.add(
-                            documents=[content],
-                            metadatas=[metadata],
-                            ids=[doc_id]
-                        )
-                        logger.info(f"Documento {doc_id} aggiunto anche a ChromaDB (vettorizzato)")
-                    else:
-                        logger.warning(f"ChromaDB collection non disponibile per {doc_id}")
-                except Exception as e:
-                    logger.warning(f"Errore aggiunta a ChromaDB per {doc_id}: {e}")
-                    # Non fallire se ChromaDB ha problemi
+                # Non fallire se ChromaDB ha problemi: vectorize_documents non solleva eccezioni
+                status = self.vectorize_documents([{'id': doc_id, 'content': content, 'metadata': metadata}])[0]
+                if status['vectorized']:
+                    logger.info(f"Documento {doc_id} aggiunto anche a ChromaDB (vettorizzato)")
+                else:
+                    logger.warning(f"Errore aggiunta a ChromaDB per {doc_id}: {status.get('vector_error')}")
             else:
                 logger.info(f"Documento {doc_id} NON aggiunto a ChromaDB (contenuto non vettorizzabile)")
             
@@ -136,6 +183,141 @@ class DocumentManager:
             logger.error(f"Errore coordinamento aggiunta documento {doc_id}: {e}")
             return False
     
+    def add_documents(self, documents: List[Dict[str, Any]], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """
+        Aggiunge più documenti in blocco a entrambi i database.
+
+        SQLite viene scritto con un'unica transazione; ChromaDB riceve `upsert` a blocchi
+        di `batch_size` documenti con embedding calcolati in batch. Gli ID ripetuti nel
+        batch vengono ridotti all'ultima occorrenza; le precedenti risultano 'duplicate'.
+
+        Args:
+            documents: Lista di dict con 'id', 'content' e 'metadata'
+            batch_size: Dimensione dei blocchi inviati a ChromaDB
+
+        Returns:
+            Lista con lo stato di ogni documento, nello stesso ordine dell'input
+        """
+        statuses = [
+            {'id': doc['id'], 'status': 'created', 'vectorized': False}
+            for doc in documents
+        ]
+        if not documents:
+            return statuses
+
+        # ID ripetuti: vale l'ultima occorrenza (ChromaDB rifiuterebbe l'intero blocco)
+        last_index = {doc['id']: i for i, doc in enumerate(documents)}
+        for i, doc in enumerate(documents):
+            if last_index[doc['id']] != i:
+                statuses[i]['status'] = 'duplicate'
+                statuses[i]['error'] = "ID ripetuto nel batch: sostituito da un'occorrenza successiva"
+        unique_indexes = sorted(last_index.values())
+        documents = [documents[i] for i in unique_indexes]
+
+        # 1. SQLite: un'unica transazione per tutto il batch
+        sqlite_result = self.metadata_db.add_documents([
+            {
+                'id': doc['id'],
+                'content': doc.get('content', ''),
+                **(doc.get('metadata') or {}),
+                'metadata': doc.get('metadata') or {}
+            }
+            for doc in documents
+        ])
+        if not sqlite_result.get('success'):
+            error = sqlite_result.get('error', 'Errore SQLite')
+            logger.error(f"Errore aggiunta batch a SQLite: {error}")
+            for i in unique_indexes:
+                statuses[i]['status'] = 'error'
+                statuses[i]['error'] = error
+            return statuses
+
+        # 2. ChromaDB: solo i contenuti vettorizzabili, a blocchi
+        vector_statuses = self.vectorize_documents(documents, batch_size=batch_size)
+        for item, vector_status in zip((statuses[i] for i in unique_indexes), vector_statuses):
+            item['vectorized'] = vector_status['vectorized']
+            if 'vector_error' in vector_status:
+                item['vector_error'] = vector_status['vector_error']
+
+        vectorizable = sum(1 for vector_status in vector_statuses if vector_status['vectorizable'])
+        logger.info(f"Batch di {len(documents)} documenti aggiunto ({vectorizable} vettorizzabili)")
+        return statuses
+
+    @staticmethod
+    def _document_collection(document: Dict[str, Any]) -> Optional[str]:
+        """Collezione logica del documento, con le stesse regole di SQLite."""
+        metadata = document.get('metadata') or {}
+        return (document.get('collection') or metadata.get('collection')
+                or metadata.get('collection_name') or None)
+    
+    def vectorize_documents(self, documents: List[Dict[str, Any]], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """
+        Scrive in ChromaDB (upsert) i documenti vettorizzabili, a blocchi con embedding calcolati in batch.
+        Non scrive su SQLite (usato anche dalla riconciliazione per ricostruire i vettori mancanti).
+        
+        Ogni documento va nella collezione ChromaDB della sua collezione logica, con il
+        modello di embedding configurato per quella collezione.
+
+        Args:
+            documents: Lista di dict con 'id', 'content' e 'metadata'
+            batch_size: Dimensione dei blocchi inviati a ChromaDB
+
+        Returns:
+            Lista, nello stesso ordine dell'input, di dict con 'id', 'vectorizable',
+            'vectorized' ed eventualmente 'vector_error'
+        """
+        statuses = [{'id': doc['id'], 'vectorizable': False, 'vectorized': False} for doc in documents]
+        by_collection: Dict[str, List[Any]] = {}
+        for i, doc in enumerate(documents):
+            if self._should_vectorize_content(doc.get('content') or '', doc.get('metadata') or {}):
+                statuses[i]['vectorizable'] = True
+                target = resolve_collection_name(self._document_collection(doc))
+                by_collection.setdefault(target, []).append((i, doc))
+
+        for collection_name, to_vectorize in by_collection.items():
+            collection = self.vector_db.get_collection(collection_name)
+            if not collection:
+                logger.warning(f"ChromaDB collection '{collection_name}' non disponibile per l'aggiunta batch")
+                for i, _ in to_vectorize:
+                    statuses[i]['vector_error'] = "ChromaDB collection non disponibile"
+                continue
+            
+            model_name = self.vector_db.get_collection_settings(collection_name)["embedding_model"]
+            for start in range(0, len(to_vectorize), batch_size):
+                chunk = to_vectorize[start:start + batch_size]
+                contents = [doc.get('content', '') for _, doc in chunk]
+                add_kwargs = {
+                    'documents': contents,
+                    # ChromaDB rifiuta i metadati vuoti: None per i documenti senza metadati
+                    'metadatas': [doc.get('metadata') or None for _, doc in chunk],
+                    'ids': [doc['id'] for _, doc in chunk]
+                }
+                try:
+                    # I chunk già indicizzati riusano il vettore archiviato
+                    add_kwargs['embeddings'] = embedding_manager.encode_documents(contents, model_name=model_name)
+                except ImportError:
+                    # Senza sentence-transformers ChromaDB calcola gli embedding da sé
+                    pass
+
+                try:
+                    # L'handle va riletto dentro la scrittura: l'indice può essere stato sostituito
+                    with self.vector_db.writing(collection_name, add_kwargs['ids']):
+                        # Upsert come SQLite: un ID già presente riceve il nuovo contenuto e vettore
+                        existing = self.vector_db.get_collection(collection_name).get(
+                            ids=add_kwargs['ids'], include=[]
+                        )['ids']
+                        self.vector_db.store_vectors(collection_name, upsert=True, **add_kwargs)
+                    stats_service.record_chroma_change(len(chunk) - len(existing))
+                    for i, _ in chunk:
+                        statuses[i]['vectorized'] = True
+                except Exception as e:
+                    # Non fallire se ChromaDB ha problemi: i documenti restano in SQLite
+                    logger.warning(f"Errore aggiunta batch a ChromaDB ({len(chunk)} documenti): {e}")
+                    for i, _ in chunk:
+                        statuses[i]['vector_error'] = str(e)
+
+        return statuses
+
     def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """
         Recupera un documento usando l'approccio ibrido.
@@ -156,13 +338,16 @@ class DocumentManager:
                 logger.debug(f"Documento {doc_id} trovato in SQLite")
                 return document
             
-            # 2. Fallback su ChromaDB
+            # 2. Fallback su ChromaDB: la collezione non è nota, si cercano tutte
             try:
-                collection = self.vector_db.get_collection()
-                if collection:
+                other_collections = sorted(set(self.vector_db.list_collections()) - {CHROMA_COLLECTION_NAME})
+                for collection_name in [CHROMA_COLLECTION_NAME] + other_collections:
+                    collection = self.vector_db.get_collection(collection_name, create=False)
+                    if not collection:
+                        continue
                     result = collection.get(ids=[doc_id])
                     if result and result.get('documents') and len(result['documents']) > 0:
-                        logger.debug(f"Documento {doc_id} trovato in ChromaDB")
+                        logger.debug(f"Documento {doc_id} trovato in ChromaDB (collezione {collection_name})")
                         doc_content = result['documents'][0]
                         doc_metadata = result.get('metadatas', [{}])[0] or {}
                         
@@ -204,27 +389,33 @@ class DocumentManager:
             # 2. Per ChromaDB, devo rimuovere e riaggiungi (update pattern)
             if content is not None:
                 try:
-                    collection = self.vector_db.get_collection()
-                    if collection:
-                        # Ottieni metadati attuali
-                        current_doc = self.get_document(doc_id)
-                        updated_metadata = current_doc.copy() if current_doc else {}
-                        if metadata:
-                            updated_metadata.update(metadata)
-                        
-                        # Rimuovi il documento esistente
-                        try:
-                            collection.delete(ids=[doc_id])
-                        except:
-                            pass  # Ignora errori se il documento non esiste
-                        
-                        # Aggiungi il documento aggiornato
-                        collection.add(
-                            documents=[content],
-                            metadatas=[updated_metadata],
-                            ids=[doc_id]
-                        )
-                        logger.info(f"Documento {doc_id} aggiornato in ChromaDB")
+                    # Ottieni metadati attuali
+                    current_doc = self.get_document(doc_id)
+                    collection_name = resolve_collection_name(self._document_collection(current_doc or {}))
+                    # La collezione va aperta (o creata) prima di leggerne le impostazioni: il
+                    # documento può essere il primo vettore della sua collezione
+                    if not self.vector_db.get_collection(collection_name):
+                        raise RuntimeError(f"ChromaDB collection '{collection_name}' non disponibile")
+                    settings = self.vector_db.get_collection_settings(collection_name) or default_collection_settings()
+                    add_kwargs = {'documents': [content], 'ids': [doc_id]}
+                    try:
+                        # Se il contenuto non è cambiato il vettore arriva dall'archivio degli embedding
+                        model_name = settings["embedding_model"]
+                        add_kwargs['embeddings'] = embedding_manager.encode_documents([content], model_name=model_name)
+                    except ImportError:
+                        # Senza sentence-transformers ChromaDB calcola gli embedding da sé
+                        pass
+                    with self.vector_db.writing(collection_name, [doc_id]):
+                        collection = self.vector_db.get_collection(collection_name)
+                        if collection:
+                            updated_metadata = current_doc.copy() if current_doc else {}
+                            if metadata:
+                                updated_metadata.update(metadata)
+                            
+                            # Sostituisce il documento esistente (o lo aggiunge se manca)
+                            self.vector_db.store_vectors(collection_name, metadatas=[updated_metadata],
+                                                         upsert=True, **add_kwargs)
+                            logger.info(f"Documento {doc_id} aggiornato in ChromaDB")
                 except Exception as e:
                     logger.warning(f"Errore aggiornamento ChromaDB per {doc_id}: {e}")
             
@@ -248,6 +439,15 @@ class DocumentManager:
         try:
             success_count = 0
             
+            # La collezione va letta prima di eliminare il documento da SQLite
+            collection_name = CHROMA_COLLECTION_NAME
+            try:
+                existing = self.metadata_db.get_document(doc_id)
+                if existing:
+                    collection_name = resolve_collection_name(self._document_collection(existing))
+            except Exception as e:
+                logger.warning(f"Errore lettura collezione del documento {doc_id}: {e}")
+            
             # 1. Elimina da SQLite
             try:
                 sqlite_success = self.metadata_db.delete_document(doc_id)
@@ -257,11 +457,25 @@ class DocumentManager:
             except Exception as e:
                 logger.warning(f"Errore eliminazione da SQLite per {doc_id}: {e}")
             
-            # 2. Elimina da ChromaDB
+            # 2. Elimina da ChromaDB (anche dalla collezione predefinita, per i vettori indicizzati
+            # prima del routing per collezione)
             try:
-                collection = self.vector_db.get_collection()
-                if collection:
-                    collection.delete(ids=[doc_id])
+                collection_names = [collection_name]
+                if LEGACY_COLLECTION_FALLBACK and collection_name != CHROMA_COLLECTION_NAME:
+                    collection_names.append(CHROMA_COLLECTION_NAME)
+                deleted = False
+                removed = 0
+                for name in collection_names:
+                    with self.vector_db.writing(name, [doc_id]):
+                        collection = self.vector_db.get_collection(name, create=False)
+                        if collection:
+                            # Solo i vettori effettivamente presenti contano per le statistiche
+                            removed += len(collection.get(ids=[doc_id], include=[])['ids'])
+                            self.vector_db.delete_vectors(name, [doc_id])
+                            deleted = True
+                if removed > 0:
+                    stats_service.record_chroma_change(-removed)
+                if deleted:
                     success_count += 1
                     logger.debug(f"Documento {doc_id} eliminato da ChromaDB")
             except Exception as e:
@@ -279,34 +493,143 @@ class DocumentManager:
             logger.error(f"Errore eliminazione documento {doc_id}: {e}")
             return False
     
-    def search_documents(self, query: str, limit: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _distance_to_similarity(distance: float) -> float:
+        """Converte una distanza ChromaDB in score di similarità (0-1)."""
+        # 🔧 FIX: Usa formula normalizzata per distanze > 1.0
+        # ChromaDB può restituire distanze > 1.0 con certi embedding models
+        if distance <= 1.0:
+            return max(0.0, 1.0 - distance)
+        # Normalizzazione con radice quadrata per distanze > 1.0
+        return max(0.0, 1.0 - math.sqrt(distance) / 2.0)
+    
+    def _search_targets(self, collections: Optional[List[str]]) -> List[Any]:
+        """
+        Collezioni ChromaDB da interrogare per le collezioni logiche richieste.
+        
+        Returns:
+            Lista di tuple (collezione ChromaDB, clausola where aggiuntiva o None).
+            Senza collezioni (o con la predefinita) si cercano tutte le collezioni.
+        """
+        # Elenco dal registro degli handle: ChromaDB è interrogato solo se manca una collezione
+        if not collections or any(is_default_collection(name) for name in collections):
+            return [(name, None) for name in self.vector_db.cached_collections()]
+        
+        existing = set(self.vector_db.cached_collections())
+        if not {resolve_collection_name(name) for name in collections} <= existing:
+            existing = set(self.vector_db.cached_collections(refresh=True))
+        targets = []
+        legacy = []
+        for name in dict.fromkeys(collections):
+            target = resolve_collection_name(name)
+            if target != CHROMA_COLLECTION_NAME:
+                if target in existing:
+                    targets.append((target, None))
+                if not LEGACY_COLLECTION_FALLBACK:
+                    continue
+            # Nome non valido per ChromaDB o vettori indicizzati prima del routing per collezione
+            legacy.append(name)
+        
+        if legacy and CHROMA_COLLECTION_NAME in existing:
+            where = {"collection": legacy[0]} if len(legacy) == 1 else {"collection": {"$in": legacy}}
+            targets.append((CHROMA_COLLECTION_NAME, where))
+        return targets
+    
+    def search_embedding_models(self, collections: Optional[List[str]] = None) -> List[str]:
+        """
+        Modelli di embedding delle collezioni ChromaDB interrogate da una ricerca.
+        
+        Permette di calcolare gli embedding della query prima della ricerca (nel pool
+        dedicato) e di passarli a search_documents/hybrid_search con `query_embeddings`.
+        """
+        models = []
+        for collection_name, _ in self._search_targets(collections):
+            settings = self.vector_db.get_collection_settings(collection_name)
+            # Collezione eliminata o sostituita nel frattempo: la ricerca calcolerà da sé l'embedding
+            if settings is not None:
+                models.append(settings["embedding_model"])
+        return list(dict.fromkeys(models))
+    
+    @staticmethod
+    def _query_embedding(query: str, model_name: str,
+                         query_embeddings: Optional[Dict[str, List[float]]]) -> List[float]:
+        """Embedding della query per un modello: precalcolato se disponibile, altrimenti calcolato qui."""
+        if query_embeddings and query_embeddings.get(model_name) is not None:
+            return query_embeddings[model_name]
+        return embedding_manager.encode_query(query, model_name=model_name)
+    
+    def search_documents(self, query: str, limit: int = 10, where: Optional[Dict[str, Any]] = None,
+                         metadata_filter: Optional[Dict[str, Any]] = None,
+                         collections: Optional[List[str]] = None,
+                         query_embeddings: Optional[Dict[str, List[float]]] = None) -> List[Dict[str, Any]]:
         """
         Esegue ricerca semantica usando ChromaDB.
         
         Args:
             query: Query di ricerca
             limit: Numero massimo di risultati
-            where: Filtri metadati (opzionale)
+            where: Filtri metadati in formato ChromaDB (opzionale)
+            metadata_filter: Filtro tipizzato (vedi app.utils.metadata_filter), applicato
+                prima della ricerca vettoriale (opzionale)
+            collections: Collezioni logiche in cui cercare (default: tutte). Con più
+                collezioni le ricerche sono eseguite in parallelo e fuse in un unico top-k
+            query_embeddings: Embedding della query già calcolati, per nome del modello
+                (vedi search_embedding_models); i modelli mancanti vengono calcolati qui
             
         Returns:
             Lista di documenti con score di similarità
+        
+        Raises:
+            MetadataFilterError: Se metadata_filter non è valido o troppo poco selettivo.
         """
+        targets = self._search_targets(collections)
+        if metadata_filter:
+            chroma_where = to_chroma_where(metadata_filter)
+            if chroma_where is None:
+                # Filtro non esprimibile in ChromaDB: preselezione su SQLite e ranking esatto
+                return self._search_prefiltered(query, limit, where, metadata_filter, collections, targets,
+                                                query_embeddings)
+            where = _and_where(where, chroma_where)
+        
+        if not targets:
+            logger.warning(f"Nessuna collezione ChromaDB per la ricerca in {collections}")
+            return []
+        if len(targets) == 1:
+            collection_name, target_where = targets[0]
+            return self._search_collection(collection_name, query, limit, _and_where(where, target_where),
+                                           query_embeddings)
+        
+        futures = [
+            _fanout_executor.submit(self._search_collection, collection_name, query, limit,
+                                    _and_where(where, target_where), query_embeddings)
+            for collection_name, target_where in targets
+        ]
+        results = [result for future in futures for result in future.result()]
+        logger.debug(f"Ricerca su {len(targets)} collezioni: {len(results)} risultati prima della fusione")
+        return _merge_top_k(results, limit)
+    
+    def _search_collection(self, collection_name: str, query: str, limit: int,
+                           where: Optional[Dict[str, Any]],
+                           query_embeddings: Optional[Dict[str, List[float]]] = None) -> List[Dict[str, Any]]:
+        """Ricerca semantica su una singola collezione ChromaDB."""
         try:
             # Usa ChromaDB per ricerca semantica
-            collection = self.vector_db.get_collection()
+            collection = self.vector_db.get_collection(collection_name, create=False)
             if not collection:
-                logger.warning("ChromaDB collection non disponibile per ricerca")
+                logger.warning(f"ChromaDB collection '{collection_name}' non disponibile per ricerca")
                 return []
+            settings = self.vector_db.get_collection_settings(collection_name)
             
             # 🔧 FIX: Genera embedding con lo stesso modello usato per l'indicizzazione
             try:
-                from sentence_transformers import SentenceTransformer
-                model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-                query_embedding = model.encode([query], normalize_embeddings=True)[0].tolist()
+                # Il modello resta caricato nel processo: niente reload ad ogni query
+                query_embedding = self._query_embedding(query, settings["embedding_model"], query_embeddings)
                 
                 # Usa query_embeddings invece di query_texts per consistenza del modello
-                results = collection.query(
-                    query_embeddings=[query_embedding],  # ✅ Stesso modello dell'indicizzazione
+                # (le collezioni quantizzate sono cercate sul proprio indice)
+                results = self.vector_db.query_vectors(
+                    collection_name,
+                    query_embedding,  # ✅ Stesso modello dell'indicizzazione
                     n_results=limit,
                     where=where
                 )
@@ -335,34 +658,201 @@ class DocumentManager:
             for i, doc_content in enumerate(documents):
                 # Converti distanza coseno in score similarità (0-1)
                 distance = distances[i] if i < len(distances) else 1.0
-                
-                # 🔧 FIX: Usa formula normalizzata per distanze > 1.0
-                # ChromaDB può restituire distanze > 1.0 con certi embedding models
-                import math
-                if distance <= 1.0:
-                    similarity_score = max(0.0, 1.0 - distance)
-                else:
-                    # Normalizzazione con radice quadrata per distanze > 1.0
-                    similarity_score = max(0.0, 1.0 - math.sqrt(distance) / 2.0)
+                similarity_score = self._distance_to_similarity(distance)
                 
                 # DEBUG: Log delle distanze
                 print(f"[DEBUG] Doc {i}: distance={distance}, similarity={similarity_score}")
                 
+                metadata = metadatas[i] if i < len(metadatas) else {}
                 doc_data = {
                     'id': ids[i] if i < len(ids) else f"doc_{i}",
                     'content': doc_content,
                     'similarity_score': similarity_score,
-                    'metadata': metadatas[i] if i < len(metadatas) else {}
+                    'metadata': metadata,
+                    'collection': (metadata or {}).get('collection') or collection_name
                 }
                 formatted_results.append(doc_data)
             
-            logger.debug(f"Ricerca semantica completata: {len(formatted_results)} risultati")
+            logger.debug(f"Ricerca semantica su '{collection_name}' completata: {len(formatted_results)} risultati")
             return formatted_results
             
         except Exception as e:
-            logger.error(f"Errore ricerca documenti: {e}")
+            logger.error(f"Errore ricerca documenti nella collezione '{collection_name}': {e}")
             return []
     
+    def _search_prefiltered(self, query: str, limit: int, where: Optional[Dict[str, Any]],
+                            metadata_filter: Dict[str, Any], collections: Optional[List[str]],
+                            targets: List[Any],
+                            query_embeddings: Optional[Dict[str, List[float]]] = None) -> List[Dict[str, Any]]:
+        """
+        Ricerca vettoriale esatta sui soli documenti che soddisfano il filtro.
+        
+        Gli ID candidati vengono selezionati su SQLite con gli indici tipizzati (già
+        ristretti alle collezioni richieste); i loro embedding vengono letti da ciascuna
+        collezione ChromaDB e ordinati con la metrica HNSW di quella collezione.
+        """
+        if collections and not any(is_default_collection(name) for name in collections):
+            metadata_filter = {"and": [metadata_filter, {"field": "collection", "op": "in", "value": list(collections)}]}
+        candidate_ids = self.metadata_db.filter_document_ids(metadata_filter, limit=FILTER_PREFILTER_MAX_IDS + 1)
+        if len(candidate_ids) > FILTER_PREFILTER_MAX_IDS:
+            raise MetadataFilterError(
+                f"Il filtro seleziona più di {FILTER_PREFILTER_MAX_IDS} documenti: restringere il filtro"
+            )
+        if not candidate_ids:
+            return []
+        
+        results = []
+        for collection_name, _ in targets:
+            try:
+                collection = self.vector_db.get_collection(collection_name, create=False)
+                if not collection:
+                    continue
+                settings = self.vector_db.get_collection_settings(collection_name)
+                
+                query_embedding = self._query_embedding(query, settings["embedding_model"], query_embeddings)
+                data = self.vector_db.fetch_vectors(collection_name, ids=candidate_ids, where=where or None,
+                                                    include=["embeddings", "documents", "metadatas"])
+            except Exception as e:
+                logger.error(f"Errore ricerca con preselezione nella collezione '{collection_name}': {e}")
+                continue
+            
+            documents = data.get('documents') or []
+            metadatas = data.get('metadatas') or []
+            for i, doc_id in enumerate(data.get('ids') or []):
+                distance = _vector_distance(settings["space"], query_embedding, data['embeddings'][i])
+                metadata = metadatas[i] if i < len(metadatas) and metadatas[i] else {}
+                results.append({
+                    'id': doc_id,
+                    'content': documents[i] if i < len(documents) else '',
+                    'similarity_score': self._distance_to_similarity(distance),
+                    'metadata': metadata,
+                    'collection': metadata.get('collection') or collection_name
+                })
+        
+        return _merge_top_k(results, limit)
+    
+    def full_text_search(self, query: str, collection: Optional[str] = None,
+                         limit: int = 20, offset: int = 0,
+                         fields: Optional[List[str]] = None,
+                         metadata_filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ricerca lessicale (FTS5, ranking BM25) su nome file, contenuto e metadati.
+        
+        Args:
+            query: Testo da cercare
+            collection: Filtra per collezione (opzionale)
+            limit: Numero di risultati nella pagina
+            offset: Offset per la paginazione
+            fields: Campi da restituire (opzionale)
+            metadata_filters: Filtri di uguaglianza sui metadati (opzionale)
+        
+        Returns:
+            Dict con 'results' e 'total'
+        """
+        try:
+            return self.metadata_db.full_text_search(
+                query, collection=collection, limit=limit, offset=offset, fields=fields,
+                metadata_filters=metadata_filters
+            )
+        except Exception as e:
+            logger.error(f"Errore ricerca full-text: {e}")
+            return {"results": [], "total": 0, "error": str(e)}
+    
+    def hybrid_search(self, query: str, limit: int = 10, where: Optional[Dict[str, Any]] = None,
+                      fusion: str = "rrf", rrf_k: int = DEFAULT_RRF_K,
+                      vector_weight: float = 1.0, lexical_weight: float = 1.0,
+                      candidates: Optional[int] = None,
+                      metadata_filter: Optional[Dict[str, Any]] = None,
+                      collections: Optional[List[str]] = None,
+                      query_embeddings: Optional[Dict[str, List[float]]] = None) -> Dict[str, Any]:
+        """
+        Ricerca ibrida: ricerca vettoriale (ChromaDB) e lessicale (FTS5/BM25) eseguite
+        in parallelo e fuse in un'unica classifica.
+        
+        Args:
+            query: Query di ricerca
+            limit: Numero di risultati finali
+            where: Filtri di uguaglianza sui metadati, applicati a entrambi i rami
+            fusion: "rrf" (Reciprocal Rank Fusion) o "weighted" (punteggi normalizzati)
+            rrf_k: Costante della RRF
+            vector_weight: Peso del ramo vettoriale
+            lexical_weight: Peso del ramo lessicale
+            candidates: Risultati richiesti a ciascun ramo (default: max(4 * limit, 20))
+            metadata_filter: Filtro tipizzato applicato a entrambi i rami (opzionale)
+            collections: Collezioni logiche in cui cercare (default: tutte)
+            query_embeddings: Embedding della query già calcolati, per nome del modello
+        
+        Returns:
+            Dict con 'results' (ordinati per 'hybrid_score') e 'timings_ms' per ramo.
+        """
+        if fusion not in ("rrf", "weighted"):
+            raise ValueError(f"Metodo di fusione non supportato: {fusion}")
+        
+        candidates = candidates or max(4 * limit, 20)
+        # Il ramo lessicale supporta solo uguaglianze semplici; gli operatori Chroma ($and, $in, ...) no
+        lexical_supported = not where or not any(
+            key.startswith("$") or isinstance(value, (dict, list)) for key, value in where.items()
+        )
+        lexical_filters = where if where and lexical_supported else None
+        if metadata_filter:
+            lexical_filters = {"and": [lexical_filters, metadata_filter]} if lexical_filters else metadata_filter
+        if collections and not any(is_default_collection(name) for name in collections):
+            collection_filter = {"field": "collection", "op": "in", "value": list(collections)}
+            lexical_filters = {"and": [lexical_filters, collection_filter]} if lexical_filters else collection_filter
+        
+        def timed(func, *args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            return result, (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        vector_future = _hybrid_executor.submit(
+            timed, self.search_documents, query, limit=candidates, where=where or None,
+            metadata_filter=metadata_filter, collections=collections, query_embeddings=query_embeddings
+        )
+        lexical_future = None
+        if lexical_supported:
+            lexical_future = _hybrid_executor.submit(
+                timed, self.full_text_search, query, limit=candidates, metadata_filters=lexical_filters
+            )
+        
+        vector_results, vector_ms = vector_future.result()
+        lexical_results, lexical_ms = [], 0.0
+        if lexical_future is not None:
+            lexical_search, lexical_ms = lexical_future.result()
+            lexical_results = [
+                {**result, 'lexical_score': result.pop('score', 0.0)}
+                for result in lexical_search.get("results", [])
+            ]
+        
+        fusion_start = time.perf_counter()
+        result_lists = {"vector": vector_results, "lexical": lexical_results}
+        weights = {"vector": vector_weight, "lexical": lexical_weight}
+        if fusion == "rrf":
+            fused = reciprocal_rank_fusion(result_lists, k=rrf_k, weights=weights)
+        else:
+            fused = weighted_score_fusion(
+                result_lists,
+                score_keys={"vector": "similarity_score", "lexical": "lexical_score"},
+                weights=weights
+            )
+        fusion_ms = (time.perf_counter() - fusion_start) * 1000
+        
+        return {
+            "results": fused[:limit],
+            "fusion": fusion,
+            "legs": {
+                "vector": len(vector_results),
+                "lexical": len(lexical_results) if lexical_future is not None else None
+            },
+            "timings_ms": {
+                "vector": round(vector_ms, 2),
+                "lexical": round(lexical_ms, 2),
+                "fusion": round(fusion_ms, 2),
+                "total": round((time.perf_counter() - start) * 1000, 2)
+            }
+        }
+    
     def list_all_documents(self) -> List[str]:
         """
         Restituisce lista di tutti gli ID documento da SQLite.
@@ -398,100 +888,101 @@ class DocumentManager:
             
             return []  # Sempre restituire una lista, mai None
     
-    def get_statistics(self) -> Dict[str, int]:
+    def get_documents_page(self, limit: int = 50, cursor: Optional[str] = None,
+                           collection: Optional[str] = None, offset: int = 0,
+                           fields: Optional[List[str]] = None,
+                           metadata_filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Restituisce statistiche sui database.
+        Restituisce una pagina di documenti con paginazione keyset lato SQLite.
+        
+        Se SQLite è vuoto legge la sola pagina richiesta da ChromaDB (limit/offset),
+        senza caricare l'intera collezione.
+        
+        Args:
+            limit: Numero di documenti nella pagina
+            cursor: Cursore opaco restituito dalla pagina precedente
+            collection: Filtra per collezione (opzionale)
+            offset: Offset legacy, usato solo senza cursore
+            fields: Campi da restituire (opzionale)
+            metadata_filter: Filtro tipizzato sui metadati (opzionale)
         
         Returns:
-            Dict con contatori documenti per database
+            Dict con 'documents', 'next_cursor' e 'total'.
+        
+        Raises:
+            ValueError: Se il cursore o il filtro non sono validi.
         """
+        page = self.metadata_db.get_documents_page(
+            limit=limit, cursor_token=cursor, collection=collection, offset=offset, fields=fields,
+            metadata_filter=metadata_filter
+        )
+        if page["documents"] or page["total"] or cursor or metadata_filter:
+            return page
+    
+        # SQLite vuoto: fallback a ChromaDB, una pagina alla volta
         try:
-            # Ottieni documenti completi dal metadata database
-            all_docs = self.metadata_db.get_documents()
-            if all_docs is None:
-                all_docs = []
-            
-            # Calcola documenti creati oggi
-            from datetime import datetime, date
-            today = date.today()
-            documents_today = 0
-            
-            for doc in all_docs:
-                if doc and isinstance(doc, dict) and 'created_at' in doc:
-                    try:
-                        # Parse della data di creazione
-                        created_date_str = doc['created_at']
-                        if created_date_str:
-                            created_date = datetime.fromisoformat(created_date_str.replace('Z', '+00:00')).date()
-                            if created_date == today:
-                                documents_today += 1
-                    except (ValueError, AttributeError, TypeError):
-                        continue
-            
-            stats = {
-                'sqlite_documents': self.metadata_db.get_document_count(),
-                'chroma_collections': 0,
-                'chroma_documents': 0,
-                'documents_total': len(all_docs),
-                'documents_today': documents_today,
-                'collections': 0,
-                'processing_queue': 0
-            }
-            
-            # Statistiche ChromaDB
-            try:
-                collections = self.vector_db.list_collections()
-                stats['chroma_collections'] = len(collections)
-                stats['collections'] = len(collections)
-                
-                # Conta documenti nella collezione principale
-                collection = self.vector_db.get_collection()
-                if collection:
-                    stats['chroma_documents'] = collection.count()
-                
-            except Exception as e:
-                logger.warning(f"Errore statistiche ChromaDB: {e}")
-            
-            return stats
-            
+            chroma_collection = self.vector_db.get_collection()
+            if chroma_collection:
+                chroma_data = chroma_collection.get(limit=limit, offset=offset) or {}
+                ids = chroma_data.get('ids') or []
+                contents = chroma_data.get('documents') or []
+                metadatas = chroma_data.get('metadatas') or []
+                documents = [
+                    {
+                        'id': doc_id,
+                        'content': contents[i] if i < len(contents) else '',
+                        'metadata': metadatas[i] if i < len(metadatas) and metadatas[i] else {}
+                    }
+                    for i, doc_id in enumerate(ids)
+                ]
+                return {
+                    "documents": documents,
+                    "next_cursor": None,
+                    "total": chroma_collection.count()
+                }
         except Exception as e:
-            logger.error(f"Errore calcolo statistiche: {e}")
-            return {'sqlite_documents': 0, 'chroma_collections': 0, 'chroma_documents': 0, 'documents_total': 0, 'documents_today': 0, 'collections': 0, 'processing_queue': 0}
+            logger.error(f"Errore fallback ChromaDB per la paginazione: {e}")
+    
+        return page
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Restituisce statistiche sui database.
+        
+        I valori sono letti dai contatori mantenuti in modo incrementale
+        (vedi app.services.stats_service), senza caricare i documenti.
+        
+        Returns:
+            Dict con contatori documenti per database
+        """
+        return stats_service.get_statistics()
     
     def sync_databases(self) -> Dict[str, Any]:
         """
-        Sincronizza i due database, risolvendo inconsistenze.
+        Confronta i due database e riporta le inconsistenze, senza correggerle.
+        
+        Il confronto è un merge join sugli ID letti a pagine (vedi
+        app.services.reconciliation); per correggere le inconsistenze
+        avviare un job con POST /reconciliation/jobs.
         
         Returns:
             Dict con risultati della sincronizzazione
         """
         try:
             logger.info("Iniziando sincronizzazione database...")
+            from app.services.reconciliation import reconciliation_service
             
-            # Ottieni liste documenti
-            sqlite_docs = set(self.list_all_documents())
-            
-            # Per ChromaDB
-            chroma_docs = set()
-            try:
-                collection = self.vector_db.get_collection()
-                if collection:
-                    result = collection.get()
-                    if result and result.get('ids'):
-                        chroma_docs.update(result['ids'])
-            except Exception as e:
-                logger.warning(f"Errore lettura ChromaDB durante sync: {e}")
-            
-            # Identifica inconsistenze
-            only_in_sqlite = sqlite_docs - chroma_docs
-            only_in_chroma = chroma_docs - sqlite_docs
+            progress = reconciliation_service.diff()
             
             sync_result = {
-                'total_sqlite': len(sqlite_docs),
-                'total_chroma': len(chroma_docs),
-                'only_in_sqlite': len(only_in_sqlite),
-                'only_in_chroma': len(only_in_chroma),
-                'synchronized': len(sqlite_docs & chroma_docs),
+                'success': True,
+                'total_sqlite': progress['sqlite_scanned'],
+                'total_chroma': progress['chroma_scanned'],
+                'only_in_sqlite': progress['only_in_sqlite'],
+                'only_in_sqlite_not_vectorizable': progress['only_in_sqlite_not_vectorizable'],
+                'only_in_chroma': progress['only_in_chroma'],
+                'synchronized': progress['matched'],
+                'samples': progress['samples'],
                 'actions_taken': []
             }
             
@@ -547,15 +1038,19 @@ class DocumentManager:
             
             success_count = 0
             
-            # 1. Reset ChromaDB
+            # 1. Reset ChromaDB (tutte le collezioni)
             try:
-                collection = self.vector_db.get_collection()
-                if collection:
+                for collection_name in self.vector_db.list_collections():
+                    collection = self.vector_db.get_collection(collection_name, create=False)
+                    if not collection:
+                        continue
                     # Ottieni tutti gli ID e li elimina
-                    result = collection.get()
+                    result = collection.get(include=[])
                     if result and result.get('ids'):
-                        collection.delete(ids=result['ids'])
-                        logger.info(f"ChromaDB resettato: {len(result['ids'])} documenti eliminati")
+                        with self.vector_db.writing(collection_name, result['ids']):
+                            self.vector_db.delete_vectors(collection_name, result['ids'])
+                        stats_service.record_chroma_change(-len(result['ids']))
+                        logger.info(f"ChromaDB resettato: {len(result['ids'])} documenti eliminati da '{collection_name}'")
                 success_count += 1
             except Exception as e:
                 logger.error(f"Errore reset ChromaDB: {e}")
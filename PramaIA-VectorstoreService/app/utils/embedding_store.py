@@ -0,0 +1,200 @@
+"""
+Archivio persistente degli embedding dei documenti, indirizzato per contenuto.
+
+Ogni vettore è salvato una sola volta con chiave (modello, sha256 del testo) come
+BLOB float32 in un database SQLite dedicato. Quando un file modificato viene
+ricaricato, i chunk identici a quelli già indicizzati trovano qui il loro vettore
+e solo i chunk nuovi o cambiati passano dal modello di embedding.
+"""
+
+import os
+import time
+import array
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Sequence
+
+from app.utils.sqlite_pool import get_pool, PooledConnection
+
+# Configurazione logger
+logger = logging.getLogger(__name__)
+
+# Numero massimo di vettori conservati (0 = nessun limite); oltre il limite si
+# eliminano quelli usati meno di recente
+EMBEDDING_STORE_MAX_ENTRIES = int(os.getenv("VECTORSTORE_EMBEDDING_STORE_MAX_ENTRIES", "0"))
+
+# Hash per statement nelle letture a lotti (limite dei parametri SQLite)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def content_hash(text: str) -> str:
+    """Hash sha256 del testo di un chunk (chiave dell'archivio)."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return array.array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vector = array.array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingStore:
+    """
+    Embedding dei documenti con chiave (modello, hash del contenuto).
+    """
+
+    def __init__(self, db_path: str, max_entries: int = EMBEDDING_STORE_MAX_ENTRIES):
+        """
+        Args:
+            db_path: Percorso del database SQLite dell'archivio
+            max_entries: Numero massimo di vettori conservati (0 = nessun limite)
+        """
+        self.db_path = db_path
+        self.max_entries = max(0, max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.pruned = 0
+        self._init_db()
+
+    def _get_connection(self) -> PooledConnection:
+        return get_pool(self.db_path).acquire()
+
+    def _init_db(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._get_connection()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS document_embeddings (
+                    model TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    dimension INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (model, content_hash)
+                ) WITHOUT ROWID
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_document_embeddings_last_used "
+                "ON document_embeddings(last_used_at)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_many(self, model_name: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """
+        Restituisce i vettori presenti nell'archivio, per hash del contenuto.
+        """
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        if unique:
+            now = time.time()
+            conn = self._get_connection()
+            try:
+                for start in range(0, len(unique), LOOKUP_CHUNK_SIZE):
+                    chunk = unique[start:start + LOOKUP_CHUNK_SIZE]
+                    placeholders = ", ".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT content_hash, vector FROM document_embeddings "
+                        f"WHERE model = ? AND content_hash IN ({placeholders})",
+                        [model_name, *chunk]
+                    ).fetchall()
+                    for row in rows:
+                        found[row[0]] = _unpack(row[1])
+                if found and self.max_entries:
+                    # Serve solo a scegliere cosa eliminare quando l'archivio è limitato
+                    conn.executemany(
+                        "UPDATE document_embeddings SET last_used_at = ? WHERE model = ? AND content_hash = ?",
+                        [(now, model_name, h) for h in found]
+                    )
+                    conn.commit()
+            finally:
+                conn.close()
+
+        with self._lock:
+            hits = sum(1 for h in hashes if h in found)
+            self.hits += hits
+            self.misses += len(hashes) - hits
+        return found
+
+    def put_many(self, model_name: str, vectors: Dict[str, Sequence[float]]) -> None:
+        """
+        Salva i vettori appena calcolati, per hash del contenuto.
+        """
+        if not vectors:
+            return
+        now = time.time()
+        conn = self._get_connection()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO document_embeddings "
+                "(model, content_hash, dimension, vector, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                [(model_name, h, len(v), _pack(v), now) for h, v in vectors.items()]
+            )
+            pruned = 0
+            if self.max_entries:
+                pruned = conn.execute(
+                    "DELETE FROM document_embeddings WHERE (model, content_hash) IN ("
+                    "SELECT model, content_hash FROM document_embeddings ORDER BY last_used_at LIMIT "
+                    "MAX(0, (SELECT COUNT(*) FROM document_embeddings) - ?))",
+                    (self.max_entries,)
+                ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.stored += len(vectors)
+            self.pruned += max(0, pruned)
+
+    def clear(self, model_name: Optional[str] = None) -> int:
+        """
+        Elimina i vettori dell'archivio (di un solo modello, se indicato).
+
+        Returns:
+            Numero di vettori eliminati.
+        """
+        conn = self._get_connection()
+        try:
+            if model_name:
+                deleted = conn.execute("DELETE FROM document_embeddings WHERE model = ?", (model_name,)).rowcount
+            else:
+                deleted = conn.execute("DELETE FROM document_embeddings").rowcount
+            conn.commit()
+            return deleted
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce dimensione dell'archivio e hit rate delle ricerche.
+        """
+        conn = self._get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT model, COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM document_embeddings GROUP BY model"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "db_path": self.db_path,
+                "entries": sum(row[1] for row in rows),
+                "vector_bytes": sum(row[2] for row in rows),
+                "models": {row[0]: row[1] for row in rows},
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stored": self.stored,
+                "pruned": self.pruned,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
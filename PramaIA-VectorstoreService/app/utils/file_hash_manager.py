@@ -3,12 +3,16 @@ Modulo per la gestione degli hash dei file nel VectorstoreService.
 """
 import os
 import hashlib
-import sqlite3
 import logging
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Iterator, Sequence
+
+from app.utils.sqlite_pool import get_pool, PooledConnection
 
 logger = logging.getLogger(__name__)
 
+# Richieste per statement nel controllo duplicati a lotti (4 parametri ciascuna)
+DUPLICATE_CHECK_CHUNK_SIZE = 200
+
 class FileHashManager:
     """
     Gestore degli hash dei file per il rilevamento dei duplicati.
@@ -33,12 +37,19 @@ class FileHashManager:
             
         self._init_db()
         logger.info(f"FileHashManager inizializzato con database: {self.db_path}")
+
+    def _get_connection(self) -> PooledConnection:
+        """
+        Ottiene una connessione WAL persistente dal pool condiviso;
+        `conn.close()` la restituisce al pool.
+        """
+        return get_pool(self.db_path).acquire()
         
     def _init_db(self):
         """
         Inizializza il database degli hash se non esiste.
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         # Crea la tabella file_hashes se non esiste
@@ -58,6 +69,8 @@ class FileHashManager:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_hash ON file_hashes (file_hash)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_document_id ON file_hashes (document_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_client_path ON file_hashes (client_id, original_path)')
+        # Ordinamento per data di upload usato dalla paginazione
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_time_hash ON file_hashes (upload_time, file_hash)')
         
         conn.commit()
         conn.close()
@@ -75,45 +88,77 @@ class FileHashManager:
         Returns:
             Tuple (is_duplicate, document_id, is_path_duplicate)
         """
+        result = self.check_duplicates([(file_hash, client_id, original_path)])[0]
+
+        if result["is_path_duplicate"]:
+            logger.info(f"Duplicato esatto rilevato, document_id: {result['document_id']}")
+        elif result["is_duplicate"]:
+            logger.info(f"Duplicato di contenuto rilevato, document_id originale: {result['document_id']}")
+        else:
+            logger.info(f"File non è un duplicato, hash={file_hash}")
+
+        return result["is_duplicate"], result["document_id"], result["is_path_duplicate"]
+
+    def check_duplicates(self, items: Sequence[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        """
+        Verifica in blocco se i file sono duplicati, con una query per gruppo di richieste.
+
+        Args:
+            items: Sequenza di (file_hash, client_id, original_path)
+
+        Returns:
+            Lista, nello stesso ordine di items, di dict con file_hash, client_id,
+            original_path, is_duplicate, document_id e is_path_duplicate
+        """
+        results = [
+            {
+                "file_hash": file_hash,
+                "client_id": client_id,
+                "original_path": original_path,
+                "is_duplicate": False,
+                "document_id": None,
+                "is_path_duplicate": False
+            }
+            for file_hash, client_id, original_path in items
+        ]
+        if not results:
+            return results
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Cerca prima il file con lo stesso hash, client_id e percorso originale (duplicato esatto)
-            cursor.execute(
-                "SELECT document_id FROM file_hashes WHERE file_hash = ? AND client_id = ? AND original_path = ?", 
-                (file_hash, client_id, original_path)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                # Duplicato esatto trovato (stesso hash, stesso client, stesso percorso)
-                document_id = result[0]
-                logger.info(f"Duplicato esatto rilevato, document_id: {document_id}")
-                conn.close()
-                return True, document_id, True
-            
-            # Se non è un duplicato esatto, cerca un duplicato di contenuto (stesso hash, client diverso o percorso diverso)
-            cursor.execute(
-                "SELECT document_id FROM file_hashes WHERE file_hash = ? LIMIT 1", 
-                (file_hash,)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                # Duplicato di contenuto trovato
-                document_id = result[0]
-                logger.info(f"Duplicato di contenuto rilevato, document_id originale: {document_id}")
+            conn = self._get_connection()
+            try:
+                cursor = conn.cursor()
+                for chunk_start in range(0, len(results), DUPLICATE_CHECK_CHUNK_SIZE):
+                    chunk = results[chunk_start:chunk_start + DUPLICATE_CHECK_CHUNK_SIZE]
+                    values = ", ".join(["(?, ?, ?, ?)"] * len(chunk))
+                    params: List[Any] = []
+                    for offset, item in enumerate(chunk):
+                        params.extend([chunk_start + offset, item["file_hash"], item["client_id"], item["original_path"]])
+
+                    # Duplicato esatto (stesso hash, client e percorso) o di contenuto (stesso hash)
+                    cursor.execute(f"""
+                        WITH request(idx, file_hash, client_id, original_path) AS (VALUES {values})
+                        SELECT r.idx,
+                               (SELECT f.document_id FROM file_hashes f
+                                WHERE f.file_hash = r.file_hash AND f.client_id = r.client_id
+                                  AND f.original_path = r.original_path) AS exact_document_id,
+                               (SELECT f.document_id FROM file_hashes f
+                                WHERE f.file_hash = r.file_hash LIMIT 1) AS content_document_id
+                        FROM request r
+                    """, params)
+
+                    for idx, exact_document_id, content_document_id in cursor.fetchall():
+                        result = results[idx]
+                        if exact_document_id is not None:
+                            result.update(is_duplicate=True, document_id=exact_document_id, is_path_duplicate=True)
+                        elif content_document_id is not None:
+                            result.update(is_duplicate=True, document_id=content_document_id)
+            finally:
                 conn.close()
-                return True, document_id, False
-            
-            logger.info(f"File non è un duplicato, hash={file_hash}")
-            conn.close()
-            return False, None, False
-            
         except Exception as e:
             logger.error(f"Errore durante il controllo dei duplicati: {e}")
-            return False, None, False
+
+        return results
             
     def save_file_hash(self, file_hash: str, filename: str, document_id: str, 
                       client_id: str = "system", original_path: str = "") -> bool:
@@ -131,7 +176,7 @@ class FileHashManager:
             bool: True se il salvataggio è avvenuto con successo, False altrimenti
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Controlla se la combinazione di hash, client_id e original_path è già presente
@@ -159,26 +204,79 @@ class FileHashManager:
             logger.error(f"Errore durante il salvataggio dell'hash: {e}")
             return False
             
-    def get_all_hashes(self) -> List[Dict[str, Any]]:
+    def get_hashes_page(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """
-        Ottiene tutti gli hash dal database.
-        
+        Ottiene una pagina di hash, dal più recente.
+
+        Args:
+            limit: Numero massimo di record
+            offset: Numero di record da saltare
+
         Returns:
             Lista di dizionari contenenti gli hash e i metadati associati
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Permette di accedere alle colonne per nome
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT * FROM file_hashes ORDER BY upload_time DESC")
-            results = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            return results
+            conn = self._get_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT * FROM file_hashes ORDER BY upload_time DESC, file_hash DESC LIMIT ? OFFSET ?",
+                    (limit, offset)
+                )
+                return [dict(row) for row in cursor.fetchall()]
+            finally:
+                conn.close()
         except Exception as e:
             logger.error(f"Errore durante il recupero degli hash: {e}")
             return []
+
+    def iter_hashes(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Scorre tutti gli hash, dal più recente, leggendo a blocchi di batch_size.
+
+        La connessione è tenuta solo per la lettura di ciascun blocco (paginazione
+        per chiave su upload_time, file_hash), quindi un consumatore lento non
+        occupa il pool.
+        """
+        last_key: Optional[Tuple[Any, str]] = None
+        while True:
+            try:
+                conn = self._get_connection()
+                try:
+                    cursor = conn.cursor()
+                    if last_key is None:
+                        cursor.execute(
+                            "SELECT * FROM file_hashes ORDER BY upload_time DESC, file_hash DESC LIMIT ?",
+                            (batch_size,)
+                        )
+                    else:
+                        cursor.execute(
+                            "SELECT * FROM file_hashes WHERE (upload_time, file_hash) < (?, ?) "
+                            "ORDER BY upload_time DESC, file_hash DESC LIMIT ?",
+                            (*last_key, batch_size)
+                        )
+                    rows = [dict(row) for row in cursor.fetchall()]
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.error(f"Errore durante il recupero degli hash: {e}")
+                return
+
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_key = (rows[-1]["upload_time"], rows[-1]["file_hash"])
+
+    def get_all_hashes(self) -> List[Dict[str, Any]]:
+        """
+        Ottiene tutti gli hash dal database.
+
+        Per tabelle grandi usare iter_hashes() o get_hashes_page().
+        
+        Returns:
+            Lista di dizionari contenenti gli hash e i metadati associati
+        """
+        return list(self.iter_hashes())
             
     def delete_hash(self, file_hash: str) -> bool:
         """
@@ -191,7 +289,7 @@ class FileHashManager:
             bool: True se l'eliminazione è avvenuta con successo, False altrimenti
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM file_hashes WHERE file_hash = ?", (file_hash,))
@@ -3,19 +3,74 @@ File Watcher personalizzato per VectorstoreService
 
 Questo modulo fornisce funzionalità di monitoraggio dei file
 con log dettagliati su quali file sono stati modificati e che tipo di modifiche sono avvenute.
+
+Backend disponibili (VECTORSTORE_FILE_WATCHER_BACKEND):
+- inotify: notifiche del kernel Linux, nessuna scansione periodica dell'albero
+- polling: scansione incrementale con os.scandir; rilegge solo le directory
+  il cui mtime è cambiato e riusa gli stat di DirEntry
+- auto (default): inotify se disponibile, altrimenti polling
+
+In entrambi i casi una scansione completa periodica rileva le modifiche che non cambiano
+l'mtime della directory (scritture in-place nel backend polling) o gli eventi persi
+(overflow della coda inotify). Con inotify l'intervallo è VECTORSTORE_FILE_WATCHER_FULL_SCAN_SECONDS;
+con il polling, dove è l'unico modo di vedere le scritture in-place, è il più breve
+VECTORSTORE_FILE_WATCHER_POLLING_FULL_SCAN_SECONDS.
+
+Le modifiche rilevate passano da una ChangeQueue che le combina per file, attende
+che il file resti fermo per un breve periodo e le consegna a lotti alle callback
+tramite un pool di worker, fuori dal thread di scansione.
 """
 
 import os
+import sys
+import stat
 import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
 import threading
 import logging
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Dict, Set, Optional, Callable, List, Tuple
-from dataclasses import dataclass
+from typing import Dict, Set, Optional, Callable, List, Tuple, Any
+from dataclasses import dataclass, field
 from enum import Enum
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger("vectorstore.file_watcher")
 
+# Backend del watcher: auto, inotify o polling
+FILE_WATCHER_BACKEND = os.getenv("VECTORSTORE_FILE_WATCHER_BACKEND", "auto").lower()
+# Intervallo della scansione completa di verifica (0 la disabilita)
+FILE_WATCHER_FULL_SCAN_SECONDS = float(os.getenv("VECTORSTORE_FILE_WATCHER_FULL_SCAN_SECONDS", "60"))
+# Intervallo della scansione completa con il backend polling: determina la latenza delle scritture in-place
+FILE_WATCHER_POLLING_FULL_SCAN_SECONDS = float(os.getenv("VECTORSTORE_FILE_WATCHER_POLLING_FULL_SCAN_SECONDS", "5"))
+# Coda delle modifiche: attesa di inattività per file, capacità, worker e dimensione dei lotti
+FILE_WATCHER_DEBOUNCE_SECONDS = float(os.getenv("VECTORSTORE_FILE_WATCHER_DEBOUNCE_SECONDS", "0.5"))
+FILE_WATCHER_QUEUE_SIZE = int(os.getenv("VECTORSTORE_FILE_WATCHER_QUEUE_SIZE", "10000"))
+FILE_WATCHER_WORKERS = int(os.getenv("VECTORSTORE_FILE_WATCHER_WORKERS", "2"))
+FILE_WATCHER_BATCH_SIZE = int(os.getenv("VECTORSTORE_FILE_WATCHER_BATCH_SIZE", "100"))
+
+# Costanti inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+_INOTIFY_EVENT = struct.Struct("iIII")
+
 class ChangeType(Enum):
     """Tipi di cambiamenti che possono essere rilevati."""
     CREATED = "created"
@@ -37,6 +92,330 @@ class FileChange:
         metadata_str = f", metadata: {self.metadata}" if self.metadata else ""
         return f"[{timestamp_str}] {self.change_type.value.upper()}: {self.path}{metadata_str}"
 
+@dataclass
+class _DirState:
+    """Stato di una directory monitorata: mtime e contenuto all'ultima lettura."""
+    mtime_ns: int
+    files: Set[str] = field(default_factory=set)
+    subdirs: Set[str] = field(default_factory=set)
+
+
+class _Inotify:
+    """Wrapper minimale dell'API inotify del kernel Linux (via ctypes)."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 fallita: {os.strerror(err)}")
+        self._wd_to_dir: Dict[int, str] = {}
+        self._dir_to_wd: Dict[str, int] = {}
+
+    @property
+    def watch_count(self) -> int:
+        return len(self._dir_to_wd)
+
+    def add_watch(self, dir_path: str) -> bool:
+        """
+        Aggiunge un watch su una directory.
+
+        Raises:
+            OSError: Se è stato raggiunto il limite fs.inotify.max_user_watches.
+        """
+        if dir_path in self._dir_to_wd:
+            return True
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dir_path), INOTIFY_WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "Limite di watch inotify raggiunto (fs.inotify.max_user_watches)")
+            # Directory sparita nel frattempo o non accessibile
+            logger.debug(f"Impossibile monitorare {dir_path}: {os.strerror(err)}")
+            return False
+        self._wd_to_dir[wd] = dir_path
+        self._dir_to_wd[dir_path] = wd
+        return True
+
+    def remove_watch(self, dir_path: str) -> None:
+        wd = self._dir_to_wd.pop(dir_path, None)
+        if wd is not None:
+            self._wd_to_dir.pop(wd, None)
+            self._libc.inotify_rm_watch(self.fd, wd)
+
+    def sync(self, dirs: Set[str]) -> None:
+        """Allinea i watch all'insieme di directory indicato."""
+        for dir_path in list(self._dir_to_wd):
+            if dir_path not in dirs:
+                self.remove_watch(dir_path)
+        for dir_path in dirs:
+            self.add_watch(dir_path)
+
+    def read_events(self, timeout: float) -> List[Tuple[int, str]]:
+        """
+        Attende gli eventi fino a timeout secondi.
+
+        Returns:
+            Lista di (mask, percorso). Un overflow della coda è restituito come (IN_Q_OVERFLOW, "").
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    events.append((mask, ""))
+                    continue
+                if mask & IN_IGNORED:
+                    # Watch rimosso dal kernel (directory eliminata o smontata)
+                    dir_path = self._wd_to_dir.pop(wd, None)
+                    if dir_path is not None and self._dir_to_wd.get(dir_path) == wd:
+                        del self._dir_to_wd[dir_path]
+                    continue
+                dir_path = self._wd_to_dir.get(wd)
+                if dir_path is not None and name:
+                    events.append((mask, os.path.join(dir_path, name)))
+        return events
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self._wd_to_dir.clear()
+        self._dir_to_wd.clear()
+
+
+def _coalesce(previous: FileChange, change: FileChange) -> Optional[FileChange]:
+    """
+    Combina due modifiche consecutive dello stesso file non ancora consegnate.
+
+    Returns:
+        La modifica risultante, o None se le due si annullano (creato e poi eliminato).
+    """
+    previous_type, change_type = previous.change_type, change.change_type
+
+    if previous_type == ChangeType.CREATED:
+        if change_type == ChangeType.DELETED:
+            return None
+        if change_type == ChangeType.MODIFIED:
+            metadata = dict(previous.metadata or {})
+            if change.metadata and "size" in change.metadata:
+                metadata["size"] = change.metadata["size"]
+            return FileChange(path=change.path, change_type=ChangeType.CREATED,
+                              timestamp=change.timestamp, metadata=metadata)
+
+    if previous_type == ChangeType.MODIFIED and change_type == ChangeType.MODIFIED:
+        metadata = dict(change.metadata or {})
+        if previous.metadata and "previous_mtime" in previous.metadata:
+            metadata["previous_mtime"] = previous.metadata["previous_mtime"]
+        return FileChange(path=change.path, change_type=ChangeType.MODIFIED,
+                          timestamp=change.timestamp, metadata=metadata)
+
+    if previous_type == ChangeType.DELETED and change_type == ChangeType.CREATED:
+        # File sostituito (es. salvataggio atomico tramite rename)
+        metadata = dict(change.metadata or {})
+        created = metadata.get("created", change.timestamp)
+        metadata.setdefault("previous_mtime", created)
+        metadata.setdefault("current_mtime", created)
+        return FileChange(path=change.path, change_type=ChangeType.MODIFIED,
+                          timestamp=change.timestamp, metadata=metadata)
+
+    return change
+
+
+@dataclass
+class _PendingChange:
+    change: FileChange
+    last_seen: float
+
+
+class ChangeQueue:
+    """
+    Coda limitata tra il thread di scansione e le callback.
+
+    Le modifiche allo stesso file vengono combinate finché il file non resta fermo
+    per `debounce` secondi; le modifiche pronte sono consegnate a lotti da un pool
+    di worker. Un file non è mai consegnato a due worker contemporaneamente.
+    Se la coda è piena, put() attende (backpressure sul thread di scansione).
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[FileChange]], int],
+        debounce: float = FILE_WATCHER_DEBOUNCE_SECONDS,
+        max_size: int = FILE_WATCHER_QUEUE_SIZE,
+        workers: int = FILE_WATCHER_WORKERS,
+        batch_size: int = FILE_WATCHER_BATCH_SIZE
+    ):
+        """
+        Inizializza la coda.
+
+        Args:
+            dispatch: Funzione che consegna un lotto e restituisce il numero di errori
+            debounce: Secondi di inattività di un file prima della consegna
+            max_size: Numero massimo di file in attesa
+            workers: Numero di worker che eseguono le callback
+            batch_size: Numero massimo di modifiche per lotto
+        """
+        self.dispatch = dispatch
+        self.debounce = max(0.0, debounce)
+        self.max_size = max(1, max_size)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._pending: "OrderedDict[str, _PendingChange]" = OrderedDict()
+        self._in_flight: Set[str] = set()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(self.workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats: Dict[str, Any] = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "cancelled": 0,
+            "dispatched": 0,
+            "batches": 0,
+            "callback_errors": 0,
+            "max_depth": 0,
+            "backpressure_waits": 0,
+            "backpressure_wait_ms": 0.0
+        }
+
+    def put(self, change: FileChange) -> None:
+        """Accoda una modifica, combinandola con quella in attesa per lo stesso file."""
+        with self._cond:
+            if change.path not in self._pending and len(self._pending) >= self.max_size:
+                waited_since = time.perf_counter()
+                self._stats["backpressure_waits"] += 1
+                while (change.path not in self._pending and len(self._pending) >= self.max_size
+                       and not self._stopping):
+                    self._cond.wait(0.5)
+                self._stats["backpressure_wait_ms"] += (time.perf_counter() - waited_since) * 1000
+
+            self._stats["enqueued"] += 1
+            pending = self._pending.pop(change.path, None)
+            if pending is not None:
+                self._stats["coalesced"] += 1
+                change = _coalesce(pending.change, change)
+                if change is None:
+                    self._stats["cancelled"] += 1
+                    self._cond.notify_all()
+                    return
+
+            # L'ordine del dizionario segue l'ultima modifica: i file pronti sono in testa
+            self._pending[change.path] = _PendingChange(change=change, last_seen=time.monotonic())
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._pending))
+            self._cond.notify_all()
+
+    def _take_ready(self, now: float, force: bool) -> Tuple[List[FileChange], Optional[float]]:
+        """
+        Estrae fino a batch_size modifiche pronte (chiamato con il lock acquisito).
+
+        Returns:
+            Tuple (lotto, istante in cui sarà pronta la prossima modifica o None)
+        """
+        batch: List[FileChange] = []
+        for path, pending in list(self._pending.items()):
+            if len(batch) >= self.batch_size:
+                break
+            if path in self._in_flight:
+                continue
+            ready_at = pending.last_seen + self.debounce
+            if not force and ready_at > now:
+                return batch, ready_at
+            del self._pending[path]
+            self._in_flight.add(path)
+            batch.append(pending.change)
+        return batch, None
+
+    def _run(self) -> None:
+        while True:
+            self._slots.acquire()
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    batch, ready_at = self._take_ready(now, force=self._stopping)
+                    if batch or (self._stopping and not self._pending):
+                        break
+                    self._cond.wait(None if ready_at is None else max(0.0, ready_at - now))
+                if batch:
+                    self._cond.notify_all()
+
+            if not batch:
+                self._slots.release()
+                return
+            self._executor.submit(self._deliver, batch)
+
+    def _deliver(self, batch: List[FileChange]) -> None:
+        try:
+            errors = self.dispatch(batch)
+        except Exception as e:
+            logger.error(f"Errore nella consegna delle modifiche: {e}")
+            errors = len(batch)
+        finally:
+            self._slots.release()
+
+        with self._cond:
+            for change in batch:
+                self._in_flight.discard(change.path)
+            self._stats["dispatched"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["callback_errors"] += errors
+            self._cond.notify_all()
+
+    def start(self) -> None:
+        """Avvia il thread di consegna e il pool di worker."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-watcher-callback")
+        self._thread = threading.Thread(target=self._run, name="file-watcher-dispatch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Consegna le modifiche ancora in attesa (senza debounce) e arresta i worker."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Restituisce profondità della coda, lotti consegnati e metriche di backpressure."""
+        with self._cond:
+            now = time.monotonic()
+            oldest = min((pending.last_seen for pending in self._pending.values()), default=None)
+            stats = dict(self._stats)
+            stats.update({
+                "depth": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "capacity": self.max_size,
+                "utilization": round(len(self._pending) / self.max_size, 4),
+                "oldest_pending_ms": round((now - oldest) * 1000, 2) if oldest is not None else 0.0,
+                "debounce": self.debounce,
+                "workers": self.workers,
+                "batch_size": self.batch_size
+            })
+        stats["backpressure_wait_ms"] = round(stats["backpressure_wait_ms"], 2)
+        return stats
+
+
 class FileWatcher:
     """
     Un watcher di file che monitora una directory per cambiamenti
@@ -50,7 +429,14 @@ class FileWatcher:
         recursive: bool = True,
         include_patterns: Optional[List[str]] = None,
         exclude_patterns: Optional[List[str]] = None,
-        on_change_callback: Optional[Callable[[FileChange], None]] = None
+        on_change_callback: Optional[Callable[[FileChange], None]] = None,
+        backend: Optional[str] = None,
+        full_scan_interval: Optional[float] = None,
+        on_batch_callback: Optional[Callable[[List[FileChange]], None]] = None,
+        debounce: Optional[float] = None,
+        max_queue_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None
     ):
         """
         Inizializza il FileWatcher.
@@ -62,6 +448,15 @@ class FileWatcher:
             include_patterns: Lista di pattern glob da includere
             exclude_patterns: Lista di pattern glob da escludere
             on_change_callback: Callback da chiamare quando viene rilevata una modifica
+            backend: "auto", "inotify" o "polling" (default da VECTORSTORE_FILE_WATCHER_BACKEND)
+            full_scan_interval: Secondi tra due scansioni complete di verifica (0 le disabilita).
+                Se None dipende dal backend: VECTORSTORE_FILE_WATCHER_FULL_SCAN_SECONDS con inotify,
+                VECTORSTORE_FILE_WATCHER_POLLING_FULL_SCAN_SECONDS con il polling
+            on_batch_callback: Callback che riceve un lotto di modifiche (alternativa a on_change_callback)
+            debounce: Secondi di inattività di un file prima di consegnarne le modifiche
+            max_queue_size: Numero massimo di file con modifiche in attesa
+            workers: Numero di worker che eseguono le callback
+            batch_size: Numero massimo di modifiche per lotto
         """
         self.paths = [Path(p) for p in paths]
         self.interval = interval
@@ -69,23 +464,84 @@ class FileWatcher:
         self.include_patterns = include_patterns or ["*"]
         self.exclude_patterns = exclude_patterns or [".git/*", "__pycache__/*", "*.pyc", "*.pyo", "*.pyd", ".DS_Store"]
         self.on_change_callback = on_change_callback
-        self._file_stats: Dict[str, float] = {}  # path -> mtime
-        self._known_files: Set[str] = set()
+        self.on_batch_callback = on_batch_callback
+        self.requested_backend = (backend or FILE_WATCHER_BACKEND).lower()
+        self._full_scan_interval = full_scan_interval
+        self.backend = "polling"
+        self._file_stats: Dict[str, Tuple[float, int]] = {}  # path -> (mtime, size)
+        self._dirs: Dict[str, _DirState] = {}
+        self._inotify: Optional[_Inotify] = None
         self._running = False
+        self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "scans": 0,
+            "full_scans": 0,
+            "total_scan_duration_ms": 0.0,
+            "max_scan_duration_ms": 0.0,
+            "last_scan": None,
+            "changes_total": {change_type.value: 0 for change_type in ChangeType},
+            "fallback_reason": None
+        }
+        self.queue = ChangeQueue(
+            dispatch=self._dispatch_batch,
+            debounce=FILE_WATCHER_DEBOUNCE_SECONDS if debounce is None else debounce,
+            max_size=max_queue_size or FILE_WATCHER_QUEUE_SIZE,
+            workers=workers or FILE_WATCHER_WORKERS,
+            batch_size=batch_size or FILE_WATCHER_BATCH_SIZE
+        )
         self._initial_scan()
     
+    @property
+    def full_scan_interval(self) -> float:
+        """Secondi tra due scansioni complete, per il backend attivo se non indicati esplicitamente."""
+        if self._full_scan_interval is not None:
+            return self._full_scan_interval
+        if self.backend == "polling":
+            return FILE_WATCHER_POLLING_FULL_SCAN_SECONDS
+        return FILE_WATCHER_FULL_SCAN_SECONDS
+    
     def _initial_scan(self) -> None:
-        """Esegue una scansione iniziale dei file monitorati."""
+        """Esegue una scansione iniziale dei file monitorati e attiva il backend."""
         logger.info(f"Esecuzione scansione iniziale di {len(self.paths)} percorsi")
-        for path in self.paths:
-            self._scan_path(path)
-        logger.info(f"Scansione iniziale completata. {len(self._known_files)} file indicizzati.")
+        started = time.perf_counter()
+        self._scan(full=True)
+        self._stats["initial_scan_duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self._setup_backend()
+        logger.info(f"Scansione iniziale completata in {self._stats['initial_scan_duration_ms']} ms. "
+                    f"{len(self._file_stats)} file indicizzati in {len(self._dirs)} directory "
+                    f"(backend: {self.backend}).")
+
+    def _setup_backend(self) -> None:
+        """Attiva inotify se richiesto e disponibile, altrimenti resta sul polling incrementale."""
+        if self.requested_backend not in ("auto", "inotify", "polling"):
+            logger.warning(f"Backend file watcher sconosciuto '{self.requested_backend}', uso 'auto'")
+            self.requested_backend = "auto"
+        if self.requested_backend == "polling":
+            return
+        if not sys.platform.startswith("linux"):
+            if self.requested_backend == "inotify":
+                self._fallback_to_polling("inotify disponibile solo su Linux")
+            return
+
+        try:
+            self._inotify = _Inotify()
+            self._inotify.sync(set(self._dirs))
+            self.backend = "inotify"
+        except (OSError, AttributeError) as e:
+            self._fallback_to_polling(str(e))
+
+    def _fallback_to_polling(self, reason: str) -> None:
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+        self.backend = "polling"
+        self._stats["fallback_reason"] = reason
+        logger.warning(f"File watcher: uso il backend polling ({reason})")
     
     def _should_monitor(self, file_path: str) -> bool:
         """Controlla se un file dovrebbe essere monitorato in base ai pattern di inclusione/esclusione."""
-        from fnmatch import fnmatch
-        
         # Prima applica i pattern di esclusione
         for pattern in self.exclude_patterns:
             if fnmatch(file_path, pattern):
@@ -97,134 +553,353 @@ class FileWatcher:
                 return True
         
         return False
-    
-    def _scan_path(self, path: Path) -> None:
-        """Scansiona un percorso e aggiorna i file conosciuti."""
-        if not path.exists():
-            logger.warning(f"Il percorso {path} non esiste")
-            return
-            
-        if path.is_file() and self._should_monitor(str(path)):
-            try:
-                self._known_files.add(str(path))
-                self._file_stats[str(path)] = path.stat().st_mtime
-            except (FileNotFoundError, PermissionError) as e:
-                logger.debug(f"Errore durante l'accesso a {path}: {e}")
-        elif path.is_dir():
-            try:
-                for item in path.iterdir():
-                    if item.is_file() and self._should_monitor(str(item)):
-                        self._known_files.add(str(item))
-                        try:
-                            self._file_stats[str(item)] = item.stat().st_mtime
-                        except (FileNotFoundError, PermissionError) as e:
-                            logger.debug(f"Errore durante l'accesso a {item}: {e}")
-                    elif item.is_dir() and self.recursive:
-                        self._scan_path(item)
-            except (PermissionError, FileNotFoundError) as e:
-                logger.debug(f"Errore durante la scansione della directory {path}: {e}")
-    
-    def _check_for_changes(self) -> List[FileChange]:
-        """Controlla se ci sono cambiamenti nei file monitorati."""
-        changes = []
-        current_files = set()
-        
-        # Controlla tutti i percorsi monitorati
-        for path in self.paths:
-            if not path.exists():
-                continue
-                
-            self._scan_current_files(path, current_files)
-        
-        # Trova i file creati (nei file correnti ma non conosciuti)
-        for file_path in current_files - self._known_files:
-            if self._should_monitor(file_path):
-                try:
-                    stat = Path(file_path).stat()
-                    changes.append(FileChange(
-                        path=file_path,
-                        change_type=ChangeType.CREATED,
-                        timestamp=time.time(),
-                        metadata={
-                            "size": stat.st_size,
-                            "created": stat.st_ctime,
-                            "extension": os.path.splitext(file_path)[1]
-                        }
-                    ))
-                    self._file_stats[file_path] = stat.st_mtime
-                except (FileNotFoundError, PermissionError):
-                    pass
-        
-        # Trova i file eliminati (nei file conosciuti ma non correnti)
-        for file_path in self._known_files - current_files:
+
+    def _should_descend(self, dir_path: str) -> bool:
+        """
+        Controlla se una directory va visitata: i pattern "<prefisso>/*" che escludono
+        tutto il suo contenuto (es. "*.git/*") evitano di scansionarla del tutto.
+        """
+        if not self.recursive:
+            return False
+        probe = dir_path.replace(os.sep, "/") + "/"
+        for pattern in self.exclude_patterns:
+            if pattern.endswith("/*") and fnmatch(probe, pattern[:-1]):
+                return False
+        return True
+
+    def _record_stat(self, file_path: str, st: os.stat_result, changes: List[FileChange]) -> None:
+        """Confronta lo stat di un file con quello noto e registra creazione o modifica."""
+        previous = self._file_stats.get(file_path)
+        self._file_stats[file_path] = (st.st_mtime, st.st_size)
+        if previous is None:
             changes.append(FileChange(
                 path=file_path,
-                change_type=ChangeType.DELETED,
+                change_type=ChangeType.CREATED,
                 timestamp=time.time(),
                 metadata={
+                    "size": st.st_size,
+                    "created": st.st_ctime,
                     "extension": os.path.splitext(file_path)[1]
                 }
             ))
-            if file_path in self._file_stats:
-                del self._file_stats[file_path]
-        
-        # Trova i file modificati (file che esistono ma con orario di modifica diverso)
-        for file_path in current_files.intersection(self._known_files):
+        elif previous != (st.st_mtime, st.st_size):
+            changes.append(FileChange(
+                path=file_path,
+                change_type=ChangeType.MODIFIED,
+                timestamp=time.time(),
+                metadata={
+                    "size": st.st_size,
+                    "previous_mtime": previous[0],
+                    "current_mtime": st.st_mtime,
+                    "extension": os.path.splitext(file_path)[1]
+                }
+            ))
+
+    def _record_deleted(self, file_path: str, changes: List[FileChange]) -> None:
+        if self._file_stats.pop(file_path, None) is None:
+            return
+        changes.append(FileChange(
+            path=file_path,
+            change_type=ChangeType.DELETED,
+            timestamp=time.time(),
+            metadata={
+                "extension": os.path.splitext(file_path)[1]
+            }
+        ))
+
+    def _drop_dir(self, dir_path: str, changes: List[FileChange]) -> None:
+        """Rimuove una directory sparita, segnalando come eliminati i file del sottoalbero."""
+        state = self._dirs.pop(dir_path, None)
+        if state is None:
+            return
+        for file_path in state.files:
+            self._record_deleted(file_path, changes)
+        for subdir in state.subdirs:
+            self._drop_dir(subdir, changes)
+
+    def _scan(self, full: bool) -> Tuple[List[FileChange], Dict[str, int]]:
+        """
+        Scansiona i percorsi monitorati.
+
+        Args:
+            full: Se True rilegge tutte le directory; altrimenti solo quelle con mtime cambiato.
+
+        Returns:
+            Tuple (modifiche rilevate, contatori della scansione)
+        """
+        changes: List[FileChange] = []
+        counters = {"directories_listed": 0, "directories_skipped": 0, "files_checked": 0}
+        for path in self.paths:
+            root = str(path)
+            if os.path.isdir(root):
+                self._scan_dir(root, full, changes, counters)
+            elif root in self._dirs:
+                self._drop_dir(root, changes)
+            else:
+                self._scan_root_file(root, changes, counters)
+        return changes, counters
+
+    def _scan_root_file(self, file_path: str, changes: List[FileChange], counters: Dict[str, int]) -> None:
+        """Verifica un percorso monitorato che è un singolo file."""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            self._record_deleted(file_path, changes)
+            return
+        if stat.S_ISREG(st.st_mode) and self._should_monitor(file_path):
+            counters["files_checked"] += 1
+            self._record_stat(file_path, st, changes)
+
+    def _scan_dir(self, dir_path: str, full: bool, changes: List[FileChange], counters: Dict[str, int]) -> None:
+        """
+        Scansiona una directory. Se il suo mtime non è cambiato (e la scansione non è
+        completa) il contenuto è invariato: si passa direttamente alle sottodirectory note.
+        """
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            self._drop_dir(dir_path, changes)
+            return
+
+        state = self._dirs.get(dir_path)
+        if state is not None and not full and state.mtime_ns == mtime_ns:
+            counters["directories_skipped"] += 1
+            for subdir in list(state.subdirs):
+                self._scan_dir(subdir, full, changes, counters)
+            return
+
+        counters["directories_listed"] += 1
+        files: Set[str] = set()
+        subdirs: Set[str] = set()
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self._should_descend(entry.path):
+                                subdirs.add(entry.path)
+                        elif entry.is_file() and self._should_monitor(entry.path):
+                            # DirEntry.stat() è in cache: nessuna seconda chiamata di sistema
+                            st = entry.stat()
+                            counters["files_checked"] += 1
+                            files.add(entry.path)
+                            self._record_stat(entry.path, st, changes)
+                    except OSError as e:
+                        logger.debug(f"Errore durante l'accesso a {entry.path}: {e}")
+        except OSError as e:
+            logger.debug(f"Errore durante la scansione della directory {dir_path}: {e}")
+            self._drop_dir(dir_path, changes)
+            return
+
+        if state is not None:
+            for file_path in state.files - files:
+                self._record_deleted(file_path, changes)
+            for subdir in state.subdirs - subdirs:
+                self._drop_dir(subdir, changes)
+        self._dirs[dir_path] = _DirState(mtime_ns=mtime_ns, files=files, subdirs=subdirs)
+
+        for subdir in subdirs:
+            self._scan_dir(subdir, full, changes, counters)
+
+    def _process_inotify_events(self, events: List[Tuple[int, str]], changes: List[FileChange],
+                                counters: Dict[str, int]) -> bool:
+        """
+        Applica gli eventi inotify allo stato noto.
+
+        Returns:
+            True se la coda del kernel è andata in overflow ed è necessaria una scansione completa.
+        """
+        new_dirs = []
+        for mask, path in events:
+            if mask & IN_Q_OVERFLOW:
+                return True
+
+            parent = self._dirs.get(os.path.dirname(path))
+            if parent is None:
+                continue
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if self._should_descend(path):
+                        parent.subdirs.add(path)
+                        new_dirs.append(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    parent.subdirs.discard(path)
+                    self._drop_dir(path, changes)
+                continue
+
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                parent.files.discard(path)
+                self._record_deleted(path, changes)
+                continue
+
             try:
-                current_mtime = Path(file_path).stat().st_mtime
-                if file_path in self._file_stats and current_mtime > self._file_stats[file_path]:
-                    stat = Path(file_path).stat()
-                    changes.append(FileChange(
-                        path=file_path,
-                        change_type=ChangeType.MODIFIED,
-                        timestamp=time.time(),
-                        metadata={
-                            "size": stat.st_size,
-                            "previous_mtime": self._file_stats.get(file_path),
-                            "current_mtime": current_mtime,
-                            "extension": os.path.splitext(file_path)[1]
-                        }
-                    ))
-                    self._file_stats[file_path] = current_mtime
-            except (FileNotFoundError, PermissionError):
-                pass
-        
-        # Aggiorna i file conosciuti
-        self._known_files = current_files
-        
+                st = os.stat(path)
+            except OSError:
+                parent.files.discard(path)
+                self._record_deleted(path, changes)
+                continue
+            if stat.S_ISREG(st.st_mode) and self._should_monitor(path):
+                counters["files_checked"] += 1
+                parent.files.add(path)
+                self._record_stat(path, st, changes)
+
+        for dir_path in new_dirs:
+            # Il watch va aggiunto prima di leggere la directory, per non perdere
+            # i file creati durante la scansione
+            if self._inotify.add_watch(dir_path):
+                self._scan_dir(dir_path, True, changes, counters)
+        if new_dirs:
+            self._inotify.sync(set(self._dirs))
+        return False
+
+    def _check_for_changes(self, full: bool = False) -> List[FileChange]:
+        """Controlla se ci sono cambiamenti nei file monitorati."""
+        started = time.perf_counter()
+        events = 0
+
+        if self._inotify is not None and not full:
+            changes: List[FileChange] = []
+            counters = {"directories_listed": 0, "directories_skipped": 0, "files_checked": 0}
+            inotify_events = self._inotify.read_events(self.interval)
+            events = len(inotify_events)
+            # La durata misura l'elaborazione degli eventi, non l'attesa in select()
+            started = time.perf_counter()
+            try:
+                overflow = self._process_inotify_events(inotify_events, changes, counters)
+            except OSError as e:
+                self._fallback_to_polling(str(e))
+                overflow = True
+            if overflow:
+                logger.warning("File watcher: eventi persi, eseguo una scansione completa")
+                full = True
+            # I percorsi monitorati che sono file singoli non hanno un watch
+            for path in self.paths:
+                if str(path) not in self._dirs and not os.path.isdir(path):
+                    self._scan_root_file(str(path), changes, counters)
+            if full:
+                more_changes, more_counters = self._scan(full=True)
+                changes.extend(more_changes)
+                for key, value in more_counters.items():
+                    counters[key] += value
+        else:
+            changes, counters = self._scan(full)
+
+        if full and self._inotify is not None:
+            try:
+                self._inotify.sync(set(self._dirs))
+            except OSError as e:
+                self._fallback_to_polling(str(e))
+
+        self._record_scan_stats(time.perf_counter() - started, full, changes, counters, events)
         return changes
-    
-    def _scan_current_files(self, path: Path, current_files: Set[str]) -> None:
-        """Scansiona i file attuali e li aggiunge al set fornito."""
-        if path.is_file() and self._should_monitor(str(path)):
-            current_files.add(str(path))
-        elif path.is_dir():
+
+    def _record_scan_stats(self, elapsed: float, full: bool, changes: List[FileChange],
+                           counters: Dict[str, int], events: int) -> None:
+        duration_ms = round(elapsed * 1000, 2)
+        with self._stats_lock:
+            stats = self._stats
+            stats["scans"] += 1
+            if full:
+                stats["full_scans"] += 1
+            stats["total_scan_duration_ms"] += duration_ms
+            stats["max_scan_duration_ms"] = max(stats["max_scan_duration_ms"], duration_ms)
+            for change in changes:
+                stats["changes_total"][change.change_type.value] += 1
+            stats["last_scan"] = {
+                "timestamp": time.time(),
+                "duration_ms": duration_ms,
+                "full": full,
+                "changes": len(changes),
+                "events": events,
+                **counters
+            }
+
+        if changes:
+            logger.info(f"Scansione file completata in {duration_ms} ms: {len(changes)} modifiche "
+                        f"({counters['directories_listed']} directory lette, {counters['files_checked']} file verificati)")
+        if elapsed > self.interval:
+            logger.warning(f"Scansione file più lenta dell'intervallo ({duration_ms} ms > {self.interval}s)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce le metriche del watcher: backend attivo, durata delle scansioni e modifiche rilevate.
+        """
+        with self._stats_lock:
+            stats = {
+                **self._stats,
+                "changes_total": dict(self._stats["changes_total"]),
+                "last_scan": dict(self._stats["last_scan"]) if self._stats["last_scan"] else None
+            }
+        scans = stats["scans"]
+        stats["avg_scan_duration_ms"] = round(stats["total_scan_duration_ms"] / scans, 2) if scans else 0.0
+        stats["total_scan_duration_ms"] = round(stats["total_scan_duration_ms"], 2)
+        stats.update({
+            "backend": self.backend,
+            "running": self._running,
+            "interval": self.interval,
+            "full_scan_interval": self.full_scan_interval,
+            "paths": [str(path) for path in self.paths],
+            "files_tracked": len(self._file_stats),
+            "directories_tracked": len(self._dirs),
+            "watches": self._inotify.watch_count if self._inotify else 0,
+            "queue": self.queue.get_stats()
+        })
+        return stats
+
+    def _dispatch_batch(self, changes: List[FileChange]) -> int:
+        """
+        Consegna un lotto di modifiche alle callback (eseguito dai worker della coda).
+
+        Returns:
+            Numero di callback terminate con errore.
+        """
+        for change in changes:
+            logger.info(f"Modifica rilevata: {change}")
+
+        if self.on_batch_callback:
             try:
-                for item in path.iterdir():
-                    if item.is_file() and self._should_monitor(str(item)):
-                        current_files.add(str(item))
-                    elif item.is_dir() and self.recursive:
-                        self._scan_current_files(item, current_files)
-            except (PermissionError, FileNotFoundError) as e:
-                logger.debug(f"Errore durante la scansione della directory {path}: {e}")
+                self.on_batch_callback(changes)
+            except Exception as e:
+                logger.error(f"Errore nella callback di modifica: {e}")
+                return 1
+            return 0
+
+        errors = 0
+        if self.on_change_callback:
+            for change in changes:
+                try:
+                    self.on_change_callback(change)
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"Errore nella callback di modifica: {e}")
+        return errors
     
     def _watch_thread(self) -> None:
         """Thread principale per il monitoraggio dei file."""
-        logger.info(f"Avvio monitoraggio file su {len(self.paths)} percorsi con intervallo di {self.interval}s")
+        logger.info(f"Avvio monitoraggio file su {len(self.paths)} percorsi con intervallo di {self.interval}s "
+                    f"(backend: {self.backend})")
+        # L'intervallo è riletto ad ogni giro: il passaggio al polling lo accorcia subito
+        last_full_scan = time.monotonic()
         
         while self._running:
-            changes = self._check_for_changes()
+            full = self.full_scan_interval > 0 and time.monotonic() >= last_full_scan + self.full_scan_interval
+            if full:
+                last_full_scan = time.monotonic()
+
+            try:
+                changes = self._check_for_changes(full)
+            except Exception as e:
+                logger.error(f"Errore durante il controllo dei file: {e}")
+                changes = []
             
-            if changes:
-                for change in changes:
-                    logger.info(f"Modifica rilevata: {change}")
-                    if self.on_change_callback:
-                        try:
-                            self.on_change_callback(change)
-                        except Exception as e:
-                            logger.error(f"Errore nella callback di modifica: {e}")
+            # Le callback girano nei worker della coda: una callback lenta non blocca la scansione
+            for change in changes:
+                self.queue.put(change)
             
-            time.sleep(self.interval)
+            # Con inotify l'attesa avviene già in select()
+            if self._inotify is None:
+                self._stop_event.wait(self.interval)
     
     def start(self) -> None:
         """Avvia il monitoraggio dei file in un thread separato."""
@@ -233,7 +908,9 @@ class FileWatcher:
             return
             
         self._running = True
-        self._thread = threading.Thread(target=self._watch_thread, daemon=True)
+        self._stop_event.clear()
+        self.queue.start()
+        self._thread = threading.Thread(target=self._watch_thread, name="file-watcher", daemon=True)
         self._thread.start()
         logger.info("FileWatcher avviato")
     
@@ -244,10 +921,25 @@ class FileWatcher:
             return
             
         self._running = False
+        self._stop_event.set()
         if self._thread:
             self._thread.join(timeout=self.interval * 2)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+        self.queue.stop()
         logger.info("FileWatcher arrestato")
 
+
+# Ultimo watcher avviato con start_file_watcher (esposto dall'endpoint di health)
+_active_watcher: Optional[FileWatcher] = None
+
+
+def get_active_file_watcher() -> Optional[FileWatcher]:
+    """Restituisce il watcher avviato dal servizio, se presente."""
+    return _active_watcher
+
+
 # Funzione di aiuto per creare e avviare un watcher configurato
 def start_file_watcher(
     paths: List[str],
@@ -265,6 +957,8 @@ def start_file_watcher(
     Returns:
         L'istanza FileWatcher avviata
     """
+    global _active_watcher
     watcher = FileWatcher(paths=paths, on_change_callback=on_change_callback, **kwargs)
     watcher.start()
+    _active_watcher = watcher
     return watcher
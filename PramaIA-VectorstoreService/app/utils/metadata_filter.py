@@ -0,0 +1,223 @@
+"""
+Filtri tipizzati sui metadati dei documenti.
+
+Un filtro è un dict JSON:
+
+    {"and": [
+        {"field": "author", "op": "eq", "value": "Rossi"},
+        {"field": "file_size", "op": "gt", "value": 1048576},
+        {"field": "created_at", "op": "range", "gte": "2025-01-01", "lt": "2025-02-01"},
+        {"or": [
+            {"field": "tags", "op": "in", "value": ["contratti", "fatture"]},
+            {"field": "filename", "op": "prefix", "value": "report_"}
+        ]}
+    ]}
+
+Operatori: eq, ne, gt, gte, lt, lte, range, in, prefix; combinatori: and, or.
+Un dict semplice {"chiave": valore} equivale a un AND di uguaglianze.
+
+I campi id, filename, collection, created_at e last_updated sono colonne della
+tabella documents; ogni altro nome (o "metadata.<chiave>") è una chiave di
+document_metadata. I valori numerici sono confrontati sulla colonna value_num,
+le stringhe su value (le date ISO 8601 si confrontano correttamente come testo).
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+
+# Colonne della tabella documents filtrabili direttamente
+DOCUMENT_FIELDS = ("id", "filename", "collection", "created_at", "last_updated")
+
+COMPARISON_OPS = {"eq": "=", "ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+RANGE_BOUNDS = ("gt", "gte", "lt", "lte")
+
+# Limiti per evitare query SQL arbitrariamente grandi
+MAX_FILTER_CONDITIONS = 64
+MAX_IN_VALUES = 500
+
+
+class MetadataFilterError(ValueError):
+    """Filtro sui metadati non valido."""
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_shorthand(spec: Dict[str, Any]) -> bool:
+    return not ({"and", "or", "field"} & set(spec))
+
+
+def _shorthand_to_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    return {"and": [{"field": key, "op": "eq", "value": value} for key, value in spec.items()]}
+
+
+def _split_field(field: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Restituisce (colonna di documents, chiave di metadato): uno solo dei due è valorizzato."""
+    if not isinstance(field, str) or not field:
+        raise MetadataFilterError(f"Campo non valido: {field!r}")
+    if field.startswith("metadata."):
+        return None, field[len("metadata."):]
+    if field in DOCUMENT_FIELDS:
+        return field, None
+    return None, field
+
+
+def _check_scalar(value: Any) -> None:
+    if not (isinstance(value, (str, bool)) or _is_number(value)):
+        raise MetadataFilterError(f"Valore non supportato nel filtro: {value!r}")
+
+
+def _typed_condition(column: Optional[str], op: str, value: Any) -> Tuple[str, List[Any]]:
+    """
+    Condizione su una colonna di documents (column) o sul valore del metadato (column None).
+    """
+    _check_scalar(value)
+    sql_op = COMPARISON_OPS[op]
+    if column:
+        return f"d.{column} {sql_op} ?", [value]
+    if _is_number(value):
+        return f"value_num {sql_op} ?", [float(value)]
+    return f"value {sql_op} ?", [str(value)]
+
+
+def _prefix_bounds(prefix: str) -> Tuple[str, str]:
+    """Intervallo [prefix, upper) equivalente a LIKE 'prefix%', ma risolvibile con l'indice."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class _Compiler:
+    def __init__(self):
+        self.conditions = 0
+
+    def compile(self, spec: Any) -> Tuple[str, List[Any]]:
+        if not isinstance(spec, dict) or not spec:
+            raise MetadataFilterError("Il filtro deve essere un oggetto non vuoto")
+
+        if _is_shorthand(spec):
+            spec = _shorthand_to_spec(spec)
+
+        for combinator in ("and", "or"):
+            if combinator in spec:
+                children = spec[combinator]
+                if not isinstance(children, list) or not children:
+                    raise MetadataFilterError(f"'{combinator}' richiede una lista non vuota di condizioni")
+                compiled = [self.compile(child) for child in children]
+                sql = f" {combinator.upper()} ".join(f"({child_sql})" for child_sql, _ in compiled)
+                params = [param for _, child_params in compiled for param in child_params]
+                return sql, params
+
+        return self._compile_leaf(spec)
+
+    def _compile_leaf(self, spec: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        self.conditions += 1
+        if self.conditions > MAX_FILTER_CONDITIONS:
+            raise MetadataFilterError(f"Troppe condizioni nel filtro (massimo {MAX_FILTER_CONDITIONS})")
+
+        column, key = _split_field(spec.get("field"))
+        op = spec.get("op", "eq")
+
+        if op in COMPARISON_OPS:
+            if "value" not in spec:
+                raise MetadataFilterError(f"L'operatore '{op}' richiede 'value'")
+            condition, params = _typed_condition(column, op, spec["value"])
+
+        elif op == "range":
+            bounds = [bound for bound in RANGE_BOUNDS if bound in spec]
+            if not bounds:
+                raise MetadataFilterError("L'operatore 'range' richiede almeno uno tra gt, gte, lt, lte")
+            parts = [_typed_condition(column, bound, spec[bound]) for bound in bounds]
+            condition = " AND ".join(part_sql for part_sql, _ in parts)
+            params = [param for _, part_params in parts for param in part_params]
+
+        elif op == "in":
+            values = spec.get("value")
+            if not isinstance(values, list) or not values:
+                raise MetadataFilterError("L'operatore 'in' richiede una lista non vuota in 'value'")
+            if len(values) > MAX_IN_VALUES:
+                raise MetadataFilterError(f"Troppi valori per 'in' (massimo {MAX_IN_VALUES})")
+            for value in values:
+                _check_scalar(value)
+            placeholders = ", ".join("?" * len(values))
+            if column:
+                condition, params = f"d.{column} IN ({placeholders})", list(values)
+            elif all(_is_number(value) for value in values):
+                condition, params = f"value_num IN ({placeholders})", [float(value) for value in values]
+            else:
+                condition, params = f"value IN ({placeholders})", [str(value) for value in values]
+
+        elif op == "prefix":
+            prefix = spec.get("value")
+            if not isinstance(prefix, str) or not prefix:
+                raise MetadataFilterError("L'operatore 'prefix' richiede una stringa non vuota in 'value'")
+            low, high = _prefix_bounds(prefix)
+            target = f"d.{column}" if column else "value"
+            condition, params = f"{target} >= ? AND {target} < ?", [low, high]
+
+        else:
+            raise MetadataFilterError(f"Operatore non supportato: {op!r}")
+
+        if column:
+            return condition, params
+
+        # Sottoquery risolta con gli indici (key, value, document_id) e (key, value_num, document_id)
+        return (
+            f"d.id IN (SELECT document_id FROM document_metadata WHERE key = ? AND {condition})",
+            [key] + params
+        )
+
+
+def compile_metadata_filter(spec: Any) -> Tuple[str, List[Any]]:
+    """
+    Compila un filtro in una condizione SQL sul documento con alias `d`.
+
+    Returns:
+        Tuple (condizione SQL, parametri)
+
+    Raises:
+        MetadataFilterError: Se il filtro non è valido.
+    """
+    return _Compiler().compile(spec)
+
+
+def to_chroma_where(spec: Any) -> Optional[Dict[str, Any]]:
+    """
+    Traduce il filtro in una clausola `where` di ChromaDB, se possibile.
+
+    ChromaDB confronta con gt/gte/lt/lte solo numeri e non supporta prefix né le
+    colonne di documents: in questi casi restituisce None.
+    """
+    if not isinstance(spec, dict) or not spec:
+        return None
+    if _is_shorthand(spec):
+        spec = _shorthand_to_spec(spec)
+
+    for combinator in ("and", "or"):
+        if combinator in spec:
+            children = [to_chroma_where(child) for child in spec[combinator] or []]
+            if not children or any(child is None for child in children):
+                return None
+            return children[0] if len(children) == 1 else {f"${combinator}": children}
+
+    try:
+        column, key = _split_field(spec.get("field"))
+    except MetadataFilterError:
+        return None
+    if column:
+        return None
+
+    op = spec.get("op", "eq")
+    if op in ("eq", "ne"):
+        value = spec.get("value")
+        return {key: {f"${op}": value}} if isinstance(value, (str, bool)) or _is_number(value) else None
+    if op in RANGE_BOUNDS:
+        return {key: {f"${op}": spec["value"]}} if _is_number(spec.get("value")) else None
+    if op == "range":
+        bounds = [bound for bound in RANGE_BOUNDS if bound in spec]
+        if not bounds or not all(_is_number(spec[bound]) for bound in bounds):
+            return None
+        conditions = [{key: {f"${bound}": spec[bound]}} for bound in bounds]
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    if op == "in":
+        values = spec.get("value")
+        return {key: {"$in": values}} if isinstance(values, list) and values else None
+    return None
@@ -0,0 +1,129 @@
+"""
+Cache LRU con TTL per gli embedding delle query.
+
+Le query ripetute (retry, grafi RAG multi-nodo, dashboard in polling) riutilizzano
+l'embedding già calcolato invece di passare di nuovo dal modello.
+"""
+
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Any
+
+
+def normalize_query_text(text: str) -> str:
+    """
+    Normalizza il testo di una query per l'uso come chiave di cache.
+    Applica la normalizzazione Unicode NFKC e comprime gli spazi.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+class QueryEmbeddingCache:
+    """
+    Cache limitata degli embedding delle query, con chiave (modello, testo normalizzato).
+
+    Le voci più vecchie vengono rimosse quando si supera `max_size` (LRU) e le voci
+    scadute dopo `ttl_seconds` vengono ignorate e rimosse alla lettura.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 600.0):
+        """
+        Args:
+            max_size: Numero massimo di embedding in cache (0 disabilita la cache)
+            ttl_seconds: Durata di validità di una voce in secondi (0 = nessuna scadenza)
+        """
+        self.max_size = max(0, max_size)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        """
+        Restituisce l'embedding in cache per la query, o None se assente o scaduto.
+        """
+        if not self.enabled:
+            return None
+
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, vector = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(vector)
+
+    def put(self, model_name: str, text: str, vector: List[float]) -> None:
+        """
+        Memorizza l'embedding di una query, rimuovendo le voci meno usate se necessario.
+        """
+        if not self.enabled:
+            return
+
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(vector))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def sample(self, model_name: str, limit: int) -> List[List[float]]:
+        """
+        Restituisce fino a `limit` embedding non scaduti del modello, dai più recenti.
+        Usati come query reali dal benchmark degli indici.
+        """
+        now = time.monotonic()
+        vectors: List[List[float]] = []
+        with self._lock:
+            for (entry_model, _), (stored_at, vector) in reversed(self._entries.items()):
+                if len(vectors) >= limit:
+                    break
+                if entry_model != model_name:
+                    continue
+                if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+                    continue
+                vectors.append(list(vector))
+        return vectors
+
+    def clear(self) -> None:
+        """Svuota la cache mantenendo i contatori."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce i contatori di hit/miss/eviction della cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
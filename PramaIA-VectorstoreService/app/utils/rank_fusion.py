@@ -0,0 +1,89 @@
+"""
+Fusione di liste di risultati ordinate (ricerca ibrida lessicale + vettoriale).
+
+Ogni lista è una sequenza di dict con almeno 'id', già ordinata per rilevanza
+decrescente. Le funzioni restituiscono una lista unica con 'hybrid_score' e la
+posizione del documento in ciascuna lista di partenza.
+"""
+
+from typing import Dict, List, Any, Optional
+
+# Costante di smorzamento standard della Reciprocal Rank Fusion
+DEFAULT_RRF_K = 60
+
+
+def _merge(result_lists: Dict[str, List[Dict[str, Any]]], scores: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Unisce i risultati per id, conservando i campi della prima lista che li contiene."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for leg, results in result_lists.items():
+        for rank, result in enumerate(results, start=1):
+            doc_id = result["id"]
+            entry = merged.get(doc_id)
+            if entry is None:
+                entry = {**result, "ranks": {}}
+                merged[doc_id] = entry
+            else:
+                for key, value in result.items():
+                    entry.setdefault(key, value)
+            entry["ranks"][leg] = rank
+
+    fused = list(merged.values())
+    for entry in fused:
+        entry["hybrid_score"] = scores[entry["id"]]
+    fused.sort(key=lambda entry: entry["hybrid_score"], reverse=True)
+    return fused
+
+
+def reciprocal_rank_fusion(result_lists: Dict[str, List[Dict[str, Any]]],
+                           k: int = DEFAULT_RRF_K,
+                           weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Reciprocal Rank Fusion: score = somma su ogni lista di peso / (k + posizione).
+
+    Non dipende dalla scala dei punteggi originali, quindi combina senza
+    normalizzazioni distanze coseno e punteggi BM25.
+
+    Args:
+        result_lists: Liste di risultati per nome (es. {"vector": [...], "lexical": [...]})
+        k: Costante di smorzamento (valori alti riducono il peso delle prime posizioni)
+        weights: Peso di ciascuna lista (default 1.0)
+
+    Returns:
+        Lista fusa ordinata per 'hybrid_score' decrescente.
+    """
+    weights = weights or {}
+    scores: Dict[str, float] = {}
+    for leg, results in result_lists.items():
+        weight = weights.get(leg, 1.0)
+        for rank, result in enumerate(results, start=1):
+            scores[result["id"]] = scores.get(result["id"], 0.0) + weight / (k + rank)
+    return _merge(result_lists, scores)
+
+
+def weighted_score_fusion(result_lists: Dict[str, List[Dict[str, Any]]],
+                          score_keys: Dict[str, str],
+                          weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Combinazione lineare dei punteggi, normalizzati min-max in [0, 1] per ogni lista.
+
+    Args:
+        result_lists: Liste di risultati per nome
+        score_keys: Campo del punteggio da usare per ogni lista (più alto = più rilevante)
+        weights: Peso di ciascuna lista (default 1.0)
+
+    Returns:
+        Lista fusa ordinata per 'hybrid_score' decrescente.
+    """
+    weights = weights or {}
+    scores: Dict[str, float] = {}
+    for leg, results in result_lists.items():
+        if not results:
+            continue
+        raw = [float(result.get(score_keys[leg], 0.0) or 0.0) for result in results]
+        low, high = min(raw), max(raw)
+        span = high - low
+        weight = weights.get(leg, 1.0)
+        for result, value in zip(results, raw):
+            normalized = (value - low) / span if span else 1.0
+            scores[result["id"]] = scores.get(result["id"], 0.0) + weight * normalized
+    return _merge(result_lists, scores)
@@ -5,12 +5,16 @@ Sostituisce la precedente implementazione basata su JSON file con un database SQ
 
 import os
 import json
+import base64
 import sqlite3
 import logging
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
+from app.utils.sqlite_pool import get_pool, PooledConnection
+from app.utils.metadata_filter import compile_metadata_filter
+
 # Configurazione logger
 logger = logging.getLogger(__name__)
 
@@ -42,16 +46,30 @@ class SQLiteMetadataManager:
         if migrate_from_json and os.path.exists(self.json_file):
             self._migrate_from_json()
     
-    def _get_db_connection(self) -> sqlite3.Connection:
+    def _get_db_connection(self) -> PooledConnection:
         """
-        Ottiene una connessione al database SQLite.
+        Ottiene una connessione al database SQLite dal pool condiviso.
+        
+        Le connessioni sono in modalità WAL con busy_timeout, quindi i lettori non si
+        bloccano sugli scrittori; `conn.close()` restituisce la connessione al pool.
         
         Returns:
             Connessione SQLite.
         """
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row  # Per ottenere risultati come dizionari
-        return conn
+        return get_pool(self.db_file).acquire()
+    
+    def close_connections(self) -> None:
+        """
+        Chiude le connessioni del pool verso questo database.
+        Da chiamare prima di eliminare o sostituire il file del database.
+        """
+        get_pool(self.db_file).close_all()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce le metriche del pool di connessioni (incluso il tempo di attesa).
+        """
+        return get_pool(self.db_file).get_stats()
     
     def _init_database(self) -> None:
         """
@@ -87,7 +105,21 @@ class SQLiteMetadataManager:
             
             # Indici per migliorare le performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents(collection)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_document_metadata_key ON document_metadata(key)')
+            
+            # Valore numerico tipizzato dei metadati (colonna generata, indicizzabile)
+            cursor.execute("PRAGMA table_xinfo(document_metadata)")
+            if "value_num" not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute('''
+                    ALTER TABLE document_metadata ADD COLUMN value_num REAL
+                    GENERATED ALWAYS AS (
+                        CASE WHEN value_type IN ('int', 'float') THEN CAST(value AS REAL) END
+                    ) VIRTUAL
+                ''')
+            
+            # Indici composti per i filtri tipizzati (coprono anche la ricerca per sola chiave)
+            cursor.execute('DROP INDEX IF EXISTS idx_document_metadata_key')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_document_metadata_key_value ON document_metadata(key, value, document_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_document_metadata_key_num ON document_metadata(key, value_num, document_id)')
             
             # Verifica se la colonna content esiste già
             try:
@@ -97,6 +129,14 @@ class SQLiteMetadataManager:
                 logger.info("Aggiunta colonna 'content' alla tabella documents")
                 cursor.execute('ALTER TABLE documents ADD COLUMN content TEXT')
             
+            # Indice per la paginazione keyset su (created_at, id)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_created_at_id ON documents(created_at, id)')
+            
+            self._init_document_counts(cursor)
+            self._init_document_stats(cursor)
+            self._init_fulltext_index(cursor)
+            self._init_reconciliation_jobs(cursor)
+            
             conn.commit()
             conn.close()
             logger.info(f"Database inizializzato con successo: {self.db_file}")
@@ -104,6 +144,389 @@ class SQLiteMetadataManager:
             logger.error(f"Errore nell'inizializzazione del database: {str(e)}")
             raise
     
+    def _init_document_counts(self, cursor) -> None:
+        """
+        Crea la tabella dei contatori per collezione, mantenuta da trigger su documents,
+        così il conteggio dei documenti non richiede un COUNT(*) sull'intera tabella.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_counts'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS document_counts (
+                collection TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_counts_insert AFTER INSERT ON documents
+            BEGIN
+                INSERT INTO document_counts (collection, count) VALUES (NEW.collection, 1)
+                ON CONFLICT(collection) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_counts_delete AFTER DELETE ON documents
+            BEGIN
+                UPDATE document_counts SET count = count - 1 WHERE collection = OLD.collection;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_counts_update AFTER UPDATE OF collection ON documents
+            WHEN OLD.collection IS NOT NEW.collection
+            BEGIN
+                UPDATE document_counts SET count = count - 1 WHERE collection = OLD.collection;
+                INSERT INTO document_counts (collection, count) VALUES (NEW.collection, 1)
+                ON CONFLICT(collection) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        
+        if not exists:
+            # Primo avvio su un database esistente: inizializza i contatori
+            cursor.execute(
+                "INSERT INTO document_counts (collection, count) " + self._STATS_SOURCE_QUERIES["collection"]
+            )
+    
+    def _init_document_stats(self, cursor) -> None:
+        """
+        Crea la tabella delle statistiche per giorno di creazione e per content_type,
+        mantenuta da trigger su documents e document_metadata.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_stats'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS document_stats (
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, key)
+            )
+        ''')
+        
+        # Giorno di creazione (created_at è ISO o CURRENT_TIMESTAMP: i primi 10 caratteri sono la data)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_stats_day_insert AFTER INSERT ON documents
+            BEGIN
+                INSERT INTO document_stats (dimension, key, count)
+                VALUES ('day', COALESCE(substr(NEW.created_at, 1, 10), 'unknown'), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_stats_day_delete AFTER DELETE ON documents
+            BEGIN
+                UPDATE document_stats SET count = count - 1
+                WHERE dimension = 'day' AND key = COALESCE(substr(OLD.created_at, 1, 10), 'unknown');
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_stats_day_update AFTER UPDATE OF created_at ON documents
+            WHEN substr(OLD.created_at, 1, 10) IS NOT substr(NEW.created_at, 1, 10)
+            BEGIN
+                UPDATE document_stats SET count = count - 1
+                WHERE dimension = 'day' AND key = COALESCE(substr(OLD.created_at, 1, 10), 'unknown');
+                INSERT INTO document_stats (dimension, key, count)
+                VALUES ('day', COALESCE(substr(NEW.created_at, 1, 10), 'unknown'), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        
+        # Content type, dal metadato 'content_type'
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_stats_type_insert AFTER INSERT ON document_metadata
+            WHEN NEW.key = 'content_type'
+            BEGIN
+                INSERT INTO document_stats (dimension, key, count)
+                VALUES ('content_type', COALESCE(lower(NEW.value), ''), 1)
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_stats_type_delete AFTER DELETE ON document_metadata
+            WHEN OLD.key = 'content_type'
+            BEGIN
+                UPDATE document_stats SET count = count - 1
+                WHERE dimension = 'content_type' AND key = COALESCE(lower(OLD.value), '');
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_document_stats_type_update AFTER UPDATE OF key, value ON document_metadata
+            WHEN OLD.key = 'content_type' OR NEW.key = 'content_type'
+            BEGIN
+                UPDATE document_stats SET count = count - 1
+                WHERE OLD.key = 'content_type' AND dimension = 'content_type' AND key = COALESCE(lower(OLD.value), '');
+                INSERT INTO document_stats (dimension, key, count)
+                SELECT 'content_type', COALESCE(lower(NEW.value), ''), 1 WHERE NEW.key = 'content_type'
+                ON CONFLICT(dimension, key) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        
+        if not exists:
+            self._rebuild_document_stats(cursor)
+    
+    # Metadati i cui valori vengono indicizzati nella ricerca full-text
+    FTS_METADATA_KEYS = ("title", "author", "description", "tags", "keywords", "subject", "source", "original_filename")
+    
+    def _fts_metadata_sql(self, document_id_expr: str) -> str:
+        """Sottoquery che concatena i valori dei metadati indicizzati di un documento."""
+        keys = ", ".join(f"'{key}'" for key in self.FTS_METADATA_KEYS)
+        return (
+            f"(SELECT group_concat(value, ' ') FROM document_metadata "
+            f"WHERE document_id = {document_id_expr} AND key IN ({keys}))"
+        )
+    
+    def _init_fulltext_index(self, cursor) -> None:
+        """
+        Crea l'indice FTS5 su filename, content e metadati selezionati.
+        
+        Le righe dell'indice hanno lo stesso rowid della tabella documents e sono
+        mantenute da trigger su documents e document_metadata.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                filename, content, metadata,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_documents_fts_insert AFTER INSERT ON documents
+            BEGIN
+                INSERT INTO documents_fts (rowid, filename, content, metadata)
+                VALUES (NEW.rowid, NEW.filename, NEW.content, {self._fts_metadata_sql("NEW.id")});
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_documents_fts_update AFTER UPDATE OF filename, content ON documents
+            BEGIN
+                UPDATE documents_fts SET filename = NEW.filename, content = NEW.content WHERE rowid = NEW.rowid;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_documents_fts_delete AFTER DELETE ON documents
+            BEGIN
+                DELETE FROM documents_fts WHERE rowid = OLD.rowid;
+            END
+        ''')
+        
+        keys = ", ".join(f"'{key}'" for key in self.FTS_METADATA_KEYS)
+        for event, row in (("INSERT", "NEW"), ("DELETE", "OLD"), ("UPDATE OF value", "NEW")):
+            trigger_name = f"trg_documents_fts_metadata_{event.split()[0].lower()}"
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {trigger_name} AFTER {event} ON document_metadata
+                WHEN {row}.key IN ({keys})
+                BEGIN
+                    UPDATE documents_fts SET metadata = {self._fts_metadata_sql(f"{row}.document_id")}
+                    WHERE rowid = (SELECT rowid FROM documents WHERE id = {row}.document_id);
+                END
+            ''')
+        
+        if not exists:
+            self._rebuild_fulltext_index(cursor)
+    
+    def _rebuild_fulltext_index(self, cursor) -> None:
+        """Ricostruisce l'indice FTS5 dai documenti (prima creazione e dopo VACUUM)."""
+        cursor.execute("DELETE FROM documents_fts")
+        cursor.execute(
+            "INSERT INTO documents_fts (rowid, filename, content, metadata) "
+            f"SELECT d.rowid, d.filename, d.content, {self._fts_metadata_sql('d.id')} FROM documents d"
+        )
+    
+    @staticmethod
+    def build_fts_query(text: str, column: Optional[str] = None) -> str:
+        """
+        Converte il testo libero dell'utente in un'espressione FTS5 sicura.
+        
+        Ogni parola diventa una stringa tra virgolette (gli operatori FTS5 non vengono
+        interpretati); un '*' finale mantiene la ricerca per prefisso. Le parole sono
+        in AND implicito.
+        
+        Args:
+            text: Testo della ricerca
+            column: Limita la ricerca a una colonna dell'indice (opzionale)
+        
+        Returns:
+            Espressione MATCH, o stringa vuota se il testo non contiene parole.
+        """
+        terms = []
+        for token in (text or "").split():
+            prefix = token.endswith("*")
+            token = token.rstrip("*").replace('"', "")
+            if token:
+                terms.append(f'"{token}"' + ("*" if prefix else ""))
+        
+        if not terms:
+            return ""
+        expression = " ".join(terms)
+        return f"{column} : ({expression})" if column else expression
+    
+    def full_text_search(self, query: str, collection: Optional[str] = None,
+                         limit: int = 20, offset: int = 0,
+                         fields: Optional[List[str]] = None,
+                         metadata_filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ricerca full-text con ranking BM25 su filename, content e metadati selezionati.
+        
+        Args:
+            query: Testo da cercare (parole in AND, '*' finale per la ricerca per prefisso)
+            collection: Filtra per collezione (opzionale)
+            limit: Numero di risultati nella pagina
+            offset: Offset per la paginazione
+            fields: Campi da restituire (vedi get_documents)
+            metadata_filters: Filtri di uguaglianza sui metadati (opzionale)
+        
+        Returns:
+            Dict con 'results' (ogni risultato ha 'score' e 'snippet') e 'total'.
+        """
+        match = self.build_fts_query(query)
+        if not match:
+            return {"results": [], "total": 0}
+        
+        columns, with_metadata = self._resolve_fields(fields)
+        where = "documents_fts MATCH ?"
+        params: List[Any] = [match]
+        if collection:
+            where += " AND d.collection = ?"
+            params.append(collection)
+        filter_clauses, filter_params = self._metadata_filter_clauses(metadata_filters)
+        for clause in filter_clauses:
+            where += f" AND {clause}"
+        params.extend(filter_params)
+        
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT COUNT(*) FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid WHERE {where}",
+                params
+            )
+            total = cursor.fetchone()[0]
+            
+            # bm25: valori più bassi = più rilevanti; il nome file pesa più del contenuto
+            cursor.execute(
+                f"""
+                SELECT {columns},
+                       bm25(documents_fts, 5.0, 1.0, 2.0) AS score,
+                       snippet(documents_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+                FROM documents_fts
+                JOIN documents d ON d.rowid = documents_fts.rowid
+                WHERE {where}
+                ORDER BY score
+                LIMIT ? OFFSET ?
+                """,
+                params + [limit, offset]
+            )
+            results = []
+            for row in cursor.fetchall():
+                result = dict(row)
+                # Punteggio crescente con la rilevanza, più leggibile per i client
+                result["score"] = -result["score"]
+                results.append(result)
+            
+            if with_metadata:
+                self._hydrate_metadata(cursor, results)
+        finally:
+            conn.close()
+        
+        return {"results": results, "total": total}
+    
+    # Query che ricalcolano da zero i contatori, usate per l'inizializzazione e la riconciliazione
+    _STATS_SOURCE_QUERIES = {
+        "collection": "SELECT collection, COUNT(*) FROM documents GROUP BY collection",
+        "day": "SELECT COALESCE(substr(created_at, 1, 10), 'unknown'), COUNT(*) FROM documents GROUP BY 1",
+        "content_type": (
+            "SELECT COALESCE(lower(value), ''), COUNT(*) FROM document_metadata "
+            "WHERE key = 'content_type' GROUP BY 1"
+        )
+    }
+    
+    def _read_stats(self, cursor) -> Dict[str, Dict[str, int]]:
+        """Legge i contatori correnti, escludendo le chiavi a zero."""
+        cursor.execute("SELECT collection, count FROM document_counts WHERE count != 0")
+        stats = {"collection": {row[0]: row[1] for row in cursor.fetchall()}, "day": {}, "content_type": {}}
+        cursor.execute("SELECT dimension, key, count FROM document_stats WHERE count != 0")
+        for dimension, key, count in cursor.fetchall():
+            stats.setdefault(dimension, {})[key] = count
+        return stats
+    
+    def _rebuild_document_stats(self, cursor) -> Dict[str, Dict[str, int]]:
+        """
+        Ricalcola tutti i contatori dai dati e li sostituisce.
+        
+        Returns:
+            I contatori ricalcolati, per dimensione.
+        """
+        actual = {}
+        for dimension, query in self._STATS_SOURCE_QUERIES.items():
+            cursor.execute(query)
+            actual[dimension] = {row[0]: row[1] for row in cursor.fetchall()}
+        
+        cursor.execute("DELETE FROM document_counts")
+        cursor.executemany(
+            "INSERT INTO document_counts (collection, count) VALUES (?, ?)",
+            actual["collection"].items()
+        )
+        cursor.execute("DELETE FROM document_stats")
+        cursor.executemany(
+            "INSERT INTO document_stats (dimension, key, count) VALUES (?, ?, ?)",
+            [(dimension, key, count) for dimension in ("day", "content_type") for key, count in actual[dimension].items()]
+        )
+        return actual
+    
+    def get_document_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce i contatori mantenuti dai trigger, senza scorrere i documenti.
+        
+        Returns:
+            Dict con 'total' e i conteggi 'by_collection', 'by_day' e 'by_content_type'.
+        """
+        conn = self._get_db_connection()
+        try:
+            stats = self._read_stats(conn.cursor())
+        finally:
+            conn.close()
+        
+        return {
+            "total": sum(stats["collection"].values()),
+            "by_collection": stats["collection"],
+            "by_day": stats["day"],
+            "by_content_type": stats["content_type"]
+        }
+    
+    def reconcile_document_stats(self) -> Dict[str, Any]:
+        """
+        Ricalcola i contatori dai dati e corregge eventuali derive (es. scritture
+        avvenute fuori da questo servizio o database precedenti ai trigger).
+        
+        Returns:
+            Dict con le differenze corrette, per dimensione: {chiave: [contato, reale]}.
+        """
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            stored = self._read_stats(cursor)
+            actual = self._rebuild_document_stats(cursor)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        drift = {}
+        for dimension, counts in actual.items():
+            keys = set(counts) | set(stored.get(dimension, {}))
+            diff = {
+                key: [stored.get(dimension, {}).get(key, 0), counts.get(key, 0)]
+                for key in keys
+                if stored.get(dimension, {}).get(key, 0) != counts.get(key, 0)
+            }
+            if diff:
+                drift[dimension] = diff
+        return drift
+    
     def _migrate_from_json(self) -> None:
         """
         Migra i dati dal vecchio formato JSON al nuovo database SQLite.
@@ -193,7 +616,74 @@ class SQLiteMetadataManager:
             logger.error(f"Errore durante la migrazione dal JSON al database: {str(e)}")
             raise
     
-    def get_documents(self, collection: Optional[str] = None, limit: int = 1000, offset: int = 0) -> List[Dict[str, Any]]:
+    # Colonne della tabella documents selezionabili con il parametro `fields`
+    DOCUMENT_COLUMNS = ("id", "filename", "collection", "content", "created_at", "last_updated")
+    
+    # Numero massimo di parametri per ogni clausola IN (...) (limite SQLite storico: 999)
+    METADATA_BATCH_SIZE = 500
+    
+    @staticmethod
+    def _decode_metadata_value(value: Any, value_type: str) -> Any:
+        """
+        Converte un valore di metadato memorizzato come testo nel tipo originale.
+        """
+        if value_type == 'int':
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                # Se non può essere convertito, mantieni come stringa
+                return value
+        if value_type == 'float':
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                # Se non può essere convertito, mantieni come stringa
+                return value
+        if value_type == 'bool':
+            return str(value).lower() in ('true', '1', 'yes')
+        if value_type == 'json':
+            try:
+                return json.loads(value)
+            except (TypeError, ValueError):
+                return value
+        return value
+    
+    def _resolve_fields(self, fields: Optional[List[str]]) -> Tuple[str, bool]:
+        """
+        Traduce la proiezione `fields` nella lista di colonne SQL.
+        
+        Returns:
+            Tuple (colonne per la SELECT, True se servono i metadati)
+        """
+        if not fields:
+            return "d.*", True
+        
+        columns = ["id"] + [f for f in self.DOCUMENT_COLUMNS if f in fields and f != "id"]
+        return ", ".join(f"d.{column}" for column in columns), "metadata" in fields
+    
+    def _hydrate_metadata(self, cursor, documents: List[Dict[str, Any]]) -> None:
+        """
+        Carica i metadati di tutti i documenti con query IN (...) a blocchi,
+        invece di una query per documento.
+        """
+        by_id = {}
+        for doc in documents:
+            doc['metadata'] = {}
+            by_id[doc['id']] = doc['metadata']
+        
+        doc_ids = list(by_id.keys())
+        for start in range(0, len(doc_ids), self.METADATA_BATCH_SIZE):
+            chunk = doc_ids[start:start + self.METADATA_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT document_id, key, value, value_type FROM document_metadata WHERE document_id IN ({placeholders})",
+                chunk
+            )
+            for document_id, key, value, value_type in cursor.fetchall():
+                by_id[document_id][key] = self._decode_metadata_value(value, value_type)
+    
+    def get_documents(self, collection: Optional[str] = None, limit: int = 1000, offset: int = 0,
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Ottiene tutti i documenti, opzionalmente filtrati per collezione.
         
@@ -201,6 +691,8 @@ class SQLiteMetadataManager:
             collection: Nome della collezione per filtrare i risultati (opzionale)
             limit: Numero massimo di documenti da restituire
             offset: Offset per la paginazione
+            fields: Campi da restituire (es. ["id", "filename", "collection"]). I metadati
+                vengono caricati solo se "metadata" è tra i campi. Se None, tutti i campi.
         
         Returns:
             Lista di documenti con i relativi metadati.
@@ -209,67 +701,27 @@ class SQLiteMetadataManager:
             conn = self._get_db_connection()
             cursor = conn.cursor()
             
+            columns, with_metadata = self._resolve_fields(fields)
+            
             # Query di base
-            query = "SELECT * FROM documents"
+            query = f"SELECT {columns} FROM documents d"
             params = []
             
             # Aggiungi filtro per collezione se specificato
             if collection:
-                query += " WHERE collection = ?"
+                query += " WHERE d.collection = ?"
                 params.append(collection)
             
             # Aggiungi limit e offset
-            query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+            query += " ORDER BY d.created_at DESC LIMIT ? OFFSET ?"
             params.extend([limit, offset])
             
             cursor.execute(query, params)
-            documents_rows = cursor.fetchall()
+            documents = [dict(doc_row) for doc_row in cursor.fetchall()]
             
-            # Converti i risultati in dizionari
-            documents = []
-            for doc_row in documents_rows:
-                doc = dict(doc_row)
-                
-                # Ottieni i metadati per questo documento
-                cursor.execute(
-                    "SELECT key, value, value_type FROM document_metadata WHERE document_id = ?",
-                    (doc['id'],)
-                )
-                metadata_rows = cursor.fetchall()
-                
-                # Converti i metadati in un dizionario
-                metadata = {}
-                for meta_row in metadata_rows:
-                    key = meta_row['key']
-                    value = meta_row['value']
-                    value_type = meta_row['value_type']
-                    
-                    # Converti il valore nel tipo corretto
-                    if value_type == 'int':
-                        try:
-                            value = int(value)
-                        except ValueError:
-                            # Se non può essere convertito, mantieni come stringa
-                            pass
-                    elif value_type == 'float':
-                        try:
-                            value = float(value)
-                        except ValueError:
-                            # Se non può essere convertito, mantieni come stringa
-                            pass
-                    elif value_type == 'bool':
-                        value = str(value).lower() in ('true', '1', 'yes')
-                    elif value_type == 'json':
-                        try:
-                            value = json.loads(value)
-                        except:
-                            pass
-                    
-                    metadata[key] = value
-                
-                # Aggiungi metadati al documento
-                doc['metadata'] = metadata
-                documents.append(doc)
+            # Metadati di tutta la pagina in blocco
+            if with_metadata:
+                self._hydrate_metadata(cursor, documents)
             
             conn.close()
             return documents
@@ -278,6 +730,108 @@ class SQLiteMetadataManager:
             logger.error(f"Errore nel recupero dei documenti: {str(e)}")
             return []
     
+    @staticmethod
+    def encode_cursor(created_at: Optional[str], document_id: str) -> str:
+        """Codifica la posizione (created_at, id) in un cursore opaco."""
+        raw = json.dumps([created_at, document_id], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor_token: str) -> Tuple[Optional[str], str]:
+        """
+        Decodifica un cursore prodotto da encode_cursor.
+        
+        Raises:
+            ValueError: Se il cursore non è valido.
+        """
+        try:
+            padded = cursor_token + "=" * (-len(cursor_token) % 4)
+            created_at, document_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            return created_at, str(document_id)
+        except Exception as e:
+            raise ValueError(f"Cursore non valido: {cursor_token}") from e
+    
+    def get_documents_page(self, limit: int = 50, cursor_token: Optional[str] = None,
+                           collection: Optional[str] = None, offset: int = 0,
+                           fields: Optional[List[str]] = None,
+                           metadata_filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Restituisce una pagina di documenti con paginazione keyset su (created_at, id).
+        
+        Il costo di una pagina è proporzionale alla sua dimensione, non al numero
+        totale di documenti: la posizione viene ripresa dal cursore tramite l'indice
+        idx_documents_created_at_id invece di scorrere le righe precedenti.
+        
+        Args:
+            limit: Numero di documenti nella pagina
+            cursor_token: Cursore restituito dalla pagina precedente (opzionale)
+            collection: Filtra per collezione (opzionale)
+            offset: Offset legacy, usato solo se cursor_token è assente
+            fields: Campi da restituire (vedi get_documents)
+            metadata_filter: Filtro sui metadati (vedi app.utils.metadata_filter)
+        
+        Returns:
+            Dict con 'documents', 'next_cursor' (None se è l'ultima pagina) e 'total'
+            ('total' è None se è presente un filtro, per non contare tutte le corrispondenze).
+        
+        Raises:
+            ValueError: Se il cursore o il filtro non sono validi.
+        """
+        columns, with_metadata = self._resolve_fields(fields)
+        # created_at serve a costruire il cursore anche se non è stato richiesto
+        select_columns = columns if columns == "d.*" or "d.created_at" in columns else f"{columns}, d.created_at"
+        
+        where = []
+        params: List[Any] = []
+        if collection:
+            where.append("d.collection = ?")
+            params.append(collection)
+        filter_clauses, filter_params = self._metadata_filter_clauses(metadata_filter)
+        where.extend(filter_clauses)
+        params.extend(filter_params)
+        if cursor_token:
+            created_at, last_id = self.decode_cursor(cursor_token)
+            where.append("(d.created_at, d.id) < (?, ?)")
+            params.extend([created_at, last_id])
+        
+        query = f"SELECT {select_columns} FROM documents d"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY d.created_at DESC, d.id DESC LIMIT ?"
+        params.append(limit + 1)
+        if offset and not cursor_token:
+            query += " OFFSET ?"
+            params.append(offset)
+        
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            documents = [dict(row) for row in cursor.fetchall()]
+            
+            has_more = len(documents) > limit
+            documents = documents[:limit]
+            
+            next_cursor = None
+            if has_more and documents:
+                last = documents[-1]
+                next_cursor = self.encode_cursor(last.get("created_at"), last["id"])
+            
+            if select_columns != columns:
+                for doc in documents:
+                    doc.pop("created_at", None)
+            
+            if with_metadata:
+                self._hydrate_metadata(cursor, documents)
+        finally:
+            conn.close()
+        
+        return {
+            "documents": documents,
+            "next_cursor": next_cursor,
+            "total": None if metadata_filter else self.get_document_count(collection)
+        }
+    
     def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
         """
         Ottiene un documento specifico dal database.
@@ -332,37 +886,10 @@ class SQLiteMetadataManager:
             print(f"Documento {document_id} ha {len(metadata_rows)} metadati")
             
             # Converti i metadati in un dizionario
-            metadata = {}
-            for meta_row in metadata_rows:
-                key = meta_row['key']
-                value = meta_row['value']
-                value_type = meta_row['value_type']
-                
-                # Converti il valore nel tipo corretto
-                if value_type == 'int':
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        # Se non può essere convertito, mantieni come stringa
-                        pass
-                elif value_type == 'float':
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        # Se non può essere convertito, mantieni come stringa
-                        pass
-                elif value_type == 'bool':
-                    value = str(value).lower() in ('true', '1', 'yes')
-                elif value_type == 'json':
-                    try:
-                        value = json.loads(value)
-                    except:
-                        pass
-                
-                metadata[key] = value
-            
-            # Aggiungi metadati al documento
-            doc['metadata'] = metadata
+            doc['metadata'] = {
+                meta_row['key']: self._decode_metadata_value(meta_row['value'], meta_row['value_type'])
+                for meta_row in metadata_rows
+            }
             
             conn.close()
             return doc
@@ -433,20 +960,10 @@ class SQLiteMetadataManager:
             # Inserisci i metadati
             metadata = document.get('metadata', {})
             for key, value in metadata.items():
-                value_type = "str"
-                if isinstance(value, int):
-                    value_type = "int"
-                elif isinstance(value, float):
-                    value_type = "float"
-                elif isinstance(value, bool):
-                    value_type = "bool"
-                elif isinstance(value, dict) or isinstance(value, list):
-                    value = json.dumps(value)
-                    value_type = "json"
-                
+                text_value, value_type = self._serialize_metadata_value(value)
                 cursor.execute(
                     "INSERT INTO document_metadata (document_id, key, value, value_type) VALUES (?, ?, ?, ?)",
-                    (document.get('id', ''), key, str(value), value_type)
+                    (document.get('id', ''), key, text_value, value_type)
                 )
             
             conn.commit()
@@ -457,6 +974,100 @@ class SQLiteMetadataManager:
             logger.error(f"Errore nell'aggiunta/aggiornamento del documento {document.get('id', '')}: {str(e)}")
             return False
     
+    @staticmethod
+    def _serialize_metadata_value(value: Any) -> Tuple[str, str]:
+        """
+        Converte un valore di metadato nella coppia (valore testuale, value_type).
+        """
+        if isinstance(value, bool):
+            return str(value), "bool"
+        if isinstance(value, int):
+            return str(value), "int"
+        if isinstance(value, float):
+            return str(value), "float"
+        if isinstance(value, (dict, list)):
+            return json.dumps(value), "json"
+        return str(value), "str"
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Aggiunge o aggiorna più documenti in un'unica transazione.
+
+        Usa executemany per documenti e metadati: N documenti costano un solo commit
+        invece di N connessioni e N transazioni.
+
+        Args:
+            documents: Documenti da aggiungere/aggiornare (stesso formato di add_document)
+
+        Returns:
+            Dizionario con 'success' (bool), 'ids' (ID scritti) ed eventuale 'error'.
+        """
+        if not documents:
+            return {"success": True, "ids": []}
+
+        # Se lo stesso ID compare più volte nel batch vince l'ultima occorrenza
+        unique_documents = {document.get('id', ''): document for document in documents}
+
+        now = datetime.now().isoformat()
+        document_rows = []
+        metadata_rows = []
+        doc_ids = list(unique_documents.keys())
+
+        for doc_id, document in unique_documents.items():
+            metadata = document.get('metadata', {}) or {}
+            document_rows.append((
+                doc_id,
+                document.get('filename', ''),
+                document.get('collection', document.get('collection_name', '')),
+                document.get('content', ''),
+                metadata.get('created_at', now),
+                now
+            ))
+            for key, value in metadata.items():
+                text_value, value_type = self._serialize_metadata_value(value)
+                metadata_rows.append((doc_id, key, text_value, value_type))
+
+        conn = None
+        try:
+            conn = self._get_db_connection()
+            cursor = conn.cursor()
+            conn.execute("BEGIN TRANSACTION")
+
+            # Upsert: per i documenti esistenti created_at resta invariato
+            cursor.executemany(
+                """
+                INSERT INTO documents (id, filename, collection, content, created_at, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    filename = excluded.filename,
+                    collection = excluded.collection,
+                    content = excluded.content,
+                    last_updated = excluded.last_updated
+                """,
+                document_rows
+            )
+            cursor.executemany(
+                "DELETE FROM document_metadata WHERE document_id = ?",
+                [(doc_id,) for doc_id in doc_ids]
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO document_metadata (document_id, key, value, value_type) VALUES (?, ?, ?, ?)",
+                metadata_rows
+            )
+
+            conn.commit()
+            logger.debug(f"Batch di {len(doc_ids)} documenti scritto nel database")
+            return {"success": True, "ids": doc_ids}
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Errore nell'aggiunta batch di {len(doc_ids)} documenti: {str(e)}")
+            return {"success": False, "ids": [], "error": str(e)}
+        finally:
+            if conn:
+                conn.close()
+
     def delete_document(self, document_id: str) -> bool:
         """
         Elimina un documento dal database.
@@ -500,37 +1111,15 @@ class SQLiteMetadataManager:
             conn = self._get_db_connection()
             cursor = conn.cursor()
             
-            # Verifica se il metadato esiste già
+            # Determina il tipo di valore (value_num viene ricalcolato da SQLite)
+            text_value, value_type = self._serialize_metadata_value(value)
+            
+            # Inserisce o aggiorna il metadato
             cursor.execute(
-                "SELECT id FROM document_metadata WHERE document_id = ? AND key = ?", 
-                (document_id, key)
+                "INSERT INTO document_metadata (document_id, key, value, value_type) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(document_id, key) DO UPDATE SET value = excluded.value, value_type = excluded.value_type",
+                (document_id, key, text_value, value_type)
             )
-            existing = cursor.fetchone()
-            
-            # Determina il tipo di valore
-            value_type = "str"
-            if isinstance(value, int):
-                value_type = "int"
-            elif isinstance(value, float):
-                value_type = "float"
-            elif isinstance(value, bool):
-                value_type = "bool"
-            elif isinstance(value, dict) or isinstance(value, list):
-                value = json.dumps(value)
-                value_type = "json"
-            
-            if existing:
-                # Aggiorna il metadato esistente
-                cursor.execute(
-                    "UPDATE document_metadata SET value = ?, value_type = ? WHERE document_id = ? AND key = ?",
-                    (str(value), value_type, document_id, key)
-                )
-            else:
-                # Inserisce un nuovo metadato
-                cursor.execute(
-                    "INSERT INTO document_metadata (document_id, key, value, value_type) VALUES (?, ?, ?, ?)",
-                    (document_id, key, str(value), value_type)
-                )
             
             rows_affected = cursor.rowcount
             conn.commit()
@@ -629,21 +1218,68 @@ class SQLiteMetadataManager:
             logger.error(f"Errore nel recupero delle statistiche della collezione: {str(e)}")
             return {}
     
+    def _metadata_filter_clauses(self, metadata_filters: Optional[Dict[str, Any]]) -> Tuple[List[str], List[Any]]:
+        """
+        Traduce un filtro sui metadati (vedi app.utils.metadata_filter) in clausole sul documento `d`.
+        
+        Raises:
+            MetadataFilterError: Se il filtro non è valido.
+        """
+        if not metadata_filters:
+            return [], []
+        condition, params = compile_metadata_filter(metadata_filters)
+        return [condition], params
+    
+    def filter_document_ids(self, metadata_filter: Dict[str, Any], collection: Optional[str] = None,
+                            limit: Optional[int] = None) -> List[str]:
+        """
+        Restituisce gli ID dei documenti che soddisfano il filtro, usando gli indici tipizzati.
+        
+        Args:
+            metadata_filter: Filtro sui metadati (vedi app.utils.metadata_filter)
+            collection: Filtra per collezione (opzionale)
+            limit: Numero massimo di ID (opzionale)
+        
+        Raises:
+            MetadataFilterError: Se il filtro non è valido.
+        """
+        where, params = self._metadata_filter_clauses(metadata_filter)
+        if collection:
+            where.append("d.collection = ?")
+            params.append(collection)
+        
+        query = "SELECT d.id FROM documents d"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
     def search_documents(self, 
                         query: str, 
                         collection: Optional[str] = None,
                         metadata_filters: Optional[Dict[str, Any]] = None,
                         limit: int = 100,
-                        offset: int = 0) -> List[Dict[str, Any]]:
+                        offset: int = 0,
+                        fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Esegue una ricerca sui documenti in base al testo e ai metadati.
         
         Args:
-            query: Testo da cercare nel nome del file
+            query: Parole da cercare nel nome del file (vedi build_fts_query)
             collection: Nome della collezione (opzionale)
             metadata_filters: Filtri sui metadati (opzionale)
             limit: Numero massimo di documenti da restituire
             offset: Offset per la paginazione
+            fields: Campi da restituire (vedi get_documents)
             
         Returns:
             Lista di documenti che corrispondono ai criteri di ricerca.
@@ -652,23 +1288,31 @@ class SQLiteMetadataManager:
             conn = self._get_db_connection()
             cursor = conn.cursor()
             
+            columns, with_metadata = self._resolve_fields(fields)
+            
             # Query di base
             query_parts = ["1=1"]  # Trick per iniziare sempre con AND
             params = []
             
-            # Aggiungi filtro per testo
-            if query:
-                query_parts.append("filename LIKE ?")
-                params.append(f"%{query}%")
+            # Aggiungi filtro per testo (sul nome file, tramite l'indice full-text)
+            match = self.build_fts_query(query, column="filename") if query else ""
+            if match:
+                query_parts.append("d.rowid IN (SELECT rowid FROM documents_fts WHERE documents_fts MATCH ?)")
+                params.append(match)
             
             # Aggiungi filtro per collezione
             if collection:
-                query_parts.append("collection = ?")
+                query_parts.append("d.collection = ?")
                 params.append(collection)
             
+            # Filtri sui metadati applicati in SQL, prima di LIMIT/OFFSET
+            filter_clauses, filter_params = self._metadata_filter_clauses(metadata_filters)
+            query_parts.extend(filter_clauses)
+            params.extend(filter_params)
+            
             # Costruisci la query SQL
             sql_query = f"""
-                SELECT DISTINCT d.* 
+                SELECT {columns}
                 FROM documents d
                 WHERE {' AND '.join(query_parts)}
                 ORDER BY d.created_at DESC
@@ -677,62 +1321,11 @@ class SQLiteMetadataManager:
             params.extend([limit, offset])
             
             cursor.execute(sql_query, params)
-            document_rows = cursor.fetchall()
+            results = [dict(doc_row) for doc_row in cursor.fetchall()]
             
-            # Se ci sono filtri sui metadati, filtra ulteriormente i risultati
-            results = []
-            for doc_row in document_rows:
-                doc = dict(doc_row)
-                
-                # Ottieni metadati
-                cursor.execute(
-                    "SELECT key, value, value_type FROM document_metadata WHERE document_id = ?",
-                    (doc['id'],)
-                )
-                metadata_rows = cursor.fetchall()
-                
-                # Costruisci dizionario metadati
-                metadata = {}
-                for meta_row in metadata_rows:
-                    key = meta_row['key']
-                    value = meta_row['value']
-                    value_type = meta_row['value_type']
-                    
-                    # Converti il valore nel tipo corretto
-                    if value_type == 'int':
-                        try:
-                            value = int(value)
-                        except ValueError:
-                            # Se non può essere convertito, mantieni come stringa
-                            pass
-                    elif value_type == 'float':
-                        try:
-                            value = float(value)
-                        except ValueError:
-                            # Se non può essere convertito, mantieni come stringa
-                            pass
-                    elif value_type == 'bool':
-                        value = str(value).lower() in ('true', '1', 'yes')
-                    elif value_type == 'json':
-                        try:
-                            value = json.loads(value)
-                        except:
-                            pass
-                    
-                    metadata[key] = value
-                
-                doc['metadata'] = metadata
-                
-                # Applica filtri sui metadati
-                include_doc = True
-                if metadata_filters:
-                    for meta_key, meta_value in metadata_filters.items():
-                        if meta_key not in metadata or metadata[meta_key] != meta_value:
-                            include_doc = False
-                            break
-                
-                if include_doc:
-                    results.append(doc)
+            # Metadati di tutti i risultati in blocco
+            if with_metadata:
+                self._hydrate_metadata(cursor, results)
             
             conn.close()
             return results
@@ -770,6 +1363,142 @@ class SQLiteMetadataManager:
             logger.error(f"Errore nell'esportazione in JSON: {str(e)}")
             return False
     
+    def get_document_ids_page(self, after: Optional[str] = None, limit: int = 1000) -> List[str]:
+        """
+        Restituisce gli ID dei documenti in ordine crescente, a partire da quello
+        successivo ad `after` (paginazione per chiave sull'indice della chiave primaria).
+        
+        Args:
+            after: Ultimo ID della pagina precedente (None per iniziare)
+            limit: Numero massimo di ID
+            
+        Returns:
+            Lista ordinata di ID.
+        """
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            if after is None:
+                cursor.execute("SELECT id FROM documents ORDER BY id LIMIT ?", (limit,))
+            else:
+                cursor.execute("SELECT id FROM documents WHERE id > ? ORDER BY id LIMIT ?", (after, limit))
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def get_documents_by_ids(self, document_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Ottiene più documenti (con contenuto e metadati) in blocco.
+        
+        Args:
+            document_ids: ID dei documenti
+            
+        Returns:
+            Documenti trovati, nell'ordine di document_ids.
+        """
+        if not document_ids:
+            return []
+        
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            by_id = {}
+            for start in range(0, len(document_ids), self.METADATA_BATCH_SIZE):
+                chunk = document_ids[start:start + self.METADATA_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT * FROM documents WHERE id IN ({placeholders})", chunk)
+                for row in cursor.fetchall():
+                    by_id[row["id"]] = dict(row)
+            
+            documents = [by_id[document_id] for document_id in document_ids if document_id in by_id]
+            self._hydrate_metadata(cursor, documents)
+            return documents
+        finally:
+            conn.close()
+    
+    def _init_reconciliation_jobs(self, cursor) -> None:
+        """
+        Crea la tabella dello stato dei job di riconciliazione (checkpoint per la ripresa).
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reconciliation_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                position TEXT,
+                progress TEXT NOT NULL,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                finished_at TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reconciliation_jobs_created_at ON reconciliation_jobs(created_at)')
+    
+    @staticmethod
+    def _job_from_row(row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        return job
+    
+    def save_reconciliation_job(self, job: Dict[str, Any]) -> None:
+        """
+        Salva (inserisce o aggiorna) lo stato di un job di riconciliazione.
+        """
+        conn = self._get_db_connection()
+        try:
+            conn.execute('''
+                INSERT INTO reconciliation_jobs
+                    (id, status, params, position, progress, error, created_at, updated_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    params = excluded.params,
+                    position = excluded.position,
+                    progress = excluded.progress,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at,
+                    finished_at = excluded.finished_at
+            ''', (
+                job["id"], job["status"], json.dumps(job["params"]), job.get("position"),
+                json.dumps(job["progress"]), job.get("error"), job["created_at"],
+                datetime.now().isoformat(), job.get("finished_at")
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_reconciliation_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Restituisce lo stato salvato di un job di riconciliazione, o None.
+        """
+        conn = self._get_db_connection()
+        try:
+            row = conn.execute("SELECT * FROM reconciliation_jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job_from_row(row) if row else None
+        finally:
+            conn.close()
+    
+    def list_reconciliation_jobs(self, limit: int = 20, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Restituisce i job di riconciliazione più recenti, opzionalmente filtrati per stato.
+        """
+        conn = self._get_db_connection()
+        try:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM reconciliation_jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                    (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM reconciliation_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+            return [self._job_from_row(row) for row in rows]
+        finally:
+            conn.close()
+    
     def get_document_count(self, collection: Optional[str] = None) -> int:
         """
         Ottiene il numero totale di documenti, opzionalmente filtrati per collezione.
@@ -784,10 +1513,11 @@ class SQLiteMetadataManager:
             conn = self._get_db_connection()
             cursor = conn.cursor()
             
+            # Letto dai contatori mantenuti dai trigger: O(collezioni), non O(documenti)
             if collection:
-                cursor.execute("SELECT COUNT(*) FROM documents WHERE collection = ?", (collection,))
+                cursor.execute("SELECT COALESCE(SUM(count), 0) FROM document_counts WHERE collection = ?", (collection,))
             else:
-                cursor.execute("SELECT COUNT(*) FROM documents")
+                cursor.execute("SELECT COALESCE(SUM(count), 0) FROM document_counts")
             
             count = cursor.fetchone()[0]
             conn.close()
@@ -809,6 +1539,9 @@ class SQLiteMetadataManager:
         try:
             conn = sqlite3.connect(self.db_file)
             conn.execute("VACUUM")
+            # VACUUM può rinumerare i rowid di documents: riallinea l'indice full-text
+            self._rebuild_fulltext_index(conn.cursor())
+            conn.commit()
             conn.close()
             
             logger.info(f"Operazione VACUUM completata con successo sul database {self.db_file}")
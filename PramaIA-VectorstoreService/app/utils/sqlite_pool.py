@@ -0,0 +1,239 @@
+"""
+Pool di connessioni SQLite condiviso per file di database.
+
+Le connessioni vengono aperte una sola volta in modalità WAL (i lettori non si bloccano
+sugli scrittori), con busy_timeout, cache e mmap configurati e cache delle prepared
+statement attiva. I gestori continuano a usare `conn.close()`: sulle connessioni del
+pool questo restituisce la connessione invece di chiuderla.
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+# Configurazione logger
+logger = logging.getLogger(__name__)
+
+# Parametri del pool e delle PRAGMA (sovrascrivibili da variabili d'ambiente)
+SQLITE_POOL_SIZE = int(os.getenv("VECTORSTORE_SQLITE_POOL_SIZE", "8"))
+SQLITE_POOL_TIMEOUT = float(os.getenv("VECTORSTORE_SQLITE_POOL_TIMEOUT", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("VECTORSTORE_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("VECTORSTORE_SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("VECTORSTORE_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHED_STATEMENTS = int(os.getenv("VECTORSTORE_SQLITE_CACHED_STATEMENTS", "256"))
+
+
+class PooledConnection:
+    """
+    Connessione presa in prestito dal pool.
+
+    Espone la stessa interfaccia di `sqlite3.Connection`; `close()` annulla
+    un'eventuale transazione rimasta aperta e restituisce la connessione al pool.
+    """
+
+    def __init__(self, pool: "SQLiteConnectionPool", connection: sqlite3.Connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name: str) -> Any:
+        connection = self.__dict__.get("_connection")
+        if connection is None:
+            raise sqlite3.ProgrammingError("Connessione già restituita al pool")
+        return getattr(connection, name)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Come sqlite3.Connection: commit o rollback, senza chiudere
+        if exc_type is None:
+            self._connection.commit()
+        else:
+            self._connection.rollback()
+
+    def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool._release(connection)
+
+    def __del__(self):
+        # Rete di sicurezza per i percorsi di errore che non chiudono la connessione
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class SQLiteConnectionPool:
+    """
+    Pool limitato di connessioni verso un singolo file SQLite.
+    """
+
+    def __init__(self, db_file: str, size: int = SQLITE_POOL_SIZE, timeout: float = SQLITE_POOL_TIMEOUT):
+        self.db_file = db_file
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._generation = 0
+        self._generations: Dict[int, int] = {}
+
+        # Metriche
+        self.acquisitions = 0
+        self.wait_time_ms_total = 0.0
+        self.wait_time_ms_max = 0.0
+        self.timeouts = 0
+        self.in_use = 0
+
+    def _create_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+            check_same_thread=False,
+            cached_statements=SQLITE_CACHED_STATEMENTS
+        )
+        conn.row_factory = sqlite3.Row  # Per ottenere risultati come dizionari
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        # Necessario per ON DELETE CASCADE sui metadati (e per i trigger delle statistiche)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """
+        Prende in prestito una connessione, creandola se il pool non è ancora pieno.
+
+        Raises:
+            sqlite3.OperationalError: Se nessuna connessione si libera entro `timeout`.
+        """
+        start = time.perf_counter()
+        conn = None
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            create = False
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+            if create:
+                try:
+                    conn = self._create_connection()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                with self._lock:
+                    self._generations[id(conn)] = self._generation
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise sqlite3.OperationalError(
+                        f"Pool SQLite esaurito: nessuna connessione libera entro {self.timeout}s ({self.db_file})"
+                    )
+
+        waited_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.acquisitions += 1
+            self.in_use += 1
+            self.wait_time_ms_total += waited_ms
+            self.wait_time_ms_max = max(self.wait_time_ms_max, waited_ms)
+
+        return PooledConnection(self, conn)
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            pass
+
+        with self._lock:
+            self.in_use -= 1
+            stale = self._generations.get(id(conn)) != self._generation
+
+        if stale:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._generations.pop(id(conn), None)
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self) -> None:
+        """
+        Chiude le connessioni inattive; quelle in uso verranno chiuse alla restituzione.
+        Da usare prima di eliminare o sostituire il file del database.
+        """
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce le metriche del pool, incluso il tempo di attesa per una connessione.
+        """
+        with self._lock:
+            acquisitions = self.acquisitions
+            return {
+                "db_file": self.db_file,
+                "size": self.size,
+                "open_connections": self._created,
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "acquisitions": acquisitions,
+                "timeouts": self.timeouts,
+                "wait_time_ms_total": round(self.wait_time_ms_total, 3),
+                "wait_time_ms_avg": round(self.wait_time_ms_total / acquisitions, 3) if acquisitions else 0.0,
+                "wait_time_ms_max": round(self.wait_time_ms_max, 3)
+            }
+
+
+# Un pool per file di database, condiviso da tutte le istanze dei gestori
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file: str) -> SQLiteConnectionPool:
+    """
+    Restituisce il pool associato al file di database, creandolo se necessario.
+    """
+    key = os.path.abspath(db_file)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLiteConnectionPool(key)
+            _pools[key] = pool
+            logger.info(f"Pool SQLite creato per {key} (size={pool.size}, WAL)")
+        return pool
+
+
+def get_all_pool_stats() -> Dict[str, Any]:
+    """Restituisce le metriche di tutti i pool aperti."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.db_file: pool.get_stats() for pool in pools}
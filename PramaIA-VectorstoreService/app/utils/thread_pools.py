@@ -0,0 +1,219 @@
+"""
+Pool di thread limitati per il lavoro bloccante delle route.
+
+Le route FastAPI sono `async def`, ma ChromaDB, SQLite e il modello di embedding
+sono sincroni: eseguiti direttamente bloccherebbero l'event loop per tutte le
+richieste. Le route delegano quindi il lavoro a tre pool separati (letture,
+scritture, embedding), così un picco di scritture o di calcolo degli embedding non
+esaurisce i thread delle letture.
+
+Ogni pool accetta al massimo `workers + queue_size` operazioni in corso: oltre
+questo limite la richiesta viene rifiutata subito con `PoolSaturatedError`
+(429 con Retry-After) invece di accumularsi in una coda senza limiti; dopo lo
+shutdown il rifiuto diventa un 503.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+# Configurazione logger
+logger = logging.getLogger(__name__)
+
+# Dimensioni dei pool e delle code di attesa (sovrascrivibili da variabili d'ambiente)
+READ_POOL_WORKERS = int(os.getenv("VECTORSTORE_READ_POOL_WORKERS", "8"))
+READ_POOL_QUEUE_SIZE = int(os.getenv("VECTORSTORE_READ_POOL_QUEUE_SIZE", "64"))
+WRITE_POOL_WORKERS = int(os.getenv("VECTORSTORE_WRITE_POOL_WORKERS", "2"))
+WRITE_POOL_QUEUE_SIZE = int(os.getenv("VECTORSTORE_WRITE_POOL_QUEUE_SIZE", "16"))
+EMBEDDING_POOL_WORKERS = int(os.getenv("VECTORSTORE_EMBEDDING_POOL_WORKERS", "2"))
+EMBEDDING_POOL_QUEUE_SIZE = int(os.getenv("VECTORSTORE_EMBEDDING_POOL_QUEUE_SIZE", "32"))
+# Secondi suggeriti al client nell'header Retry-After quando un pool è saturo
+POOL_RETRY_AFTER_SECONDS = int(os.getenv("VECTORSTORE_POOL_RETRY_AFTER_SECONDS", "1"))
+
+
+class PoolSaturatedError(Exception):
+    """
+    Operazione rifiutata dal controllo di ammissione di un pool.
+
+    `status_code` è 429 se il pool è pieno, 503 se è stato arrestato.
+    """
+
+    def __init__(self, pool: str, status_code: int = 429, retry_after: int = POOL_RETRY_AFTER_SECONDS):
+        self.pool = pool
+        self.status_code = status_code
+        self.retry_after = retry_after
+        if status_code == 503:
+            message = f"Pool '{pool}' non disponibile: servizio in arresto"
+        else:
+            message = f"Pool '{pool}' saturo: riprovare tra {retry_after}s"
+        super().__init__(message)
+
+
+class BlockingPool:
+    """
+    Thread pool con capacità limitata e metriche di saturazione.
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.capacity = self.workers + self.queue_size
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metriche
+        self.in_flight = 0
+        self.active = 0
+        self.max_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_time_ms_total = 0.0
+        self.wait_time_ms_max = 0.0
+        self.run_time_ms_total = 0.0
+        self.run_time_ms_max = 0.0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._closed:
+                self.rejected += 1
+                raise PoolSaturatedError(self.name, status_code=503)
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise PoolSaturatedError(self.name)
+            self.in_flight += 1
+            self.submitted += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _release(self, future: Future) -> None:
+        # Chiamato anche se l'operazione viene annullata prima di partire
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Accoda l'operazione nel pool.
+
+        Raises:
+            PoolSaturatedError: Se il pool è pieno o arrestato.
+        """
+        self._admit()
+        enqueued = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            wait_ms = (started - enqueued) * 1000
+            with self._lock:
+                self.active += 1
+                self.wait_time_ms_total += wait_ms
+                self.wait_time_ms_max = max(self.wait_time_ms_max, wait_ms)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                run_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self.active -= 1
+                    self.run_time_ms_total += run_ms
+                    self.run_time_ms_max = max(self.run_time_ms_max, run_ms)
+
+        try:
+            future = self._executor.submit(task)
+        except RuntimeError:
+            # Executor già arrestato
+            with self._lock:
+                self.in_flight -= 1
+                self.submitted -= 1
+                self.rejected += 1
+            raise PoolSaturatedError(self.name, status_code=503)
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Esegue l'operazione bloccante nel pool senza bloccare l'event loop.
+
+        Raises:
+            PoolSaturatedError: Se il pool è pieno o arrestato.
+        """
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Rifiuta le nuove operazioni e attende quelle in corso."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Restituisce le metriche del pool: occupazione, rifiuti e tempi di attesa/esecuzione.
+        """
+        with self._lock:
+            started = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "capacity": self.capacity,
+                "active": self.active,
+                "queued": self.in_flight - self.active,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "saturation": round(self.in_flight / self.capacity, 3),
+                "worker_utilization": round(self.active / self.workers, 3),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "closed": self._closed,
+                "wait_time_ms_avg": round(self.wait_time_ms_total / started, 3) if started else 0.0,
+                "wait_time_ms_max": round(self.wait_time_ms_max, 3),
+                "run_time_ms_avg": round(self.run_time_ms_total / started, 3) if started else 0.0,
+                "run_time_ms_max": round(self.run_time_ms_max, 3)
+            }
+
+
+# Pool condivisi da tutte le route
+read_pool = BlockingPool("read", READ_POOL_WORKERS, READ_POOL_QUEUE_SIZE)
+write_pool = BlockingPool("write", WRITE_POOL_WORKERS, WRITE_POOL_QUEUE_SIZE)
+embedding_pool = BlockingPool("embedding", EMBEDDING_POOL_WORKERS, EMBEDDING_POOL_QUEUE_SIZE)
+
+_all_pools = (read_pool, write_pool, embedding_pool)
+
+
+async def run_read(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Esegue una lettura bloccante (SQLite, ChromaDB) nel pool delle letture."""
+    return await read_pool.run(func, *args, **kwargs)
+
+
+async def run_write(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Esegue una scrittura bloccante nel pool delle scritture."""
+    return await write_pool.run(func, *args, **kwargs)
+
+
+async def run_embedding(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Esegue il calcolo di embedding nel pool dedicato."""
+    return await embedding_pool.run(func, *args, **kwargs)
+
+
+def get_all_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Restituisce le metriche di tutti i pool, per nome."""
+    return {pool.name: pool.get_stats() for pool in _all_pools}
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """Arresta tutti i pool (chiamato allo shutdown del servizio)."""
+    for pool in _all_pools:
+        pool.shutdown(wait=wait)
+    logger.info("Pool di thread delle route arrestati")
@@ -15,7 +15,8 @@ import sys
 import logging
 from datetime import datetime
 import uvicorn
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from pathlib import Path
@@ -29,6 +30,7 @@ from app.api import api_router
 
 # Importa il file watcher personalizzato
 from app.utils.file_watcher import FileWatcher, start_file_watcher, FileChange
+from app.utils.thread_pools import PoolSaturatedError, shutdown_pools
 
 # Carica variabili d'ambiente
 load_dotenv()
@@ -76,6 +78,15 @@ async def app_lifespan(app: FastAPI):
         chroma_status = vector_db_manager.get_status()
         logger.info(f"ChromaDB inizializzato in modalita persistente locale. Stato: {chroma_status.get('status')}")
         
+        # Precarica il modello di embedding per non pagarne il caricamento sulla prima query
+        if os.getenv("VECTORSTORE_EMBEDDING_PRELOAD", "true").lower() == "true":
+            from app.core.embedding_manager import embedding_manager
+            embedding_manager.warmup()
+        
+        # Avvia la riconciliazione periodica dei contatori delle statistiche
+        from app.services.stats_service import stats_service
+        stats_service.start()
+        
         # Avvia il file watcher personalizzato
         monitored_paths = [
             os.getcwd(),  # Directory corrente
@@ -112,6 +123,21 @@ async def app_lifespan(app: FastAPI):
             file_watcher.stop()
             logger.info("File watcher arrestato.")
         
+        # Arresta la riconciliazione delle statistiche
+        from app.services.stats_service import stats_service
+        stats_service.stop()
+        
+        # Ferma l'eventuale job di riconciliazione (riprendibile al riavvio)
+        from app.services.reconciliation import reconciliation_service
+        reconciliation_service.stop()
+        
+        # Annulla ricostruzioni e benchmark degli indici (le collezioni parziali vengono eliminate)
+        from app.services.index_maintenance import index_maintenance_service
+        index_maintenance_service.stop()
+        
+        # Attende le operazioni in corso nei pool delle route
+        shutdown_pools()
+        
         logger.info("VectorstoreService arrestato con successo.")
     except Exception as e:
         logger.error(f"Errore durante l'arresto: {str(e)}")
@@ -133,6 +159,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Controllo di ammissione: pool delle route saturo (429) o in arresto (503)
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "pool": exc.pool},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Aggiungi i router all'app
 app.include_router(api_router)
 
@@ -161,9 +196,8 @@ async def reset_database_root():
         db_path = doc_db.db_file
         logger.info(f"Resettando database: {db_path}")
         
-        # Chiudi eventuali connessioni
-        if hasattr(doc_db, '_connection') and doc_db._connection:
-            doc_db._connection.close()
+        # Chiudi le connessioni del pool
+        doc_db.close_connections()
             
         # Rimuovi il file del database
         if os.path.exists(db_path):
@@ -0,0 +1,26 @@
+"""
+Configurazione comune dei test: rende importabile il package `app` anche
+quando pytest viene lanciato da una directory diversa da quella del servizio.
+"""
+
+import os
+import sys
+
+import pytest
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_ROOT not in sys.path:
+    sys.path.insert(0, SERVICE_ROOT)
+
+
+@pytest.fixture
+def vector_db(tmp_path, monkeypatch):
+    """VectorDBManager indipendente dal singleton, con i dati in una directory temporanea."""
+    from app.core import vectordb_manager as vectordb_module
+
+    monkeypatch.setattr(vectordb_module, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma_db"))
+    monkeypatch.setattr(vectordb_module, "QUANTIZED_INDEX_DIR", str(tmp_path / "chroma_db" / "quantized"))
+    manager = object.__new__(vectordb_module.VectorDBManager)
+    manager._initialized = False
+    manager.__init__()
+    return manager
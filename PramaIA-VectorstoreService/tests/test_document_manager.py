@@ -0,0 +1,182 @@
+"""
+Test del DocumentManager con ChromaDB e SQLite sostituiti da implementazioni in memoria.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from app.core.vectordb_manager import CHROMA_COLLECTION_NAME
+from app.utils import document_manager as document_manager_module
+from app.utils.document_manager import DocumentManager
+
+
+class FakeCollection:
+    """Collezione ChromaDB in memoria: id -> (documento, metadati, embedding)."""
+
+    def __init__(self):
+        self.vectors = {}
+
+    def get(self, ids=None, include=None):
+        found = [doc_id for doc_id in ids if doc_id in self.vectors]
+        return {
+            'ids': found,
+            'documents': [self.vectors[doc_id]['document'] for doc_id in found],
+            'metadatas': [self.vectors[doc_id]['metadata'] for doc_id in found]
+        }
+
+
+class FakeVectorDB:
+    """VectorDBManager in memoria: le collezioni esistono solo dopo get_collection(create=True)."""
+
+    def __init__(self, models=None):
+        self.collections = {}
+        self.models = models or {}
+
+    def list_collections(self, include_internal=False):
+        return list(self.collections)
+
+    def cached_collections(self, include_internal=False, refresh=False):
+        return sorted(self.collections)
+
+    def get_collection(self, collection_name=None, create=True):
+        name = collection_name or CHROMA_COLLECTION_NAME
+        if name not in self.collections:
+            if not create:
+                return None
+            self.collections[name] = FakeCollection()
+        return self.collections[name]
+
+    def get_collection_settings(self, collection_name=None):
+        name = collection_name or CHROMA_COLLECTION_NAME
+        if name not in self.collections:
+            return None
+        return {"embedding_model": self.models.get(name, "default-model")}
+
+    @contextmanager
+    def writing(self, collection_name, ids=None):
+        yield
+
+    def store_vectors(self, collection_name, ids, documents, metadatas, embeddings=None, upsert=False):
+        collection = self.collections[collection_name]
+        for i, doc_id in enumerate(ids):
+            if not upsert:
+                assert doc_id not in collection.vectors
+            collection.vectors[doc_id] = {
+                'document': documents[i],
+                'metadata': metadatas[i],
+                'embedding': embeddings[i] if embeddings is not None else None
+            }
+
+    def delete_vectors(self, collection_name, ids):
+        for doc_id in ids:
+            self.collections[collection_name].vectors.pop(doc_id, None)
+
+
+class FakeMetadataDB:
+    """SQLiteMetadataManager in memoria."""
+
+    def __init__(self, documents=None):
+        self.documents = {doc['id']: doc for doc in documents or []}
+
+    def get_document(self, doc_id):
+        return self.documents.get(doc_id)
+
+    def update_metadata(self, doc_id, key, value):
+        self.documents[doc_id].setdefault('metadata', {})[key] = value
+        return True
+
+    def delete_document(self, doc_id):
+        return self.documents.pop(doc_id, None) is not None
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    """Registra le chiamate a encode_documents e restituisce un vettore per modello."""
+    calls = []
+
+    def encode_documents(texts, model_name=None):
+        calls.append(model_name)
+        return [[float(len(text)), float(len(model_name))] for text in texts]
+
+    monkeypatch.setattr(document_manager_module.embedding_manager, "encode_documents", encode_documents)
+    return calls
+
+
+@pytest.fixture
+def chroma_changes(monkeypatch):
+    """Registra le variazioni del contatore dei vettori ChromaDB."""
+    changes = []
+    monkeypatch.setattr(document_manager_module.stats_service, "record_chroma_change", changes.append)
+    return changes
+
+
+def make_manager(vector_db, metadata_db):
+    manager = DocumentManager.__new__(DocumentManager)
+    manager.vector_db = vector_db
+    manager.metadata_db = metadata_db
+    return manager
+
+
+def test_update_document_creates_missing_collection(encoded):
+    # Il documento era binario: la sua collezione non esiste ancora in ChromaDB
+    metadata_db = FakeMetadataDB([{'id': 'doc-1', 'collection': 'manuali', 'metadata': {}}])
+    vector_db = FakeVectorDB(models={'manuali': 'modello-manuali'})
+    manager = make_manager(vector_db, metadata_db)
+
+    assert manager.update_document('doc-1', content="testo estratto") is True
+
+    stored = vector_db.collections['manuali'].vectors['doc-1']
+    assert stored['document'] == "testo estratto"
+    assert encoded == ['modello-manuali']
+    assert stored['embedding'] == [float(len("testo estratto")), float(len('modello-manuali'))]
+
+
+def test_delete_document_counts_only_existing_vectors(chroma_changes):
+    metadata_db = FakeMetadataDB([
+        {'id': 'doc-1', 'collection': 'manuali', 'metadata': {}},
+        {'id': 'doc-2', 'collection': 'manuali', 'metadata': {'is_binary': True}}
+    ])
+    vector_db = FakeVectorDB()
+    # doc-1 indicizzato sia prima (collezione predefinita) sia dopo il routing per collezione
+    for name in ('manuali', CHROMA_COLLECTION_NAME):
+        vector_db.get_collection(name)
+        vector_db.store_vectors(name, ['doc-1'], ["testo"], [{}])
+    manager = make_manager(vector_db, metadata_db)
+
+    assert manager.delete_document('doc-1') is True
+    assert chroma_changes == [-2]
+    assert all('doc-1' not in collection.vectors for collection in vector_db.collections.values())
+
+    # Documento senza vettori: nessuna variazione del contatore
+    assert manager.delete_document('doc-2') is True
+    assert chroma_changes == [-2]
+
+
+def test_search_embedding_models_skips_vanished_collections(monkeypatch):
+    vector_db = FakeVectorDB(models={'manuali': 'modello-manuali'})
+    for name in ('manuali', 'contratti', CHROMA_COLLECTION_NAME):
+        vector_db.get_collection(name)
+    manager = make_manager(vector_db, FakeMetadataDB())
+
+    # 'contratti' viene sostituita tra la scelta delle collezioni e la lettura delle impostazioni
+    get_collection_settings = vector_db.get_collection_settings
+    monkeypatch.setattr(vector_db, "get_collection_settings",
+                        lambda name=None: None if name == 'contratti' else get_collection_settings(name))
+
+    # La collezione predefinita è interrogata per i vettori indicizzati prima del routing
+    assert manager.search_embedding_models(['manuali', 'contratti']) == ['modello-manuali', 'default-model']
+
+
+def test_vectorize_documents_without_metadata(vector_db, encoded, chroma_changes):
+    manager = make_manager(vector_db, FakeMetadataDB())
+
+    statuses = manager.vectorize_documents([
+        {'id': 'doc-1', 'content': "documento senza metadati"},
+        {'id': 'doc-2', 'content': "documento con metadati", 'metadata': {'autore': 'test'}}
+    ])
+
+    assert [status['vectorized'] for status in statuses] == [True, True]
+    stored = vector_db.get_collection(CHROMA_COLLECTION_NAME).get(ids=['doc-1', 'doc-2'])
+    assert sorted(stored['ids']) == ['doc-1', 'doc-2']
+    assert chroma_changes == [2]
@@ -0,0 +1,134 @@
+"""
+Test del FileWatcher e della ChangeQueue su directory temporanee.
+"""
+
+import threading
+import time
+
+from app.utils import file_watcher as file_watcher_module
+from app.utils.file_watcher import ChangeQueue, ChangeType, FileChange, FileWatcher
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+class Recorder:
+    """Dispatch della ChangeQueue che registra i lotti consegnati."""
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            self.batches.append(list(batch))
+        return 0
+
+    @property
+    def changes(self):
+        with self.lock:
+            return [change for batch in self.batches for change in batch]
+
+
+def change(path, change_type, **metadata):
+    return FileChange(path=path, change_type=change_type, timestamp=time.time(), metadata=metadata or None)
+
+
+def test_change_queue_coalesces_changes_per_file():
+    recorder = Recorder()
+    queue = ChangeQueue(dispatch=recorder, debounce=0.1, workers=1)
+    queue.put(change("/docs/nuovo.txt", ChangeType.CREATED, size=1))
+    queue.put(change("/docs/nuovo.txt", ChangeType.MODIFIED, size=5))
+    queue.put(change("/docs/temp.txt", ChangeType.CREATED, size=1))
+    queue.put(change("/docs/temp.txt", ChangeType.DELETED))
+    queue.put(change("/docs/salvato.txt", ChangeType.DELETED))
+    queue.put(change("/docs/salvato.txt", ChangeType.CREATED, created=1.0))
+    queue.start()
+    try:
+        assert wait_for(lambda: len(recorder.changes) == 2)
+    finally:
+        queue.stop()
+
+    delivered = {c.path: c for c in recorder.changes}
+    # Creato e poi modificato: una sola creazione con la dimensione finale
+    assert delivered["/docs/nuovo.txt"].change_type == ChangeType.CREATED
+    assert delivered["/docs/nuovo.txt"].metadata["size"] == 5
+    # Creato e poi eliminato prima della consegna: nessuna modifica
+    assert "/docs/temp.txt" not in delivered
+    # Eliminato e ricreato (salvataggio atomico): una modifica
+    assert delivered["/docs/salvato.txt"].change_type == ChangeType.MODIFIED
+
+    stats = queue.get_stats()
+    assert stats["enqueued"] == 6
+    assert stats["coalesced"] == 3
+    assert stats["cancelled"] == 1
+    assert stats["dispatched"] == 2
+
+
+def test_change_queue_waits_for_file_to_settle():
+    recorder = Recorder()
+    queue = ChangeQueue(dispatch=recorder, debounce=0.3, workers=1)
+    queue.start()
+    try:
+        # Scritture ravvicinate: il debounce riparte ad ogni modifica
+        started = time.monotonic()
+        for size in range(5):
+            queue.put(change("/docs/log.txt", ChangeType.MODIFIED, size=size))
+            time.sleep(0.1)
+            assert recorder.changes == []
+        assert wait_for(lambda: recorder.changes)
+        assert time.monotonic() - started >= 0.4 + 0.3
+    finally:
+        queue.stop()
+
+    assert len(recorder.changes) == 1
+    assert recorder.changes[0].metadata["size"] == 4
+
+
+def test_change_queue_stop_flushes_pending_changes():
+    recorder = Recorder()
+    queue = ChangeQueue(dispatch=recorder, debounce=60, workers=1)
+    queue.start()
+    queue.put(change("/docs/a.txt", ChangeType.CREATED))
+    queue.stop()
+
+    assert [c.path for c in recorder.changes] == ["/docs/a.txt"]
+
+
+def test_polling_full_scan_interval_defaults_to_polling_setting(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_watcher_module, "FILE_WATCHER_POLLING_FULL_SCAN_SECONDS", 3.0)
+    monkeypatch.setattr(file_watcher_module, "FILE_WATCHER_FULL_SCAN_SECONDS", 60.0)
+
+    assert FileWatcher([str(tmp_path)], backend="polling").full_scan_interval == 3.0
+    assert FileWatcher([str(tmp_path)], backend="polling", full_scan_interval=10).full_scan_interval == 10
+
+
+def test_polling_detects_in_place_edit(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_watcher_module, "FILE_WATCHER_POLLING_FULL_SCAN_SECONDS", 0.2)
+    document = tmp_path / "documento.txt"
+    document.write_text("prima versione")
+
+    changes = []
+    lock = threading.Lock()
+
+    def on_batch(batch):
+        with lock:
+            changes.extend(batch)
+
+    watcher = FileWatcher([str(tmp_path)], interval=0.05, backend="polling",
+                          on_batch_callback=on_batch, debounce=0.05)
+    watcher.start()
+    try:
+        # Scrittura in-place: l'mtime della directory non cambia
+        time.sleep(0.1)
+        with open(document, "a") as f:
+            f.write(", modificata")
+        assert wait_for(lambda: any(change.change_type == ChangeType.MODIFIED for change in changes), timeout=3.0)
+    finally:
+        watcher.stop()
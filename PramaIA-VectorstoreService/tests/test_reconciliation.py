@@ -0,0 +1,133 @@
+"""
+Test della riconciliazione tra SQLite e ChromaDB, su archivi temporanei.
+"""
+
+import threading
+
+import pytest
+
+from app.core.vectordb_manager import CHROMA_COLLECTION_NAME
+from app.services import reconciliation as reconciliation_module
+from app.services.reconciliation import ReconciliationService, _new_progress
+from app.utils import document_manager as document_manager_module
+from app.utils.document_manager import DocumentManager
+from app.utils.sqlite_metadata_manager import SQLiteMetadataManager
+
+CONTENT = "Contenuto del documento abbastanza lungo da essere vettorizzato"
+
+
+@pytest.fixture
+def chroma_changes(monkeypatch):
+    changes = []
+    monkeypatch.setattr(reconciliation_module.stats_service, "record_chroma_change", changes.append)
+    monkeypatch.setattr(document_manager_module.stats_service, "record_chroma_change", changes.append)
+    return changes
+
+
+@pytest.fixture
+def service(tmp_path, vector_db, chroma_changes, monkeypatch):
+    """ReconciliationService indipendente dal singleton, su SQLite e ChromaDB temporanei."""
+    monkeypatch.setattr(document_manager_module.embedding_manager, "encode_documents",
+                        lambda texts, model_name=None: [[float(len(text)), 1.0, 0.0] for text in texts])
+    manager = DocumentManager.__new__(DocumentManager)
+    manager.vector_db = vector_db
+    manager.metadata_db = SQLiteMetadataManager(data_dir=str(tmp_path / "data"), migrate_from_json=False)
+
+    reconciliation = object.__new__(ReconciliationService)
+    reconciliation._initialized = False
+    reconciliation.__init__()
+    reconciliation._document_manager = manager
+    return reconciliation
+
+
+def add_sqlite_document(service, doc_id, content=CONTENT, **metadata):
+    assert service.metadata_db.add_document({
+        'id': doc_id, 'filename': f"{doc_id}.txt", 'collection': '', 'content': content, 'metadata': metadata
+    })
+
+
+def add_vector(service, doc_id):
+    service.document_manager.vector_db.store_vectors(
+        CHROMA_COLLECTION_NAME, ids=[doc_id], documents=[CONTENT], metadatas=[{'source': 'test'}],
+        embeddings=[[1.0, 0.0, 0.0]]
+    )
+
+
+def vector_ids(service):
+    collection = service.document_manager.vector_db.get_collection(CHROMA_COLLECTION_NAME)
+    return sorted(collection.get(include=[])['ids'])
+
+
+def run_job(service, **params):
+    job = {
+        "id": "test",
+        "params": {"dry_run": False, "page_size": 2, "repair_batch_size": 2,
+                   "delete_orphan_vectors": True, "reindex_missing_vectors": True, **params},
+        "position": None,
+        "progress": _new_progress()
+    }
+    assert service._reconcile(job, persist=False, cancel_event=threading.Event())
+    return job["progress"]
+
+
+@pytest.fixture
+def populated(service):
+    # doc-a allineato, doc-b senza vettore, doc-c binario, doc-d e doc-z vettori orfani
+    for doc_id in ("doc-a", "doc-b"):
+        add_sqlite_document(service, doc_id)
+    add_sqlite_document(service, "doc-c", content="BINARY_FILE: immagine.png", is_binary=True)
+    for doc_id in ("doc-a", "doc-d", "doc-z"):
+        add_vector(service, doc_id)
+    return service
+
+
+def test_diff_detects_orphan_and_missing_vectors(populated):
+    progress = populated.diff(page_size=2)
+
+    assert progress["matched"] == 1
+    assert progress["only_in_sqlite"] == 1
+    assert progress["samples"]["only_in_sqlite"] == ["doc-b"]
+    assert progress["only_in_sqlite_not_vectorizable"] == 1
+    assert progress["only_in_chroma"] == 2
+    assert progress["samples"]["only_in_chroma"] == ["doc-d", "doc-z"]
+    assert progress["sqlite_scanned"] == 3
+    assert progress["chroma_scanned"] == 3
+    # Il confronto non corregge nulla
+    assert vector_ids(populated) == ["doc-a", "doc-d", "doc-z"]
+
+
+def test_reconcile_repairs_orphan_and_missing_vectors(populated, chroma_changes):
+    progress = run_job(populated)
+
+    assert progress["vectors_added"] == 1
+    assert progress["vectors_deleted"] == 2
+    assert progress["repair_errors"] == 0
+    assert vector_ids(populated) == ["doc-a", "doc-b"]
+    assert sum(chroma_changes) == 1 - 2
+
+    clean = populated.diff(page_size=2)
+    assert clean["matched"] == 2
+    assert clean["only_in_sqlite"] == clean["only_in_chroma"] == 0
+
+
+def test_dry_run_does_not_repair(populated):
+    progress = run_job(populated, dry_run=True)
+
+    assert progress["only_in_chroma"] == 2
+    assert progress["vectors_added"] == progress["vectors_deleted"] == 0
+    assert vector_ids(populated) == ["doc-a", "doc-d", "doc-z"]
+
+
+def test_orphan_recheck_keeps_documents_added_during_scan(populated, chroma_changes):
+    # doc-d risulta orfano nella scansione, ma il documento arriva in SQLite prima dell'eliminazione
+    add_sqlite_document(populated, "doc-d")
+    job = {"params": {"dry_run": False, "delete_orphan_vectors": True}, "progress": _new_progress()}
+    vector_db = populated.document_manager.vector_db
+    collections = {CHROMA_COLLECTION_NAME: vector_db.get_collection(CHROMA_COLLECTION_NAME)}
+
+    populated._repair_orphan_vectors(job, collections, [("doc-d", CHROMA_COLLECTION_NAME),
+                                                        ("doc-z", CHROMA_COLLECTION_NAME)])
+
+    assert vector_ids(populated) == ["doc-a", "doc-d"]
+    assert job["progress"]["vectors_deleted"] == 1
+    assert chroma_changes == [-1]
@@ -0,0 +1,55 @@
+"""
+Test del registro delle collezioni del VectorDBManager, su un ChromaDB persistente temporaneo.
+"""
+
+import pytest
+
+from app.core.vectordb_manager import CHROMA_COLLECTION_NAME
+
+
+@pytest.fixture
+def client_listings(vector_db, monkeypatch):
+    """Conta le chiamate a list_collections del client ChromaDB."""
+    calls = []
+    list_collections = vector_db._client.list_collections
+
+    def counting_list_collections(*args, **kwargs):
+        calls.append(1)
+        return list_collections(*args, **kwargs)
+
+    monkeypatch.setattr(vector_db._client, "list_collections", counting_list_collections)
+    return calls
+
+
+def test_cached_collections_reads_client_once(vector_db, client_listings):
+    for _ in range(5):
+        assert vector_db.cached_collections() == [CHROMA_COLLECTION_NAME]
+    assert len(client_listings) == 1
+
+    # Le collezioni aperte o eliminate dal manager aggiornano il registro
+    vector_db.create_collection("manuali")
+    listings = len(client_listings)
+    assert vector_db.cached_collections() == ["manuali", CHROMA_COLLECTION_NAME]
+    vector_db.drop_collection("manuali")
+    assert vector_db.cached_collections() == [CHROMA_COLLECTION_NAME]
+    assert len(client_listings) == listings
+
+
+def test_cached_collections_refresh_sees_external_changes(vector_db):
+    assert vector_db.cached_collections() == [CHROMA_COLLECTION_NAME]
+    vector_db._client.create_collection(name="esterna")
+
+    assert vector_db.cached_collections() == [CHROMA_COLLECTION_NAME]
+    assert vector_db.cached_collections(refresh=True) == ["esterna", CHROMA_COLLECTION_NAME]
+
+
+def test_swap_collection_updates_cached_collections(vector_db):
+    vector_db.create_collection("manuali")
+    target_name, _ = vector_db.create_rebuild_collection("manuali", {"m": 32})
+    assert target_name in vector_db.cached_collections(include_internal=True)
+
+    vector_db.swap_collection("manuali", target_name)
+
+    assert vector_db.cached_collections(include_internal=True) == ["manuali", CHROMA_COLLECTION_NAME]
+    assert vector_db.cached_collections(include_internal=True, refresh=True) == ["manuali", CHROMA_COLLECTION_NAME]
+    assert vector_db.get_collection_settings("manuali")["m"] == 32
@@ -178,8 +178,8 @@ class VectorstoreMonitor:
         }
         
         # Raccogli statistiche per ogni collezione
-        if stats.get("status") != "error" and "collections" in stats:
-            for collection in stats["collections"]:
+        if stats.get("status") != "error" and "by_collection" in stats:
+            for collection in stats["by_collection"]:
                 collection_name = collection.get("name")
                 if collection_name:
                     collection_stats = self.get_collection_stats(collection_name)
@@ -226,13 +226,19 @@ class VectorstoreMonitor:
             print("\nSTATISTICHE GENERALI:")
             print(f"- Collezioni totali: {stats.get('collection_count', 'N/A')}")
             print(f"- Documenti totali: {stats.get('total_documents', 'N/A')}")
+            print(f"- Documenti oggi: {stats.get('documents_today', 'N/A')}")
             print(f"- Spazio su disco: {stats.get('disk_usage', 'N/A')}")
+            
+            stats_reconciliation = stats.get("stats_reconciliation", {})
+            if stats_reconciliation.get("last_run"):
+                print(f"- Ultima riconciliazione statistiche: {stats_reconciliation['last_run']} "
+                      f"(derive corrette: {len(stats_reconciliation.get('drift_corrected', {}))})")
         
         # Collezioni
-        if stats.get("status") != "error" and "collections" in stats:
+        if stats.get("status") != "error" and "by_collection" in stats:
             print("\nCOLLEZIONI:")
             collections_data = []
-            for collection in stats["collections"]:
+            for collection in stats["by_collection"]:
                 collection_name = collection.get("name", "N/A")
                 doc_count = collection.get("document_count", "N/A")
                 